@@ -195,6 +195,10 @@ class AXdrDecoder:
                 parsed_data.append(self.decode_structure())
                 continue
 
+            if data_class == dlms_data.BitStringData:
+                parsed_data.append(self.decode_data(data_class))
+                continue
+
             if data_class.LENGTH != VARIABLE_LENGTH:
                 parsed_data.append(
                     data_class.from_bytes(
@@ -236,6 +240,14 @@ class AXdrDecoder:
     def decode_data(self, data_class):
         assert data_class not in [dlms_data.DataArray, dlms_data.DataStructure]
 
+        if data_class == dlms_data.BitStringData:
+            # The length of a bit string is the number of bits, not bytes.
+            bit_length = self.get_axdr_length()
+            bits = data_class.from_bytes(
+                self.get_bytes(data_class.byte_length(bit_length))
+            )
+            return bits.value[:bit_length]
+
         if data_class.LENGTH == VARIABLE_LENGTH:
             length = self.get_axdr_length()
             return data_class.from_bytes(self.get_bytes(length)).to_python()
@@ -0,0 +1,207 @@
+import logging
+import time
+from typing import *
+
+import attr
+
+from dlms_cosem import cosem, enumerations, invocation_counters, tracing
+from dlms_cosem.clients.async_hdlc_transport import AsyncSerialHdlcTransport
+from dlms_cosem.clients.dlms_client import BaseDlmsClient, DlmsExchange
+from dlms_cosem.cosem.selective_access import RangeDescriptor
+from dlms_cosem.protocol import acse, xdlms
+from dlms_cosem.protocol.xdlms.access import (
+    AccessRequestSpecification,
+    AccessResponseSpecification,
+)
+
+LOG = logging.getLogger(__name__)
+
+
+@attr.s(auto_attribs=True)
+class AsyncDlmsSession:
+    """
+    Async context manager connecting and associating the client on enter and releasing
+    the association and disconnecting on exit.
+    """
+
+    client: "AsyncDlmsClient"
+
+    async def __aenter__(self) -> "AsyncDlmsClient":
+        await self.client.connect()
+        await self.client.associate()
+        return self.client
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.client.release_association()
+        await self.client.disconnect()
+
+
+@attr.s(auto_attribs=True)
+class AsyncDlmsClient(BaseDlmsClient):
+    """
+    DLMS client for asyncio. Works as `DlmsClient` but all methods doing I/O are
+    coroutines and the transport has to implement `AsyncDlmsIOInterface`.
+
+    Many meters can be read concurrently from one event loop:
+
+        async with client.session() as session:
+            data = await session.get(attribute)
+    """
+
+    @classmethod
+    def with_serial_hdlc_transport(
+        cls,
+        serial_port: str,
+        client_logical_address: int,
+        server_logical_address: int,
+        server_physical_address: Optional[int],
+        client_physical_address: Optional[int] = None,
+        baud_rate: int = 9600,
+        authentication_method: Optional[enumerations.AuthenticationMechanism] = None,
+        password: Optional[bytes] = None,
+        encryption_key: Optional[bytes] = None,
+        authentication_key: Optional[bytes] = None,
+        security_suite: Optional[int] = 0,
+        dedicated_ciphering: bool = False,
+        block_transfer: bool = False,
+        action_block_transfer: bool = False,
+        max_pdu_size: int = 65535,
+        client_system_title: Optional[bytes] = None,
+        client_initial_invocation_counter: int = 0,
+        meter_initial_invocation_counter: int = 0,
+        invocation_counter_store: Optional[
+            invocation_counters.InvocationCounterStore
+        ] = None,
+        tracer: Optional[tracing.Tracer] = None,
+        timeout: int = 10,
+        hdlc_max_info_length: int = 128,
+        hdlc_window_size: int = 1,
+    ):
+        serial_client = AsyncSerialHdlcTransport(
+            client_logical_address=client_logical_address,
+            client_physical_address=client_physical_address,
+            server_logical_address=server_logical_address,
+            server_physical_address=server_physical_address,
+            serial_port=serial_port,
+            serial_baud_rate=baud_rate,
+            timeout=timeout,
+            max_info_length=hdlc_max_info_length,
+            window_size=hdlc_window_size,
+        )
+        return cls(
+            client_logical_address=client_logical_address,
+            server_logical_address=server_logical_address,
+            authentication_method=authentication_method,
+            password=password,
+            encryption_key=encryption_key,
+            authentication_key=authentication_key,
+            security_suite=security_suite,
+            dedicated_ciphering=dedicated_ciphering,
+            block_transfer=block_transfer,
+            action_block_transfer=action_block_transfer,
+            max_pdu_size=max_pdu_size,
+            client_system_title=client_system_title,
+            client_initial_invocation_counter=client_initial_invocation_counter,
+            meter_initial_invocation_counter=meter_initial_invocation_counter,
+            invocation_counter_store=invocation_counter_store,
+            tracer=tracer,
+            timeout=timeout,
+            io_interface=serial_client,
+        )
+
+    def session(self) -> AsyncDlmsSession:
+        return AsyncDlmsSession(self)
+
+    async def run_exchange(self, exchange: DlmsExchange):
+        """
+        Sends the requests of the exchange and returns its result.
+        """
+        response = None
+        while True:
+            try:
+                request = exchange.send(response)
+            except StopIteration as stop:
+                return stop.value
+            await self.send(request)
+            response = self.next_event()
+
+    async def get(
+        self,
+        cosem_attribute: cosem.CosemAttribute,
+        access_descriptor: Optional[RangeDescriptor] = None,
+    ) -> bytes:
+        return await self.run_exchange(
+            self.get_exchange(cosem_attribute, access_descriptor)
+        )
+
+    async def get_many(
+        self, cosem_attributes_with_selection: List[cosem.CosemAttributeWithSelection]
+    ):
+        """
+        Make a GET.WITH_LIST call. Get many items in one request.
+        """
+        return await self.run_exchange(
+            self.get_many_exchange(cosem_attributes_with_selection)
+        )
+
+    async def set(self, cosem_attribute: cosem.CosemAttribute, data: bytes):
+        return await self.run_exchange(self.set_exchange(cosem_attribute, data))
+
+    async def access(
+        self,
+        requests: List[AccessRequestSpecification],
+        self_descriptive: bool = False,
+        break_on_error: bool = False,
+    ) -> List[AccessResponseSpecification]:
+        """
+        Make an ACCESS call, see `DlmsClient.access`.
+        """
+        return await self.run_exchange(
+            self.access_exchange(requests, self_descriptive, break_on_error)
+        )
+
+    async def action(self, method: cosem.CosemMethod, data: bytes):
+        return await self.run_exchange(self.action_exchange(method, data))
+
+    async def action_many(
+        self, methods: List[cosem.CosemMethod], data: List[Optional[bytes]]
+    ) -> List[xdlms.ActionResponseWithOptionalData]:
+        """
+        Make an ACTION.WITH_LIST call, see `DlmsClient.action_many`.
+        """
+        return await self.run_exchange(self.action_many_exchange(methods, data))
+
+    async def associate(
+        self,
+        association_request: Optional[acse.ApplicationAssociationRequest] = None,
+    ) -> acse.ApplicationAssociationResponse:
+        return await self.run_exchange(self.associate_exchange(association_request))
+
+    async def send_hls_reply(self) -> Optional[bytes]:
+        return await self.run_exchange(self.hls_reply_exchange())
+
+    async def release_association(self) -> acse.ReleaseResponse:
+        return await self.run_exchange(self.release_exchange())
+
+    async def connect(self):
+        await self.io_interface.connect()
+
+    async def disconnect(self):
+        self.save_invocation_counters()
+        await self.io_interface.disconnect()
+
+    async def send(self, *events):
+        for event in events:
+            data = self.request_bytes(event)
+            if self.tracer is None:
+                response_bytes = await self.io_interface.send(data)
+            else:
+                started = time.perf_counter()
+                response_bytes = await self.io_interface.send(data)
+                self.tracer.record(
+                    tracing.TRANSPORT,
+                    time.perf_counter() - started,
+                    len(data) + len(response_bytes),
+                )
+
+            self.dlms_connection.receive_data(response_bytes)
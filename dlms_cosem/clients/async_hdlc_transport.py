@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+from typing import *
+
+import attr
+import serial
+
+from dlms_cosem import exceptions, tracing
+from dlms_cosem.clients.hdlc_transport import (
+    RECEIVE_FRAME,
+    BaseHdlcTransport,
+    HdlcExchange,
+)
+from dlms_cosem.hdlc import connection, state
+
+LOG = logging.getLogger(__name__)
+
+READ_SIZE = 4096
+
+
+async def wait_until_writable(fd: int):
+    loop = asyncio.get_event_loop()
+    writable = loop.create_future()
+
+    def set_writable():
+        if not writable.done():
+            writable.set_result(None)
+
+    loop.add_writer(fd, set_writable)
+    try:
+        await writable
+    finally:
+        loop.remove_writer(fd)
+
+
+async def write_non_blocking(fd: int, data: bytes):
+    """
+    Writes all data to a non-blocking file descriptor. When the output buffer of the
+    port is full we wait until it is writable again.
+    """
+    view = memoryview(data)
+    while view:
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            await wait_until_writable(fd)
+            continue
+        view = view[written:]
+
+
+@attr.s(auto_attribs=True)
+class AsyncSerialHdlcTransport(BaseHdlcTransport):
+    """
+    HDLC transport to send data over serial using asyncio. The HDLC connection,
+    segmentation and windowing are the same as in `SerialHdlcTransport`.
+
+    pyserial is only used to open and configure the port. The file descriptor is read
+    with `loop.add_reader` and written non-blocking so one event loop can serve many
+    serial ports without a thread per port. Needs an event loop supporting
+    `add_reader` on a serial port, which is the default loop on Linux and macOS.
+
+    Waiting for a response longer than `timeout` seconds raises a CommunicationError.
+    """
+
+    client_logical_address: int
+    server_logical_address: int
+    serial_port: str
+    serial_baud_rate: int = attr.ib(default=9600)
+    server_physical_address: Optional[int] = attr.ib(default=None)
+    client_physical_address: Optional[int] = attr.ib(default=None)
+    timeout: int = attr.ib(default=10)
+    # Proposed to the meter in the SNRM. The negotiated values are used.
+    max_info_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    hdlc_connection: connection.HdlcConnection = attr.ib(
+        default=attr.Factory(
+            lambda self: connection.HdlcConnection(
+                self.client_hdlc_address,
+                self.server_hdlc_address,
+                max_data_size=self.max_info_length,
+                max_data_size_receive=self.max_info_length,
+                window_size_transmit=self.window_size,
+                window_size_receive=self.window_size,
+            ),
+            takes_self=True,
+        )
+    )
+    _serial: Optional[serial.Serial] = attr.ib(default=None)
+    tracer: Optional[tracing.Tracer] = attr.ib(default=None, repr=False)
+
+    out_buffer: bytearray = attr.ib(init=False, factory=bytearray)
+    request_sent_at: float = attr.ib(init=False, default=0.0)
+    # Data or errors from the reader callback. Created when the port is opened so it
+    # belongs to the running event loop.
+    _received: Optional[asyncio.Queue] = attr.ib(init=False, default=None)
+
+    def open(self):
+        """
+        Opens the serial port and starts reading it in the running event loop.
+        """
+        if self._serial is None:
+            self._serial = serial.Serial(
+                port=self.serial_port, baudrate=self.serial_baud_rate, timeout=0
+            )
+        elif not self._serial.is_open:
+            self._serial.open()
+        self._received = asyncio.Queue()
+        asyncio.get_event_loop().add_reader(self._serial.fileno(), self._data_received)
+
+    def close(self):
+        """
+        Stops reading the serial port and closes it.
+        """
+        if self._serial is None or not self._serial.is_open:
+            return
+        asyncio.get_event_loop().remove_reader(self._serial.fileno())
+        self._serial.close()
+
+    async def run_exchange(self, exchange: HdlcExchange):
+        """
+        Writes what the exchange yields and waits for the frames it needs. Returns the
+        result of the exchange.
+        """
+        received = None
+        while True:
+            try:
+                action = exchange.send(received)
+            except StopIteration as stop:
+                return stop.value
+            if action is RECEIVE_FRAME:
+                received = await self.next_event()
+            else:
+                await self._write_bytes(action)
+                received = None
+
+    async def connect(self):
+        """
+        Opens the serial port and sets up the HDLC Connection by sending a SNRM
+        request. The HDLC parameters are negotiated as in `SerialHdlcTransport`.
+        """
+        self.check_not_connected()
+        self.open()
+        return await self.run_exchange(self.connect_exchange())
+
+    async def disconnect(self):
+        """
+        Sends a DisconnectFrame and closes the serial port.
+        """
+        try:
+            return await self.run_exchange(self.disconnect_exchange())
+        finally:
+            self.close()
+
+    async def next_event(self):
+        """
+        Waits for data on the serial line until a proper response event is read.
+        """
+        while True:
+            event = self.hdlc_connection.next_event()
+            if event is state.NEED_DATA:
+                self.hdlc_connection.receive_data(await self._read())
+                continue
+            return event
+
+    async def send(self, telegram: bytes) -> bytes:
+        """
+        Sends the telegram and returns the response data when received in full.
+        """
+        return await self.run_exchange(self.send_exchange(telegram))
+
+    def _data_received(self):
+        """
+        Called by the event loop when the serial port is readable.
+        """
+        try:
+            data = os.read(self._serial.fileno(), READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # The reader is removed so the loop is not spinning on a broken port.
+            asyncio.get_event_loop().remove_reader(self._serial.fileno())
+            self._received.put_nowait(e)
+            return
+        if not data:
+            asyncio.get_event_loop().remove_reader(self._serial.fileno())
+            self._received.put_nowait(ConnectionError(f"{self.serial_port} was closed"))
+            return
+        self._received.put_nowait(data)
+
+    async def _read(self) -> bytes:
+        try:
+            data = await asyncio.wait_for(self._received.get(), self.timeout)
+        except asyncio.TimeoutError:
+            raise exceptions.CommunicationError(
+                f"No data received on {self.serial_port} within {self.timeout} seconds"
+            )
+        if isinstance(data, Exception):
+            raise exceptions.CommunicationError(
+                f"Could not read from {self.serial_port}"
+            ) from data
+        return data
+
+    async def _write_bytes(self, to_write: bytes):
+        LOG.debug("Sending: %r", to_write)
+        try:
+            await write_non_blocking(self._serial.fileno(), to_write)
+        except OSError as e:
+            raise exceptions.CommunicationError(
+                f"Could not write to {self.serial_port}"
+            ) from e
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
@@ -1,10 +1,11 @@
 import logging
 import socket
+import time
 from typing import *
 
 import attr
 
-from dlms_cosem import exceptions
+from dlms_cosem import exceptions, metrics, tracing
 from dlms_cosem.clients.io_proto import DlmsIOInterface
 from dlms_cosem.protocol.wrappers import WrapperHeader, WrapperProtocolDataUnit
 
@@ -22,6 +23,7 @@ class BlockingTcpTransport:
     client_logical_address: int
     server_logical_address: int
     timeout: int = attr.ib(default=10)
+    tracer: Optional[tracing.Tracer] = attr.ib(default=None, repr=False)
     tcp_socket: Optional[socket.socket] = attr.ib(init=False, default=None)
 
     @property
@@ -85,12 +87,24 @@ class BlockingTcpTransport:
         """
         if not self.tcp_socket:
             raise RuntimeError("TCP transport not connected.")
+        tracer = self.tracer
+        if tracer is not None:
+            started = time.perf_counter()
+        wrapped = self.wrap(bytes_to_send)
         try:
-            self.tcp_socket.sendall(self.wrap(bytes_to_send))
+            self.tcp_socket.sendall(wrapped)
         except (OSError, IOError, socket.timeout, socket.error) as e:
             raise exceptions.CommunicationError("Could no send data") from e
-
-        return self.recv()
+        if metrics.REGISTRY.enabled:
+            metrics.BYTES_SENT.inc("tcp", amount=len(wrapped))
+        if tracer is None:
+            return self.recv()
+
+        sent = time.perf_counter()
+        tracer.record(tracing.TRANSPORT_SEND, sent - started, len(bytes_to_send))
+        data = self.recv()
+        tracer.record(tracing.TRANSPORT_RECEIVE, time.perf_counter() - sent, len(data))
+        return data
 
     def recv(self) -> bytes:
         """
@@ -101,6 +115,8 @@ class BlockingTcpTransport:
             data = self._recv_bytes(header.length)
         except (OSError, IOError, socket.timeout, socket.error) as e:
             raise exceptions.CommunicationError("Could not receive data") from e
+        if metrics.REGISTRY.enabled:
+            metrics.BYTES_RECEIVED.inc("tcp", amount=8 + len(data))
         return data
 
     def _recv_bytes(self, amount: int):
@@ -1,17 +1,32 @@
 import contextlib
 import logging
+import time
 from typing import *
 
 import attr
 
-from dlms_cosem import cosem, dlms_data, enumerations, exceptions, state, utils
+from dlms_cosem import (
+    cosem,
+    dlms_data,
+    enumerations,
+    exceptions,
+    invocation_counters,
+    state,
+    tracing,
+    utils,
+)
 from dlms_cosem.clients.blocking_tcp_transport import BlockingTcpTransport
+from dlms_cosem.clients.hdlc_tcp_transport import HdlcTcpTransport
 from dlms_cosem.clients.hdlc_transport import SerialHdlcTransport
-from dlms_cosem.clients.io_proto import DlmsIOInterface
+from dlms_cosem.clients.io_proto import AsyncDlmsIOInterface, DlmsIOInterface
 from dlms_cosem.connection import DlmsConnection
 from dlms_cosem.cosem.selective_access import RangeDescriptor
 from dlms_cosem.protocol import acse, xdlms
 from dlms_cosem.protocol.xdlms import ConfirmedServiceError
+from dlms_cosem.protocol.xdlms.access import (
+    AccessRequestSpecification,
+    AccessResponseSpecification,
+)
 
 LOG = logging.getLogger(__name__)
 
@@ -28,11 +43,23 @@ class HLSError(Exception):
     """error in HLS procedure"""
 
 
+# An exchange yields the requests to send, gets the response to each request sent in
+# and returns the result of the service.
+DlmsExchange = Generator[Any, Any, Any]
+
+
 @attr.s(auto_attribs=True)
-class DlmsClient:
+class BaseDlmsClient:
+    """
+    The DLMS services of the clients without any I/O. Each service is an exchange
+    that yields the requests to send and gets the response to each request sent in.
+    `DlmsClient` runs them with a blocking transport and `AsyncDlmsClient` with an
+    asyncio transport.
+    """
+
     client_logical_address: int
     server_logical_address: int
-    io_interface: DlmsIOInterface
+    io_interface: Union[DlmsIOInterface, AsyncDlmsIOInterface]
     authentication_method: Optional[enumerations.AuthenticationMechanism] = attr.ib(
         default=None
     )
@@ -42,11 +69,30 @@ class DlmsClient:
     security_suite: Optional[int] = attr.ib(default=0)
     dedicated_ciphering: bool = attr.ib(default=False)
     block_transfer: bool = attr.ib(default=False)
+    # Proposes block transfer of ACTION parameters and results to the meter.
+    action_block_transfer: bool = attr.ib(default=False)
     max_pdu_size: int = attr.ib(default=65535)
     client_system_title: Optional[bytes] = attr.ib(default=None)
     client_initial_invocation_counter: int = attr.ib(default=0)
     meter_initial_invocation_counter: int = attr.ib(default=0)
     timeout: int = attr.ib(default=10)
+    # Invocation counters are reserved in and saved to the store when it is set. The
+    # counters are stored on `invocation_counter_key`, by default made from the client
+    # address and the encryption key.
+    invocation_counter_store: Optional[
+        invocation_counters.InvocationCounterStore
+    ] = attr.ib(default=None)
+    invocation_counter_key: Optional[str] = attr.ib(default=None)
+    counter_reservation: Optional[invocation_counters.CounterReservation] = attr.ib(
+        default=None, init=False
+    )
+    # Receives the timings of the client, the connection and the transport when set.
+    # Set it with the `tracer` argument or property so the connection and transport
+    # get it too.
+    _tracer: Optional[tracing.Tracer] = attr.ib(default=None, repr=False)
+
+    # Long invoke id of the last ACCESS request. Used to match responses to requests.
+    long_invoke_id: int = attr.ib(default=0, init=False)
 
     dlms_connection: DlmsConnection = attr.ib(
         default=attr.Factory(
@@ -58,15 +104,468 @@ class DlmsClient:
                 global_authentication_key=self.authentication_key,
                 use_dedicated_ciphering=self.dedicated_ciphering,
                 use_block_transfer=self.block_transfer,
+                use_action_block_transfer=self.action_block_transfer,
                 security_suite=self.security_suite,
                 max_pdu_size=self.max_pdu_size,
                 client_invocation_counter=self.client_initial_invocation_counter,
                 meter_invocation_counter=self.meter_initial_invocation_counter,
+                tracer=self.tracer,
             ),
             takes_self=True,
         )
     )
 
+    def __attrs_post_init__(self):
+        if self._tracer is not None:
+            # The connection or transport might have been made without it.
+            self.tracer = self._tracer
+
+    @property
+    def tracer(self) -> Optional[tracing.Tracer]:
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer: Optional[tracing.Tracer]):
+        self._tracer = tracer
+        self.dlms_connection.tracer = tracer
+        if hasattr(self.io_interface, "tracer"):
+            self.io_interface.tracer = tracer
+
+    def get_exchange(
+        self,
+        cosem_attribute: cosem.CosemAttribute,
+        access_descriptor: Optional[RangeDescriptor] = None,
+    ) -> DlmsExchange:
+        get_response = yield xdlms.GetRequestNormal(
+            cosem_attribute=cosem_attribute, access_selection=access_descriptor
+        )
+        data = bytearray()
+        while True:
+            if isinstance(get_response, xdlms.GetResponseNormal):
+                data.extend(get_response.data)
+                break
+            if isinstance(get_response, xdlms.GetResponseWithBlock):
+                data.extend(get_response.data)
+                get_response = yield xdlms.GetRequestNext(
+                    invoke_id_and_priority=get_response.invoke_id_and_priority,
+                    block_number=get_response.block_number,
+                )
+                continue
+            if isinstance(get_response, xdlms.GetResponseLastBlock):
+                data.extend(get_response.data)
+                break
+
+            if isinstance(get_response, xdlms.GetResponseLastBlockWithError):
+                raise DataResultError(
+                    f"Error in blocktransfer of GET response: {get_response.error!r}"
+                )
+
+            if isinstance(get_response, xdlms.GetResponseNormalWithError):
+                raise DataResultError(
+                    f"Could not perform GET request: {get_response.error!r}"
+                )
+
+            self.raise_for_exception_response(get_response)
+            raise exceptions.LocalDlmsProtocolError(
+                f"Received a {get_response.__class__.__name__} to a GET request"
+            )
+
+        return bytes(data)
+
+    def get_many_exchange(
+        self, cosem_attributes_with_selection: List[cosem.CosemAttributeWithSelection]
+    ) -> DlmsExchange:
+        response = yield xdlms.GetRequestWithList(
+            cosem_attributes_with_selection=cosem_attributes_with_selection
+        )
+        self.raise_for_exception_response(response)
+        return response
+
+    def set_exchange(
+        self, cosem_attribute: cosem.CosemAttribute, data: bytes
+    ) -> DlmsExchange:
+        response = yield xdlms.SetRequestNormal(
+            cosem_attribute=cosem_attribute, data=data
+        )
+        return response
+
+    def access_exchange(
+        self,
+        requests: List[AccessRequestSpecification],
+        self_descriptive: bool = False,
+        break_on_error: bool = False,
+    ) -> DlmsExchange:
+        # The long invoke id is 24 bits.
+        self.long_invoke_id = (self.long_invoke_id + 1) % 0x1000000
+        response = yield xdlms.AccessRequest(
+            long_invoke_id_and_priority=xdlms.LongInvokeIdAndPriority(
+                long_invoke_id=self.long_invoke_id,
+                prioritized=True,
+                confirmed=True,
+                self_descriptive=self_descriptive,
+                break_on_error=break_on_error,
+            ),
+            requests=requests,
+        )
+        self.raise_for_exception_response(response)
+        if not isinstance(response, xdlms.AccessResponse):
+            raise exceptions.DlmsClientException(
+                f"Expected an AccessResponse but got {response.__class__.__name__}"
+            )
+        received_invoke_id = response.long_invoke_id_and_priority.long_invoke_id
+        if received_invoke_id != self.long_invoke_id:
+            raise exceptions.DlmsClientException(
+                f"Received an AccessResponse for long invoke id {received_invoke_id} "
+                f"but expected {self.long_invoke_id}"
+            )
+        return response.responses
+
+    def action_exchange(self, method: cosem.CosemMethod, data: bytes) -> DlmsExchange:
+        request = xdlms.ActionRequestNormal(cosem_method=method, data=data)
+        if self.should_use_action_pblocks(request):
+            response = yield from self.send_action_pblocks(
+                lambda pblock: xdlms.ActionRequestWithFirstPblock(
+                    cosem_method=method, pblock=pblock
+                ),
+                raw_data=data or dlms_data.NullData().to_bytes(),
+            )
+        else:
+            response = yield request
+        response = yield from self.receive_action_response(response, with_list=False)
+
+        if isinstance(response, xdlms.ActionResponseWithOptionalData):
+            # The response was transferred in blocks.
+            if response.error is not None:
+                raise ActionError(response.error.name)
+            if response.status != enumerations.ActionResultStatus.SUCCESS:
+                raise ActionError(f"Unsuccessful ActionRequest: {response.status.name}")
+            return response.data
+
+        if isinstance(response, xdlms.ActionResponseNormalWithError):
+            raise ActionError(response.error.name)
+        if response.status != enumerations.ActionResultStatus.SUCCESS:
+            raise ActionError(f"Unsuccessful ActionRequest: {response.status.name}")
+        if isinstance(response, xdlms.ActionResponseNormalWithData):
+            return response.data
+        return None
+
+    def action_many_exchange(
+        self, methods: List[cosem.CosemMethod], data: List[Optional[bytes]]
+    ) -> DlmsExchange:
+        request = xdlms.ActionRequestWithList(cosem_methods=methods, data=data)
+        if self.should_use_action_pblocks(request):
+            response = yield from self.send_action_pblocks(
+                lambda pblock: xdlms.ActionRequestWithListAndFirstPblock(
+                    cosem_methods=methods, pblock=pblock
+                ),
+                raw_data=xdlms.ActionRequestWithList.encode_parameters(data),
+            )
+        else:
+            response = yield request
+        response = yield from self.receive_action_response(response, with_list=True)
+
+        if isinstance(response, list):
+            return response
+        if isinstance(response, xdlms.ActionResponseWithList):
+            return response.responses
+        raise ActionError(
+            f"Expected a list of action responses but got {response.__class__.__name__}"
+        )
+
+    def should_use_action_pblocks(self, request) -> bool:
+        """
+        Action requests that are too large to fit in one APDU are sent with block
+        transfer if the meter supports it.
+        """
+        return (
+            len(request.to_bytes()) > self.dlms_connection.max_apdu_size
+            and self.dlms_connection.conformance.block_transfer_with_action
+        )
+
+    def send_action_pblocks(
+        self,
+        make_first_request: Callable[[xdlms.DataBlockSA], Any],
+        raw_data: bytes,
+    ) -> DlmsExchange:
+        """
+        Sends the method invocation parameters in blocks. Every block except the last
+        one is acknowledged by the meter with an ActionResponseNextPblock. Returns the
+        response to the last block.
+        """
+        # Size of the first request without any raw data. The length of the raw data
+        # octet string can be up to 3 bytes longer when it holds data.
+        header_length = len(
+            make_first_request(
+                xdlms.DataBlockSA(last_block=False, block_number=1, raw_data=b"")
+            ).to_bytes()
+        )
+        block_size = self.dlms_connection.max_apdu_size - header_length - 2
+        if block_size <= 0:
+            raise ActionError(
+                f"Max APDU size {self.dlms_connection.max_apdu_size} is too small to "
+                f"send action parameters in blocks"
+            )
+
+        blocks = [
+            raw_data[index : index + block_size]
+            for index in range(0, len(raw_data), block_size)
+        ]
+        for block_number, block in enumerate(blocks, start=1):
+            pblock = xdlms.DataBlockSA(
+                last_block=block_number == len(blocks),
+                block_number=block_number,
+                raw_data=block,
+            )
+            if block_number == 1:
+                response = yield make_first_request(pblock)
+            else:
+                response = yield xdlms.ActionRequestWithPblock(pblock=pblock)
+
+            if pblock.last_block:
+                return response
+
+            if not isinstance(response, xdlms.ActionResponseNextPblock):
+                raise ActionError(
+                    f"Expected the meter to acknowledge block {block_number} but got "
+                    f"{response.__class__.__name__}"
+                )
+            if response.block_number != block_number:
+                raise ActionError(
+                    f"Meter acknowledged block {response.block_number} but block "
+                    f"{block_number} was sent"
+                )
+
+    def receive_action_response(self, response, with_list: bool) -> DlmsExchange:
+        """
+        Receives the rest of the response to an ACTION. When the response is sent in
+        blocks we acknowledge each block and return the
+        Action-Response-With-Optional-Data carried in the blocks, or the list of them
+        for an ACTION.WITH_LIST.
+        """
+        data = bytearray()
+        block_number = 0
+        while True:
+            self.raise_for_exception_response(response)
+            if isinstance(response, xdlms.ActionResponseWithPblock):
+                block_number += 1
+                if response.block_number != block_number:
+                    raise ActionError(
+                        f"Expected action response block {block_number} but got "
+                        f"block {response.block_number}"
+                    )
+            # ActionResponseLastPblock is a subclass of ActionResponseWithPblock.
+            if isinstance(response, xdlms.ActionResponseLastPblock):
+                data.extend(response.data)
+                if with_list:
+                    return xdlms.ActionResponseWithList.parse_responses(data)
+                result, rest = xdlms.ActionResponseWithOptionalData.from_bytes(data)
+                if rest:
+                    raise ActionError(
+                        f"{len(rest)} bytes left after the action response in blocks"
+                    )
+                return result
+            if isinstance(response, xdlms.ActionResponseWithPblock):
+                data.extend(response.data)
+                response = yield xdlms.ActionRequestNextPblock(
+                    block_number=response.block_number,
+                    invoke_id_and_priority=response.invoke_id_and_priority,
+                )
+                continue
+
+            return response
+
+    def associate_exchange(
+        self,
+        association_request: Optional[acse.ApplicationAssociationRequest] = None,
+    ) -> DlmsExchange:
+
+        # the aarq can be overridden or the standard one from the connection is used.
+        aarq = association_request or self.dlms_connection.get_aarq()
+
+        response = yield aarq
+        # we could have received an exception from the meter.
+        if isinstance(response, xdlms.ExceptionResponse):
+            raise exceptions.DlmsClientException(
+                f"DLMS Exception: {response.state_error!r}:{response.service_error!r}"
+            )
+        if not isinstance(response, acse.ApplicationAssociationResponse):
+            raise exceptions.LocalDlmsProtocolError(
+                "Did not receive an AARE after sending AARQ"
+            )
+        # the association might not be accepted by the meter
+        if response.result is not enumerations.AssociationResult.ACCEPTED:
+            # there could be an error suppled with the reject.
+            extra_error = None
+            if response.user_information:
+                if isinstance(response.user_information.content, ConfirmedServiceError):
+                    extra_error = response.user_information.content.error
+            raise exceptions.DlmsClientException(
+                f"Unable to perform Association: {response.result!r} and "
+                f"{response.result_source_diagnostics!r}, extra info: {extra_error}"
+            )
+
+        if self.should_send_hls_reply():
+            try:
+                hls_response = yield from self.hls_reply_exchange()
+            except ActionError as e:
+                raise HLSError from e
+
+            if not hls_response:
+                raise HLSError("No HLS data in response")
+
+            hls_data = utils.parse_as_dlms_data(hls_response)
+
+            if not self.dlms_connection.hls_response_valid(hls_data):
+                raise HLSError(
+                    f"Meter did not respond with correct challenge calculation"
+                )
+
+        return response
+
+    def should_send_hls_reply(self) -> bool:
+        return (
+            self.dlms_connection.state.current_state
+            == state.SHOULD_SEND_HLS_SEVER_CHALLENGE_RESULT
+        )
+
+    def hls_reply_exchange(self) -> DlmsExchange:
+        return (
+            yield from self.action_exchange(
+                method=cosem.CosemMethod(
+                    enumerations.CosemInterface.ASSOCIATION_LN,
+                    cosem.Obis(0, 0, 40, 0, 0),
+                    1,
+                ),
+                data=dlms_data.OctetStringData(
+                    self.dlms_connection.get_hls_reply()
+                ).to_bytes(),
+            )
+        )
+
+    def release_exchange(self) -> DlmsExchange:
+        rlre = yield self.dlms_connection.get_rlrq()
+        self.save_invocation_counters()
+        return rlre
+
+    def request_bytes(self, event) -> bytes:
+        """
+        Returns the bytes of a request to send, reserving the invocation counter of
+        ciphered requests first when there is a store.
+        """
+        if (
+            self.invocation_counter_store is not None
+            and self.dlms_connection.global_encryption_key
+        ):
+            self.reserve_invocation_counter()
+        return self.dlms_connection.send(event)
+
+    def next_event(self):
+        """
+        Returns the next event from the received data. All data of a response is
+        received when it is sent so this does not do any I/O.
+        """
+        event = self.dlms_connection.next_event()
+        LOG.info("Received %s", event)
+        return event
+
+    @staticmethod
+    def raise_for_exception_response(response):
+        if isinstance(response, xdlms.ExceptionResponse):
+            raise exceptions.DlmsClientException(
+                f"Received an Exception response with state error: "
+                f"{response.state_error.name} and service error: "
+                f"{response.service_error.name}"
+            )
+
+    def reserve_invocation_counter(self):
+        """
+        Makes sure the next client invocation counter is reserved in the store.
+        """
+        connection = self.dlms_connection
+        if self.counter_reservation is None:
+            key = self.invocation_counter_key or invocation_counters.counter_key(
+                self.client_logical_address, connection.global_encryption_key
+            )
+            self.counter_reservation = invocation_counters.CounterReservation(
+                store=self.invocation_counter_store, key=key
+            )
+            connection.meter_invocation_counter = max(
+                connection.meter_invocation_counter,
+                self.invocation_counter_store.meter_invocation_counter(key),
+            )
+        connection.client_invocation_counter = (
+            self.counter_reservation.next_invocation_counter(
+                connection.client_invocation_counter
+            )
+        )
+
+    def save_invocation_counters(self):
+        """
+        Hands the unused reserved invocation counters back to the store, so the next
+        client continues from them, and saves the meter invocation counter.
+        """
+        if self.counter_reservation is None:
+            return
+        self.counter_reservation.release(self.dlms_connection.client_invocation_counter)
+        self.invocation_counter_store.update_meter_invocation_counter(
+            self.counter_reservation.key, self.dlms_connection.meter_invocation_counter
+        )
+
+    @property
+    def client_invocation_counter(self) -> int:
+        return self.dlms_connection.client_invocation_counter
+
+    @client_invocation_counter.setter
+    def client_invocation_counter(self, ic: int):
+        self.dlms_connection.client_invocation_counter = ic
+
+    def switch_client_type(
+        self,
+        client_logical_address: Optional[int] = None,
+        authentication_method: Optional[enumerations.AuthenticationMechanism] = None,
+        encryption_key: Optional[bytes] = None,
+        authentication_key: Optional[bytes] = None,
+    ):
+        """
+        A convenience method to switch a client into another client type. For example
+        going from a public client to a management client.
+        """
+        if self.dlms_connection.state.current_state != state.NO_ASSOCIATION:
+            raise exceptions.DlmsClientException(
+                "Unable to switch to another client type while there is still an "
+                "active association."
+            )
+        if client_logical_address:
+            self.client_logical_address = client_logical_address
+            self.io_interface.client_logical_address = client_logical_address
+
+        if authentication_method:
+            self.authentication_method = authentication_method
+            self.dlms_connection.authentication_method = authentication_method
+
+        if encryption_key or authentication_key:
+            if not (encryption_key and authentication_key):
+                raise exceptions.DlmsClientException(
+                    "When switching the client to an encrypted context you need to "
+                    "specify both an encryption key and an authentication key."
+                )
+
+            self.encryption_key = encryption_key
+            self.dlms_connection.global_encryption_key = encryption_key
+            self.authentication_key = authentication_key
+            self.dlms_connection.global_authentication_key = authentication_key
+
+        if client_logical_address or encryption_key:
+            # The counters are stored on another key.
+            self.counter_reservation = None
+
+
+@attr.s(auto_attribs=True)
+class DlmsClient(BaseDlmsClient):
+    """
+    DLMS client with a blocking transport.
+    """
+
     @classmethod
     def with_serial_hdlc_transport(
         cls,
@@ -83,11 +582,20 @@ class DlmsClient:
         security_suite: Optional[int] = 0,
         dedicated_ciphering: bool = False,
         block_transfer: bool = False,
+        action_block_transfer: bool = False,
         max_pdu_size: int = 65535,
         client_system_title: Optional[bytes] = None,
         client_initial_invocation_counter: int = 0,
         meter_initial_invocation_counter: int = 0,
+        invocation_counter_store: Optional[
+            invocation_counters.InvocationCounterStore
+        ] = None,
+        tracer: Optional[tracing.Tracer] = None,
         timeout: int = 10,
+        hdlc_max_info_length: int = 128,
+        hdlc_window_size: int = 1,
+        iec_mode_e: bool = False,
+        iec_max_baud_rate: int = 19200,
     ):
         serial_client = SerialHdlcTransport(
             client_logical_address=client_logical_address,
@@ -97,6 +605,10 @@ class DlmsClient:
             serial_port=serial_port,
             serial_baud_rate=baud_rate,
             timeout=timeout,
+            max_info_length=hdlc_max_info_length,
+            window_size=hdlc_window_size,
+            iec_mode_e=iec_mode_e,
+            iec_max_baud_rate=iec_max_baud_rate,
         )
         return cls(
             client_logical_address=client_logical_address,
@@ -108,10 +620,13 @@ class DlmsClient:
             security_suite=security_suite,
             dedicated_ciphering=dedicated_ciphering,
             block_transfer=block_transfer,
+            action_block_transfer=action_block_transfer,
             max_pdu_size=max_pdu_size,
             client_system_title=client_system_title,
             client_initial_invocation_counter=client_initial_invocation_counter,
             meter_initial_invocation_counter=meter_initial_invocation_counter,
+            invocation_counter_store=invocation_counter_store,
+            tracer=tracer,
             io_interface=serial_client,
         )
 
@@ -129,10 +644,15 @@ class DlmsClient:
         security_suite: Optional[int] = 0,
         dedicated_ciphering: bool = False,
         block_transfer: bool = False,
+        action_block_transfer: bool = False,
         max_pdu_size: int = 65535,
         client_system_title: Optional[bytes] = None,
         client_initial_invocation_counter: int = 0,
         meter_initial_invocation_counter: int = 0,
+        invocation_counter_store: Optional[
+            invocation_counters.InvocationCounterStore
+        ] = None,
+        tracer: Optional[tracing.Tracer] = None,
         timeout: int = 10,
     ):
         tcp_transport = BlockingTcpTransport(
@@ -152,13 +672,79 @@ class DlmsClient:
             security_suite=security_suite,
             dedicated_ciphering=dedicated_ciphering,
             block_transfer=block_transfer,
+            action_block_transfer=action_block_transfer,
             max_pdu_size=max_pdu_size,
             client_system_title=client_system_title,
             client_initial_invocation_counter=client_initial_invocation_counter,
             meter_initial_invocation_counter=meter_initial_invocation_counter,
+            invocation_counter_store=invocation_counter_store,
+            tracer=tracer,
             io_interface=tcp_transport,
         )
 
+    @classmethod
+    def with_hdlc_tcp_transport(
+        cls,
+        host: str,
+        port: int,
+        client_logical_address: int,
+        server_logical_address: int,
+        server_physical_address: Optional[int],
+        client_physical_address: Optional[int] = None,
+        authentication_method: Optional[enumerations.AuthenticationMechanism] = None,
+        password: Optional[bytes] = None,
+        encryption_key: Optional[bytes] = None,
+        authentication_key: Optional[bytes] = None,
+        security_suite: Optional[int] = 0,
+        dedicated_ciphering: bool = False,
+        block_transfer: bool = False,
+        action_block_transfer: bool = False,
+        max_pdu_size: int = 65535,
+        client_system_title: Optional[bytes] = None,
+        client_initial_invocation_counter: int = 0,
+        meter_initial_invocation_counter: int = 0,
+        invocation_counter_store: Optional[
+            invocation_counters.InvocationCounterStore
+        ] = None,
+        tracer: Optional[tracing.Tracer] = None,
+        timeout: int = 10,
+        hdlc_max_info_length: int = 128,
+        hdlc_window_size: int = 1,
+    ):
+        """
+        HDLC over TCP, for meters behind serial-to-IP converters.
+        """
+        hdlc_tcp_transport = HdlcTcpTransport(
+            host=host,
+            port=port,
+            client_logical_address=client_logical_address,
+            client_physical_address=client_physical_address,
+            server_logical_address=server_logical_address,
+            server_physical_address=server_physical_address,
+            timeout=timeout,
+            max_info_length=hdlc_max_info_length,
+            window_size=hdlc_window_size,
+        )
+        return cls(
+            client_logical_address=client_logical_address,
+            server_logical_address=server_logical_address,
+            authentication_method=authentication_method,
+            password=password,
+            encryption_key=encryption_key,
+            authentication_key=authentication_key,
+            security_suite=security_suite,
+            dedicated_ciphering=dedicated_ciphering,
+            block_transfer=block_transfer,
+            action_block_transfer=action_block_transfer,
+            max_pdu_size=max_pdu_size,
+            client_system_title=client_system_title,
+            client_initial_invocation_counter=client_initial_invocation_counter,
+            meter_initial_invocation_counter=meter_initial_invocation_counter,
+            invocation_counter_store=invocation_counter_store,
+            tracer=tracer,
+            io_interface=hdlc_tcp_transport,
+        )
+
     @contextlib.contextmanager
     def session(self) -> "DlmsClient":
         self.connect()
@@ -167,49 +753,25 @@ class DlmsClient:
         self.release_association()
         self.disconnect()
 
+    def run_exchange(self, exchange: DlmsExchange):
+        """
+        Sends the requests of the exchange and returns its result.
+        """
+        response = None
+        while True:
+            try:
+                request = exchange.send(response)
+            except StopIteration as stop:
+                return stop.value
+            self.send(request)
+            response = self.next_event()
+
     def get(
         self,
         cosem_attribute: cosem.CosemAttribute,
         access_descriptor: Optional[RangeDescriptor] = None,
     ) -> bytes:
-        self.send(
-            xdlms.GetRequestNormal(
-                cosem_attribute=cosem_attribute, access_selection=access_descriptor
-            )
-        )
-        all_data_received = False
-        data = bytearray()
-        while not all_data_received:
-            get_response = self.next_event()
-            if isinstance(get_response, xdlms.GetResponseNormal):
-                data.extend(get_response.data)
-                all_data_received = True
-                continue
-            if isinstance(get_response, xdlms.GetResponseWithBlock):
-                data.extend(get_response.data)
-                self.send(
-                    xdlms.GetRequestNext(
-                        invoke_id_and_priority=get_response.invoke_id_and_priority,
-                        block_number=get_response.block_number,
-                    )
-                )
-                continue
-            if isinstance(get_response, xdlms.GetResponseLastBlock):
-                data.extend(get_response.data)
-                all_data_received = True
-                continue
-
-            if isinstance(get_response, xdlms.GetResponseLastBlockWithError):
-                raise DataResultError(
-                    f"Error in blocktransfer of GET response: {get_response.error!r}"
-                )
-
-            if isinstance(get_response, xdlms.GetResponseNormalWithError):
-                raise DataResultError(
-                    f"Could not perform GET request: {get_response.error!r}"
-                )
-
-        return bytes(data)
+        return self.run_exchange(self.get_exchange(cosem_attribute, access_descriptor))
 
     def get_many(
         self, cosem_attributes_with_selection: List[cosem.CosemAttributeWithSelection]
@@ -217,175 +779,75 @@ class DlmsClient:
         """
         Make a GET.WITH_LIST call. Get many items in one request.
         """
-        out = xdlms.GetRequestWithList(
-            cosem_attributes_with_selection=cosem_attributes_with_selection
+        return self.run_exchange(
+            self.get_many_exchange(cosem_attributes_with_selection)
         )
-        self.send(out)
-        response = self.next_event()
-        if isinstance(response, xdlms.ExceptionResponse):
-            raise exceptions.DlmsClientException(
-                f"Received an Exception response with state error: "
-                f"{response.state_error.name} and service error: "
-                f"{response.service_error.name}"
-            )
-        return response
 
     def set(self, cosem_attribute: cosem.CosemAttribute, data: bytes):
-        self.send(xdlms.SetRequestNormal(cosem_attribute=cosem_attribute, data=data))
-        return self.next_event()
+        return self.run_exchange(self.set_exchange(cosem_attribute, data))
+
+    def access(
+        self,
+        requests: List[AccessRequestSpecification],
+        self_descriptive: bool = False,
+        break_on_error: bool = False,
+    ) -> List[AccessResponseSpecification]:
+        """
+        Make an ACCESS call. GET, SET and ACTION operations are combined in one request
+        and executed in order by the meter. The results are returned in the same order
+        as the requests. A failing operation does not raise an error, the result of
+        each response has to be checked.
+        """
+        return self.run_exchange(
+            self.access_exchange(requests, self_descriptive, break_on_error)
+        )
 
     def action(self, method: cosem.CosemMethod, data: bytes):
-        self.send(xdlms.ActionRequestNormal(cosem_method=method, data=data))
-        response = self.next_event()
+        return self.run_exchange(self.action_exchange(method, data))
 
-        if isinstance(response, xdlms.ActionResponseNormalWithError):
-            raise ActionError(response.error.name)
-        elif isinstance(response, xdlms.ActionResponseNormalWithData):
-            if response.status != enumerations.ActionResultStatus.SUCCESS:
-                raise ActionError(f"Unsuccessful ActionRequest: {response.status.name}")
-            return response.data
-        else:
-            if response.status != enumerations.ActionResultStatus.SUCCESS:
-                raise ActionError(f"Unsuccessful ActionRequest: {response.status.name}")
-        return
+    def action_many(
+        self, methods: List[cosem.CosemMethod], data: List[Optional[bytes]]
+    ) -> List[xdlms.ActionResponseWithOptionalData]:
+        """
+        Make an ACTION.WITH_LIST call. Invokes many methods in one request. Each method
+        needs an entry in data, None is sent as null-data.
+
+        The results are returned in the same order as the methods. A failing method
+        does not raise an error, the status of each result has to be checked.
+        """
+        return self.run_exchange(self.action_many_exchange(methods, data))
 
     def associate(
         self,
         association_request: Optional[acse.ApplicationAssociationRequest] = None,
     ) -> acse.ApplicationAssociationResponse:
-
-        # the aarq can be overridden or the standard one from the connection is used.
-        aarq = association_request or self.dlms_connection.get_aarq()
-
-        self.send(aarq)
-        response = self.next_event()
-        # we could have received an exception from the meter.
-        if isinstance(response, xdlms.ExceptionResponse):
-            raise exceptions.DlmsClientException(
-                f"DLMS Exception: {response.state_error!r}:{response.service_error!r}"
-            )
-        # the association might not be accepted by the meter
-        if isinstance(response, acse.ApplicationAssociationResponse):
-            if response.result is not enumerations.AssociationResult.ACCEPTED:
-                # there could be an error suppled with the reject.
-                extra_error = None
-                if response.user_information:
-                    if isinstance(
-                        response.user_information.content, ConfirmedServiceError
-                    ):
-                        extra_error = response.user_information.content.error
-                raise exceptions.DlmsClientException(
-                    f"Unable to perform Association: {response.result!r} and "
-                    f"{response.result_source_diagnostics!r}, extra info: {extra_error}"
-                )
-        else:
-            raise exceptions.LocalDlmsProtocolError(
-                "Did not receive an AARE after sending AARQ"
-            )
-
-        if self.should_send_hls_reply():
-            try:
-                hls_response = self.send_hls_reply()
-            except ActionError as e:
-                raise HLSError from e
-
-            if not hls_response:
-                raise HLSError("No HLS data in response")
-
-            hls_data = utils.parse_as_dlms_data(hls_response)
-
-            if not hls_response:
-                raise HLSError("Did not receive any HLS response data")
-
-            if not self.dlms_connection.hls_response_valid(hls_data):
-                raise HLSError(
-                    f"Meter did not respond with correct challenge calculation"
-                )
-
-        return response
-
-    def should_send_hls_reply(self) -> bool:
-        return (
-            self.dlms_connection.state.current_state
-            == state.SHOULD_SEND_HLS_SEVER_CHALLENGE_RESULT
-        )
+        return self.run_exchange(self.associate_exchange(association_request))
 
     def send_hls_reply(self) -> Optional[bytes]:
-        return self.action(
-            method=cosem.CosemMethod(
-                enumerations.CosemInterface.ASSOCIATION_LN,
-                cosem.Obis(0, 0, 40, 0, 0),
-                1,
-            ),
-            data=dlms_data.OctetStringData(
-                self.dlms_connection.get_hls_reply()
-            ).to_bytes(),
-        )
+        return self.run_exchange(self.hls_reply_exchange())
 
     def release_association(self) -> acse.ReleaseResponse:
-        rlrq = self.dlms_connection.get_rlrq()
-        self.send(rlrq)
-        rlre = self.next_event()
-        return rlre
+        return self.run_exchange(self.release_exchange())
 
     def connect(self):
         self.io_interface.connect()
 
     def disconnect(self):
+        self.save_invocation_counters()
         self.io_interface.disconnect()
 
     def send(self, *events):
         for event in events:
-            data = self.dlms_connection.send(event)
-            response_bytes = self.io_interface.send(data)
-
-            self.dlms_connection.receive_data(response_bytes)
-
-    def next_event(self):
-        event = self.dlms_connection.next_event()
-        LOG.info(f"Received {event}")
-        return event
-
-    @property
-    def client_invocation_counter(self) -> int:
-        return self.dlms_connection.client_invocation_counter
-
-    @client_invocation_counter.setter
-    def client_invocation_counter(self, ic: int):
-        self.dlms_connection.client_invocation_counter = ic
-
-    def switch_client_type(
-        self,
-        client_logical_address: Optional[int] = None,
-        authentication_method: Optional[enumerations.AuthenticationMechanism] = None,
-        encryption_key: Optional[bytes] = None,
-        authentication_key: Optional[bytes] = None,
-    ):
-        """
-        A convenience method to switch a client into another client type. For example
-        going from a public client to a management client.
-        """
-        if self.dlms_connection.state.current_state != state.NO_ASSOCIATION:
-            raise exceptions.DlmsClientException(
-                "Unable to switch to another client type while there is still an "
-                "active association."
-            )
-        if client_logical_address:
-            self.client_logical_address = client_logical_address
-            self.io_interface.client_logical_address = client_logical_address
-
-        if authentication_method:
-            self.authentication_method = authentication_method
-            self.dlms_connection.authentication_method = authentication_method
-
-        if encryption_key or authentication_key:
-            if not (encryption_key and authentication_key):
-                raise exceptions.DlmsClientException(
-                    "When switching the client to an encrypted context you need to "
-                    "specify both an encryption key and an authentication key."
+            data = self.request_bytes(event)
+            if self.tracer is None:
+                response_bytes = self.io_interface.send(data)
+            else:
+                started = time.perf_counter()
+                response_bytes = self.io_interface.send(data)
+                self.tracer.record(
+                    tracing.TRANSPORT,
+                    time.perf_counter() - started,
+                    len(data) + len(response_bytes),
                 )
 
-            self.encryption_key = encryption_key
-            self.dlms_connection.global_encryption_key = encryption_key
-            self.authentication_key = authentication_key
-            self.dlms_connection.global_authentication_key = authentication_key
+            self.dlms_connection.receive_data(response_bytes)
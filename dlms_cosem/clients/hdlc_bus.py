@@ -0,0 +1,381 @@
+import abc
+import asyncio
+import logging
+import os
+import socket
+from typing import *
+
+import attr
+import serial
+
+from dlms_cosem import exceptions
+from dlms_cosem.clients.async_dlms_client import AsyncDlmsClient
+from dlms_cosem.clients.async_hdlc_transport import (
+    READ_SIZE,
+    AsyncSerialHdlcTransport,
+    write_non_blocking,
+)
+from dlms_cosem.hdlc import state
+from dlms_cosem.hdlc.address import HdlcAddress
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+
+LOG = logging.getLogger(__name__)
+
+# Client logical address, server logical address and server physical address.
+LinkKey = Tuple[int, int, Optional[int]]
+
+
+@attr.s(auto_attribs=True)
+class BusHdlcTransport(AsyncSerialHdlcTransport):
+    """
+    HDLC transport to one meter on a `HdlcBus`.
+
+    The line is held for one request and its full response, including all windows of
+    a segmented exchange, and is then released so the next meter on the bus gets its
+    turn while the client handles the response and prepares its next request.
+
+    The HDLC link is kept when the client disconnects. Later sessions reuse it
+    without a new SNRM. `HdlcBus.close` disconnects all links.
+    """
+
+    bus: "HdlcBus" = attr.ib(kw_only=True)
+
+    @property
+    def link_key(self) -> LinkKey:
+        return (
+            self.client_logical_address,
+            self.server_logical_address,
+            self.server_physical_address,
+        )
+
+    @property
+    def is_connected(self) -> bool:
+        return self.hdlc_connection.state.current_state == state.IDLE
+
+    def open(self):
+        """
+        The line is opened by the bus. Only prepares for receiving frames.
+        """
+        if self._received is None:
+            self._received = asyncio.Queue()
+
+    def close(self):
+        """
+        The serial port is owned by the bus.
+        """
+
+    async def connect(self):
+        if self.is_connected:
+            return None
+        await self.bus.open()
+        async with self.bus.line:
+            return await super().connect()
+
+    async def disconnect(self):
+        """
+        Keeps the HDLC link alive for the next session. Use `disconnect_link` to
+        disconnect it.
+        """
+
+    async def disconnect_link(self):
+        if not self.is_connected:
+            return None
+        async with self.bus.line:
+            return await super().disconnect()
+
+    async def send(self, telegram: bytes) -> bytes:
+        async with self.bus.line:
+            return await super().send(telegram)
+
+    async def _write_bytes(self, to_write: bytes):
+        LOG.debug("Sending: %r", to_write)
+        await self.bus.write(to_write)
+
+    def frame_received(self, frame_bytes: bytes):
+        if self._received is None:
+            LOG.warning(f"Dropping frame for closed link {self.link_key}")
+            return
+        self._received.put_nowait(frame_bytes)
+
+    def error_received(self, error: Exception):
+        if self._received is not None:
+            self._received.put_nowait(error)
+
+
+class BaseHdlcBus(abc.ABC):
+    """
+    Shares one line between HDLC links to many meters. The meters are addressed by
+    the physical part of the server HDLC address.
+
+    The line is half duplex so only one meter can be talking at a time. The links
+    take turns to use the line in the order they asked for it. Received frames are
+    passed to the link matching their addresses.
+
+    Subclasses open the line and have `timeout`, `max_info_length`, `window_size`,
+    `links`, `scanner` and `line` as attributes.
+    """
+
+    @property
+    @abc.abstractmethod
+    def name(self) -> str:
+        """Name of the line used in messages"""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def open_line(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def close_line(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def fileno(self) -> int:
+        raise NotImplementedError()
+
+    @property
+    def is_open(self) -> bool:
+        return self.reading
+
+    async def open(self):
+        """
+        Opens the line and starts reading it in the running event loop. No-op if the
+        bus is already open.
+        """
+        if self.line is None:
+            self.line = asyncio.Lock()
+        async with self.line:
+            if self.is_open:
+                return
+            await self.open_line()
+            asyncio.get_event_loop().add_reader(self.fileno(), self._data_received)
+            self.reading = True
+
+    async def close(self):
+        """
+        Disconnects all links and closes the line.
+        """
+        if not self.is_open:
+            return
+        try:
+            for link in self.links.values():
+                try:
+                    await link.disconnect_link()
+                except exceptions.CommunicationError as e:
+                    LOG.warning(f"Could not disconnect link {link.link_key}: {e}")
+        finally:
+            self._stop_reading()
+            self.close_line()
+
+    def transport(
+        self,
+        server_physical_address: Optional[int],
+        server_logical_address: int = 1,
+        client_logical_address: int = 16,
+    ) -> BusHdlcTransport:
+        """
+        Returns the transport of the link to a meter. The same transport is returned
+        for the same addresses so the link is kept between sessions.
+        """
+        key = (client_logical_address, server_logical_address, server_physical_address)
+        link = self.links.get(key)
+        if link is None:
+            link = BusHdlcTransport(
+                client_logical_address=client_logical_address,
+                server_logical_address=server_logical_address,
+                server_physical_address=server_physical_address,
+                serial_port=self.name,
+                timeout=self.timeout,
+                max_info_length=self.max_info_length,
+                window_size=self.window_size,
+                bus=self,
+            )
+            self.links[key] = link
+        return link
+
+    def client(
+        self,
+        server_physical_address: Optional[int],
+        server_logical_address: int = 1,
+        client_logical_address: int = 16,
+        **kwargs,
+    ) -> AsyncDlmsClient:
+        """
+        Returns an AsyncDlmsClient using the link to a meter. Other keyword arguments
+        are passed to the client.
+        """
+        return AsyncDlmsClient(
+            client_logical_address=client_logical_address,
+            server_logical_address=server_logical_address,
+            io_interface=self.transport(
+                server_physical_address=server_physical_address,
+                server_logical_address=server_logical_address,
+                client_logical_address=client_logical_address,
+            ),
+            timeout=self.timeout,
+            **kwargs,
+        )
+
+    async def write(self, data: bytes):
+        try:
+            await write_non_blocking(self.fileno(), data)
+        except OSError as e:
+            raise exceptions.CommunicationError(
+                f"Could not write to {self.name}"
+            ) from e
+
+    def _stop_reading(self):
+        if self.reading:
+            asyncio.get_event_loop().remove_reader(self.fileno())
+            self.reading = False
+
+    def _data_received(self):
+        """
+        Called by the event loop when the line is readable. Complete frames are passed
+        to their links.
+        """
+        try:
+            data = os.read(self.fileno(), READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._line_lost(e)
+            return
+        if not data:
+            self._line_lost(ConnectionError(f"{self.name} was closed"))
+            return
+
+        self.scanner.receive_data(data)
+        while True:
+            frame_bytes = self.scanner.next_frame_bytes()
+            if frame_bytes is None:
+                return
+            self.route_frame(frame_bytes)
+
+    def _line_lost(self, error: Exception):
+        LOG.error(f"Could not read from {self.name}: {error}")
+        self._stop_reading()
+        for link in self.links.values():
+            link.error_received(error)
+
+    def route_frame(self, frame_bytes: bytes):
+        try:
+            destination, source = HdlcAddress.find_address_in_frame_bytes(frame_bytes)
+        except (IndexError, ValueError):
+            LOG.warning(f"Dropping frame with faulty addresses: {frame_bytes!r}")
+            return
+        client_logical, _, _ = destination
+        server_logical, server_physical, _ = source
+        link = self.links.get((client_logical, server_logical, server_physical))
+        if link is None:
+            LOG.warning(
+                f"Dropping frame from unknown meter (logical: {server_logical}, "
+                f"physical: {server_physical}): {frame_bytes!r}"
+            )
+            return
+        link.frame_received(frame_bytes)
+
+
+@attr.s(auto_attribs=True)
+class HdlcBus(BaseHdlcBus):
+    """
+    Shares one serial port, like an RS-485 multidrop bus, between HDLC links to many
+    meters.
+
+        bus = HdlcBus(serial_port="/dev/ttyUSB0")
+        clients = [bus.client(server_physical_address=address) for address in meters]
+        await asyncio.gather(*[read_meter(client) for client in clients])
+        await bus.close()
+    """
+
+    serial_port: str
+    serial_baud_rate: int = attr.ib(default=9600)
+    timeout: int = attr.ib(default=10)
+    # Proposed to each meter in the SNRM.
+    max_info_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    links: Dict[LinkKey, BusHdlcTransport] = attr.ib(factory=dict)
+    scanner: HdlcFrameScanner = attr.ib(factory=HdlcFrameScanner)
+    _serial: Optional[serial.Serial] = attr.ib(default=None)
+    # Created when the bus is opened so it belongs to the running event loop.
+    line: Optional[asyncio.Lock] = attr.ib(init=False, default=None)
+    reading: bool = attr.ib(init=False, default=False)
+
+    @property
+    def name(self) -> str:
+        return self.serial_port
+
+    async def open_line(self):
+        if self._serial is None:
+            self._serial = serial.Serial(
+                port=self.serial_port, baudrate=self.serial_baud_rate, timeout=0
+            )
+        elif not self._serial.is_open:
+            self._serial.open()
+
+    def close_line(self):
+        self._serial.close()
+
+    def fileno(self) -> int:
+        return self._serial.fileno()
+
+
+@attr.s(auto_attribs=True)
+class HdlcTcpBus(BaseHdlcBus):
+    """
+    HDLC over TCP to meters behind a serial-to-IP converter (terminal server) that
+    passes the HDLC frames as is, without the DLMS IP wrapper. All meters on the
+    converter share one TCP connection.
+
+        bus = HdlcTcpBus(host="10.0.0.10", port=4001)
+        client = bus.client(server_physical_address=17)
+    """
+
+    host: str
+    port: int
+    timeout: int = attr.ib(default=10)
+    # Proposed to each meter in the SNRM.
+    max_info_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    links: Dict[LinkKey, BusHdlcTransport] = attr.ib(factory=dict)
+    scanner: HdlcFrameScanner = attr.ib(factory=HdlcFrameScanner)
+    tcp_socket: Optional[socket.socket] = attr.ib(init=False, default=None)
+    # Created when the bus is opened so it belongs to the running event loop.
+    line: Optional[asyncio.Lock] = attr.ib(init=False, default=None)
+    reading: bool = attr.ib(init=False, default=False)
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def open_line(self):
+        loop = asyncio.get_event_loop()
+        try:
+            address_info = await loop.getaddrinfo(
+                self.host, self.port, type=socket.SOCK_STREAM
+            )
+            family, socket_type, protocol, _, address = address_info[0]
+            tcp_socket = socket.socket(family, socket_type, protocol)
+            tcp_socket.setblocking(False)
+            try:
+                await asyncio.wait_for(
+                    loop.sock_connect(tcp_socket, address), self.timeout
+                )
+            except BaseException:
+                tcp_socket.close()
+                raise
+        except (OSError, asyncio.TimeoutError) as e:
+            raise exceptions.CommunicationError(
+                f"Unable to connect to {self.name}"
+            ) from e
+        self.tcp_socket = tcp_socket
+        LOG.info(f"Connected to {self.name}")
+
+    def close_line(self):
+        if self.tcp_socket:
+            self.tcp_socket.close()
+            self.tcp_socket = None
+            LOG.info(f"Connection to {self.name} is closed")
+
+    def fileno(self) -> int:
+        return self.tcp_socket.fileno()
@@ -0,0 +1,108 @@
+import logging
+import socket
+from typing import *
+
+import attr
+
+from dlms_cosem import exceptions, tracing
+from dlms_cosem.clients.hdlc_transport import HdlcTransport
+from dlms_cosem.hdlc import connection
+
+LOG = logging.getLogger(__name__)
+
+READ_SIZE = 4096
+
+
+@attr.s(auto_attribs=True)
+class HdlcTcpTransport(HdlcTransport):
+    """
+    HDLC transport over TCP, for meters behind serial-to-IP converters (terminal
+    servers) that pass the HDLC frames as is, without the DLMS IP wrapper.
+
+    The socket is opened when connecting and closed when disconnecting. To talk to
+    several meters over one TCP connection use `HdlcTcpBus`.
+    """
+
+    client_logical_address: int
+    server_logical_address: int
+    host: str
+    port: int
+    server_physical_address: Optional[int] = attr.ib(default=None)
+    client_physical_address: Optional[int] = attr.ib(default=None)
+    timeout: int = attr.ib(default=10)
+    # Proposed to the meter in the SNRM. The negotiated values are used.
+    max_info_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    hdlc_connection: connection.HdlcConnection = attr.ib(
+        default=attr.Factory(
+            lambda self: connection.HdlcConnection(
+                self.client_hdlc_address,
+                self.server_hdlc_address,
+                max_data_size=self.max_info_length,
+                max_data_size_receive=self.max_info_length,
+                window_size_transmit=self.window_size,
+                window_size_receive=self.window_size,
+            ),
+            takes_self=True,
+        )
+    )
+    tracer: Optional[tracing.Tracer] = attr.ib(default=None, repr=False)
+    tcp_socket: Optional[socket.socket] = attr.ib(init=False, default=None)
+    out_buffer: bytearray = attr.ib(init=False, factory=bytearray)
+    request_sent_at: float = attr.ib(init=False, default=0.0)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.host, self.port
+
+    def connect(self):
+        """
+        Opens the socket and sets up the HDLC connection.
+        """
+        if self.tcp_socket:
+            raise RuntimeError(f"There is already an active socket to {self.address}")
+
+        try:
+            self.tcp_socket = socket.create_connection(
+                address=self.address, timeout=self.timeout
+            )
+        except (OSError, socket.timeout) as e:
+            raise exceptions.CommunicationError("Unable to connect socket") from e
+        LOG.info(f"Connected to {self.address}")
+        return super().connect()
+
+    def disconnect(self):
+        """
+        Disconnects the HDLC connection and closes the socket.
+        """
+        try:
+            return super().disconnect()
+        finally:
+            if self.tcp_socket:
+                self.tcp_socket.close()
+                self.tcp_socket = None
+                LOG.info(f"Connection to {self.address} is closed")
+
+    def _write_bytes(self, to_write: bytes):
+        if not self.tcp_socket:
+            raise RuntimeError("TCP transport not connected.")
+        LOG.debug("Sending: %r", to_write)
+        try:
+            self.tcp_socket.sendall(to_write)
+        except (OSError, socket.timeout) as e:
+            raise exceptions.CommunicationError("Could no send data") from e
+
+    def _read(self) -> bytes:
+        """
+        Returns the data available on the socket. The socket has a timeout so it is
+        not blocking longer than `timeout` seconds.
+        """
+        if not self.tcp_socket:
+            raise RuntimeError("TCP transport not connected.")
+        try:
+            data = self.tcp_socket.recv(READ_SIZE)
+        except (OSError, socket.timeout) as e:
+            raise exceptions.CommunicationError("Could not receive data") from e
+        if not data:
+            raise exceptions.CommunicationError(f"{self.address} closed the connection")
+        return data
@@ -1,9 +1,12 @@
+import abc
 import logging
-from typing import Optional
+import time
+from typing import *
 
 import attr
 import serial
 
+from dlms_cosem import iec62056_21, tracing
 from dlms_cosem.hdlc import address, connection, frames, state
 
 LOG = logging.getLogger(__name__)
@@ -16,41 +19,25 @@ class ClientError(Exception):
     """General error in client"""
 
 
-@attr.s(auto_attribs=True)
-class SerialHdlcTransport:
-    """
-    HDLC transport to send data over serial.
-    """
+# Yielded by the exchanges of `BaseHdlcTransport` when they need the next frame from
+# the server. Everything else they yield is bytes to write.
+RECEIVE_FRAME = state.make_sentinel("RECEIVE_FRAME")
 
-    client_logical_address: int
-    server_logical_address: int
-    serial_port: str
-    serial_baud_rate: int = attr.ib(default=9600)
-    server_physical_address: Optional[int] = attr.ib(default=None)
-    client_physical_address: Optional[int] = attr.ib(default=None)
-    timeout: int = attr.ib(default=10)
-    hdlc_connection: connection.HdlcConnection = attr.ib(
-        default=attr.Factory(
-            lambda self: connection.HdlcConnection(
-                self.server_hdlc_address, self.client_hdlc_address
-            ),
-            takes_self=True,
-        )
-    )
-    _serial: serial.Serial = attr.ib(
-        default=attr.Factory(
-            lambda self: serial.Serial(
-                port=self.serial_port,
-                baudrate=self.serial_baud_rate,
-                timeout=self.timeout,
-            ),
-            takes_self=True,
-        )
-    )
+# An exchange yields bytes to write or RECEIVE_FRAME, gets the received frames sent in
+# and returns its result.
+HdlcExchange = Generator[Any, Any, Any]
 
-    _send_buffer: list = attr.ib(factory=list)
-    out_buffer: bytearray = attr.ib(init=False, factory=bytearray)
-    in_buffer: bytearray = attr.ib(init=False, factory=bytearray)
+
+class BaseHdlcTransport:
+    """
+    The HDLC connection, segmentation and windowing of the HDLC transports, without
+    any I/O. Connecting, disconnecting and sending data are exchanges run by
+    `HdlcTransport` with blocking reads and writes and by `AsyncSerialHdlcTransport`
+    with asyncio.
+
+    Subclasses have the addresses, `hdlc_connection`, `out_buffer`, `tracer` and
+    `request_sent_at` as attributes.
+    """
 
     @property
     def server_hdlc_address(self):
@@ -68,33 +55,36 @@ class SerialHdlcTransport:
             address_type="client",
         )
 
-    def connect(self):
-        """
-        Sets up the HDLC Connection by sending a SNRM request.
-
-        """
-        # TODO: Implement hdlc parameter negotiation in SNRM frame
-
+    def check_not_connected(self):
         if self.hdlc_connection.state.current_state != state.NOT_CONNECTED:
             raise ClientError(
                 f"Client tried to initiate a HDLC connection but connection state was "
                 f"not in NOT_CONNECTED but in "
                 f"state={self.hdlc_connection.state.current_state}"
             )
+
+    def connect_exchange(self) -> HdlcExchange:
+        """
+        Sets up the HDLC Connection by sending a SNRM request.
+        Maximum information field lengths and window sizes that differs from the
+        default values are proposed in the SNRM. The values accepted by the meter in
+        the UA are used for the connection.
+        """
+        self.check_not_connected()
         snrm = frames.SetNormalResponseModeFrame(
             destination_address=self.server_hdlc_address,
             source_address=self.client_hdlc_address,
+            parameters=self.hdlc_connection.proposed_parameters,
         )
         self.out_buffer += self.hdlc_connection.send(snrm)
-        self.drain_out_buffer()
-        ua_response = self.next_event()
+        yield from self.drain_out_buffer()
+        ua_response = yield RECEIVE_FRAME
         LOG.info(f"Received {ua_response!r}")
         return ua_response
 
-    def disconnect(self):
+    def disconnect_exchange(self) -> HdlcExchange:
         """
         Sends a DisconnectFrame
-        :return:
         """
         disc = frames.DisconnectFrame(
             destination_address=self.server_hdlc_address,
@@ -102,101 +92,139 @@ class SerialHdlcTransport:
         )
 
         self.out_buffer += self.hdlc_connection.send(disc)
-        self.drain_out_buffer()
-        response = self.next_event()
+        yield from self.drain_out_buffer()
+        response = yield RECEIVE_FRAME
         return response
 
-    def next_event(self):
-        """
-        Will read the serial line until a proper response event is read.
-        :return:
-        """
-
-        while True:
-            # If we already have a complete event buffered internally, just
-            # return that. Otherwise, read some data, add it to the internal
-            # buffer, and then try again.
-            event = self.hdlc_connection.next_event()
-            if event is state.NEED_DATA:
-                self.hdlc_connection.receive_data(self._read_frame())
-                continue
-            return event
-
-    def send(self, telegram: bytes) -> bytes:
+    def send_exchange(self, telegram: bytes) -> HdlcExchange:
         """
-        Send will make sure the data that needs to be sent i sent.
-        The send is the only public function that will return the response data
-        when received in full.
+        Sends the telegram and returns the response data when received in full.
         Send will handle fragmentation of data if data is to large to be sent in a
         single HDLC frame.
-        :param telegram:
-        :return:
+        The payloads of the response frames are collected and joined once when the
+        last frame is received.
         """
         # prepend the LLC
         # The LLC should only be present in the first segmented information frame.
         # So instead we just prepend the data with it we know it will only be in the
         # intial information frame
 
+        tracer = self.tracer
+        if tracer is not None:
+            started = time.perf_counter()
         self.out_buffer += LLC_COMMAND_HEADER
         self.out_buffer += telegram
-        self.drain_out_buffer()
-        in_buffer = bytearray()
+        response = yield from self.drain_out_buffer()
+        payloads: List[bytes] = list()
         while True:
-            response = self.next_event()
-            in_buffer += response.payload
-            if response.segmented and response.final:
-                # there is still data but server has send its max window size
-                # tell the server to send more.
-                rr = frames.ReceiveReadyFrame(
-                    destination_address=self.server_hdlc_address,
-                    source_address=self.client_hdlc_address,
-                    receive_sequence_number=self.hdlc_connection.server_rsn,
-                )
-                self.out_buffer += self.hdlc_connection.send(rr)
-                self.drain_out_buffer()
-
-            if response.segmented and not response.final:
-                # the server will send more frames.
-                continue
-            if not response.segmented and response.final:
-                # this was the last frame
-                break
-
-        if not in_buffer.startswith(LLC_RESPONSE_HEADER):
+            if isinstance(response, frames.InformationFrame):
+                # Frames received out of sequence are discarded and will be sent again
+                # by the server after a reject.
+                if not self.hdlc_connection.reject_pending:
+                    payloads.append(response.payload)
+
+                if response.final:
+                    if self.hdlc_connection.reject_pending:
+                        # Request the server to resend the frames from the missing one.
+                        yield self.frame_bytes(
+                            frames.RejectFrame(
+                                destination_address=self.server_hdlc_address,
+                                source_address=self.client_hdlc_address,
+                                receive_sequence_number=self.hdlc_connection.server_rsn,
+                            )
+                        )
+                    elif response.segmented:
+                        # there is still data but server has send its max window size
+                        # tell the server to send more.
+                        yield self.frame_bytes(
+                            frames.ReceiveReadyFrame(
+                                destination_address=self.server_hdlc_address,
+                                source_address=self.client_hdlc_address,
+                                receive_sequence_number=self.hdlc_connection.server_rsn,
+                            )
+                        )
+                    else:
+                        # this was the last frame
+                        break
+                # If the frame is not final the server will send more frames in the
+                # window.
+
+            response = yield RECEIVE_FRAME
+
+        if not payloads or not payloads[0].startswith(LLC_RESPONSE_HEADER):
             raise ValueError("The data is not prepended by the LLC response header")
         # don't return the LLC
-        return in_buffer[3:]
+        payloads[0] = memoryview(payloads[0])[len(LLC_RESPONSE_HEADER) :]
+        data = b"".join(payloads)
+        if tracer is not None:
+            sent = self.request_sent_at
+            tracer.record(tracing.TRANSPORT_SEND, sent - started, len(telegram))
+            tracer.record(
+                tracing.TRANSPORT_RECEIVE, time.perf_counter() - sent, len(data)
+            )
+        return data
 
-    def drain_out_buffer(self):
+    def drain_out_buffer(self) -> HdlcExchange:
         """
         If the data we need to send is longer than the allowed InformationFrame payload
         size we need to segment the data. It is done by splitting the payload into
         several frames and setting the segmented flag.
-        To indicate that we are done with the sending a window we set final on the
-        last I-frame. To indicated we are done sending all the data we set segmented to
-        False
-        :return:
+
+        Up to `window_size_transmit` frames are sent before the server needs to
+        acknowledge them. To indicate that we are done with the sending a window we set
+        final on the last I-frame. The server acknowledges the window with a RR frame.
+        If it has missed frames it answers with a RR or REJ frame with the sequence
+        number of the first missing frame and the frames from it are sent again.
+        To indicated we are done sending all the data we set segmented to False.
+
+        Returns the response to the last window.
         """
+        if self.hdlc_connection.state.current_state != state.IDLE:
+            # Not exchanging information. The buffer holds a complete frame.
+            out = self.out_buffer
+            self.out_buffer = bytearray()
+            yield out
+            return None
+
+        # The segments are views into the buffer so the data is not copied until the
+        # frames are serialized.
         data_size = self.hdlc_connection.max_data_size
-        while len(self.out_buffer) > 0:
-            data = self.out_buffer[:data_size]
-            self.out_buffer = self.out_buffer[data_size:]
-            segmented = bool(self.out_buffer)
-            if self.hdlc_connection.state.current_state != state.IDLE:
-                self._write_bytes(data)
-                return
-            # We dont handle window sizes so final is always true
-            out_frame = self.generate_information_frame(
-                data, segmented=segmented, final=True
-            )
-            self._write_frame(out_frame)
-            # if it is the last frame we should not listen to possible RR frame
-            if segmented:
-                response = self.next_event()
-                if isinstance(response, frames.ReceiveReadyFrame):
-                    # send the next information frame.
-                    continue
-            break
+        data = memoryview(self.out_buffer)
+        segments = [
+            data[index : index + data_size] for index in range(0, len(data), data_size)
+        ]
+        self.out_buffer = bytearray()
+        position = 0
+        while True:
+            window = segments[
+                position : position + self.hdlc_connection.window_size_transmit
+            ]
+            for index, segment in enumerate(window, start=position):
+                yield self.frame_bytes(
+                    self.generate_information_frame(
+                        segment,
+                        segmented=index < len(segments) - 1,
+                        final=index == position + len(window) - 1,
+                    )
+                )
+            position += len(window)
+            if self.tracer is not None and position >= len(segments):
+                self.request_sent_at = time.perf_counter()
+
+            response = yield RECEIVE_FRAME
+            if isinstance(response, frames.InformationFrame):
+                # The server has received all data and responds.
+                return response
+
+            frames_to_resend = self.hdlc_connection.rewind_to_unacknowledged()
+            if frames_to_resend:
+                LOG.info(
+                    f"Server did not acknowledge {len(frames_to_resend)} frames. "
+                    f"Sending them again."
+                )
+                position -= len(frames_to_resend)
+            elif position >= len(segments):
+                return response
 
     def generate_information_frame(
         self, payload: bytes, segmented: bool, final: bool
@@ -211,23 +239,86 @@ class SerialHdlcTransport:
             final=final,
         )
 
-    def _write_frame(self, frame):
+    def frame_bytes(self, frame) -> bytes:
         frame_bytes = self.hdlc_connection.send(frame)
-        LOG.info(f"Sending {frame!r}")
-        self._write_bytes(frame_bytes)
+        LOG.info("Sending %r", frame)
+        return frame_bytes
 
-    def _write_bytes(self, to_write: bytes):
-        LOG.debug(f"Sending: {to_write!r}")
-        self._serial.write(to_write)
 
-    def _read_frame(self) -> bytes:
-        in_bytes = self._serial.read_until(frames.HDLC_FLAG)
+class HdlcTransport(BaseHdlcTransport, abc.ABC):
+    """
+    Sends DLMS data in HDLC frames with blocking reads and writes. Subclasses
+    implement the I/O.
+    """
+
+    def run_exchange(self, exchange: HdlcExchange):
+        """
+        Writes what the exchange yields and reads the frames it needs. Returns the
+        result of the exchange.
+        """
+        received = None
+        while True:
+            try:
+                action = exchange.send(received)
+            except StopIteration as stop:
+                return stop.value
+            if action is RECEIVE_FRAME:
+                received = self.next_event()
+            else:
+                self._write_bytes(action)
+                received = None
+
+    def connect(self):
+        """
+        Sets up the HDLC Connection by sending a SNRM request, see
+        `BaseHdlcTransport.connect_exchange`.
+        """
+        return self.run_exchange(self.connect_exchange())
 
-        if in_bytes == frames.HDLC_FLAG:
-            # We found the first HDLC Frame Flag. We should read until the last one.
-            in_bytes += self._serial.read_until(frames.HDLC_FLAG)
+    def disconnect(self):
+        """
+        Sends a DisconnectFrame
+        :return:
+        """
+        return self.run_exchange(self.disconnect_exchange())
+
+    def next_event(self):
+        """
+        Will read the serial line until a proper response event is read.
+        :return:
+        """
 
-        return in_bytes
+        while True:
+            # If we already have a complete event buffered internally, just
+            # return that. Otherwise, read some data, add it to the internal
+            # buffer, and then try again.
+            event = self.hdlc_connection.next_event()
+            if event is state.NEED_DATA:
+                self.hdlc_connection.receive_data(self._read())
+                continue
+            return event
+
+    def send(self, telegram: bytes) -> bytes:
+        """
+        Send will make sure the data that needs to be sent i sent.
+        The send is the only public function that will return the response data
+        when received in full. See `BaseHdlcTransport.send_exchange`.
+        :param telegram:
+        :return:
+        """
+        return self.run_exchange(self.send_exchange(telegram))
+
+    @abc.abstractmethod
+    def _write_bytes(self, to_write: bytes):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def _read(self) -> bytes:
+        """
+        Blocks until some data is received or the read times out. The data does not
+        need to be complete frames.
+        """
+        raise NotImplementedError()
 
     def __enter__(self):
         self.connect()
@@ -235,3 +326,113 @@ class SerialHdlcTransport:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.disconnect()
+
+
+@attr.s(auto_attribs=True)
+class SerialHdlcTransport(HdlcTransport):
+    """
+    HDLC transport to send data over serial.
+    """
+
+    client_logical_address: int
+    server_logical_address: int
+    serial_port: str
+    serial_baud_rate: int = attr.ib(default=9600)
+    server_physical_address: Optional[int] = attr.ib(default=None)
+    client_physical_address: Optional[int] = attr.ib(default=None)
+    timeout: int = attr.ib(default=10)
+    # Proposed to the meter in the SNRM. The negotiated values are used.
+    max_info_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    # Optical probes on meters starting in IEC 62056-21 need the mode E opening
+    # sequence before HDLC can be used. The highest baud rate supported by both the
+    # meter and `iec_max_baud_rate` is used for the HDLC session.
+    iec_mode_e: bool = attr.ib(default=False)
+    iec_max_baud_rate: int = attr.ib(default=19200)
+    iec_device_address: str = attr.ib(default="")
+    hdlc_connection: connection.HdlcConnection = attr.ib(
+        default=attr.Factory(
+            lambda self: connection.HdlcConnection(
+                self.server_hdlc_address,
+                self.client_hdlc_address,
+                max_data_size=self.max_info_length,
+                max_data_size_receive=self.max_info_length,
+                window_size_transmit=self.window_size,
+                window_size_receive=self.window_size,
+            ),
+            takes_self=True,
+        )
+    )
+    _serial: serial.Serial = attr.ib(
+        default=attr.Factory(
+            lambda self: serial.Serial(
+                port=self.serial_port,
+                baudrate=self.serial_baud_rate,
+                timeout=self.timeout,
+            ),
+            takes_self=True,
+        )
+    )
+
+    tracer: Optional[tracing.Tracer] = attr.ib(default=None, repr=False)
+
+    out_buffer: bytearray = attr.ib(init=False, factory=bytearray)
+    request_sent_at: float = attr.ib(init=False, default=0.0)
+
+    def connect(self):
+        """
+        Runs the IEC 62056-21 mode E opening sequence if `iec_mode_e` is set and sets
+        up the HDLC connection.
+        """
+        if self.iec_mode_e:
+            self.mode_e_handshake()
+        return super().connect()
+
+    def mode_e_handshake(self) -> int:
+        """
+        Sends the IEC 62056-21 request message at 300 baud and selects the highest
+        baud rate supported by both the meter and `iec_max_baud_rate` in the
+        acknowledgement. The port is then switched to the selected baud rate and to
+        8 data bits without parity for HDLC. Returns the selected baud rate.
+        """
+        self._serial.baudrate = iec62056_21.INITIAL_BAUD_RATE
+        self._serial.bytesize = serial.SEVENBITS
+        self._serial.parity = serial.PARITY_EVEN
+        self._serial.reset_input_buffer()
+
+        self._write_bytes(
+            iec62056_21.RequestMessage(
+                device_address=self.iec_device_address
+            ).to_bytes()
+        )
+        identification = iec62056_21.IdentificationMessage.from_bytes(
+            self._serial.read_until(iec62056_21.LINE_END)
+        )
+        LOG.info(f"Received {identification!r}")
+        baud_rate = iec62056_21.select_baud_rate(identification, self.iec_max_baud_rate)
+        self._write_bytes(
+            iec62056_21.AckOptionSelectMessage(
+                baud_rate_character=iec62056_21.BAUD_RATE_CHARACTERS[baud_rate]
+            ).to_bytes()
+        )
+        # The acknowledgement has to be sent in full before switching baud rate.
+        self._serial.flush()
+        time.sleep(iec62056_21.BAUD_RATE_SWITCH_DELAY)
+
+        self._serial.baudrate = baud_rate
+        self._serial.bytesize = serial.EIGHTBITS
+        self._serial.parity = serial.PARITY_NONE
+        LOG.info(f"Switched to {baud_rate} baud for HDLC")
+        return baud_rate
+
+    def _write_bytes(self, to_write: bytes):
+        LOG.debug("Sending: %r", to_write)
+        self._serial.write(to_write)
+
+    def _read(self) -> bytes:
+        """
+        Reads everything that is waiting on the serial line in one go. If nothing is
+        waiting we block until at least one byte is received or the read times out.
+        The HdlcConnection finds the frames in the received data.
+        """
+        return self._serial.read(max(1, self._serial.in_waiting))
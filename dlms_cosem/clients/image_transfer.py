@@ -0,0 +1,364 @@
+import logging
+import mmap
+import os
+import time
+from enum import IntEnum
+from typing import *
+
+import attr
+
+from dlms_cosem import cosem, dlms_data, enumerations, exceptions, utils
+from dlms_cosem.clients.dlms_client import ActionError, DlmsClient
+
+LOG = logging.getLogger(__name__)
+
+
+class ImageTransferStatus(IntEnum):
+    NOT_INITIATED = 0
+    INITIATED = 1
+    VERIFICATION_INITIATED = 2
+    VERIFICATION_SUCCESSFUL = 3
+    VERIFICATION_FAILED = 4
+    ACTIVATION_INITIATED = 5
+    ACTIVATION_SUCCESSFUL = 6
+    ACTIVATION_FAILED = 7
+
+
+class ImageTransferError(exceptions.DlmsClientException):
+    """Error in the image transfer process"""
+
+
+@attr.s(auto_attribs=True)
+class ImageTransferResult:
+    """
+    Summary of an image upload.
+
+    :param int image_size: Total size of the image in bytes.
+    :param int block_size: The image_block_size used by the meter.
+    :param int total_blocks: Number of blocks the image is split into.
+    :param int blocks_sent: Number of blocks that was sent in this upload. When
+        resuming an interrupted transfer it is lower than total_blocks.
+    :param int bytes_sent: Number of image bytes that was sent in this upload.
+    :param float elapsed: Seconds spent transferring blocks.
+    """
+
+    image_size: int
+    block_size: int
+    total_blocks: int
+    blocks_sent: int = attr.ib(default=0)
+    bytes_sent: int = attr.ib(default=0)
+    elapsed: float = attr.ib(default=0.0)
+
+    @property
+    def throughput(self) -> float:
+        """Image bytes transferred per second"""
+        if not self.elapsed:
+            return 0.0
+        return self.bytes_sent / self.elapsed
+
+    @property
+    def blocks_per_second(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.blocks_sent / self.elapsed
+
+
+def number_of_blocks(image_size: int, block_size: int) -> int:
+    return (image_size + block_size - 1) // block_size
+
+
+def missing_blocks(blocks_status: str, total_blocks: int) -> List[int]:
+    """
+    image_transferred_blocks_status is a bit string where bit n indicates if block n
+    has been successfully transferred. Returns the block numbers that still needs to
+    be sent. Bits not present in the status are treated as not transferred.
+    """
+    return [
+        block_number
+        for block_number in range(0, total_blocks)
+        if block_number >= len(blocks_status) or blocks_status[block_number] != "1"
+    ]
+
+
+@attr.s(auto_attribs=True)
+class ImageTransfer:
+    """
+    Transfers firmware images to a meter using the Image Transfer interface class
+    (IC 18).
+
+    The transfer follows the procedure described in the Blue Book:
+
+    1. Read image_block_size (attribute 2).
+    2. Initiate the transfer with image_transfer_initiate (method 1). A meter that
+        already has a transfer of the same image identifier and size initiated keeps
+        the blocks it received so the transfer is resumed.
+    3. Transfer the blocks with image_block_transfer (method 2).
+    4. Read image_transferred_blocks_status (attribute 3) to find blocks that was not
+        received and send them again.
+    5. Verify the image with image_verify (method 3).
+    6. Activate the image with image_activate (method 4).
+
+    The client should already be associated with the meter.
+    """
+
+    INTERFACE: ClassVar[
+        enumerations.CosemInterface
+    ] = enumerations.CosemInterface.IMAGE_TRANSFER
+
+    dlms_client: DlmsClient
+    logical_name: cosem.Obis = attr.ib(factory=lambda: cosem.Obis(0, 0, 44, 0, 0))
+
+    # How many times we read the transferred blocks status and resend missing blocks
+    # before giving up.
+    max_retries: int = attr.ib(default=3)
+
+    # Number of image_block_transfer invocations sent in one ACTION.WITH_LIST request.
+    # Saves a round trip per block on high latency links. Large requests are sent
+    # with block transfer if the meter supports it.
+    blocks_per_request: int = attr.ib(default=1)
+
+    # How often and for how long image_transfer_status is polled while the meter
+    # verifies the image asynchronously.
+    verify_poll_interval: float = attr.ib(default=1.0)
+    verify_timeout: float = attr.ib(default=60.0)
+
+    def _attribute(self, attribute: int) -> cosem.CosemAttribute:
+        return cosem.CosemAttribute(
+            interface=self.INTERFACE, instance=self.logical_name, attribute=attribute
+        )
+
+    def _method(self, method: int) -> cosem.CosemMethod:
+        return cosem.CosemMethod(
+            interface=self.INTERFACE, instance=self.logical_name, method=method
+        )
+
+    def _get(self, attribute: int) -> Any:
+        return utils.parse_as_dlms_data(
+            self.dlms_client.get(self._attribute(attribute))
+        )
+
+    def read_image_block_size(self) -> int:
+        return self._get(2)
+
+    def read_transferred_blocks_status(self) -> str:
+        return self._get(3) or ""
+
+    def read_first_not_transferred_block_number(self) -> int:
+        return self._get(4)
+
+    def read_transfer_enabled(self) -> bool:
+        return self._get(5)
+
+    def read_transfer_status(self) -> ImageTransferStatus:
+        return ImageTransferStatus(self._get(6))
+
+    def initiate(self, image_identifier: bytes, image_size: int):
+        """
+        image_transfer_initiate. Resets the transferred blocks status in the meter.
+        """
+        data = dlms_data.DataStructure(
+            [
+                dlms_data.OctetStringData(image_identifier),
+                dlms_data.DoubleLongUnsignedData(image_size),
+            ]
+        )
+        self.dlms_client.action(method=self._method(1), data=data.to_bytes())
+
+    @staticmethod
+    def encode_block(block_number: int, block: bytes) -> bytes:
+        return dlms_data.DataStructure(
+            [
+                dlms_data.DoubleLongUnsignedData(block_number),
+                dlms_data.OctetStringData(bytes(block)),
+            ]
+        ).to_bytes()
+
+    def transfer_block(self, block_number: int, block: bytes):
+        """
+        image_block_transfer.
+        """
+        self.dlms_client.action(
+            method=self._method(2), data=self.encode_block(block_number, block)
+        )
+
+    def verify(self):
+        """
+        image_verify. Some meters verify asynchronously and respond with
+        TEMPORARY_FAILURE. Then image_transfer_status is polled until the verification
+        is done.
+        """
+        try:
+            self.dlms_client.action(
+                method=self._method(3), data=dlms_data.IntegerData(0).to_bytes()
+            )
+        except ActionError:
+            if (
+                self.read_transfer_status()
+                != ImageTransferStatus.VERIFICATION_INITIATED
+            ):
+                raise
+            self.wait_for_verification()
+
+    def wait_for_verification(self):
+        deadline = time.monotonic() + self.verify_timeout
+        while True:
+            status = self.read_transfer_status()
+            if status == ImageTransferStatus.VERIFICATION_SUCCESSFUL:
+                return
+            if status == ImageTransferStatus.VERIFICATION_FAILED:
+                raise ImageTransferError("Meter could not verify the image")
+            if time.monotonic() > deadline:
+                raise ImageTransferError(
+                    f"Image verification not done after {self.verify_timeout}s, "
+                    f"image_transfer_status is {status.name}"
+                )
+            time.sleep(self.verify_poll_interval)
+
+    def activate(self):
+        self.dlms_client.action(
+            method=self._method(4), data=dlms_data.IntegerData(0).to_bytes()
+        )
+
+    def transfer_blocks(self, block_numbers: List[int], blocks: List[bytes]):
+        """
+        Transfers several blocks in one ACTION.WITH_LIST request. Blocks the meter
+        did not accept are found and re-sent after reading the transferred blocks
+        status.
+        """
+        if len(block_numbers) == 1:
+            self.transfer_block(block_numbers[0], blocks[0])
+            return
+        results = self.dlms_client.action_many(
+            methods=[self._method(2)] * len(block_numbers),
+            data=[
+                self.encode_block(block_number, block)
+                for block_number, block in zip(block_numbers, blocks)
+            ],
+        )
+        for block_number, result in zip(block_numbers, results):
+            if result.status != enumerations.ActionResultStatus.SUCCESS:
+                LOG.warning(
+                    f"Transfer of block {block_number} failed: {result.status.name}"
+                )
+
+    def send_blocks(
+        self,
+        image: Union[bytes, memoryview, mmap.mmap],
+        block_numbers: Iterable[int],
+        block_size: int,
+        result: ImageTransferResult,
+    ):
+        block_numbers = list(block_numbers)
+        start = time.monotonic()
+        # The views must be released before a memory-mapped image can be closed.
+        with memoryview(image) as view:
+            try:
+                for index in range(0, len(block_numbers), self.blocks_per_request):
+                    batch = block_numbers[index : index + self.blocks_per_request]
+                    blocks = [
+                        view[
+                            block_number * block_size : (block_number + 1) * block_size
+                        ]
+                        for block_number in batch
+                    ]
+                    try:
+                        self.transfer_blocks(batch, blocks)
+                        result.blocks_sent += len(batch)
+                        result.bytes_sent += sum(len(block) for block in blocks)
+                    finally:
+                        for block in blocks:
+                            block.release()
+            finally:
+                result.elapsed += time.monotonic() - start
+
+    def upload(
+        self,
+        image: Union[bytes, memoryview, mmap.mmap],
+        image_identifier: bytes,
+        resume: bool = True,
+        verify: bool = True,
+        activate: bool = False,
+    ) -> ImageTransferResult:
+        """
+        Upload an image to the meter.
+
+        The transfer is always initiated with the identifier and size of the image. If
+        resume is set and the meter reports that a transfer was already initiated we
+        only send the blocks that the meter has not received after the initiation. A
+        meter resets the transferred blocks when the pending transfer is of another
+        image, so the blocks of different images are never mixed.
+        """
+        image_size = len(image)
+        block_size = self.read_image_block_size()
+        if not block_size:
+            raise ImageTransferError("Meter reported an image_block_size of 0")
+        total_blocks = number_of_blocks(image_size, block_size)
+        result = ImageTransferResult(
+            image_size=image_size, block_size=block_size, total_blocks=total_blocks
+        )
+
+        resuming = (
+            resume and self.read_transfer_status() == ImageTransferStatus.INITIATED
+        )
+        self.initiate(image_identifier, image_size)
+        if resuming:
+            LOG.info("Image transfer already initiated. Resuming transfer")
+            to_send = missing_blocks(
+                self.read_transferred_blocks_status(), total_blocks
+            )
+        else:
+            to_send = list(range(0, total_blocks))
+
+        for attempt in range(0, self.max_retries + 1):
+            if not to_send:
+                break
+            LOG.info(
+                f"Transferring {len(to_send)} of {total_blocks} blocks "
+                f"(attempt {attempt + 1})"
+            )
+            self.send_blocks(image, to_send, block_size, result)
+            to_send = missing_blocks(
+                self.read_transferred_blocks_status(), total_blocks
+            )
+        else:
+            if to_send:
+                raise ImageTransferError(
+                    f"Meter is still missing {len(to_send)} blocks after "
+                    f"{self.max_retries} retries"
+                )
+
+        LOG.info(
+            f"Transferred {result.bytes_sent} bytes in {result.elapsed:.2f}s "
+            f"({result.throughput:.0f} bytes/s)"
+        )
+
+        if verify:
+            self.verify()
+        if activate:
+            self.activate()
+
+        return result
+
+    def upload_file(
+        self,
+        path: Union[str, os.PathLike],
+        image_identifier: bytes,
+        resume: bool = True,
+        verify: bool = True,
+        activate: bool = False,
+    ) -> ImageTransferResult:
+        """
+        Upload an image file. The file is memory-mapped so that blocks are sliced
+        directly from the page cache instead of reading the whole file into memory.
+        """
+        with open(path, "rb") as image_file:
+            if os.fstat(image_file.fileno()).st_size == 0:
+                raise ImageTransferError(f"Image file {path} is empty")
+            with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as image:
+                return self.upload(
+                    image,
+                    image_identifier=image_identifier,
+                    resume=resume,
+                    verify=verify,
+                    activate=activate,
+                )
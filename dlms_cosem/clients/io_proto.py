@@ -18,3 +18,22 @@ class DlmsIOInterface(Protocol):
 
     def send(self, bytes_to_send: bytes) -> bytes:
         ...
+
+
+class AsyncDlmsIOInterface(Protocol):
+    """
+    Protocol for a class that should be used for transport with asyncio.
+    """
+
+    client_logical_address: int
+    server_logical_address: int
+    timeout: int
+
+    async def connect(self) -> None:
+        ...
+
+    async def disconnect(self) -> None:
+        ...
+
+    async def send(self, bytes_to_send: bytes) -> bytes:
+        ...
@@ -1,13 +1,14 @@
 import logging
 import os
+import time
 from typing import *
 
 import attr
 
 from dlms_cosem import enumerations as enums
-from dlms_cosem import exceptions, security
+from dlms_cosem import exceptions, metrics, security
 from dlms_cosem import state as dlms_state
-from dlms_cosem import utils
+from dlms_cosem import tracing, utils
 from dlms_cosem.exceptions import DecryptionError
 from dlms_cosem.protocol import acse, xdlms
 from dlms_cosem.protocol.xdlms.base import AbstractXDlmsApdu
@@ -15,6 +16,36 @@ from dlms_cosem.protocol.xdlms.conformance import Conformance
 
 LOG = logging.getLogger(__name__)
 
+# APDUs carrying a block of the data in GET and ACTION block transfers.
+SENT_BLOCKS = (
+    xdlms.ActionRequestWithFirstPblock,
+    xdlms.ActionRequestWithListAndFirstPblock,
+    xdlms.ActionRequestWithPblock,
+)
+RECEIVED_BLOCKS = (
+    xdlms.GetResponseWithBlock,
+    xdlms.GetResponseLastBlock,
+    xdlms.GetResponseLastBlockWithError,
+    xdlms.ActionResponseWithPblock,
+)
+
+REJECTED_ASSOCIATION = (
+    enums.AssociationResult.REJECTED_PERMANENT,
+    enums.AssociationResult.REJECTED_TRANSIENT,
+)
+
+
+def count_received(apdu):
+    """Updates the metrics counters of a received APDU."""
+    metrics.APDUS_RECEIVED.inc(type(apdu).__name__)
+    if isinstance(apdu, RECEIVED_BLOCKS):
+        metrics.BLOCKS.inc("received")
+    elif (
+        isinstance(apdu, acse.ApplicationAssociationResponse)
+        and apdu.result in REJECTED_ASSOCIATION
+    ):
+        metrics.ASSOCIATION_REJECTS.inc(apdu.result.name.lower())
+
 
 def default_system_title() -> bytes:
     """A non FLAG registed id + 5 random bytes """
@@ -34,7 +65,10 @@ class XDlmsApduFactory:
         33: xdlms.GlobalCipherInitiateRequest,
         40: xdlms.GlobalCipherInitiateResponse,
         216: xdlms.ExceptionResponse,
+        217: xdlms.AccessRequest,
+        218: xdlms.AccessResponse,
         219: xdlms.GeneralGlobalCipher,
+        220: xdlms.GeneralDedicatedCipher,
         # ACSE APDUs:
         96: acse.ApplicationAssociationRequest,
         97: acse.ApplicationAssociationResponse,
@@ -71,10 +105,15 @@ def make_client_to_server_challenge(length: int = 8) -> bytes:
         )
 
 
-def make_conformance(encryption_key: Optional[bytes], use_block_transfer: bool):
+def make_conformance(
+    encryption_key: Optional[bytes],
+    use_block_transfer: bool,
+    use_action_block_transfer: bool = False,
+):
     """
     Return a default conformance with general_protection set if a
-    encryption key is passed.
+    encryption key is passed. Block transfer with ACTION is only proposed when it is
+    asked for.
     """
     return Conformance(
         general_protection=bool(encryption_key),
@@ -85,7 +124,7 @@ def make_conformance(encryption_key: Optional[bytes], use_block_transfer: bool):
         attribute_0_supported_with_get=False,
         block_transfer_with_get_or_read=True,
         block_transfer_with_set_or_write=False,
-        block_transfer_with_action=False,
+        block_transfer_with_action=use_action_block_transfer,
         multiple_references=True,
         data_notification=False,
         access=True,
@@ -101,6 +140,12 @@ class ProtectionError(Exception):
     """Unable to perform cryptographic function"""
 
 
+# General-glo-ciphering adds a tag, the system title (with length), the length of the
+# ciphered content, the security control byte, the invocation counter and a 12 byte
+# authentication tag to the protected APDU.
+GENERAL_GLOBAL_CIPHER_OVERHEAD = 1 + 9 + 3 + 1 + 4 + 12
+
+
 @attr.s(auto_attribs=True)
 class DlmsConnection:
     """
@@ -165,9 +210,16 @@ class DlmsConnection:
     global_dedicated_key: Optional[bytes] = attr.ib(default=None)
     # the dedicated invocation_counter will be reset on each new dedicated_key.
     dedicated_invocation_counter: int = attr.ib(init=False, default=0)
+    # The meter keeps its own invocation counter for the dedicated key. It is unknown
+    # until the first dedicated ciphered APDU is received.
+    meter_dedicated_invocation_counter: Optional[int] = attr.ib(
+        init=False, default=None
+    )
 
     # not supported yet
     use_block_transfer: bool = attr.ib(default=False)
+    # Proposes block transfer of ACTION parameters and results in the AARQ.
+    use_action_block_transfer: bool = attr.ib(default=False)
 
     # the max pdu size controls when we need to use block transfer. If the message is
     # larger than max_pdu_size we automatically use the general block service.
@@ -178,14 +230,22 @@ class DlmsConnection:
     is_pre_established: bool = attr.ib(default=False)
 
     buffer: bytearray = attr.ib(init=False, factory=bytearray)
+    # Security contexts are cached per key so the ciphers are only set up once.
+    security_contexts: Dict[
+        Tuple[int, bytes, bytes], security.SecurityContext
+    ] = attr.ib(init=False, factory=dict, repr=False)
     state: dlms_state.DlmsConnectionState = attr.ib(
         factory=dlms_state.DlmsConnectionState
     )
+    # Receives the timings of encoding, protection and state changes when set.
+    tracer: Optional[tracing.Tracer] = attr.ib(default=None, repr=False)
 
     conformance: Conformance = attr.ib(
         default=attr.Factory(
             lambda self: make_conformance(
-                self.global_encryption_key, self.use_block_transfer
+                self.global_encryption_key,
+                self.use_block_transfer,
+                self.use_action_block_transfer,
             ),
             takes_self=True,
         )
@@ -270,25 +330,46 @@ class DlmsConnection:
                     f"pre-established "
                 )
 
-        self.state.process_event(event)
-        LOG.debug(f"Preparing to send: {event}")
+        tracer = self.tracer
+        if tracer is None:
+            self.state.process_event(event)
+        else:
+            previous_state = self.state.current_state
+            self.state.process_event(event)
+            if self.state.current_state is not previous_state:
+                tracer.state_changed(previous_state, self.state.current_state)
+        LOG.debug("Preparing to send: %s", event)
+        if metrics.REGISTRY.enabled:
+            metrics.APDUS_SENT.inc(type(event).__name__)
+            if isinstance(event, SENT_BLOCKS):
+                metrics.BLOCKS.inc("sent")
 
         if self.use_protection:
+            if tracer is not None:
+                started = time.perf_counter()
             event = self.protect(event)
+            if tracer is not None:
+                tracer.record(tracing.PROTECT, time.perf_counter() - started)
 
         # if self.use_blocks:
         #    blocks = self.make_blocks(event)
         #    # TODO: How to handle the subcase of sending blocks?
 
-        LOG.info(f"Sending : {event}")
+        LOG.info("Sending : %s", event)
 
+        if tracer is not None:
+            started = time.perf_counter()
         out = event.to_bytes()
+        if tracer is not None:
+            tracer.record(tracing.ENCODE, time.perf_counter() - started, len(out))
 
         if len(out) > self.max_pdu_size:
             raise exceptions.LocalDlmsProtocolError(
                 f"PDU size too big. Max PDU size for association is {self.max_pdu_size} "
                 f"bytes. PDU to be sent is {len(out)}"
             )
+        if tracing.WIRE_TRACE.enabled:
+            tracing.WIRE_TRACE.record("dlms", tracing.SENT, out)
         return out
 
     def receive_data(self, data: bytes):
@@ -297,7 +378,8 @@ class DlmsConnection:
         After this you could call next_event
         """
         if data:
-            LOG.debug(f"Received DLMS data: {data!r}")
+            if tracing.WIRE_TRACE.enabled:
+                tracing.WIRE_TRACE.record("dlms", tracing.RECEIVED, data)
             self.buffer += data
 
     def next_event(self):
@@ -310,7 +392,15 @@ class DlmsConnection:
         the IP wrapper element so it is possible to can keep on trying until all data
         is received.
         """
+        tracer = self.tracer
+        if tracer is not None:
+            previous_state = self.state.current_state
+            started = time.perf_counter()
         apdu = XDlmsApduFactory.apdu_from_bytes(self.buffer)
+        if tracer is not None:
+            tracer.record(
+                tracing.DECODE, time.perf_counter() - started, len(self.buffer)
+            )
 
         if isinstance(apdu, acse.ApplicationAssociationResponse):
             # To be able to run the decryption we need to know some things about the
@@ -318,7 +408,7 @@ class DlmsConnection:
             self.update_meter_info(apdu)
 
         if self.use_protection:
-            apdu = self.unprotect(apdu)
+            apdu = self.unprotect_received(apdu, tracer)
 
         if self.is_pre_established:
             if isinstance(
@@ -330,16 +420,15 @@ class DlmsConnection:
                     f"association it is not possible to handle ACSE services."
                 )
 
+        if metrics.REGISTRY.enabled:
+            count_received(apdu)
         self.state.process_event(apdu)
         self.clear_buffer()
 
         if isinstance(apdu, acse.ApplicationAssociationResponse):
             self.update_negotiated_parameters(apdu)
 
-            if apdu.result in [
-                enums.AssociationResult.REJECTED_PERMANENT,
-                enums.AssociationResult.REJECTED_TRANSIENT,
-            ]:
+            if apdu.result in REJECTED_ASSOCIATION:
                 # reset the association on a reject
                 self.state.process_event(dlms_state.RejectAssociation())
 
@@ -366,6 +455,21 @@ class DlmsConnection:
                     "Received a non Action response when in HLS DONE"
                 )
 
+        if tracer is not None and self.state.current_state is not previous_state:
+            tracer.state_changed(previous_state, self.state.current_state)
+        return apdu
+
+    def unprotect_received(self, apdu, tracer: Optional[tracing.Tracer]):
+        if tracer is not None:
+            started = time.perf_counter()
+        try:
+            apdu = self.unprotect(apdu)
+        except DecryptionError:
+            if metrics.REGISTRY.enabled:
+                metrics.DECRYPTION_FAILURES.inc()
+            raise
+        if tracer is not None:
+            tracer.record(tracing.UNPROTECT, time.perf_counter() - started)
         return apdu
 
     def clear_buffer(self):
@@ -385,6 +489,16 @@ class DlmsConnection:
         else:
             return False
 
+    @property
+    def max_apdu_size(self) -> int:
+        """
+        The largest unprotected xDLMS APDU that can be sent and still fit in the
+        negotiated max_pdu_size after protection is applied.
+        """
+        if self.use_protection:
+            return self.max_pdu_size - GENERAL_GLOBAL_CIPHER_OVERHEAD
+        return self.max_pdu_size
+
     def protect(self, event) -> Any:
         """
         Will apply the correct protection to apdus depending on the security context
@@ -405,10 +519,21 @@ class DlmsConnection:
                     )
                 )
 
-        # XDLMS apdus should be protected with general-glo-ciphering
+        # XDLMS apdus should be protected with general-ded-ciphering if a dedicated
+        # key was sent in the AARQ, otherwise with general-glo-ciphering
+        elif isinstance(event, AbstractXDlmsApdu) and self.use_dedicated_protection:
+            ciphered_text, ic = self.encrypt(event.to_bytes(), dedicated=True)
+            LOG.info("Protecting a %s with DedicatedCiphering", type(event))
+
+            event = xdlms.GeneralDedicatedCipher(
+                system_title=self.client_system_title,
+                security_control=self.security_control,
+                invocation_counter=ic,
+                ciphered_text=ciphered_text,
+            )
         elif isinstance(event, AbstractXDlmsApdu):
             ciphered_text, ic = self.encrypt(event.to_bytes())
-            LOG.info(f"Protecting a {type(event)} with GlobalCiphering")
+            LOG.info("Protecting a %s with GlobalCiphering", type(event))
 
             event = xdlms.GeneralGlobalCipher(
                 system_title=self.client_system_title,
@@ -421,12 +546,40 @@ class DlmsConnection:
 
         return event
 
-    def encrypt(self, plain_text: bytes) -> Tuple[bytes, int]:
+    def get_security_context(self, key: bytes) -> security.SecurityContext:
+        """
+        Returns the cached security context for the key and the global authentication
+        key. Keys can be changed on the connection, so the context is looked up on
+        the keys in use.
+        """
+        context_key = (self.security_suite, key, self.global_authentication_key)
+        context = self.security_contexts.get(context_key)
+        if context is None:
+            context = security.SecurityContext(
+                security_suite=self.security_suite,
+                key=key,
+                auth_key=self.global_authentication_key,
+            )
+            self.security_contexts[context_key] = context
+        return context
+
+    @property
+    def use_dedicated_protection(self) -> bool:
+        """
+        If xDLMS APDUs should be protected with the dedicated key. The dedicated key is
+        generated when the AARQ is made.
+        """
+        return self.use_dedicated_ciphering and self.global_dedicated_key is not None
+
+    def encrypt(self, plain_text: bytes, dedicated: bool = False) -> Tuple[bytes, int]:
         """
         Encrypts plain bytes according to the current association and connection.
         Returns the ciphered text and the invocation counter used with the ciphered text.
         It also increases the internal client invocation counter to make sure a new
         invocation counter is used at every encryption call.
+
+        If dedicated is set the dedicated key and the dedicated invocation counter is
+        used instead of the global key and the client invocation counter.
         """
         if not self.global_encryption_key:
             raise ProtectionError(
@@ -437,29 +590,39 @@ class DlmsConnection:
                 "Unable to encrypt plain text. Missing global_authentication_key"
             )
 
-        invocation_counter = self.client_invocation_counter
+        if dedicated:
+            if not self.global_dedicated_key:
+                raise ProtectionError(
+                    "Unable to encrypt plain text. Missing global_dedicated_key"
+                )
+            key = self.global_dedicated_key
+            invocation_counter = self.dedicated_invocation_counter
+        else:
+            key = self.global_encryption_key
+            invocation_counter = self.client_invocation_counter
 
-        ciphered_text = security.encrypt(
+        ciphered_text = self.get_security_context(key).encrypt(
             self.security_control,
             system_title=self.client_system_title,
             invocation_counter=invocation_counter,
-            key=self.global_encryption_key,
-            auth_key=self.global_authentication_key,
             plain_text=plain_text,
         )
 
-        # updated the client_invocation_counter
-        self.client_invocation_counter += 1
+        # update the used invocation counter
+        if dedicated:
+            self.dedicated_invocation_counter += 1
+        else:
+            self.client_invocation_counter += 1
 
         return ciphered_text, invocation_counter
 
-    def decrypt(
-        self,
-        ciphered_text: bytes,
-    ):
+    def decrypt(self, ciphered_text: bytes, dedicated: bool = False):
         """
         Encrypts ciphered bytes according to the current association and connection.
         In the case of AARE we have not had the opportunity to
+
+        If dedicated is set the dedicated key and the meters dedicated invocation
+        counter is used.
         """
 
         if not self.global_encryption_key:
@@ -475,12 +638,21 @@ class DlmsConnection:
                 "Unable to decrypt ciphered text. Have not received the meters system title."
             )
 
-        return security.decrypt(
+        if dedicated:
+            if not self.global_dedicated_key:
+                raise ProtectionError(
+                    "Unable to decrypt ciphered text. Missing global_dedicated_key"
+                )
+            key = self.global_dedicated_key
+            invocation_counter = self.meter_dedicated_invocation_counter
+        else:
+            key = self.global_encryption_key
+            invocation_counter = self.meter_invocation_counter
+
+        return self.get_security_context(key).decrypt(
             self.security_control,
             system_title=self.meter_system_title,
-            invocation_counter=self.meter_invocation_counter,
-            key=self.global_encryption_key,
-            auth_key=self.global_authentication_key,
+            invocation_counter=invocation_counter,
             cipher_text=ciphered_text,
         )
 
@@ -511,10 +683,15 @@ class DlmsConnection:
                         plain_text
                     )
 
+        # GeneralDedicatedCipher is a subclass of GeneralGlobalCipher.
+        elif isinstance(event, xdlms.GeneralDedicatedCipher):
+            self.update_meter_dedicated_invocation_counter(event.invocation_counter)
+            plain_text = self.decrypt(event.ciphered_text, dedicated=True)
+            return XDlmsApduFactory.apdu_from_bytes(plain_text)
+
         elif isinstance(event, xdlms.GeneralGlobalCipher):
             self.update_meter_invocation_counter(event.invocation_counter)
             plain_text = self.decrypt(event.ciphered_text)
-            LOG.warning(f"apdu_bytes: {plain_text!r}")
             return XDlmsApduFactory.apdu_from_bytes(plain_text)
 
         return event
@@ -542,9 +719,28 @@ class DlmsConnection:
         else:
             ciphered_apdus = False
 
+        if self.use_dedicated_ciphering and self.global_encryption_key:
+            # A new dedicated key is used for every association. It has the same
+            # length as the global key of the security suite.
+            if self.global_dedicated_key:
+                self.security_contexts.pop(
+                    (
+                        self.security_suite,
+                        self.global_dedicated_key,
+                        self.global_authentication_key,
+                    ),
+                    None,
+                )
+            self.global_dedicated_key = os.urandom(len(self.global_encryption_key))
+            self.dedicated_invocation_counter = 0
+            self.meter_dedicated_invocation_counter = None
+
         initiate_request = xdlms.InitiateRequest(
             proposed_conformance=self.conformance,
             client_max_receive_pdu_size=self.max_pdu_size,
+            dedicated_key=self.global_dedicated_key
+            if self.use_dedicated_ciphering
+            else None,
         )
 
         return acse.ApplicationAssociationRequest(
@@ -610,12 +806,10 @@ class DlmsConnection:
                 security_suite=self.security_suite, authenticated=True, encrypted=False
             )
 
-            gmac_result = security.gmac(
+            gmac_result = self.get_security_context(self.global_encryption_key).gmac(
                 security_control=only_auth_security_control,
                 system_title=self.client_system_title,
                 invocation_counter=self.client_invocation_counter,
-                key=self.global_encryption_key,
-                auth_key=self.global_authentication_key,
                 challenge=self.meter_to_client_challenge,
             )
             return (
@@ -663,12 +857,10 @@ class DlmsConnection:
                 "Unable to verify GMAC. Have not received the meters system title."
             )
 
-        correct_gmac = security.gmac(
+        correct_gmac = self.get_security_context(self.global_encryption_key).gmac(
             security_control=security_control,
             system_title=self.meter_system_title,
             invocation_counter=invocation_counter,
-            key=self.global_encryption_key,
-            auth_key=self.global_authentication_key,
             challenge=self.client_to_meter_challenge,
         )
         return gmac_result == correct_gmac
@@ -684,6 +876,23 @@ class DlmsConnection:
             )
         self.meter_invocation_counter = received_invocation_counter
 
+    def update_meter_dedicated_invocation_counter(
+        self, received_invocation_counter: int
+    ) -> None:
+        """
+        The dedicated invocation counter is only checked against counters received
+        with the same dedicated key.
+        """
+        if (
+            self.meter_dedicated_invocation_counter is not None
+            and received_invocation_counter <= self.meter_dedicated_invocation_counter
+        ):
+            raise exceptions.LocalDlmsProtocolError(
+                "Received dedicated invocation counter is not larger than the previous "
+                "received one. "
+            )
+        self.meter_dedicated_invocation_counter = received_invocation_counter
+
     def update_meter_info(self, aare: acse.ApplicationAssociationResponse) -> None:
         self.meter_system_title = aare.system_title
         self.authentication_method = aare.authentication
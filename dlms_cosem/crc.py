@@ -1,96 +1,146 @@
-# CRC CCITT - HDLC Style 16-bit
+# CRC CCITT - HDLC Style 16-bit (CRC-16/X.25)
 # In accordning with ANSI C12.18(2006)
 # Using 0xFFFF as initial value
-# Running over serial so all message bytes need to be reversed
-# before calculation (because least significant bit is sent first)
-# resulting crc bytes needs to be reversed to become in correct order
-# The reversed crc is then XOR:ed with 0xFFFF
+# HDLC sends the least significant bit first so the CRC is calculated with the
+# reflected polynomial (0x8408) directly on the message bytes. No bit reversal of the
+# message or the result is needed.
+# The crc is XOR:ed with 0xFFFF and sent least significant byte first.
 #
-from ctypes import c_ushort
+import functools
+import sys
+from array import array
 from typing import *
 
+INITIAL_VALUE = 0xFFFF
+FINAL_XOR_VALUE = 0xFFFF
+REFLECTED_POLYNOMIAL = 0x8408
+# Running the CRC over a message including its correct CRC always leaves this value.
+GOOD_RESIDUE = 0xF0B8
+
+
+def make_crc_table(polynomial: int) -> Tuple[int, ...]:
+    """The algorithm uses tables with pre-calculated values"""
+    table = list()
+    for i in range(0, 256):
+        crc = i
+        for _ in range(0, 8):
+            if crc & 1:
+                crc = (crc >> 1) ^ polynomial
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC_TABLE = make_crc_table(REFLECTED_POLYNOMIAL)
+# The words are read in the byte order of the machine, only little endian is handled.
+USE_WORD_TABLE = sys.byteorder == "little"
+# Shorter data is faster a byte at a time.
+MIN_WORD_LENGTH = 16
+
+
+@functools.lru_cache(maxsize=None)
+def word_crc_table() -> array:
+    """
+    Table to run two bytes at a time through the reflected CRC. It is indexed by the
+    crc XOR:ed with the two bytes as a little endian 16 bit word. Made on first use.
+    """
+    table = CRC_TABLE
+    # Running the low byte through the CRC and then the high byte.
+    shifted = [value >> 8 for value in table]
+    low = [value & 0xFF for value in table]
+    return array(
+        "H",
+        [
+            shifted[low_byte] ^ table[high_byte ^ low[low_byte]]
+            for high_byte in range(0, 256)
+            for low_byte in range(0, 256)
+        ],
+    )
+
+
+def update_crc(crc: int, data: Union[bytes, bytearray, memoryview]) -> int:
+    """
+    Runs the data through the CRC and returns the new (not finalized) value.
+    """
+    table = CRC_TABLE
+    if not USE_WORD_TABLE or len(data) < MIN_WORD_LENGTH:
+        for byte in data:
+            crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+        return crc
+
+    view = memoryview(data)
+    if len(view) & 1:
+        crc = (crc >> 8) ^ table[(crc ^ view[0]) & 0xFF]
+        view = view[1:]
+    word_table = word_crc_table()
+    for word in view.cast("H"):
+        crc = word_table[crc ^ word]
+    return crc
+
+
+def crc_to_bytes(crc: int, lsb_first: bool = False) -> bytes:
+    """
+    Finalizes the crc value and returns it least significant byte first, the order
+    HDLC transmits it in.
+
+    :param lsb_first: Swaps the two bytes. Kept for compatibility, the flag was named
+        after the bit reversed CRC of the earlier implementation.
+    """
+    crc ^= FINAL_XOR_VALUE
+    if lsb_first:
+        return crc.to_bytes(2, "big")
+    return crc.to_bytes(2, "little")
+
+
+class RunningCRC:
+    """
+    Calculates the crc incrementally over several chunks of data.
+    """
 
-class CRCCCITT:
-    crc_ccitt_table: List[int] = list()
+    def __init__(self):
+        self.value = INITIAL_VALUE
 
-    # The CRC's are computed using polynomials.
+    def update(self, data: Union[bytes, bytearray, memoryview]) -> "RunningCRC":
+        self.value = update_crc(self.value, data)
+        return self
 
-    crc_ccitt_constant = 0x1021
+    def digest(self, lsb_first=False) -> bytes:
+        return crc_to_bytes(self.value, lsb_first)
 
-    def __init__(self):
-        self.starting_value = 0xFFFF
 
-        # initialize the pre-calculated tables
-        if not len(self.crc_ccitt_table):
-            self.init_crc_table()
+class CRCCCITT:
+    """
+    Calculates the HCS and FCS of HDLC frames.
+    """
 
     def calculate_for(self, input_data, lsb_first=False) -> bytes:
         """
 
         :param input_data:
-        :param lsb_first: Indicate if the Least significant byte should be returned
-            first (little endian)
+        :param lsb_first: Swaps the two bytes, see crc_to_bytes.
         :return:
         """
+        return crc_to_bytes(update_crc(INITIAL_VALUE, input_data), lsb_first)
 
-        # need to revers bits in bytes
-        reversed_data = reverse_byte_message(input_data)
-
-        reversed_crc = self._calculate(reversed_data)
-        lsb_rev = reversed_crc & 0x00FF
-        lsb: int = ord(reverse_byte(lsb_rev))
-        lsb ^= 0xFF
-        lsb_byte = lsb.to_bytes(1, "big")
-        msb_rev = (reversed_crc & 0xFF00) >> 8
-        msb = ord(reverse_byte(msb_rev))
-        msb ^= 0xFF
-        msb_byte = msb.to_bytes(1, "big")
-
-        if lsb_first:
-            return b"".join([lsb_byte, msb_byte])
-        else:
-            return b"".join([msb_byte, lsb_byte])
-
-    def _calculate(self, input_data: bytes):
-
-        crc_value = self.starting_value
-
-        for c in input_data:
-            tmp = ((crc_value >> 8) & 0xFF) ^ c
-            crc_shifted = (crc_value << 8) & 0xFF00
-            crc_value = crc_shifted ^ self.crc_ccitt_table[tmp]
-
-        return crc_value
-
-    def init_crc_table(self):
-        """The algorithm uses tables with pre-calculated values"""
-        for i in range(0, 256):
-            crc = 0
-            c = i << 8
-
-            for j in range(0, 8):
-                if (crc ^ c) & 0x8000:
-                    crc = c_ushort(crc << 1).value ^ self.crc_ccitt_constant
-                else:
-                    crc = c_ushort(crc << 1).value
-
-                c = c_ushort(c << 1).value  # equivalent of c = c << 1
-
-            self.crc_ccitt_table.append(crc)
-
-
-def reverse_byte(byte_to_reverse):
-    and_value = 1
-    reversed_byte = 0
-    for i in range(0, 8):
-        reversed_byte += ((byte_to_reverse & and_value) >> i) * (2 ** (7 - i))
-        and_value += and_value
-
-    return (chr(reversed_byte)).encode("latin-1")
-
-
-def reverse_byte_message(msg):
-    reversed_mgs = b""
-    for char in msg:
-        reversed_mgs += reverse_byte(char)
-    return reversed_mgs
+    def running(self) -> RunningCRC:
+        """
+        Returns a RunningCRC to calculate the crc over several chunks.
+        """
+        return RunningCRC()
+
+    def verify(
+        self,
+        data: Union[bytes, bytearray, memoryview],
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> bool:
+        """
+        Verifies the data between start and end where the last 2 bytes are the crc of
+        the preceding data, as it is received in a frame. The data is not copied.
+        """
+        view = memoryview(data)[start:end]
+        try:
+            return update_crc(INITIAL_VALUE, view) == GOOD_RESIDUE
+        finally:
+            view.release()
@@ -49,13 +49,15 @@ class BaseDlmsData(AbstractDlmsData):
         out.append(self.TAG)
         value_bytes = self.value_to_bytes()
         if self.LENGTH == VARIABLE_LENGTH:
-            out.append(len(value_bytes))
+            out.extend(encode_variable_integer(len(value_bytes)))
         out.extend(value_bytes)
         return bytes(out)
 
 
 @attr.s(auto_attribs=True)
 class NullData(BaseDlmsData):
+    value: Any = attr.ib(default=None)
+
     @classmethod
     def from_bytes(cls, bytes_data: bytes):
         return cls(None)
@@ -63,6 +65,9 @@ class NullData(BaseDlmsData):
     def to_python(self) -> Any:
         return None
 
+    def value_to_bytes(self) -> bytes:
+        return b""
+
     TAG = 0
 
 
@@ -76,7 +81,7 @@ class DataArray(BaseDlmsData):
     def to_bytes(self) -> bytes:
         out = bytearray()
         out.append(self.TAG)
-        out.append(encode_variable_integer(len(self.value)))
+        out.extend(encode_variable_integer(len(self.value)))
         for item in self.value:
             out.extend(item.to_bytes())
         return bytes(out)
@@ -123,11 +128,39 @@ class BooleanData(BaseDlmsData):
 
 @attr.s(auto_attribs=True)
 class BitStringData(BaseDlmsData):
+    """
+    An ordered sequence of bits. The value is represented as a string of "0" and "1"
+    where the first character is the leftmost (most significant) bit of the first
+    byte.
+
+    The length of a bit string is encoded as the number of bits and not the number of
+    bytes. Unused bits in the last byte are set to 0.
+    """
+
     TAG = 4
     LENGTH = VARIABLE_LENGTH
 
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value="".join(format(byte, "08b") for byte in bytes_data))
+
+    @staticmethod
+    def byte_length(bit_length: int) -> int:
+        """Number of bytes needed to hold a bit string of bit_length bits."""
+        return (bit_length + 7) // 8
+
     def value_to_bytes(self) -> bytes:
-        return self.value
+        if not self.value:
+            return b""
+        padded = self.value.ljust(self.byte_length(len(self.value)) * 8, "0")
+        return int(padded, 2).to_bytes(len(padded) // 8, "big")
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.extend(encode_variable_integer(len(self.value)))
+        out.extend(self.value_to_bytes())
+        return bytes(out)
 
 
 @attr.s(auto_attribs=True)
@@ -463,6 +496,26 @@ class DlmsDataParser:
 
         return self.data
 
+    def split(self, data: bytes, amount: int) -> List[bytes]:
+        """
+        Splits data into the encoded bytes of the first `amount` DLMS data elements
+        without converting them. Useful when the elements should be passed on as
+        bytes, for example as return parameters of a list of ACTIONs.
+        """
+        self.data = list()
+        self.buffer = bytearray(data)
+        self.pointer = 0
+        out = list()
+        for _ in range(0, amount):
+            start = self.pointer
+            self.parse_one_entry()
+            if self.pointer > len(self.buffer):
+                raise ValueError(
+                    f"Not enough data to split out {amount} DLMS data elements"
+                )
+            out.append(bytes(self.buffer[start : self.pointer]))
+        return out
+
     def parse_one_entry(self):
 
         tag = self.get_bytes(1)
@@ -479,6 +532,12 @@ class DlmsDataParser:
         return self.buffer[self.pointer :]
 
     def decode_data(self, data_class) -> AbstractDlmsData:
+        if data_class == BitStringData:
+            bit_length = self.decode_variable_integer()
+            bits = BitStringData.from_bytes(
+                self.get_bytes(BitStringData.byte_length(bit_length))
+            )
+            return BitStringData(value=bits.value[:bit_length])
         if data_class.LENGTH == VARIABLE_LENGTH:
             length = self.decode_variable_integer()
             return data_class.from_bytes(self.get_bytes(length))
@@ -58,6 +58,27 @@ class ActionType(IntEnum):
     WITH_PBLOCK = 6
 
 
+class ActionResponseType(IntEnum):
+    NORMAL = 1
+    WITH_PBLOCK = 2
+    WITH_LIST = 3
+    NEXT_PBLOCK = 4
+
+
+class AccessRequestType(IntEnum):
+    GET = 1
+    SET = 2
+    ACTION = 3
+    GET_WITH_SELECTION = 4
+    SET_WITH_SELECTION = 5
+
+
+class AccessResponseType(IntEnum):
+    GET = 1
+    SET = 2
+    ACTION = 3
+
+
 class StateException(IntEnum):
     SERVICE_NOT_ALLOWED = 1
     SERVICE_UNKNOWN = 2
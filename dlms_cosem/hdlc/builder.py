@@ -0,0 +1,86 @@
+from typing import *
+
+import attr
+
+from dlms_cosem import crc
+from dlms_cosem.hdlc import frames
+from dlms_cosem.hdlc.address import HdlcAddress
+
+# Format type 3 (0b1010) in the 4 highest bits of the frame format field.
+FORMAT_TYPE = 0b1010000000000000
+SEGMENTATION_BIT = 0b0000100000000000
+# Format (2 bytes), Control (1 byte) and FCS (2 bytes).
+MIN_FRAME_LENGTH = 5
+HCS_LENGTH = 2
+
+
+def address_key(address: HdlcAddress) -> Tuple[int, Optional[int], str]:
+    return address.logical_address, address.physical_address, address.address_type
+
+
+@attr.s(auto_attribs=True)
+class HdlcFrameBuilder:
+    """
+    Serializes HDLC frames for a connection.
+
+    The addresses never change during a connection so they are only encoded once. The
+    frame is built in one allocation and the CRC of the header is reused when
+    calculating the FCS, so the header is only run through the CRC once.
+
+    Produces the same bytes as `frame.to_bytes()`.
+    """
+
+    # Encoded destination and source addresses.
+    address_templates: Dict[
+        Tuple[Tuple[int, Optional[int], str], Tuple[int, Optional[int], str]], bytes
+    ] = attr.ib(factory=dict)
+
+    def address_bytes(
+        self, destination_address: HdlcAddress, source_address: HdlcAddress
+    ) -> bytes:
+        key = (address_key(destination_address), address_key(source_address))
+        template = self.address_templates.get(key)
+        if template is None:
+            template = destination_address.to_bytes() + source_address.to_bytes()
+            self.address_templates[key] = template
+        return template
+
+    def build(self, frame: frames.BaseHdlcFrame) -> bytes:
+        addresses = self.address_bytes(frame.destination_address, frame.source_address)
+        information = frame.information
+        # Frames with an information field have a HCS. The UA and UI frames always
+        # have it.
+        has_hcs = bool(information) or frame.fixed_length_bytes > MIN_FRAME_LENGTH
+        length = MIN_FRAME_LENGTH + len(addresses)
+        if has_hcs:
+            length += HCS_LENGTH + len(information)
+
+        frame_format = FORMAT_TYPE | length
+        if frame.segmented:
+            frame_format |= SEGMENTATION_BIT
+
+        header = b"".join(
+            [
+                frame_format.to_bytes(2, "big"),
+                addresses,
+                frame.get_control_field().to_bytes(),
+            ]
+        )
+        header_crc = crc.update_crc(crc.INITIAL_VALUE, header)
+        if not has_hcs:
+            return b"".join(
+                [
+                    frames.HDLC_FLAG,
+                    header,
+                    crc.crc_to_bytes(header_crc),
+                    frames.HDLC_FLAG,
+                ]
+            )
+
+        hcs = crc.crc_to_bytes(header_crc)
+        fcs = crc.crc_to_bytes(
+            crc.update_crc(crc.update_crc(header_crc, hcs), information)
+        )
+        return b"".join(
+            [frames.HDLC_FLAG, header, hcs, information, fcs, frames.HDLC_FLAG]
+        )
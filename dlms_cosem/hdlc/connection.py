@@ -1,14 +1,17 @@
 import logging
+from typing import *
 
 import attr
 
-from dlms_cosem.hdlc import address, exceptions, frames
+from dlms_cosem import metrics, tracing
+from dlms_cosem.hdlc import address, fields, frames
+from dlms_cosem.hdlc.builder import HdlcFrameBuilder
 from dlms_cosem.hdlc.exceptions import LocalProtocolError
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
 from dlms_cosem.hdlc.state import (
     AWAITING_CONNECTION,
-    AWAITING_DISCONNECT,
-    AWAITING_RESPONSE,
     NEED_DATA,
+    RECEIVE_STATES,
     HdlcConnectionState,
 )
 
@@ -30,14 +33,39 @@ class HdlcConnection:
 
     client_address: address.HdlcAddress
     server_address: address.HdlcAddress
+    # server_ssn and server_rsn are the sequence numbers to use in the next frame sent
+    # to the server. client_ssn and client_rsn are the sequence numbers expected in the
+    # next information frame received from the server.
     client_ssn: int = attr.ib(init=False, default=0)
     client_rsn: int = attr.ib(init=False, default=0)
     server_ssn: int = attr.ib(init=False, default=0)
     server_rsn: int = attr.ib(init=False, default=0)
-    max_data_size: int = attr.ib(default=128)
+    # The maximum information field lengths and window sizes are proposed to the
+    # server in the SNRM and are updated to the negotiated values when the UA is
+    # received. Window sizes are the number of information frames that can be sent
+    # before an acknowledgement is needed.
+    max_data_size: int = attr.ib(
+        default=128, validator=[fields.validate_max_info_length]
+    )
+    max_data_size_receive: int = attr.ib(
+        default=128, validator=[fields.validate_max_info_length]
+    )
+    window_size_transmit: int = attr.ib(
+        default=1, validator=[fields.validate_window_size]
+    )
+    window_size_receive: int = attr.ib(
+        default=1, validator=[fields.validate_window_size]
+    )
+    # Sent information frames not yet acknowledged by the server.
+    unacknowledged_frames: List[frames.InformationFrame] = attr.ib(
+        init=False, factory=list
+    )
+    # Set when an information frame is received out of sequence. The frames after
+    # the missing one are discarded and a REJ frame should be sent to the server.
+    reject_pending: bool = attr.ib(init=False, default=False)
     state: HdlcConnectionState = attr.ib(factory=HdlcConnectionState)
-    buffer: bytearray = attr.ib(factory=bytearray)
-    buffer_search_position: int = 1
+    scanner: HdlcFrameScanner = attr.ib(factory=HdlcFrameScanner)
+    frame_builder: HdlcFrameBuilder = attr.ib(factory=HdlcFrameBuilder)
 
     def send(self, frame) -> bytes:
         """
@@ -49,42 +77,140 @@ class HdlcConnection:
         self.state.process_frame(frame)
 
         if isinstance(frame, frames.InformationFrame):
-            self.handle_sequence_numbers(
-                frame_ssn=frame.send_sequence_number,
-                frame_rsn=frame.receive_sequence_number,
-                response=False,
+            self.handle_sent_information_frame(frame)
+        elif isinstance(frame, frames.RejectFrame):
+            self.reject_pending = False
+        elif isinstance(frame, frames.SetNormalResponseModeFrame):
+            self.reset_sequence_numbers()
+
+        out = self.frame_builder.build(frame)
+        if tracing.WIRE_TRACE.enabled:
+            tracing.WIRE_TRACE.record("hdlc", tracing.SENT, out)
+        if metrics.REGISTRY.enabled:
+            metrics.HDLC_FRAMES_SENT.inc(type(frame).__name__)
+            metrics.BYTES_SENT.inc("hdlc", amount=len(out))
+        return out
+
+    def reset_sequence_numbers(self):
+        """
+        A SNRM starts the link over with all sequence numbers at 0, also when the
+        link was connected before.
+        """
+        self.client_ssn = 0
+        self.client_rsn = 0
+        self.server_ssn = 0
+        self.server_rsn = 0
+        self.unacknowledged_frames = list()
+        self.reject_pending = False
+
+    def handle_sent_information_frame(self, frame: frames.InformationFrame):
+        if (
+            frame.send_sequence_number != self.server_ssn
+            or frame.receive_sequence_number != self.server_rsn
+        ):
+            raise LocalProtocolError(
+                f"Frame sequence numbers are wrong: frame(ssn: "
+                f"{frame.send_sequence_number}, rsn: {frame.receive_sequence_number}) "
+                f"=! client(ssn:{self.server_ssn}, rsn:{self.server_rsn})"
+            )
+        if len(self.unacknowledged_frames) >= self.window_size_transmit:
+            raise LocalProtocolError(
+                f"Window is full. {len(self.unacknowledged_frames)} frames are not "
+                f"acknowledged and the transmit window size is "
+                f"{self.window_size_transmit}"
+            )
+        self.unacknowledged_frames.append(frame)
+        self.server_ssn = (self.server_ssn + 1) % 8
+        self.client_rsn = self.server_ssn
+
+    def handle_received_information_frame(self, frame: frames.InformationFrame):
+        self.acknowledge(frame.receive_sequence_number)
+        if frame.send_sequence_number != self.client_ssn:
+            LOG.warning(
+                f"Received information frame out of sequence. Expected ssn "
+                f"{self.client_ssn} but got {frame.send_sequence_number}. Frames "
+                f"will be rejected until the missing frame is received."
+            )
+            self.reject_pending = True
+            return
+
+        self.client_ssn = (self.client_ssn + 1) % 8
+        self.server_rsn = self.client_ssn
+
+    def acknowledge(self, receive_sequence_number: int):
+        """
+        The receive sequence number from the server acknowledges all sent frames
+        before it.
+        """
+        oldest_unacknowledged = (self.server_ssn - len(self.unacknowledged_frames)) % 8
+        acknowledged = (receive_sequence_number - oldest_unacknowledged) % 8
+        if acknowledged > len(self.unacknowledged_frames):
+            raise LocalProtocolError(
+                f"Received receive sequence number {receive_sequence_number} does not "
+                f"acknowledge any frame in the window. Next send sequence number is "
+                f"{self.server_ssn} and {len(self.unacknowledged_frames)} frames are "
+                f"not acknowledged"
             )
+        del self.unacknowledged_frames[:acknowledged]
 
-        return frame.to_bytes()
-
-    def handle_sequence_numbers(self, frame_ssn: int, frame_rsn: int, response: bool):
-        if not response:
-            if frame_ssn != self.server_ssn or frame_rsn != self.server_rsn:
-                raise LocalProtocolError(
-                    f"Frame sequence numbers are wrong: frame(ssn: {frame_ssn}, rsn: "
-                    f"{frame_rsn}) =! client(ssn:{self.server_ssn}, "
-                    f"rsn:{self.server_rsn})"
-                )
-            self.server_ssn += 1
-            self.client_rsn += 1
-        else:
-            if frame_ssn != self.client_ssn or frame_rsn != self.client_rsn:
-                raise LocalProtocolError(
-                    f"Frame sequence numbers are wrong: frame(ssn: {frame_ssn}, rsn: "
-                    f"{frame_rsn}) =! client(ssn:{self.server_ssn}, "
-                    f"rsn:{self.server_rsn})"
-                )
-            self.server_rsn += 1
-            self.client_ssn += 1
-
-        if self.server_rsn > 7:
-            self.server_rsn = 0
-        if self.server_ssn > 7:
-            self.server_ssn = 0
-        if self.client_rsn > 7:
-            self.client_rsn = 0
-        if self.client_ssn > 7:
-            self.client_ssn = 0
+    def rewind_to_unacknowledged(self) -> List[frames.InformationFrame]:
+        """
+        When the server responds with RR or REJ that does not acknowledge all sent
+        frames, the frames not acknowledged needs to be sent again. Sets the send
+        sequence number back to the first frame not acknowledged and returns the frames
+        that needs to be sent again.
+        """
+        frames_to_resend = self.unacknowledged_frames
+        self.unacknowledged_frames = list()
+        if frames_to_resend:
+            if metrics.REGISTRY.enabled:
+                metrics.HDLC_RETRANSMISSIONS.inc(amount=len(frames_to_resend))
+            self.server_ssn = frames_to_resend[0].send_sequence_number
+            self.client_rsn = self.server_ssn
+        return frames_to_resend
+
+    @property
+    def proposed_parameters(self) -> Optional[fields.HdlcParameterList]:
+        """
+        HDLC parameters to propose in the SNRM. If the default values are used no
+        parameters need to be sent.
+        """
+        parameters = fields.HdlcParameterList(
+            max_info_length_transmit=self.max_data_size,
+            max_info_length_receive=self.max_data_size_receive,
+            window_size_transmit=self.window_size_transmit,
+            window_size_receive=self.window_size_receive,
+        )
+        if parameters == fields.HdlcParameterList():
+            return None
+        return parameters
+
+    def update_negotiated_parameters(
+        self, parameters: Optional[fields.HdlcParameterList]
+    ):
+        """
+        The UA holds the parameters from the servers view. What the server can receive
+        limits what we can transmit and the other way around.
+        If the server does not return any parameters the default values are used.
+        """
+        if parameters is None:
+            parameters = fields.HdlcParameterList()
+        self.max_data_size = min(self.max_data_size, parameters.max_info_length_receive)
+        self.max_data_size_receive = min(
+            self.max_data_size_receive, parameters.max_info_length_transmit
+        )
+        self.window_size_transmit = min(
+            self.window_size_transmit, parameters.window_size_receive
+        )
+        self.window_size_receive = min(
+            self.window_size_receive, parameters.window_size_transmit
+        )
+        LOG.info(
+            f"Negotiated HDLC parameters: max_data_size={self.max_data_size}, "
+            f"max_data_size_receive={self.max_data_size_receive}, "
+            f"window_size_transmit={self.window_size_transmit}, "
+            f"window_size_receive={self.window_size_receive}"
+        )
 
     def receive_data(self, data: bytes):
         """
@@ -92,102 +218,46 @@ class HdlcConnection:
         After this you could call next_event
         """
         if data:
-            LOG.debug(f"Received HDLC data: {data!r}")
-            self.buffer += data
+            if tracing.WIRE_TRACE.enabled:
+                tracing.WIRE_TRACE.record("hdlc", tracing.RECEIVED, data)
+            if metrics.REGISTRY.enabled:
+                metrics.BYTES_RECEIVED.inc("hdlc", amount=len(data))
+            self.scanner.receive_data(data)
 
     def next_event(self):
         """
         Will try to parse a frame from the buffer. If a frame is found the buffer is
         cleared of the bytes making up the frame and the frame is returned.
-        If the frame is not parsable we assume it is not compleate and we return a
-        NEED_DATA event to signal we need to receive more data.
+        If there is no complete frame in the buffer we return a NEED_DATA event to
+        signal we need to receive more data.
+        Frames that are not expected in the current state are dropped.
         :return:
         """
-        frame_bytes = self._find_frame()
-        if frame_bytes is None:
-            return NEED_DATA
+        while True:
+            frame = self.scanner.next_frame()
+            if frame is NEED_DATA:
+                return NEED_DATA
 
-        if (
-            self.state.current_state == AWAITING_CONNECTION
-            or self.state.current_state == AWAITING_DISCONNECT
-        ):
+            if self.state.current_state in RECEIVE_STATES and self.state.accepts(frame):
+                break
+
+            if metrics.REGISTRY.enabled:
+                metrics.HDLC_FRAMES_DROPPED.inc()
+            LOG.warning(
+                f"Dropping received frame {frame} since it is not expected in "
+                f"state={self.state.current_state}"
+            )
 
-            try:
-                frame = frames.UnNumberedAcknowledgmentFrame.from_bytes(frame_bytes)
-            except (exceptions.HdlcParsingError, ValueError):
-                frame = None
-
-        elif self.state.current_state == AWAITING_RESPONSE:
-            # It can be a InformationFrame or a ReceiveReadyFrame in case we have sent
-            # a segmented frame.
-            try:
-                frame = frames.InformationFrame.from_bytes(frame_bytes)
-            except (exceptions.HdlcParsingError, ValueError):
-                # Not an information frame. Should be a receive ready frame
-                frame = None
-
-            if frame is None:
-                try:
-                    frame = frames.ReceiveReadyFrame.from_bytes(frame_bytes)
-                except (exceptions.HdlcParsingError, ValueError):
-                    frame = None
-        else:
-            frame = None
-
-        if frame is None:
-            LOG.debug("HDLC frame could not be parsed. Need more data")
-            return NEED_DATA
-
-        LOG.debug(f"Received frame: {frame}")
+        LOG.debug("Received frame: %s", frame)
+        if metrics.REGISTRY.enabled:
+            metrics.HDLC_FRAMES_RECEIVED.inc(type(frame).__name__)
+        if self.state.current_state == AWAITING_CONNECTION:
+            self.update_negotiated_parameters(frame.parameters)
         self.state.process_frame(frame)
-        self._tidy_buffer()
 
         if isinstance(frame, frames.InformationFrame):
-            self.handle_sequence_numbers(
-                frame_ssn=frame.send_sequence_number,
-                frame_rsn=frame.receive_sequence_number,
-                response=True,
-            )
+            self.handle_received_information_frame(frame)
+        elif isinstance(frame, (frames.ReceiveReadyFrame, frames.RejectFrame)):
+            self.acknowledge(frame.receive_sequence_number)
 
         return frame
-
-    def _find_frame(self):
-        """
-        To find a frame in the buffer we need to assume somethings.
-        1. The first character in the buffer should be the HDLC_FLAG.
-            During normal operations we will have frames with flags on both ends.
-            But with windowing one might be omitted in long information frame exchanges
-            Ex: 7e{frame}7e{frame}7e. The second one would not have an initial 7e after
-             we take out the first frame.
-            So if the intial byte is not 7e we should manually add it.
-
-        2. We might find an incomplete frame if the second 7e was found as data and not
-            actually an end flag. So we need to keep the current end memory so we can
-            extend the search if we cant parse the frame.
-
-        3. Once we have parsed a proper frame we shoudl call clear buffer that will
-        remove the data for the frame from the buffer.
-        :return:
-        """
-        try:
-            frame_end = (
-                self.buffer.index(frames.HDLC_FLAG, self.buffer_search_position) + 1
-            )
-        except ValueError:
-            # .index raises ValueError on not finding subsection
-            return None
-
-        frame_bytes = self.buffer[:frame_end]
-        self.buffer_search_position = frame_end
-
-        if not frame_bytes.startswith(frames.HDLC_FLAG):
-            frame_bytes.insert(0, ord(frames.HDLC_FLAG))
-
-        return frame_bytes
-
-    def _tidy_buffer(self):
-        """
-        Remove the bytes we have extracted.
-        """
-        del self.buffer[: self.buffer_search_position]
-        self.buffer_search_position = 1
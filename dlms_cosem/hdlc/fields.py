@@ -1,4 +1,5 @@
 import abc
+from typing import *
 
 import attr
 
@@ -34,6 +35,7 @@ class SnrmControlField(_AbstractHdlcControlField):
     S-frame fo SNRM request.
     """
 
+    @property
     def is_final(self):
         """ 'Almost' all the time a SNRM frame is contaned in single frame."""
         # TODO: Handle multi frame
@@ -52,6 +54,7 @@ class UaControlField(_AbstractHdlcControlField):
     S-frame for Unacknowladge Answer.
     """
 
+    @property
     def is_final(self):
         """
         Most UA is only one frame. But in the HDLC setup it can be longer depending on
@@ -76,6 +79,7 @@ class DisconnectControlField(_AbstractHdlcControlField):
     S-frame for disconnect.
     """
 
+    @property
     def is_final(self):
         """
         Always final
@@ -102,6 +106,7 @@ class ReceiveReadyControlField(_AbstractHdlcControlField):
         validator=[validators.validate_information_sequence_number]
     )
 
+    @property
     def is_final(self):
         """
         Always final
@@ -128,6 +133,50 @@ class ReceiveReadyControlField(_AbstractHdlcControlField):
         control_frame = bool(value & 0b00000001)
         if not control_frame:
             raise ValueError("Frame is an information frame not a ReceiveReadyFrame")
+        if value & 0b00001111 != 0b00000001:
+            raise ValueError("Frame is a supervisory frame but not a ReceiveReadyFrame")
+        rsn = (value & 0b11100000) >> 5
+        return cls(rsn)
+
+
+@attr.s(auto_attribs=True)
+class RejectControlField(_AbstractHdlcControlField):
+    """
+    REJ-frame to request retransmission of information frames starting with the
+    receive sequence number. Sent when an information frame in a window is received out
+    of sequence.
+    """
+
+    receive_sequence_number: int = attr.ib(
+        validator=[validators.validate_information_sequence_number]
+    )
+
+    @property
+    def is_final(self):
+        """
+        Always final
+        """
+        return True
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns byte representation of the field.
+        """
+        out = 0b00001001
+        out += self.receive_sequence_number << 5
+        if self.is_final:
+            out |= 0b00010000
+        return out.to_bytes(1, "big")
+
+    @classmethod
+    def from_bytes(cls, in_byte: bytes):
+        if len(in_byte) != 1:
+            raise ValueError(
+                f"RejectControlField can only be 1 bytes. Got {len(in_byte)}"
+            )
+        value = int.from_bytes(in_byte, "big")
+        if value & 0b00001111 != 0b00001001:
+            raise ValueError("Byte is not representing a RejectControlField")
         rsn = (value & 0b11100000) >> 5
         return cls(rsn)
 
@@ -294,3 +343,170 @@ class DlmsHdlcFrameFormatField:
         if self.segmented:
             total = total | 0b0000100000000000
         return total.to_bytes(2, "big")
+
+
+MAX_INFO_LENGTH = 2030
+MAX_WINDOW_SIZE = 7
+
+
+def validate_max_info_length(instance, attribute, value):
+    if not 1 <= value <= MAX_INFO_LENGTH:
+        raise ValueError(
+            f"Maximum information field length must be between 1 and "
+            f"{MAX_INFO_LENGTH}. Got {value}"
+        )
+
+
+def validate_window_size(instance, attribute, value):
+    if not 1 <= value <= MAX_WINDOW_SIZE:
+        raise ValueError(
+            f"HDLC window size can only be between 1-{MAX_WINDOW_SIZE}. Got {value}"
+        )
+
+
+@attr.s(auto_attribs=True)
+class HdlcParameterList:
+    """
+    HDLC parameters negotiated in the information field of the SNRM and UA frames.
+
+    The parameters are expressed from the view of the sender of the frame. In the SNRM
+    the client proposes the lengths and window sizes it wants to use and in the UA the
+    server answers with the values it accepts.
+
+    Format identifier (0x81), group identifier (0x80), group length, followed by the
+    parameters encoded as identifier, length and value.
+    If a parameter is not present the default value should be used.
+    """
+
+    FORMAT_IDENTIFIER: ClassVar[int] = 0x81
+    GROUP_IDENTIFIER: ClassVar[int] = 0x80
+    MAX_INFO_LENGTH_TRANSMIT: ClassVar[int] = 0x05
+    MAX_INFO_LENGTH_RECEIVE: ClassVar[int] = 0x06
+    WINDOW_SIZE_TRANSMIT: ClassVar[int] = 0x07
+    WINDOW_SIZE_RECEIVE: ClassVar[int] = 0x08
+    DEFAULT_MAX_INFO_LENGTH: ClassVar[int] = 128
+    DEFAULT_WINDOW_SIZE: ClassVar[int] = 1
+
+    max_info_length_transmit: int = attr.ib(
+        default=128, validator=[validate_max_info_length]
+    )
+    max_info_length_receive: int = attr.ib(
+        default=128, validator=[validate_max_info_length]
+    )
+    window_size_transmit: int = attr.ib(default=1, validator=[validate_window_size])
+    window_size_receive: int = attr.ib(default=1, validator=[validate_window_size])
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        if len(source_bytes) < 3:
+            raise hdlc_exceptions.HdlcParsingError(
+                f"HDLC parameter list is to short: {source_bytes!r}"
+            )
+        if (
+            source_bytes[0] != cls.FORMAT_IDENTIFIER
+            or source_bytes[1] != cls.GROUP_IDENTIFIER
+        ):
+            raise hdlc_exceptions.HdlcParsingError(
+                f"Data is not a HDLC parameter list: {source_bytes!r}"
+            )
+        group_length = source_bytes[2]
+        data = source_bytes[3 : 3 + group_length]
+        if len(data) != group_length:
+            raise hdlc_exceptions.HdlcParsingError(
+                f"HDLC parameter group should be {group_length} bytes but is "
+                f"{len(data)}"
+            )
+
+        parameters = dict()
+        position = 0
+        while position < len(data):
+            if position + 2 > len(data):
+                raise hdlc_exceptions.HdlcParsingError(
+                    f"HDLC parameter at position {position} is truncated: {data!r}"
+                )
+            identifier = data[position]
+            length = data[position + 1]
+            value = data[position + 2 : position + 2 + length]
+            if not value or len(value) != length:
+                raise hdlc_exceptions.HdlcParsingError(
+                    f"HDLC parameter {identifier} should have a value of {length} "
+                    f"bytes but has {len(value)}"
+                )
+            parameters[identifier] = int.from_bytes(value, "big")
+            position += 2 + length
+
+        return cls(
+            max_info_length_transmit=cls.parameter_value(
+                parameters,
+                cls.MAX_INFO_LENGTH_TRANSMIT,
+                cls.DEFAULT_MAX_INFO_LENGTH,
+                MAX_INFO_LENGTH,
+            ),
+            max_info_length_receive=cls.parameter_value(
+                parameters,
+                cls.MAX_INFO_LENGTH_RECEIVE,
+                cls.DEFAULT_MAX_INFO_LENGTH,
+                MAX_INFO_LENGTH,
+            ),
+            window_size_transmit=cls.parameter_value(
+                parameters,
+                cls.WINDOW_SIZE_TRANSMIT,
+                cls.DEFAULT_WINDOW_SIZE,
+                MAX_WINDOW_SIZE,
+            ),
+            window_size_receive=cls.parameter_value(
+                parameters,
+                cls.WINDOW_SIZE_RECEIVE,
+                cls.DEFAULT_WINDOW_SIZE,
+                MAX_WINDOW_SIZE,
+            ),
+        )
+
+    @staticmethod
+    def parameter_value(
+        parameters: Dict[int, int], identifier: int, default: int, maximum: int
+    ) -> int:
+        """
+        Returns the received value of a parameter, or the default if it was not
+        received. Values above what HDLC allows are lowered to the maximum, as the
+        peer can handle the maximum as well.
+        """
+        value = parameters.get(identifier, default)
+        if value == 0:
+            raise hdlc_exceptions.HdlcParsingError(
+                f"HDLC parameter {identifier} has the value 0"
+            )
+        return min(value, maximum)
+
+    @staticmethod
+    def encode_parameter(identifier: int, value: int, length: int) -> bytes:
+        return bytes([identifier, length]) + value.to_bytes(length, "big")
+
+    @staticmethod
+    def info_length_size(value: int) -> int:
+        return 1 if value < 256 else 2
+
+    def to_bytes(self) -> bytes:
+        group = b"".join(
+            [
+                self.encode_parameter(
+                    self.MAX_INFO_LENGTH_TRANSMIT,
+                    self.max_info_length_transmit,
+                    self.info_length_size(self.max_info_length_transmit),
+                ),
+                self.encode_parameter(
+                    self.MAX_INFO_LENGTH_RECEIVE,
+                    self.max_info_length_receive,
+                    self.info_length_size(self.max_info_length_receive),
+                ),
+                self.encode_parameter(
+                    self.WINDOW_SIZE_TRANSMIT, self.window_size_transmit, 4
+                ),
+                self.encode_parameter(
+                    self.WINDOW_SIZE_RECEIVE, self.window_size_receive, 4
+                ),
+            ]
+        )
+        return (
+            bytes([self.FORMAT_IDENTIFIER, self.GROUP_IDENTIFIER, len(group)]) + group
+        )
@@ -157,30 +157,46 @@ class BaseHdlcFrame(_AbstractHdlcFrame):
 class SetNormalResponseModeFrame(BaseHdlcFrame):
     """
     SetNormalResponseMode Frame (SNRM-frame) is used to start a new HDLC connection.
+
+    HDLC parameters (max information field lengths and window sizes) can be proposed
+    in the information field. If no parameters are sent the default values are used.
     """
 
     fixed_length_bytes = 5
 
+    parameters: Optional[fields.HdlcParameterList] = attr.ib(default=None)
+
+    @property
+    def frame_length(self) -> int:
+        length = super().frame_length
+        if self.information:
+            # The HCS is only present when there is an information field
+            length += 2
+        return length
+
     @property
     def hcs(self) -> bytes:
         """
         SetNormalResponseModeFrame is an HDLC S-frame and does not contain an
-        information field. That means that there is no HCS field present, only FCS
-        # TODO: is it present when using the information field as parameter field for
-            negotiating HDLC parameters?
+        information field if no HDLC parameters are proposed. That means that there is
+        no HCS field present, only FCS.
         """
-        return b""
+        if not self.information:
+            return b""
+        return super().hcs
 
     @property
     def information(self) -> bytes:
         """
         The information field on an SNRM request can be used to negotiate HDLC
-        connection parameters, (window size, max_frame_length etc.) It is not supported.
+        connection parameters, (window size, max_frame_length etc.)
 
         By not sending any information default values will be assumed.
         Window size = 1, max transmit size = 128 bytes.
         """
-        return b""
+        if self.parameters is None:
+            return b""
+        return self.parameters.to_bytes()
 
     def get_control_field(self):
         return fields.SnrmControlField()
@@ -203,6 +219,16 @@ class UnNumberedAcknowledgmentFrame(BaseHdlcFrame):
 
         return b"".join(out)
 
+    @property
+    def parameters(self) -> Optional[fields.HdlcParameterList]:
+        """
+        The HDLC parameters the server accepted. None if the UA has no information
+        field and the default values should be used.
+        """
+        if not self.payload:
+            return None
+        return fields.HdlcParameterList.from_bytes(self.payload)
+
     def get_control_field(self):
         return fields.UaControlField()
 
@@ -232,12 +258,12 @@ class UnNumberedAcknowledgmentFrame(BaseHdlcFrame):
 
         frame = cls(destination_address, source_address, information)
 
-        if hcs != frame.hcs:
+        if not HCS.verify(frame_bytes, 1, hcs_position + 2):
             raise hdlc_exceptions.HdlcParsingError(
                 f"HCS is not correct. " f"Calculated: {frame.hcs!r}, in data: {hcs!r}"
             )
 
-        if fcs != frame.fcs:
+        if not FCS.verify(frame_bytes, 1, -1):
             raise hdlc_exceptions.HdlcParsingError("FCS is not correct")
 
         return frame
@@ -299,7 +325,72 @@ class ReceiveReadyFrame(BaseHdlcFrame):
             final=control.is_final,
         )
 
-        if fcs != frame.fcs:
+        if not FCS.verify(frame_bytes, 1, -1):
+            raise hdlc_exceptions.HdlcParsingError("FCS is not correct")
+
+        return frame
+
+
+@attr.s(auto_attribs=True)
+class RejectFrame(BaseHdlcFrame):
+    """
+    Reject frame (REJ) requests retransmission of information frames starting at the
+    receive sequence number.
+    """
+
+    fixed_length_bytes = 5
+
+    receive_sequence_number: int = attr.ib(
+        validator=[validators.validate_information_sequence_number], default=0
+    )
+
+    @property
+    def hcs(self) -> bytes:
+        """No information field in the frame so no hcs. Only FCS"""
+        return b""
+
+    @property
+    def information(self) -> bytes:
+        """
+        No information field present
+        """
+        return b""
+
+    def get_control_field(self):
+        return fields.RejectControlField(
+            receive_sequence_number=self.receive_sequence_number
+        )
+
+    @classmethod
+    def from_bytes(cls, frame_bytes: bytes):
+        if not frame_is_enclosed_by_hdlc_flags(frame_bytes):
+            raise hdlc_exceptions.MissingHdlcFlags()
+
+        frame_format = BaseHdlcFrame.extract_format_field_from_bytes(frame_bytes)
+
+        if not frame_has_correct_length(frame_format.length, frame_bytes):
+            raise hdlc_exceptions.HdlcParsingError(
+                f"Frame data is not of length specified in frame format field. "
+                f"Should be {frame_format.length} but is {len(frame_bytes)}"
+            )
+
+        destination_address = address.HdlcAddress.destination_from_bytes(
+            frame_bytes, "client"
+        )
+        source_address = address.HdlcAddress.source_from_bytes(frame_bytes, "server")
+        control_byte_position = (
+            1 + 2 + destination_address.length + source_address.length
+        )
+        control_byte = frame_bytes[control_byte_position : control_byte_position + 1]
+        control = fields.RejectControlField.from_bytes(control_byte)
+
+        frame = cls(
+            destination_address=destination_address,
+            source_address=source_address,
+            receive_sequence_number=control.receive_sequence_number,
+        )
+
+        if not FCS.verify(frame_bytes, 1, -1):
             raise hdlc_exceptions.HdlcParsingError("FCS is not correct")
 
         return frame
@@ -320,13 +411,12 @@ class InformationFrame(BaseHdlcFrame):
     @property
     def information(self) -> bytes:
         """
-        Information request uses the LLC_COMMAND_HEADER
+        Information request uses the LLC_COMMAND_HEADER. The payload is returned as is
+        to not copy it before the frame is built.
         """
-        out_data: List[bytes] = list()
         if self.payload:
-            out_data.append(self.payload)
-
-        return b"".join(out_data)
+            return self.payload
+        return b""
 
     def get_control_field(self):
         return fields.InformationControlField(
@@ -377,12 +467,12 @@ class InformationFrame(BaseHdlcFrame):
             final=information_control.final,
         )
 
-        if hcs != frame.hcs:
+        if not HCS.verify(frame_bytes, 1, hcs_position + 2):
             raise hdlc_exceptions.HdlcParsingError(
                 f"HCS is not correct Calculated: {frame.hcs!r}, in data: {hcs!r}"
             )
 
-        if fcs != frame.fcs:
+        if not FCS.verify(frame_bytes, 1, -1):
             raise hdlc_exceptions.HdlcParsingError(
                 f"FCS is not correct, Calculated: {frame.fcs!r}, in data: {fcs!r}"
             )
@@ -433,7 +523,7 @@ class DisconnectFrame(BaseHdlcFrame):
 
         frame = cls(destination_address, source_address)
 
-        if fcs != frame.fcs:
+        if not FCS.verify(frame_bytes, 1, -1):
             raise hdlc_exceptions.HdlcParsingError("FCS is not correct")
 
         return frame
@@ -498,14 +588,75 @@ class UnnumberedInformationFrame(BaseHdlcFrame):
             final=information_control.final,
         )
 
-        if hcs != frame.hcs:
+        if not HCS.verify(frame_bytes, 1, hcs_position + 2):
             raise hdlc_exceptions.HdlcParsingError(
                 f"HCS is not correct Calculated: {frame.hcs!r}, in data: {hcs!r}"
             )
 
-        if fcs != frame.fcs:
+        if not FCS.verify(frame_bytes, 1, -1):
             raise hdlc_exceptions.HdlcParsingError(
                 f"FCS is not correct, Calculated: {frame.fcs!r}, in data: {fcs!r}"
             )
 
         return frame
+
+
+def control_field_position(frame_bytes: bytes) -> int:
+    """
+    The control field is after the destination and source address. An address is 1, 2
+    or 4 bytes and the last byte of an address has the LSB set.
+    """
+    position = 3
+    try:
+        for _ in range(2):
+            while not frame_bytes[position] & 0b00000001:
+                position += 1
+            position += 1
+    except IndexError:
+        raise hdlc_exceptions.HdlcParsingError(
+            f"Could not find the end of the addresses in frame {frame_bytes!r}"
+        )
+    if position >= len(frame_bytes):
+        raise hdlc_exceptions.HdlcParsingError(
+            f"Frame has no control field: {frame_bytes!r}"
+        )
+    return position
+
+
+# Supervisory frames are identified by the 4 lowest bits of the control field.
+SUPERVISORY_FRAMES: Dict[int, Type[BaseHdlcFrame]] = {
+    0b0001: ReceiveReadyFrame,
+    0b1001: RejectFrame,
+}
+
+# Unnumbered frames are identified by the control field without the poll/final bit.
+UNNUMBERED_FRAMES: Dict[int, Type[BaseHdlcFrame]] = {
+    0b01100011: UnNumberedAcknowledgmentFrame,
+    0b01000011: DisconnectFrame,
+    0b00000011: UnnumberedInformationFrame,
+}
+
+
+def frame_class_from_control_field(control: int) -> Optional[Type[BaseHdlcFrame]]:
+    """
+    Returns the frame class a control field belongs to or None if the frame type is
+    not supported.
+    """
+    if not control & 0b00000001:
+        return InformationFrame
+    if control & 0b00000011 == 0b00000001:
+        return SUPERVISORY_FRAMES.get(control & 0b00001111)
+    return UNNUMBERED_FRAMES.get(control & 0b11101111)
+
+
+def frame_from_bytes(frame_bytes: bytes) -> BaseHdlcFrame:
+    """
+    Parses a complete frame by looking at the control field to know the frame type.
+    """
+    control = frame_bytes[control_field_position(frame_bytes)]
+    frame_class = frame_class_from_control_field(control)
+    if frame_class is None:
+        raise hdlc_exceptions.HdlcParsingError(
+            f"Frame with control field {control:#04x} is not supported"
+        )
+    return frame_class.from_bytes(frame_bytes)
@@ -0,0 +1,101 @@
+import logging
+from typing import *
+
+import attr
+
+from dlms_cosem.hdlc import exceptions, frames
+from dlms_cosem.hdlc.state import NEED_DATA
+
+LOG = logging.getLogger(__name__)
+
+FLAG = ord(frames.HDLC_FLAG)
+
+
+@attr.s(auto_attribs=True)
+class HdlcFrameScanner:
+    """
+    Finds HDLC frames in a stream of bytes.
+
+    The length in the frame format field is read first so exactly one frame is
+    sliced from the buffer without searching for the closing flag, which can be present
+    as data inside the frame. The frame type is found from the control field and the
+    frame is parsed once. Frames that can't be parsed are dropped and the scanner
+    resynchronises on the next flag.
+
+    Frames are allowed to share flags: 7e{frame}7e{frame}7e
+
+    Can be used on its own to decode continuous streams, like push data over HDLC or
+    captures of an RS-485 bus.
+    """
+
+    buffer: bytearray = attr.ib(factory=bytearray)
+    # Number of bytes dropped while searching for frames.
+    discarded_bytes: int = attr.ib(default=0)
+    # Number of frames dropped since they could not be parsed.
+    discarded_frames: int = attr.ib(default=0)
+
+    def receive_data(self, data: bytes):
+        if data:
+            self.buffer += data
+
+    def next_frame(self):
+        """
+        Returns the next frame in the buffer or NEED_DATA if there is no complete frame
+        in the buffer.
+        """
+        while True:
+            frame_bytes = self.next_frame_bytes()
+            if frame_bytes is None:
+                return NEED_DATA
+            try:
+                return frames.frame_from_bytes(frame_bytes)
+            except (exceptions.HdlcParsingError, ValueError) as e:
+                LOG.warning(f"Dropping HDLC frame {frame_bytes!r}: {e}")
+                self.discarded_frames += 1
+
+    def next_frame_bytes(self) -> Optional[bytes]:
+        """
+        Slices the bytes of the next frame from the buffer. The closing flag is kept in
+        the buffer since it can be the opening flag of the next frame.
+        """
+        buffer = self.buffer
+        while True:
+            start = buffer.find(FLAG)
+            if start == -1:
+                self.discard(len(buffer))
+                return None
+            if start > 0:
+                self.discard(start)
+            # consecutive flags between frames.
+            end_of_flags = 0
+            while end_of_flags + 1 < len(buffer) and buffer[end_of_flags + 1] == FLAG:
+                end_of_flags += 1
+            if end_of_flags:
+                del buffer[:end_of_flags]
+
+            if len(buffer) < 3:
+                return None
+
+            if buffer[1] & 0b11110000 != 0b10100000:
+                # Not a frame format field. Look for the next flag.
+                self.discard(1)
+                continue
+
+            frame_length = ((buffer[1] & 0b00000111) << 8) | buffer[2]
+            end = frame_length + 2
+            if len(buffer) < end:
+                return None
+
+            if buffer[end - 1] != FLAG:
+                # The length does not match a frame. Look for the next flag.
+                self.discard(1)
+                continue
+
+            frame_bytes = bytes(buffer[:end])
+            del buffer[: end - 1]
+            return frame_bytes
+
+    def discard(self, amount: int):
+        LOG.debug("Discarding %d bytes not part of a HDLC frame", amount)
+        del self.buffer[:amount]
+        self.discarded_bytes += amount
@@ -60,14 +60,22 @@ HDLC_STATE_TRANSITIONS = {
         frames.InformationFrame: AWAITING_RESPONSE,
         frames.DisconnectFrame: AWAITING_DISCONNECT,
         frames.ReceiveReadyFrame: AWAITING_RESPONSE,
+        frames.RejectFrame: AWAITING_RESPONSE,
+    },
+    AWAITING_RESPONSE: {
+        frames.InformationFrame: IDLE,
+        frames.ReceiveReadyFrame: IDLE,
+        frames.RejectFrame: IDLE,
     },
-    AWAITING_RESPONSE: {frames.InformationFrame: IDLE, frames.ReceiveReadyFrame: IDLE},
     AWAITING_DISCONNECT: {frames.UnNumberedAcknowledgmentFrame: NOT_CONNECTED},
 }
 
 
 SEND_STATES = [NOT_CONNECTED, IDLE]
 RECEIVE_STATES = [AWAITING_CONNECTION, AWAITING_RESPONSE, AWAITING_DISCONNECT]
+# Information frames that are not final are sent and received within a window. They
+# don't hand over control to the other party so the state is not changed.
+WINDOW_STATES = [IDLE, AWAITING_RESPONSE]
 
 # TODO: does the ssn and rsn belong in the state? Comparing to H11 that is only
 #   using types in the state not full objects. Maybe it should be stored on the
@@ -86,7 +94,22 @@ class HdlcConnectionState:
 
     current_state: _SentinelBase = attr.ib(default=NOT_CONNECTED)
 
+    def accepts(self, frame) -> bool:
+        """
+        Checks if the frame can be processed in the current state.
+        """
+        if isinstance(frame, frames.InformationFrame) and not frame.final:
+            return self.current_state in WINDOW_STATES
+        return type(frame) in HDLC_STATE_TRANSITIONS.get(self.current_state, {})
+
     def process_frame(self, frame):
+        if isinstance(frame, frames.InformationFrame) and not frame.final:
+            if self.current_state not in WINDOW_STATES:
+                raise LocalProtocolError(
+                    f"can't handle a non final information frame when "
+                    f"state={self.current_state}"
+                )
+            return
 
         self._transition_state(type(frame))
 
@@ -99,4 +122,4 @@ class HdlcConnectionState:
             )
         old_state = self.current_state
         self.current_state = new_state
-        LOG.debug(f"HDLC state transitioned from {old_state} to {new_state}")
+        LOG.debug("HDLC state transitioned from %s to %s", old_state, new_state)
@@ -0,0 +1,161 @@
+"""
+The parts of IEC 62056-21 needed to start a HDLC session with mode E.
+
+Meters with an optical port often start in the IEC 62056-21 protocol. The client
+sends a request message at 300 baud and the meter answers with its identification,
+including the highest baud rate it supports and if it supports mode E (HDLC). The
+client acknowledges with the selected baud rate and both sides switch to it and to
+binary mode. HDLC is then started with a SNRM as usual.
+"""
+
+import re
+from typing import *
+
+import attr
+
+from dlms_cosem import exceptions
+
+# The handshake is made with 7 data bits, even parity and 1 stop bit.
+INITIAL_BAUD_RATE = 300
+
+# Baud rate identification characters
+BAUD_RATES: Dict[str, int] = {
+    "0": 300,
+    "1": 600,
+    "2": 1200,
+    "3": 2400,
+    "4": 4800,
+    "5": 9600,
+    "6": 19200,
+}
+BAUD_RATE_CHARACTERS: Dict[int, str] = {
+    baud_rate: character for character, baud_rate in BAUD_RATES.items()
+}
+
+# Protocol control character 2 is the HDLC protocol procedure (mode E).
+PROTOCOL_CONTROL_HDLC = "2"
+# Mode control character 2 selects binary mode (HDLC).
+MODE_CONTROL_BINARY = "2"
+# The enhanced capability "\2" in the identification shows that mode E is supported.
+MODE_E_CAPABILITY = "2"
+
+# Time for the meter to switch baud rate after the acknowledgement is sent.
+BAUD_RATE_SWITCH_DELAY = 0.3
+
+ACK = b"\x06"
+LINE_END = b"\r\n"
+
+IDENTIFICATION_PATTERN = re.compile(
+    r"^/(?P<manufacturer>[A-Za-z]{3})(?P<baud_rate>.)"
+    r"(?P<capabilities>(?:\\.)*)(?P<identification>[^\r\n]*)\r\n$"
+)
+
+
+class Iec62056_21Error(exceptions.CommunicationError):
+    """The meter did not respond as expected in the IEC 62056-21 handshake"""
+
+
+@attr.s(auto_attribs=True)
+class RequestMessage:
+    """
+    Request message sent to start the communication. The device address is only
+    needed when several meters share the line.
+    """
+
+    device_address: str = attr.ib(default="")
+
+    def to_bytes(self) -> bytes:
+        return b"".join([b"/?", self.device_address.encode("ascii"), b"!", LINE_END])
+
+
+@attr.s(auto_attribs=True)
+class IdentificationMessage:
+    """
+    The identification sent by the meter: /XXXZ\\W<identification>CR LF
+
+    XXX is the manufacturer, Z the highest baud rate the meter supports and each
+    \\W an enhanced capability of the meter.
+    """
+
+    manufacturer: str
+    baud_rate_character: str
+    identification: str
+    capabilities: List[str] = attr.ib(factory=list)
+
+    @property
+    def baud_rate(self) -> int:
+        try:
+            return BAUD_RATES[self.baud_rate_character]
+        except KeyError:
+            raise Iec62056_21Error(
+                f"Meter identified with an unknown baud rate character "
+                f"{self.baud_rate_character!r}"
+            )
+
+    @property
+    def supports_mode_e(self) -> bool:
+        return MODE_E_CAPABILITY in self.capabilities
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes) -> "IdentificationMessage":
+        match = IDENTIFICATION_PATTERN.match(source_bytes.decode("latin-1"))
+        if not match:
+            raise Iec62056_21Error(
+                f"Could not parse the identification message: {source_bytes!r}"
+            )
+        return cls(
+            manufacturer=match.group("manufacturer"),
+            baud_rate_character=match.group("baud_rate"),
+            identification=match.group("identification"),
+            capabilities=list(match.group("capabilities")[1::2]),
+        )
+
+    def to_bytes(self) -> bytes:
+        capabilities = "".join(f"\\{capability}" for capability in self.capabilities)
+        return (
+            f"/{self.manufacturer}{self.baud_rate_character}{capabilities}"
+            f"{self.identification}"
+        ).encode("latin-1") + LINE_END
+
+
+@attr.s(auto_attribs=True)
+class AckOptionSelectMessage:
+    """
+    Acknowledges the identification and selects the protocol, baud rate and mode.
+    Defaults to HDLC in binary mode.
+    """
+
+    baud_rate_character: str
+    protocol_control_character: str = attr.ib(default=PROTOCOL_CONTROL_HDLC)
+    mode_control_character: str = attr.ib(default=MODE_CONTROL_BINARY)
+
+    def to_bytes(self) -> bytes:
+        return b"".join(
+            [
+                ACK,
+                self.protocol_control_character.encode("ascii"),
+                self.baud_rate_character.encode("ascii"),
+                self.mode_control_character.encode("ascii"),
+                LINE_END,
+            ]
+        )
+
+
+def select_baud_rate(identification: IdentificationMessage, max_baud_rate: int) -> int:
+    """
+    Returns the highest baud rate supported by both the meter and the client. The
+    handshake is made at 300 baud so it is used if `max_baud_rate` is lower.
+    """
+    if not identification.supports_mode_e:
+        raise Iec62056_21Error(
+            f"Meter {identification.manufacturer} {identification.identification} "
+            f"does not support mode E"
+        )
+    return max(
+        (
+            baud_rate
+            for baud_rate in BAUD_RATES.values()
+            if baud_rate <= min(identification.baud_rate, max_baud_rate)
+        ),
+        default=INITIAL_BAUD_RATE,
+    )
@@ -0,0 +1,253 @@
+"""
+Storage of invocation counters that survives restarts of the client.
+
+A meter rejects ciphered APDUs with an invocation counter it has already received, so
+the client must never use a counter twice with the same key. Client invocation
+counters are reserved in ranges: the end of a range is stored before any counter in it
+is used, so after a crash the client continues after the range and never reuses a
+counter. Only one write is needed per range instead of one per APDU.
+"""
+
+import abc
+import hashlib
+import sqlite3
+import threading
+from typing import *
+
+import attr
+
+# Invocation counters are 4 bytes.
+MAX_INVOCATION_COUNTER = 0xFFFFFFFF
+DEFAULT_BATCH_SIZE = 1000
+# Counters left in a range when the next one is reserved. An APDU sent by the client
+# uses at most one.
+RESERVE_MARGIN = 4
+
+
+class InvocationCounterExhaustedError(Exception):
+    """All invocation counters of a key have been used. The key must be changed."""
+
+
+def counter_key(client_logical_address: int, encryption_key: bytes) -> str:
+    """
+    Key to store the counters of a client on. The meter keeps the counters per key,
+    the key is hashed so it is not stored in plain text.
+    """
+    digest = hashlib.sha256(encryption_key).hexdigest()[:32]
+    return f"{client_logical_address}:{digest}"
+
+
+class InvocationCounterStore(abc.ABC):
+    """
+    Stores the invocation counters of many clients and meters.
+
+    :param batch_size: Number of client invocation counters reserved at a time.
+    """
+
+    batch_size: int = DEFAULT_BATCH_SIZE
+
+    @abc.abstractmethod
+    def reserve(self, key: str, count: int, at_least: int = 0) -> int:
+        """
+        Reserves `count` client invocation counters and returns the first one. No
+        counter in the range is returned again by the store, even after a restart,
+        unless it is released. The first counter is at least `at_least`.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def release(self, key: str, next_invocation_counter: int, end: int) -> bool:
+        """
+        Hands the unused counters of a range back, from `next_invocation_counter`
+        up to `end`. Only done if no range has been reserved after it. Returns True if
+        the counters were released.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def meter_invocation_counter(self, key: str) -> int:
+        """Returns the last invocation counter received from the meter."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def update_meter_invocation_counter(self, key: str, invocation_counter: int):
+        """Stores the invocation counter received from the meter, if it is higher."""
+        raise NotImplementedError()
+
+    @staticmethod
+    def range_start(next_invocation_counter: int, count: int, at_least: int) -> int:
+        start = max(next_invocation_counter, at_least)
+        if start + count - 1 > MAX_INVOCATION_COUNTER:
+            raise InvocationCounterExhaustedError(
+                f"Not enough invocation counters left to reserve {count} from {start}"
+            )
+        return start
+
+
+@attr.s(auto_attribs=True)
+class MemoryInvocationCounterStore(InvocationCounterStore):
+    """
+    Keeps the invocation counters in memory, shared by the clients of a process. Use
+    it when the counters are persisted some other way.
+    """
+
+    batch_size: int = attr.ib(default=DEFAULT_BATCH_SIZE)
+    # The next client invocation counter not reserved, and the meter counter.
+    client_counters: Dict[str, int] = attr.ib(factory=dict)
+    meter_counters: Dict[str, int] = attr.ib(factory=dict)
+    lock: threading.Lock = attr.ib(factory=threading.Lock, repr=False)
+
+    def reserve(self, key: str, count: int, at_least: int = 0) -> int:
+        with self.lock:
+            start = self.range_start(self.client_counters.get(key, 0), count, at_least)
+            self.client_counters[key] = start + count
+            return start
+
+    def release(self, key: str, next_invocation_counter: int, end: int) -> bool:
+        with self.lock:
+            if self.client_counters.get(key) != end:
+                return False
+            self.client_counters[key] = next_invocation_counter
+            return True
+
+    def meter_invocation_counter(self, key: str) -> int:
+        return self.meter_counters.get(key, 0)
+
+    def update_meter_invocation_counter(self, key: str, invocation_counter: int):
+        with self.lock:
+            if invocation_counter > self.meter_counters.get(key, 0):
+                self.meter_counters[key] = invocation_counter
+
+
+@attr.s(auto_attribs=True)
+class SqliteInvocationCounterStore(InvocationCounterStore):
+    """
+    Keeps the invocation counters in a SQLite database, in write-ahead log mode. The
+    database can be shared by several processes: reservations are made in write
+    transactions so two processes never get overlapping ranges, and a range released
+    by one process is continued by the next one reserving for the key.
+
+    Each reservation is synced to disk before its counters are used.
+    """
+
+    path: str
+    batch_size: int = attr.ib(default=DEFAULT_BATCH_SIZE)
+    # Seconds to wait for another process holding the database lock.
+    timeout: float = attr.ib(default=30.0)
+
+    def __attrs_post_init__(self):
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS invocation_counters ("
+                "key TEXT PRIMARY KEY, "
+                "next_client INTEGER NOT NULL DEFAULT 0, "
+                "meter INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        # A connection per call as reservations are rare and clients can be in
+        # different threads.
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None
+        )
+        connection.execute("PRAGMA synchronous=FULL")
+        return connection
+
+    def reserve(self, key: str, count: int, at_least: int = 0) -> int:
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT next_client FROM invocation_counters WHERE key = ?", (key,)
+                ).fetchone()
+                start = self.range_start(row[0] if row else 0, count, at_least)
+                connection.execute(
+                    "INSERT OR IGNORE INTO invocation_counters (key) VALUES (?)", (key,)
+                )
+                connection.execute(
+                    "UPDATE invocation_counters SET next_client = ? WHERE key = ?",
+                    (start + count, key),
+                )
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return start
+        finally:
+            connection.close()
+
+    def release(self, key: str, next_invocation_counter: int, end: int) -> bool:
+        connection = self.connect()
+        try:
+            cursor = connection.execute(
+                "UPDATE invocation_counters SET next_client = ? "
+                "WHERE key = ? AND next_client = ?",
+                (next_invocation_counter, key, end),
+            )
+            return cursor.rowcount == 1
+        finally:
+            connection.close()
+
+    def meter_invocation_counter(self, key: str) -> int:
+        connection = self.connect()
+        try:
+            row = connection.execute(
+                "SELECT meter FROM invocation_counters WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else 0
+        finally:
+            connection.close()
+
+    def update_meter_invocation_counter(self, key: str, invocation_counter: int):
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR IGNORE INTO invocation_counters (key) VALUES (?)", (key,)
+            )
+            connection.execute(
+                "UPDATE invocation_counters SET meter = MAX(meter, ?) WHERE key = ?",
+                (invocation_counter, key),
+            )
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+
+@attr.s(auto_attribs=True)
+class CounterReservation:
+    """
+    The range of client invocation counters reserved for a key by a client.
+    """
+
+    store: InvocationCounterStore
+    key: str
+    # End of the reserved range, the first counter not reserved.
+    end: int = attr.ib(init=False, default=0)
+
+    def next_invocation_counter(self, invocation_counter: int) -> int:
+        """
+        Returns the client invocation counter to use next, from a reserved range. A new
+        range is reserved when the current one is almost used.
+        """
+        if invocation_counter + RESERVE_MARGIN <= self.end:
+            return invocation_counter
+        start = self.store.reserve(
+            self.key, self.store.batch_size, at_least=invocation_counter
+        )
+        if start != self.end:
+            # Not following the current range, another client reserved in between.
+            invocation_counter = start
+        self.end = start + self.store.batch_size
+        return invocation_counter
+
+    def release(self, invocation_counter: int):
+        """
+        Hands the counters from `invocation_counter` to the end of the range back to
+        the store.
+        """
+        if self.end:
+            self.store.release(self.key, invocation_counter, self.end)
+            self.end = 0
@@ -0,0 +1,270 @@
+"""
+Counters of what the library sends and receives, for monitoring.
+
+The connections and transports update the counters in `REGISTRY` once counting is
+switched on with `enable_metrics()`. They can be rendered in the Prometheus text
+format, written to a file for the textfile collector of the node exporter or served
+over HTTP:
+
+    from dlms_cosem import metrics
+
+    metrics.enable_metrics()
+    ...
+    metrics.REGISTRY.write("/var/lib/node_exporter/dlms.prom")
+    server = metrics.REGISTRY.serve(port=9464)
+"""
+
+import http.server
+import logging
+import os
+import re
+import socketserver
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import *
+
+import attr
+
+LOG = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+NAME_PATTERN = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+LABEL_NAME_PATTERN = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def format_value(value: Union[int, float]) -> str:
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value)
+
+
+@attr.s(auto_attribs=True)
+class Counter:
+    """
+    A value that only goes up, per combination of label values.
+
+    Incrementing takes a lock and a dict update. The connections only increment the
+    counters of `REGISTRY` while it is enabled.
+    """
+
+    name: str
+    help: str
+    label_names: Tuple[str, ...] = attr.ib(default=(), converter=tuple)
+    values: Dict[Tuple[str, ...], Union[int, float]] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+    lock: threading.Lock = attr.ib(init=False, factory=threading.Lock, repr=False)
+
+    def __attrs_post_init__(self):
+        if not NAME_PATTERN.match(self.name):
+            raise ValueError(f"{self.name!r} is not a valid metric name")
+        for label_name in self.label_names:
+            if not LABEL_NAME_PATTERN.match(label_name):
+                raise ValueError(f"{label_name!r} is not a valid label name")
+
+    def inc(self, *label_values: str, amount: Union[int, float] = 1):
+        if amount < 0:
+            raise ValueError(f"Counters can only increase, got {amount}")
+        with self.lock:
+            value = self.values.get(label_values)
+            if value is None:
+                if len(label_values) != len(self.label_names):
+                    raise ValueError(
+                        f"{self.name} has the labels {self.label_names}, got "
+                        f"{len(label_values)} label values"
+                    )
+                value = 0
+            self.values[label_values] = value + amount
+
+    def value(self, *label_values: str) -> Union[int, float]:
+        return self.values.get(label_values, 0)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], Union[int, float]]]:
+        with self.lock:
+            return sorted(self.values.items())
+
+    def reset(self):
+        with self.lock:
+            self.values = dict()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {escape_help(self.help)}",
+            f"# TYPE {self.name} counter",
+        ]
+        samples = self.samples()
+        if not samples and not self.label_names:
+            samples = [((), 0)]
+        for label_values, value in samples:
+            labels = ""
+            if label_values:
+                pairs = ",".join(
+                    f'{label_name}="{escape_label_value(str(label_value))}"'
+                    for label_name, label_value in zip(self.label_names, label_values)
+                )
+                labels = "{" + pairs + "}"
+            lines.append(f"{self.name}{labels} {format_value(value)}")
+        return lines
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        LOG.debug(f"{self.address_string()} {format % args}")
+
+
+class MetricsServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    Serves the metrics of a registry on any path. Stop it with `shutdown()` and
+    `server_close()`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address: Tuple[str, int], registry: "MetricsRegistry"):
+        super().__init__(server_address, MetricsHandler)
+        self.registry = registry
+
+
+@attr.s(auto_attribs=True)
+class MetricsRegistry:
+    """
+    The counters of a process.
+
+    The layers check `enabled` before incrementing the counters of `REGISTRY`, so the
+    disabled registry costs one attribute lookup per APDU or frame.
+    """
+
+    enabled: bool = attr.ib(default=False)
+    counters: Dict[str, Counter] = attr.ib(init=False, factory=OrderedDict)
+    lock: threading.Lock = attr.ib(init=False, factory=threading.Lock, repr=False)
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        """
+        Returns the counter with the name, making it if it does not exist.
+        """
+        with self.lock:
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = Counter(name, help, label_names)
+            elif counter.label_names != tuple(label_names):
+                raise ValueError(
+                    f"Counter {name} already exists with the labels "
+                    f"{counter.label_names}"
+                )
+            return counter
+
+    def reset(self):
+        """Sets all counters back to zero."""
+        for counter in list(self.counters.values()):
+            counter.reset()
+
+    def render(self) -> str:
+        """
+        Returns the counters in the Prometheus text exposition format.
+        """
+        lines = list()
+        for counter in list(self.counters.values()):
+            lines.extend(counter.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Writes the counters to a file. The file is replaced in one go so readers never
+        see a partly written file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=directory, prefix=".", suffix=".tmp"
+        )
+        try:
+            # Readable by collectors running as other users.
+            os.chmod(temporary_path, 0o644)
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                file.write(self.render())
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> MetricsServer:
+        """
+        Serves the counters over HTTP from a background thread. Only listens on the
+        local host unless another `host` is given.
+        """
+        server = MetricsServer((host, port), self)
+        thread = threading.Thread(
+            target=server.serve_forever, name="dlms-metrics", daemon=True
+        )
+        thread.start()
+        LOG.info(f"Serving metrics on http://{host}:{server.server_address[1]}")
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+
+def enable_metrics(enabled: bool = True):
+    """
+    Switches counting in `REGISTRY` on or off. The counted values are kept when it is
+    switched off.
+    """
+    REGISTRY.enabled = enabled
+
+
+APDUS_SENT = REGISTRY.counter(
+    "dlms_apdus_sent_total", "APDUs sent, by type before ciphering.", ["type"]
+)
+APDUS_RECEIVED = REGISTRY.counter(
+    "dlms_apdus_received_total", "APDUs received, by type after deciphering.", ["type"]
+)
+BLOCKS = REGISTRY.counter(
+    "dlms_blocks_total", "Data blocks of GET and ACTION block transfers.", ["direction"]
+)
+DECRYPTION_FAILURES = REGISTRY.counter(
+    "dlms_decryption_failures_total", "Received APDUs that could not be deciphered."
+)
+ASSOCIATION_REJECTS = REGISTRY.counter(
+    "dlms_association_rejects_total", "Associations rejected by meters.", ["result"]
+)
+BYTES_SENT = REGISTRY.counter(
+    "dlms_bytes_sent_total", "Bytes written to the transport.", ["transport"]
+)
+BYTES_RECEIVED = REGISTRY.counter(
+    "dlms_bytes_received_total", "Bytes read from the transport.", ["transport"]
+)
+HDLC_FRAMES_SENT = REGISTRY.counter(
+    "hdlc_frames_sent_total", "HDLC frames sent, by type.", ["type"]
+)
+HDLC_FRAMES_RECEIVED = REGISTRY.counter(
+    "hdlc_frames_received_total", "HDLC frames received, by type.", ["type"]
+)
+HDLC_FRAMES_DROPPED = REGISTRY.counter(
+    "hdlc_frames_dropped_total", "HDLC frames received that were not expected."
+)
+HDLC_RETRANSMISSIONS = REGISTRY.counter(
+    "hdlc_retransmissions_total",
+    "Information frames sent again as the server did not acknowledge them.",
+)
@@ -1,16 +1,43 @@
+from dlms_cosem.protocol.xdlms.access import (
+    AccessRequest,
+    AccessRequestAction,
+    AccessRequestGet,
+    AccessRequestSet,
+    AccessResponse,
+    AccessResponseAction,
+    AccessResponseGet,
+    AccessResponseSet,
+)
 from dlms_cosem.protocol.xdlms.action import (
     ActionRequestFactory,
+    ActionRequestNextPblock,
     ActionRequestNormal,
+    ActionRequestWithFirstPblock,
+    ActionRequestWithList,
+    ActionRequestWithListAndFirstPblock,
+    ActionRequestWithPblock,
     ActionResponseFactory,
+    ActionResponseLastPblock,
+    ActionResponseNextPblock,
     ActionResponseNormal,
     ActionResponseNormalWithData,
     ActionResponseNormalWithError,
+    ActionResponseWithList,
+    ActionResponseWithOptionalData,
+    ActionResponseWithPblock,
+    DataBlockSA,
 )
 from dlms_cosem.protocol.xdlms.confirmed_service_error import ConfirmedServiceError
 from dlms_cosem.protocol.xdlms.conformance import Conformance
-from dlms_cosem.protocol.xdlms.data_notification import DataNotification
+from dlms_cosem.protocol.xdlms.data_notification import (
+    DataNotification,
+    LongInvokeIdAndPriority,
+)
 from dlms_cosem.protocol.xdlms.exception_response import ExceptionResponse
-from dlms_cosem.protocol.xdlms.general_global_cipher import GeneralGlobalCipher
+from dlms_cosem.protocol.xdlms.general_global_cipher import (
+    GeneralDedicatedCipher,
+    GeneralGlobalCipher,
+)
 from dlms_cosem.protocol.xdlms.get import (
     GetRequestFactory,
     GetRequestNext,
@@ -44,6 +71,7 @@ __all__ = [
     "InitiateRequest",
     "DataNotification",
     "GeneralGlobalCipher",
+    "GeneralDedicatedCipher",
     "InitiateResponse",
     "ConfirmedServiceError",
     "Conformance",
@@ -68,8 +96,28 @@ __all__ = [
     "ActionResponseNormal",
     "ActionResponseNormalWithData",
     "ActionResponseNormalWithError",
+    "ActionResponseWithList",
+    "ActionResponseWithOptionalData",
+    "ActionResponseWithPblock",
+    "ActionResponseLastPblock",
+    "ActionResponseNextPblock",
     "ActionResponseFactory",
     "ActionRequestNormal",
+    "ActionRequestNextPblock",
+    "ActionRequestWithList",
+    "ActionRequestWithFirstPblock",
+    "ActionRequestWithListAndFirstPblock",
+    "ActionRequestWithPblock",
     "ActionRequestFactory",
+    "DataBlockSA",
     "InvokeIdAndPriority",
+    "LongInvokeIdAndPriority",
+    "AccessRequest",
+    "AccessRequestGet",
+    "AccessRequestSet",
+    "AccessRequestAction",
+    "AccessResponse",
+    "AccessResponseGet",
+    "AccessResponseSet",
+    "AccessResponseAction",
 ]
@@ -0,0 +1,433 @@
+import datetime
+from typing import *
+
+import attr
+
+import dlms_cosem.time as dlmstime
+from dlms_cosem import cosem, dlms_data, enumerations
+from dlms_cosem.cosem import selective_access
+from dlms_cosem.dlms_data import decode_variable_integer, encode_variable_integer
+from dlms_cosem.protocol.xdlms.base import AbstractXDlmsApdu
+from dlms_cosem.protocol.xdlms.data_notification import LongInvokeIdAndPriority
+
+NULL_DATA = dlms_data.NullData().to_bytes()
+
+
+def encode_date_time(date_time: Optional[datetime.datetime]) -> bytes:
+    """
+    The date-time in ACCESS APDUs is an OCTET STRING that is empty when not used.
+    """
+    if date_time is None:
+        return b"\x00"
+    return encode_variable_integer(12) + dlmstime.datetime_to_bytes(date_time)
+
+
+def decode_date_time(
+    source_bytes: bytes,
+) -> Tuple[Optional[datetime.datetime], bytes]:
+    length, data = decode_variable_integer(source_bytes)
+    if length == 0:
+        return None, data
+    if length != 12:
+        raise ValueError(f"date-time should be 0 or 12 bytes long, got {length}")
+    date_time, _ = dlmstime.datetime_from_bytes(data[:12])
+    return date_time, data[12:]
+
+
+def decode_access_selection(
+    source_bytes: bytes,
+) -> Tuple[
+    Union[selective_access.RangeDescriptor, selective_access.EntryDescriptor], bytes
+]:
+    """
+    A selective access descriptor is the access selector followed by the access
+    parameters as DLMS data.
+    """
+    data = bytes(source_bytes)
+    parameters = dlms_data.DlmsDataParser().split(data[1:], 1)[0]
+    length = 1 + len(parameters)
+    access_selection = selective_access.AccessDescriptorFactory.from_bytes(
+        bytearray(data[:length])
+    )
+    return access_selection, data[length:]
+
+
+@attr.s(auto_attribs=True)
+class AccessRequestGet:
+    """
+    GET of an attribute in an AccessRequest.
+    """
+
+    cosem_attribute: cosem.CosemAttribute
+    access_selection: Optional[
+        Union[selective_access.RangeDescriptor, selective_access.EntryDescriptor]
+    ] = attr.ib(default=None)
+
+    @property
+    def request_type(self) -> enumerations.AccessRequestType:
+        if self.access_selection:
+            return enumerations.AccessRequestType.GET_WITH_SELECTION
+        return enumerations.AccessRequestType.GET
+
+    @property
+    def data(self) -> Optional[bytes]:
+        # GET does not carry any data but needs a null-data in the list of data.
+        return None
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.request_type.value)
+        out.extend(self.cosem_attribute.to_bytes())
+        if self.access_selection:
+            out.extend(self.access_selection.to_bytes())
+        return bytes(out)
+
+
+@attr.s(auto_attribs=True)
+class AccessRequestSet:
+    """
+    SET of an attribute in an AccessRequest. data is the encoded DLMS data to set.
+    """
+
+    cosem_attribute: cosem.CosemAttribute
+    data: Optional[bytes] = attr.ib(default=None)
+    access_selection: Optional[
+        Union[selective_access.RangeDescriptor, selective_access.EntryDescriptor]
+    ] = attr.ib(default=None)
+
+    @property
+    def request_type(self) -> enumerations.AccessRequestType:
+        if self.access_selection:
+            return enumerations.AccessRequestType.SET_WITH_SELECTION
+        return enumerations.AccessRequestType.SET
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.request_type.value)
+        out.extend(self.cosem_attribute.to_bytes())
+        if self.access_selection:
+            out.extend(self.access_selection.to_bytes())
+        return bytes(out)
+
+
+@attr.s(auto_attribs=True)
+class AccessRequestAction:
+    """
+    ACTION in an AccessRequest. data is the encoded method invocation parameters.
+    """
+
+    cosem_method: cosem.CosemMethod
+    data: Optional[bytes] = attr.ib(default=None)
+
+    @property
+    def request_type(self) -> enumerations.AccessRequestType:
+        return enumerations.AccessRequestType.ACTION
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.request_type.value)
+        out.extend(self.cosem_method.to_bytes())
+        return bytes(out)
+
+
+AccessRequestSpecification = Union[
+    AccessRequestGet, AccessRequestSet, AccessRequestAction
+]
+
+
+def encode_request_specifications(
+    specifications: List[AccessRequestSpecification],
+) -> bytes:
+    out = bytearray()
+    out.extend(encode_variable_integer(len(specifications)))
+    for specification in specifications:
+        out.extend(specification.to_bytes())
+    return bytes(out)
+
+
+def decode_request_specifications(
+    source_bytes: bytes,
+) -> Tuple[List[AccessRequestSpecification], bytes]:
+    """
+    Decodes a List-Of-Access-Request-Specification. The returned specifications
+    does not have any data set.
+    """
+    amount, data = decode_variable_integer(bytes(source_bytes))
+    specifications = list()
+    for _ in range(0, amount):
+        request_type = enumerations.AccessRequestType(data[0])
+        descriptor = data[1:10]
+        data = data[10:]
+        if request_type in (
+            enumerations.AccessRequestType.GET_WITH_SELECTION,
+            enumerations.AccessRequestType.SET_WITH_SELECTION,
+        ):
+            access_selection, data = decode_access_selection(data)
+        else:
+            access_selection = None
+
+        if request_type == enumerations.AccessRequestType.ACTION:
+            specifications.append(
+                AccessRequestAction(
+                    cosem_method=cosem.CosemMethod.from_bytes(descriptor)
+                )
+            )
+        elif request_type in (
+            enumerations.AccessRequestType.GET,
+            enumerations.AccessRequestType.GET_WITH_SELECTION,
+        ):
+            specifications.append(
+                AccessRequestGet(
+                    cosem_attribute=cosem.CosemAttribute.from_bytes(descriptor),
+                    access_selection=access_selection,
+                )
+            )
+        else:
+            specifications.append(
+                AccessRequestSet(
+                    cosem_attribute=cosem.CosemAttribute.from_bytes(descriptor),
+                    access_selection=access_selection,
+                )
+            )
+    return specifications, data
+
+
+def encode_list_of_data(data: List[Optional[bytes]]) -> bytes:
+    out = bytearray()
+    out.extend(encode_variable_integer(len(data)))
+    for item in data:
+        out.extend(item or NULL_DATA)
+    return bytes(out)
+
+
+def decode_list_of_data(source_bytes: bytes) -> Tuple[List[bytes], bytes]:
+    amount, data = decode_variable_integer(bytes(source_bytes))
+    items = dlms_data.DlmsDataParser().split(data, amount)
+    return items, data[sum(len(item) for item in items) :]
+
+
+@attr.s(auto_attribs=True)
+class AccessRequest(AbstractXDlmsApdu):
+    """
+    The ACCESS service makes it possible to combine GET, SET and ACTION operations in
+    one request. The operations are executed in order by the server.
+
+    Access-Request ::= SEQUENCE
+    {
+    long-invoke-id-and-priority     Long-Invoke-Id-And-Priority,
+    date-time                       OCTET STRING,
+    access-request-body             Access-Request-Body
+    }
+
+    Access-Request-Body ::= SEQUENCE
+    {
+    access-request-specification    List-Of-Access-Request-Specification,
+    access-request-list-of-data     List-Of-Data
+    }
+
+    The data of each request specification is encoded in the list of data. GET uses
+    null-data.
+    """
+
+    TAG: ClassVar[int] = 217
+
+    long_invoke_id_and_priority: LongInvokeIdAndPriority
+    requests: List[AccessRequestSpecification] = attr.ib(factory=list)
+    date_time: Optional[datetime.datetime] = attr.ib(default=None)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        data = bytes(source_bytes)
+        tag = data[0]
+        if tag != cls.TAG:
+            raise ValueError(
+                f"Data is not an AccessRequest APDU. Expected tag={cls.TAG} but got "
+                f"{tag}"
+            )
+        long_invoke_id_and_priority = LongInvokeIdAndPriority.from_bytes(data[1:5])
+        date_time, data = decode_date_time(data[5:])
+        requests, data = decode_request_specifications(data)
+        list_of_data, _ = decode_list_of_data(data)
+        if len(list_of_data) != len(requests):
+            raise ValueError(
+                f"AccessRequest has {len(requests)} request specifications but "
+                f"{len(list_of_data)} items of data"
+            )
+        for request, request_data in zip(requests, list_of_data):
+            if not isinstance(request, AccessRequestGet):
+                request.data = None if request_data == NULL_DATA else request_data
+
+        return cls(
+            long_invoke_id_and_priority=long_invoke_id_and_priority,
+            requests=requests,
+            date_time=date_time,
+        )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.extend(self.long_invoke_id_and_priority.to_bytes())
+        out.extend(encode_date_time(self.date_time))
+        out.extend(encode_request_specifications(self.requests))
+        out.extend(encode_list_of_data([request.data for request in self.requests]))
+        return bytes(out)
+
+
+@attr.s(auto_attribs=True)
+class AccessResponseGet:
+    """
+    Result of a GET in an AccessResponse. data holds the encoded DLMS data read.
+    """
+
+    result: enumerations.DataAccessResult
+    data: Optional[bytes] = attr.ib(default=None)
+
+    RESPONSE_TYPE: ClassVar[
+        enumerations.AccessResponseType
+    ] = enumerations.AccessResponseType.GET
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.RESPONSE_TYPE.value, self.result.value])
+
+
+@attr.s(auto_attribs=True)
+class AccessResponseSet:
+    result: enumerations.DataAccessResult
+
+    RESPONSE_TYPE: ClassVar[
+        enumerations.AccessResponseType
+    ] = enumerations.AccessResponseType.SET
+
+    @property
+    def data(self) -> Optional[bytes]:
+        return None
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.RESPONSE_TYPE.value, self.result.value])
+
+
+@attr.s(auto_attribs=True)
+class AccessResponseAction:
+    """
+    Result of an ACTION in an AccessResponse. data holds the encoded return
+    parameters, if any.
+    """
+
+    result: enumerations.ActionResultStatus
+    data: Optional[bytes] = attr.ib(default=None)
+
+    RESPONSE_TYPE: ClassVar[
+        enumerations.AccessResponseType
+    ] = enumerations.AccessResponseType.ACTION
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.RESPONSE_TYPE.value, self.result.value])
+
+
+AccessResponseSpecification = Union[
+    AccessResponseGet, AccessResponseSet, AccessResponseAction
+]
+
+
+@attr.s(auto_attribs=True)
+class AccessResponse(AbstractXDlmsApdu):
+    """
+    Access-Response ::= SEQUENCE
+    {
+    long-invoke-id-and-priority     Long-Invoke-Id-And-Priority,
+    date-time                       OCTET STRING,
+    access-response-body            Access-Response-Body
+    }
+
+    Access-Response-Body ::= SEQUENCE
+    {
+    access-request-specification    [0] List-Of-Access-Request-Specification OPTIONAL,
+    access-response-list-of-data    List-Of-Data,
+    access-response-specification   List-Of-Access-Response-Specification
+    }
+
+    If the request was sent with self_descriptive set the server echoes the
+    request specifications in the response.
+    """
+
+    TAG: ClassVar[int] = 218
+
+    long_invoke_id_and_priority: LongInvokeIdAndPriority
+    responses: List[AccessResponseSpecification] = attr.ib(factory=list)
+    date_time: Optional[datetime.datetime] = attr.ib(default=None)
+    request_specifications: Optional[List[AccessRequestSpecification]] = attr.ib(
+        default=None
+    )
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        data = bytes(source_bytes)
+        tag = data[0]
+        if tag != cls.TAG:
+            raise ValueError(
+                f"Data is not an AccessResponse APDU. Expected tag={cls.TAG} but got "
+                f"{tag}"
+            )
+        long_invoke_id_and_priority = LongInvokeIdAndPriority.from_bytes(data[1:5])
+        date_time, data = decode_date_time(data[5:])
+
+        has_request_specifications = bool(data[0])
+        data = data[1:]
+        if has_request_specifications:
+            request_specifications, data = decode_request_specifications(data)
+        else:
+            request_specifications = None
+
+        list_of_data, data = decode_list_of_data(data)
+        amount, data = decode_variable_integer(data)
+        if amount != len(list_of_data):
+            raise ValueError(
+                f"AccessResponse has {amount} response specifications but "
+                f"{len(list_of_data)} items of data"
+            )
+        responses = list()
+        for index in range(0, amount):
+            response_type = enumerations.AccessResponseType(data[index * 2])
+            result = data[index * 2 + 1]
+            response_data = list_of_data[index]
+            if response_type == enumerations.AccessResponseType.GET:
+                responses.append(
+                    AccessResponseGet(
+                        result=enumerations.DataAccessResult(result),
+                        data=response_data,
+                    )
+                )
+            elif response_type == enumerations.AccessResponseType.SET:
+                responses.append(
+                    AccessResponseSet(result=enumerations.DataAccessResult(result))
+                )
+            else:
+                responses.append(
+                    AccessResponseAction(
+                        result=enumerations.ActionResultStatus(result),
+                        data=None if response_data == NULL_DATA else response_data,
+                    )
+                )
+
+        return cls(
+            long_invoke_id_and_priority=long_invoke_id_and_priority,
+            responses=responses,
+            date_time=date_time,
+            request_specifications=request_specifications,
+        )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.extend(self.long_invoke_id_and_priority.to_bytes())
+        out.extend(encode_date_time(self.date_time))
+        if self.request_specifications is not None:
+            out.append(0x01)
+            out.extend(encode_request_specifications(self.request_specifications))
+        else:
+            out.append(0x00)
+        out.extend(encode_list_of_data([response.data for response in self.responses]))
+        out.extend(encode_variable_integer(len(self.responses)))
+        for response in self.responses:
+            out.extend(response.to_bytes())
+        return bytes(out)
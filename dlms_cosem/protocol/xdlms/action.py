@@ -2,14 +2,11 @@ from typing import *
 
 import attr
 
-from dlms_cosem import cosem, enumerations
+from dlms_cosem import cosem, dlms_data, enumerations
+from dlms_cosem.dlms_data import decode_variable_integer, encode_variable_integer
 from dlms_cosem.protocol.xdlms.base import AbstractXDlmsApdu
 from dlms_cosem.protocol.xdlms.invoke_id_and_priority import InvokeIdAndPriority
 
-# TODO:  Use same kind of setup as with GET.
-# Several classes depending on the type of Action Request/Response
-# ActionRequestNormal, ActionResponseNormal, ActionResponseNormalWithError,
-
 
 @attr.s(auto_attribs=True)
 class ActionRequestNormal(AbstractXDlmsApdu):
@@ -71,6 +68,320 @@ class ActionRequestNormal(AbstractXDlmsApdu):
         )
 
 
+@attr.s(auto_attribs=True)
+class DataBlockSA:
+    """
+    Block of data used in block transfer of ACTION parameters and results.
+
+    DataBlock-SA ::= SEQUENCE
+    {
+    last-block      BOOLEAN,
+    block-number    Unsigned32,
+    raw-data        OCTET STRING
+    }
+    """
+
+    last_block: bool
+    block_number: int
+    raw_data: bytes
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        data = bytearray(source_bytes)
+        last_block = bool(data.pop(0))
+        block_number = int.from_bytes(data[:4], "big")
+        data = data[4:]
+        length, raw_data = decode_variable_integer(data)
+        if length != len(raw_data):
+            raise ValueError(
+                f"The octet string in block data is not of the correct length. "
+                f"Should be {length} but is {len(raw_data)}"
+            )
+        return cls(last_block=last_block, block_number=block_number, raw_data=raw_data)
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(int(self.last_block))
+        out.extend(self.block_number.to_bytes(4, "big"))
+        out.extend(encode_variable_integer(len(self.raw_data)))
+        out.extend(self.raw_data)
+        return bytes(out)
+
+
+def parse_action_request_header(
+    source_bytes: bytes, tag: int, action_type: enumerations.ActionType
+) -> Tuple[InvokeIdAndPriority, bytearray]:
+    data = bytearray(source_bytes)
+    received_tag = data.pop(0)
+    if received_tag != tag:
+        raise ValueError(
+            f"Tag {received_tag} is not the correct tag for an ActionRequest, should "
+            f"be {tag}"
+        )
+    request_type = enumerations.ActionType(data.pop(0))
+    if request_type != action_type:
+        raise ValueError(
+            f"Bytes are not representing a {action_type!r}. Action type is "
+            f"{request_type!r}"
+        )
+    invoke_id_and_priority = InvokeIdAndPriority.from_bytes(
+        data.pop(0).to_bytes(1, "big")
+    )
+    return invoke_id_and_priority, data
+
+
+@attr.s(auto_attribs=True)
+class ActionRequestNextPblock(AbstractXDlmsApdu):
+    """
+    Acknowledges a block of an ActionResponseWithPblock and requests the next one.
+    """
+
+    TAG: ClassVar[int] = 195
+    ACTION_TYPE: ClassVar[enumerations.ActionType] = enumerations.ActionType.NEXT_PBLOCK
+
+    block_number: int = attr.ib(validator=attr.validators.instance_of(int))
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True),
+        validator=attr.validators.instance_of(InvokeIdAndPriority),
+    )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.ACTION_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(self.block_number.to_bytes(4, "big"))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_request_header(
+            source_bytes, cls.TAG, cls.ACTION_TYPE
+        )
+        if len(data) != 4:
+            raise ValueError(
+                f"ActionRequestNextPblock should only contain a 4 byte block number "
+                f"after the invoke id, got {len(data)} bytes"
+            )
+        return cls(
+            block_number=int.from_bytes(data, "big"),
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionRequestWithList(AbstractXDlmsApdu):
+    """
+    Invokes several methods in one request. Each method needs a corresponding
+    invocation parameter. Methods without parameters should be given None which
+    is encoded as null-data.
+
+    Action-Request-With-List ::= SEQUENCE
+    {
+    invoke-id-and-priority          Invoke-Id-And-Priority,
+    cosem-method-descriptor-list    SEQUENCE OF Cosem-Method-Descriptor,
+    method-invocation-parameters    SEQUENCE OF Data
+    }
+    """
+
+    TAG: ClassVar[int] = 195
+    ACTION_TYPE: ClassVar[enumerations.ActionType] = enumerations.ActionType.WITH_LIST
+
+    cosem_methods: List[cosem.CosemMethod]
+    data: List[Optional[bytes]] = attr.ib()
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True),
+        validator=attr.validators.instance_of(InvokeIdAndPriority),
+    )
+
+    @data.validator
+    def _check_data(self, attribute, value):
+        if len(value) != len(self.cosem_methods):
+            raise ValueError(
+                f"Each method needs invocation parameters. Got {len(value)} "
+                f"parameters for {len(self.cosem_methods)} methods"
+            )
+
+    @staticmethod
+    def encode_methods(cosem_methods: List[cosem.CosemMethod]) -> bytes:
+        out = bytearray()
+        out.extend(encode_variable_integer(len(cosem_methods)))
+        for method in cosem_methods:
+            out.extend(method.to_bytes())
+        return bytes(out)
+
+    @staticmethod
+    def encode_parameters(data: List[Optional[bytes]]) -> bytes:
+        out = bytearray()
+        out.extend(encode_variable_integer(len(data)))
+        for item in data:
+            out.extend(item or dlms_data.NullData().to_bytes())
+        return bytes(out)
+
+    @staticmethod
+    def decode_methods(data: bytearray) -> Tuple[List[cosem.CosemMethod], bytearray]:
+        amount, data = decode_variable_integer(data)
+        methods = list()
+        for _ in range(0, amount):
+            methods.append(
+                cosem.CosemMethod.from_bytes(data[: cosem.CosemMethod.LENGTH])
+            )
+            data = data[cosem.CosemMethod.LENGTH :]
+        return methods, data
+
+    @staticmethod
+    def decode_parameters(data: bytes) -> List[Optional[bytes]]:
+        amount, data = decode_variable_integer(data)
+        return [
+            None if item == dlms_data.NullData().to_bytes() else item
+            for item in dlms_data.DlmsDataParser().split(data, amount)
+        ]
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.ACTION_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(self.encode_methods(self.cosem_methods))
+        out.extend(self.encode_parameters(self.data))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_request_header(
+            source_bytes, cls.TAG, cls.ACTION_TYPE
+        )
+        cosem_methods, data = cls.decode_methods(data)
+        return cls(
+            cosem_methods=cosem_methods,
+            data=cls.decode_parameters(data),
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionRequestWithFirstPblock(AbstractXDlmsApdu):
+    """
+    Used when the method invocation parameters don't fit in one APDU. The raw data
+    of the block is a part of the encoded invocation parameters. The meter
+    acknowledges the block with an ActionResponseNextPblock and the rest of the
+    parameters are sent with ActionRequestWithPblock.
+    """
+
+    TAG: ClassVar[int] = 195
+    ACTION_TYPE: ClassVar[
+        enumerations.ActionType
+    ] = enumerations.ActionType.WITH_FIRST_PBLOCK
+
+    cosem_method: cosem.CosemMethod = attr.ib(
+        validator=attr.validators.instance_of(cosem.CosemMethod)
+    )
+    pblock: DataBlockSA = attr.ib(validator=attr.validators.instance_of(DataBlockSA))
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True),
+        validator=attr.validators.instance_of(InvokeIdAndPriority),
+    )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.ACTION_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(self.cosem_method.to_bytes())
+        out.extend(self.pblock.to_bytes())
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_request_header(
+            source_bytes, cls.TAG, cls.ACTION_TYPE
+        )
+        cosem_method = cosem.CosemMethod.from_bytes(data[: cosem.CosemMethod.LENGTH])
+        pblock = DataBlockSA.from_bytes(data[cosem.CosemMethod.LENGTH :])
+        return cls(
+            cosem_method=cosem_method,
+            pblock=pblock,
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionRequestWithListAndFirstPblock(AbstractXDlmsApdu):
+    """
+    Same as ActionRequestWithFirstPblock but for several methods. The raw data of
+    the blocks is a part of the encoded SEQUENCE OF Data with the invocation
+    parameters.
+    """
+
+    TAG: ClassVar[int] = 195
+    ACTION_TYPE: ClassVar[
+        enumerations.ActionType
+    ] = enumerations.ActionType.WITH_LIST_AND_FIRST_PBLOCK
+
+    cosem_methods: List[cosem.CosemMethod]
+    pblock: DataBlockSA = attr.ib(validator=attr.validators.instance_of(DataBlockSA))
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True),
+        validator=attr.validators.instance_of(InvokeIdAndPriority),
+    )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.ACTION_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(ActionRequestWithList.encode_methods(self.cosem_methods))
+        out.extend(self.pblock.to_bytes())
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_request_header(
+            source_bytes, cls.TAG, cls.ACTION_TYPE
+        )
+        cosem_methods, data = ActionRequestWithList.decode_methods(data)
+        return cls(
+            cosem_methods=cosem_methods,
+            pblock=DataBlockSA.from_bytes(data),
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionRequestWithPblock(AbstractXDlmsApdu):
+    """
+    Carries the following blocks of method invocation parameters after an
+    ActionRequestWithFirstPblock.
+    """
+
+    TAG: ClassVar[int] = 195
+    ACTION_TYPE: ClassVar[enumerations.ActionType] = enumerations.ActionType.WITH_PBLOCK
+
+    pblock: DataBlockSA = attr.ib(validator=attr.validators.instance_of(DataBlockSA))
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True),
+        validator=attr.validators.instance_of(InvokeIdAndPriority),
+    )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.ACTION_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(self.pblock.to_bytes())
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_request_header(
+            source_bytes, cls.TAG, cls.ACTION_TYPE
+        )
+        return cls(
+            pblock=DataBlockSA.from_bytes(data),
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
 @attr.s(auto_attribs=True)
 class ActionRequestFactory:
     """
@@ -92,6 +403,16 @@ class ActionRequestFactory:
         request_type = enumerations.ActionType(data.pop(0))
         if request_type == enumerations.ActionType.NORMAL:
             return ActionRequestNormal.from_bytes(source_bytes)
+        elif request_type == enumerations.ActionType.NEXT_PBLOCK:
+            return ActionRequestNextPblock.from_bytes(source_bytes)
+        elif request_type == enumerations.ActionType.WITH_LIST:
+            return ActionRequestWithList.from_bytes(source_bytes)
+        elif request_type == enumerations.ActionType.WITH_FIRST_PBLOCK:
+            return ActionRequestWithFirstPblock.from_bytes(source_bytes)
+        elif request_type == enumerations.ActionType.WITH_LIST_AND_FIRST_PBLOCK:
+            return ActionRequestWithListAndFirstPblock.from_bytes(source_bytes)
+        elif request_type == enumerations.ActionType.WITH_PBLOCK:
+            return ActionRequestWithPblock.from_bytes(source_bytes)
         else:
             raise NotImplementedError(
                 f"no class to support action request type {request_type}"
@@ -279,9 +600,228 @@ class ActionResponseNormalWithError(AbstractXDlmsApdu):
         )
 
 
+def parse_action_response_header(
+    source_bytes: bytes, tag: int, response_type: enumerations.ActionResponseType
+) -> Tuple[InvokeIdAndPriority, bytearray]:
+    data = bytearray(source_bytes)
+    received_tag = data.pop(0)
+    if received_tag != tag:
+        raise ValueError(
+            f"Tag {received_tag} is not correct for ActionResponse. Should be {tag}"
+        )
+    received_type = enumerations.ActionResponseType(data.pop(0))
+    if received_type != response_type:
+        raise ValueError(
+            f"Bytes are not representing a {response_type!r}. Action response type "
+            f"is {received_type!r}"
+        )
+    invoke_id_and_priority = InvokeIdAndPriority.from_bytes(
+        data.pop(0).to_bytes(1, "big")
+    )
+    return invoke_id_and_priority, data
+
+
 @attr.s(auto_attribs=True)
-class ActionResponseFactory:
+class ActionResponseWithOptionalData:
+    """
+    Result of a single method in an ActionResponseWithList.
+
+    Action-Response-With-Optional-Data ::= SEQUENCE
+    {
+    result              Action-Result,
+    return-parameters   Get-Data-Result OPTIONAL
+    }
+
+    The return parameters are either encoded DLMS data or a DataAccessResult.
+    """
+
+    status: enumerations.ActionResultStatus
+    data: Optional[bytes] = attr.ib(default=None)
+    error: Optional[enumerations.DataAccessResult] = attr.ib(default=None)
+
+    @classmethod
+    def from_bytes(
+        cls, source_bytes: bytes
+    ) -> Tuple["ActionResponseWithOptionalData", bytearray]:
+        """
+        Parses one item and returns it together with the data that is left.
+        """
+        data = bytearray(source_bytes)
+        status = enumerations.ActionResultStatus(data.pop(0))
+        has_return_parameters = bool(data.pop(0))
+        if not has_return_parameters:
+            return cls(status=status), data
+        choice = data.pop(0)
+        if choice == 0:
+            return_data = dlms_data.DlmsDataParser().split(data, 1)[0]
+            return cls(status=status, data=return_data), data[len(return_data) :]
+        elif choice == 1:
+            error = enumerations.DataAccessResult(data.pop(0))
+            return cls(status=status, error=error), data
+        else:
+            raise ValueError(f"{choice} is not a valid Get-Data-Result choice")
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.status.value)
+        if self.data is not None:
+            out.extend(b"\x01\x00")
+            out.extend(self.data)
+        elif self.error is not None:
+            out.extend(b"\x01\x01")
+            out.append(self.error.value)
+        else:
+            out.append(0x00)
+        return bytes(out)
+
+
+@attr.s(auto_attribs=True)
+class ActionResponseWithList(AbstractXDlmsApdu):
+    TAG: ClassVar[int] = 199
+    RESPONSE_TYPE: ClassVar[
+        enumerations.ActionResponseType
+    ] = enumerations.ActionResponseType.WITH_LIST
+
+    responses: List[ActionResponseWithOptionalData] = attr.ib(factory=list)
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True)
+    )
 
+    @staticmethod
+    def parse_responses(source_bytes: bytes) -> List[ActionResponseWithOptionalData]:
+        """
+        Parses a SEQUENCE OF Action-Response-With-Optional-Data. Also used for the
+        reassembled data of an action response sent in blocks.
+        """
+        amount, data = decode_variable_integer(bytes(source_bytes))
+        responses = list()
+        for _ in range(0, amount):
+            response, data = ActionResponseWithOptionalData.from_bytes(data)
+            responses.append(response)
+        return responses
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.RESPONSE_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(encode_variable_integer(len(self.responses)))
+        for response in self.responses:
+            out.extend(response.to_bytes())
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_response_header(
+            source_bytes, cls.TAG, cls.RESPONSE_TYPE
+        )
+        return cls(
+            responses=cls.parse_responses(data),
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionResponseWithPblock(AbstractXDlmsApdu):
+    """
+    A block of the response when the result of the action does not fit in one
+    APDU. The client should acknowledge it with an ActionRequestNextPblock.
+    The last block is sent as an ActionResponseLastPblock.
+    """
+
+    TAG: ClassVar[int] = 199
+    RESPONSE_TYPE: ClassVar[
+        enumerations.ActionResponseType
+    ] = enumerations.ActionResponseType.WITH_PBLOCK
+
+    data: bytes = attr.ib(validator=attr.validators.instance_of(bytes))
+    block_number: int = attr.ib(validator=attr.validators.instance_of(int), default=0)
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True)
+    )
+
+    LAST_BLOCK: ClassVar[bool] = False
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.RESPONSE_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(
+            DataBlockSA(
+                last_block=self.LAST_BLOCK,
+                block_number=self.block_number,
+                raw_data=self.data,
+            ).to_bytes()
+        )
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_response_header(
+            source_bytes, cls.TAG, cls.RESPONSE_TYPE
+        )
+        pblock = DataBlockSA.from_bytes(data)
+        if pblock.last_block != cls.LAST_BLOCK:
+            raise ValueError(
+                f"Last block is {pblock.last_block} which is not valid for a "
+                f"{cls.__name__}"
+            )
+        return cls(
+            data=bytes(pblock.raw_data),
+            block_number=pblock.block_number,
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionResponseLastPblock(ActionResponseWithPblock):
+    LAST_BLOCK: ClassVar[bool] = True
+
+
+@attr.s(auto_attribs=True)
+class ActionResponseNextPblock(AbstractXDlmsApdu):
+    """
+    The meter acknowledges a block of method invocation parameters and asks for
+    the next one.
+    """
+
+    TAG: ClassVar[int] = 199
+    RESPONSE_TYPE: ClassVar[
+        enumerations.ActionResponseType
+    ] = enumerations.ActionResponseType.NEXT_PBLOCK
+
+    block_number: int = attr.ib(validator=attr.validators.instance_of(int))
+    invoke_id_and_priority: InvokeIdAndPriority = attr.ib(
+        default=InvokeIdAndPriority(0, True, True)
+    )
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        out.append(self.TAG)
+        out.append(self.RESPONSE_TYPE.value)
+        out.extend(self.invoke_id_and_priority.to_bytes())
+        out.extend(self.block_number.to_bytes(4, "big"))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, source_bytes: bytes):
+        invoke_id_and_priority, data = parse_action_response_header(
+            source_bytes, cls.TAG, cls.RESPONSE_TYPE
+        )
+        if len(data) != 4:
+            raise ValueError(
+                f"ActionResponseNextPblock should only contain a 4 byte block number "
+                f"after the invoke id, got {len(data)} bytes"
+            )
+        return cls(
+            block_number=int.from_bytes(data, "big"),
+            invoke_id_and_priority=invoke_id_and_priority,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ActionResponseFactory:
     """
     Action-Response ::= CHOICE
     {
@@ -339,11 +879,11 @@ class ActionResponseFactory:
             raise ValueError(
                 f"Tag is not correct. Should be {ActionResponseFactory.TAG} but is {tag}"
             )
-        response_type = enumerations.ActionType(data.pop(0))
+        response_type = enumerations.ActionResponseType(data.pop(0))
 
         data.pop(0)  # Invoke id and priority that is not needed for parsing
 
-        if response_type == enumerations.ActionType.NORMAL:
+        if response_type == enumerations.ActionResponseType.NORMAL:
             data.pop(0)  # Action result status, not needed for parsing
             # check if it is an error or data response by assesing the choice.
             has_data = bool(data.pop(0))
@@ -353,10 +893,20 @@ class ActionResponseFactory:
                     return ActionResponseNormalWithData.from_bytes(source_bytes)
                 elif choice == 1:
                     return ActionResponseNormalWithError.from_bytes(source_bytes)
+                else:
+                    raise ValueError(f"{choice} is not a valid Get-Data-Result choice")
             else:
                 return ActionResponseNormal.from_bytes(source_bytes)
+        elif response_type == enumerations.ActionResponseType.WITH_PBLOCK:
+            last_block = bool(data.pop(0))
+            if last_block:
+                return ActionResponseLastPblock.from_bytes(source_bytes)
+            return ActionResponseWithPblock.from_bytes(source_bytes)
+        elif response_type == enumerations.ActionResponseType.WITH_LIST:
+            return ActionResponseWithList.from_bytes(source_bytes)
+        elif response_type == enumerations.ActionResponseType.NEXT_PBLOCK:
+            return ActionResponseNextPblock.from_bytes(source_bytes)
         else:
             raise NotImplementedError(
-                "Only implemented the ActionResponse Normal "
-                "class types is not implemented."
+                f"No class to support action response type {response_type}"
             )
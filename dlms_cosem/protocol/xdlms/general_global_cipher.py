@@ -3,7 +3,7 @@ from functools import partial
 import attr
 
 from dlms_cosem import a_xdr
-from dlms_cosem.dlms_data import OctetStringData
+from dlms_cosem.dlms_data import OctetStringData, encode_variable_integer
 from dlms_cosem.protocol.xdlms.base import AbstractXDlmsApdu
 from dlms_cosem.security import SecurityControlField, decrypt
 
@@ -66,13 +66,15 @@ class GeneralGlobalCipher(AbstractXDlmsApdu):
     def to_bytes(self) -> bytes:
         out = bytearray()
         out.append(self.TAG)
-        out.append(len(self.system_title))
+        out.extend(encode_variable_integer(len(self.system_title)))
         out.extend(self.system_title)
-        out.append(
-            len(
-                self.security_control.to_bytes()
-                + self.invocation_counter.to_bytes(4, "big")
-                + self.ciphered_text
+        out.extend(
+            encode_variable_integer(
+                len(
+                    self.security_control.to_bytes()
+                    + self.invocation_counter.to_bytes(4, "big")
+                    + self.ciphered_text
+                )
             )
         )
         out.extend(self.security_control.to_bytes())
@@ -91,3 +93,16 @@ class GeneralGlobalCipher(AbstractXDlmsApdu):
         )
 
         return bytes(plain_text)
+
+
+@attr.s(auto_attribs=True)
+class GeneralDedicatedCipher(GeneralGlobalCipher):
+    """
+    The general-ded-cipher APDU has the same structure as the general-glo-cipher
+    APDU but the ciphered text is protected with the dedicated key that the client
+    sent in the InitiateRequest of the AARQ. The dedicated key is only valid during
+    the association.
+    """
+
+    TAG = 220
+    NAME = "general-ded-cipher"
@@ -0,0 +1,21 @@
+"""
+Receiving pushed DataNotifications from meters.
+"""
+
+from dlms_cosem.push.decoder import (
+    PushDecoder,
+    PushDecodingError,
+    PushNotification,
+    ReplayError,
+    UnknownSystemTitleError,
+)
+from dlms_cosem.push.han import HanStatistics, HanStreamDecoder
+from dlms_cosem.push.keyring import (
+    CsvKeySource,
+    KeyRecord,
+    Keyring,
+    KeySource,
+    SqliteKeySource,
+)
+from dlms_cosem.push.schema import SchemaDecoder, SchemaStatistics
+from dlms_cosem.push.server import PushServer, PushStatistics
@@ -0,0 +1,136 @@
+import logging
+import time
+from typing import *
+
+import attr
+
+from dlms_cosem import exceptions, security, utils
+from dlms_cosem.protocol import xdlms
+from dlms_cosem.protocol.wrappers import WrapperHeader
+
+LOG = logging.getLogger(__name__)
+
+# Returns the security context to decrypt pushes from a system title, or None if the
+# meter is unknown. For example the get method of a dict of contexts.
+KeyLookup = Callable[[bytes], Optional[security.SecurityContext]]
+
+
+class PushDecodingError(Exception):
+    """A pushed APDU could not be decrypted or decoded"""
+
+
+class UnknownSystemTitleError(PushDecodingError):
+    """There are no keys for the system title of a ciphered push"""
+
+
+class ReplayError(PushDecodingError):
+    """The invocation counter of a ciphered push has been used before"""
+
+
+@attr.s(auto_attribs=True)
+class PushNotification:
+    """
+    A decoded DataNotification.
+
+    :param notification: The DataNotification APDU.
+    :param data: The decoded body of the notification, None if the body is not
+        decoded.
+    :param system_title: System title of the meter, if the push was ciphered.
+    :param invocation_counter: Invocation counter of the meter, if the push was
+        ciphered.
+    :param wrapper_header: Wrapper header the push was received with.
+    :param peer: Address the push was received from.
+    :param received_at: `time.time()` when the push was received.
+    """
+
+    notification: xdlms.DataNotification
+    data: Any
+    system_title: Optional[bytes] = attr.ib(default=None)
+    invocation_counter: Optional[int] = attr.ib(default=None)
+    wrapper_header: Optional[WrapperHeader] = attr.ib(default=None)
+    peer: Optional[Tuple[str, int]] = attr.ib(default=None)
+    received_at: float = attr.ib(factory=time.time)
+
+
+@attr.s(auto_attribs=True)
+class PushDecoder:
+    """
+    Decrypts and decodes pushed DataNotification APDUs, plain or protected with
+    general-glo-ciphering.
+
+    The keys are looked up on the system title in the GeneralGlobalCipher APDU. The
+    body is decoded with `body_decoder`, set it to None to only decode the APDU.
+
+    `check_invocation_counter` is called with the system title and invocation
+    counter of each ciphered push that could be decrypted, and should raise a
+    ReplayError if the invocation counter has been used before.
+    """
+
+    keys: Optional[KeyLookup] = attr.ib(default=None)
+    check_invocation_counter: Optional[Callable[[bytes, int], None]] = attr.ib(
+        default=None
+    )
+    body_decoder: Optional[Callable[[bytes], Any]] = attr.ib(
+        default=utils.parse_as_dlms_data
+    )
+
+    def decode(
+        self,
+        apdu: bytes,
+        wrapper_header: Optional[WrapperHeader] = None,
+        peer: Optional[Tuple[str, int]] = None,
+    ) -> PushNotification:
+        system_title = None
+        invocation_counter = None
+        try:
+            if apdu[0] == xdlms.GeneralGlobalCipher.TAG:
+                ciphered = xdlms.GeneralGlobalCipher.from_bytes(apdu)
+                system_title = bytes(ciphered.system_title)
+                invocation_counter = ciphered.invocation_counter
+                apdu = self.decrypt(ciphered, system_title)
+            notification = xdlms.DataNotification.from_bytes(apdu)
+            data = (
+                self.body_decoder(notification.body)
+                if self.body_decoder is not None
+                else None
+            )
+        except PushDecodingError:
+            raise
+        except (
+            exceptions.CryptographyError,
+            ValueError,
+            IndexError,
+            KeyError,
+            NotImplementedError,
+        ) as e:
+            raise PushDecodingError(
+                f"Could not decode push from {peer or 'unknown'}: {e!r}"
+            ) from e
+
+        return PushNotification(
+            notification=notification,
+            data=data,
+            system_title=system_title,
+            invocation_counter=invocation_counter,
+            wrapper_header=wrapper_header,
+            peer=peer,
+        )
+
+    def decrypt(
+        self, ciphered: xdlms.GeneralGlobalCipher, system_title: bytes
+    ) -> bytes:
+        context = self.keys(system_title) if self.keys else None
+        if context is None:
+            raise UnknownSystemTitleError(
+                f"No keys for system title {system_title.hex()}"
+            )
+        plain_text = context.decrypt(
+            ciphered.security_control,
+            system_title=system_title,
+            invocation_counter=ciphered.invocation_counter,
+            cipher_text=ciphered.ciphered_text,
+        )
+        # Only authenticated pushes may move the invocation counter.
+        if self.check_invocation_counter is not None:
+            self.check_invocation_counter(system_title, ciphered.invocation_counter)
+        return plain_text
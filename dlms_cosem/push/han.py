@@ -0,0 +1,162 @@
+"""
+Decoding of the continuous stream of pushes from the HAN (P1) port of a meter.
+"""
+
+import logging
+from typing import *
+
+import attr
+
+from dlms_cosem.clients.hdlc_transport import LLC_RESPONSE_HEADER
+from dlms_cosem.hdlc import exceptions as hdlc_exceptions
+from dlms_cosem.hdlc import frames
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+from dlms_cosem.push.decoder import PushDecoder, PushDecodingError, PushNotification
+from dlms_cosem.push.schema import SchemaDecoder
+
+LOG = logging.getLogger(__name__)
+
+READ_SIZE = 1024
+# Pushes on HAN ports are a few hundred bytes, with a margin for long profiles.
+MAX_APDU_LENGTH = 16384
+
+UNNUMBERED_INFORMATION = 0x03
+SEGMENTED = 0b00001000
+
+
+def make_decoder() -> PushDecoder:
+    return PushDecoder(body_decoder=SchemaDecoder())
+
+
+@attr.s(auto_attribs=True)
+class HanStatistics:
+    # HDLC frames found in the stream.
+    frames: int = attr.ib(default=0)
+    # Frames with incorrect FCS or that could not be read.
+    invalid_frames: int = attr.ib(default=0)
+    notifications: int = attr.ib(default=0)
+    # Notifications that were incomplete or could not be decrypted or decoded.
+    failed: int = attr.ib(default=0)
+
+
+@attr.s(auto_attribs=True)
+class HanStreamDecoder:
+    """
+    Decodes the DataNotifications a meter pushes on its HAN port, from a continuous
+    stream of bytes read from the serial port.
+
+    The HDLC frames are found with the HdlcFrameScanner, which resynchronises on
+    garbage and partial frames. Unnumbered information frames with correct FCS are put
+    together into APDUs, and each APDU is decoded with `decoder`. Ciphered pushes are
+    decrypted if the decoder has keys. By default the bodies are decoded with a
+    SchemaDecoder to (OBIS, value) pairs.
+
+    An APDU is dropped if one of its segments is lost, so a notification is never
+    decoded from parts of different pushes. When the first segment is lost the
+    following segments are dropped up to the last one, which is the frame without the
+    segmentation bit, or up to a frame starting a new APDU with the LLC header.
+    Memory is bounded by the longest HDLC frame and `max_apdu_length`.
+
+        decoder = HanStreamDecoder()
+        for push in decoder.read_stream(serial.Serial("/dev/ttyUSB0", 2400)):
+            print(push.data)
+    """
+
+    decoder: PushDecoder = attr.ib(factory=make_decoder)
+    max_apdu_length: int = attr.ib(default=MAX_APDU_LENGTH)
+    statistics: HanStatistics = attr.ib(factory=HanStatistics)
+
+    scanner: HdlcFrameScanner = attr.ib(init=False, factory=HdlcFrameScanner)
+    apdu: bytearray = attr.ib(init=False, factory=bytearray)
+    # A segment of the APDU being put together was lost.
+    apdu_lost: bool = attr.ib(init=False, default=False)
+    discarded_bytes: int = attr.ib(init=False, default=0)
+
+    def feed(self, data: bytes) -> List[PushNotification]:
+        """
+        Receives bytes from the stream and returns the notifications completed by
+        them.
+        """
+        self.scanner.receive_data(data)
+        out = list()
+        while True:
+            frame_bytes = self.scanner.next_frame_bytes()
+            if frame_bytes is None:
+                return out
+            push = self.receive_frame(frame_bytes)
+            if push is not None:
+                out.append(push)
+
+    def read_stream(
+        self, stream: BinaryIO, read_size: int = READ_SIZE
+    ) -> Iterator[PushNotification]:
+        """
+        Reads from the stream and yields the notifications until it returns no data.
+
+        A serial port is read for the bytes waiting, and at least one byte, so it is
+        blocked on while the meter is quiet. Open it without a timeout to read forever.
+        """
+        while True:
+            data = stream.read(getattr(stream, "in_waiting", read_size) or 1)
+            if not data:
+                return
+            yield from self.feed(data)
+
+    def receive_frame(self, frame_bytes: bytes) -> Optional[PushNotification]:
+        self.statistics.frames += 1
+        if self.scanner.discarded_bytes != self.discarded_bytes:
+            # The dropped bytes could have been a segment.
+            self.discarded_bytes = self.scanner.discarded_bytes
+            self.segment_lost()
+
+        if not frames.FCS.verify(frame_bytes, 1, -1):
+            LOG.debug(f"Dropping HAN frame with incorrect FCS: {frame_bytes!r}")
+            self.statistics.invalid_frames += 1
+            self.segment_lost()
+            return None
+        try:
+            position = frames.control_field_position(frame_bytes)
+        except hdlc_exceptions.HdlcParsingError as e:
+            LOG.debug(f"Dropping HAN frame {frame_bytes!r}: {e}")
+            self.statistics.invalid_frames += 1
+            self.segment_lost()
+            return None
+        # The information field is after the control field and the HCS.
+        if (
+            frame_bytes[position] & 0b11101111 != UNNUMBERED_INFORMATION
+            or len(frame_bytes) <= position + 6
+        ):
+            return None
+
+        information = frame_bytes[position + 3 : -3]
+        if not self.apdu and information.startswith(LLC_RESPONSE_HEADER):
+            information = information[len(LLC_RESPONSE_HEADER) :]
+            # A new APDU starts, so a segment lost before belonged to an earlier one.
+            self.apdu_lost = False
+        if len(self.apdu) + len(information) > self.max_apdu_length:
+            LOG.warning(f"Dropping HAN APDU longer than {self.max_apdu_length} bytes")
+            self.apdu = bytearray()
+            self.apdu_lost = True
+        elif not self.apdu_lost:
+            self.apdu += information
+        if frame_bytes[1] & SEGMENTED:
+            return None
+
+        apdu, lost = bytes(self.apdu), self.apdu_lost
+        self.apdu = bytearray()
+        self.apdu_lost = False
+        if lost:
+            LOG.warning("Dropping HAN notification with a lost segment")
+            self.statistics.failed += 1
+            return None
+        try:
+            push = self.decoder.decode(apdu)
+        except PushDecodingError as e:
+            LOG.warning(str(e))
+            self.statistics.failed += 1
+            return None
+        self.statistics.notifications += 1
+        return push
+
+    def segment_lost(self):
+        self.apdu_lost = True
@@ -0,0 +1,272 @@
+"""
+Keys of many meters, looked up on the system title of ciphered pushes.
+"""
+
+import abc
+import asyncio
+import csv
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import *
+
+import attr
+
+from dlms_cosem import security
+from dlms_cosem.push.decoder import PushDecoder, ReplayError
+
+LOG = logging.getLogger(__name__)
+
+
+def to_bytes(value: Union[bytes, str]) -> bytes:
+    """Keys and system titles are stored as bytes or as hex strings."""
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    return bytes(value)
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class KeyRecord:
+    """
+    The keys of a meter. Kept small as there is one per meter.
+    """
+
+    encryption_key: bytes = attr.ib(repr=False)
+    authentication_key: bytes = attr.ib(repr=False)
+    security_suite: int = attr.ib(default=0)
+
+    def make_context(self) -> security.SecurityContext:
+        return security.SecurityContext(
+            security_suite=self.security_suite,
+            key=self.encryption_key,
+            auth_key=self.authentication_key,
+        )
+
+
+class KeySource(abc.ABC):
+    """
+    Where the keys of a keyring are loaded from.
+    """
+
+    @abc.abstractmethod
+    def load(self) -> Dict[bytes, KeyRecord]:
+        """Returns the key records keyed on system title."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def version(self) -> Any:
+        """Changes when the keys have changed."""
+        raise NotImplementedError()
+
+
+def file_version(*paths: str) -> Tuple[Tuple[int, int], ...]:
+    versions = list()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            versions.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            versions.append((0, 0))
+    return tuple(versions)
+
+
+@attr.s(auto_attribs=True)
+class CsvKeySource(KeySource):
+    """
+    Keys in a CSV file, one meter per line with the system title, the encryption
+    key, the authentication key and optionally the security suite, all hex encoded:
+
+        4D4D4D0000BC614E,000102030405060708090A0B0C0D0E0F,D0D1D2D3D4D5D6D7D8D9DADBDCDDDEDF
+
+    Empty lines and lines starting with # are skipped.
+    """
+
+    path: str
+
+    def load(self) -> Dict[bytes, KeyRecord]:
+        records = dict()
+        with open(self.path, newline="") as file:
+            for line_number, row in enumerate(csv.reader(file), start=1):
+                if not row or row[0].startswith("#"):
+                    continue
+                try:
+                    records[bytes.fromhex(row[0])] = KeyRecord(
+                        encryption_key=bytes.fromhex(row[1]),
+                        authentication_key=bytes.fromhex(row[2]),
+                        security_suite=int(row[3]) if len(row) > 3 else 0,
+                    )
+                except (ValueError, IndexError) as e:
+                    raise ValueError(
+                        f"Invalid key record on line {line_number} of {self.path}"
+                    ) from e
+        return records
+
+    def version(self) -> Any:
+        return file_version(self.path)
+
+
+@attr.s(auto_attribs=True)
+class SqliteKeySource(KeySource):
+    """
+    Keys in a SQLite table with the columns system_title, encryption_key,
+    authentication_key and security_suite. Keys and system titles can be stored as
+    blobs or hex encoded text.
+    """
+
+    path: str
+    table: str = attr.ib(default="meter_keys")
+
+    def load(self) -> Dict[bytes, KeyRecord]:
+        connection = sqlite3.connect(self.path)
+        try:
+            # Columns: system title, keys and security suite.
+            rows = connection.execute(
+                f"SELECT system_title, encryption_key, authentication_key, "
+                f"security_suite FROM {self.table}"
+            )
+            return {
+                to_bytes(row[0]): KeyRecord(
+                    encryption_key=to_bytes(row[1]),
+                    authentication_key=to_bytes(row[2]),
+                    security_suite=row[3] or 0,
+                )
+                for row in rows
+            }
+        finally:
+            connection.close()
+
+    def version(self) -> Any:
+        # Changes are in the write-ahead log until it is checkpointed.
+        return file_version(self.path, self.path + "-wal")
+
+
+@attr.s(auto_attribs=True)
+class Keyring:
+    """
+    Keys of many meters, looked up on system title.
+
+    The keys are kept as small records and security contexts, with their set up
+    ciphers, are made for the `max_contexts` most recently used meters.
+
+    The keys can be loaded from a `KeySource` and reloaded while running. The last
+    invocation counter of each meter is tracked to reject replayed pushes, and is kept
+    when the keys are reloaded.
+
+        keyring = Keyring(source=CsvKeySource("keys.csv"))
+        keyring.reload()
+        server = PushServer(decoder=keyring.push_decoder())
+    """
+
+    source: Optional[KeySource] = attr.ib(default=None)
+    max_contexts: int = attr.ib(default=10000)
+    records: Dict[bytes, KeyRecord] = attr.ib(factory=dict, repr=False)
+    contexts: Dict[bytes, security.SecurityContext] = attr.ib(
+        init=False, factory=OrderedDict, repr=False
+    )
+    invocation_counters: Dict[bytes, int] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+    source_version: Any = attr.ib(init=False, default=None)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, system_title: bytes, record: KeyRecord):
+        self.records[system_title] = record
+        self.contexts.pop(system_title, None)
+
+    def remove(self, system_title: bytes):
+        self.records.pop(system_title, None)
+        self.contexts.pop(system_title, None)
+
+    def context(self, system_title: bytes) -> Optional[security.SecurityContext]:
+        """
+        Returns the security context of the meter, or None if the meter is unknown.
+        """
+        context = self.contexts.get(system_title)
+        if context is not None:
+            self.contexts.move_to_end(system_title)
+            return context
+        record = self.records.get(system_title)
+        if record is None:
+            return None
+        context = record.make_context()
+        self.contexts[system_title] = context
+        if len(self.contexts) > self.max_contexts:
+            self.contexts.popitem(last=False)
+        return context
+
+    def check_invocation_counter(self, system_title: bytes, invocation_counter: int):
+        """
+        Raises a ReplayError if the invocation counter is not higher than the last
+        one received from the meter.
+        """
+        last = self.invocation_counters.get(system_title)
+        if last is not None and invocation_counter <= last:
+            raise ReplayError(
+                f"Invocation counter {invocation_counter} of {system_title.hex()} is "
+                f"not higher than the last received {last}"
+            )
+        self.invocation_counters[system_title] = invocation_counter
+
+    def push_decoder(self, **kwargs) -> PushDecoder:
+        """
+        Returns a PushDecoder using the keyring. Other keyword arguments are passed
+        to the decoder.
+        """
+        return PushDecoder(
+            keys=self.context,
+            check_invocation_counter=self.check_invocation_counter,
+            **kwargs,
+        )
+
+    def reload(self):
+        """
+        Loads the keys from the source again.
+        """
+        if self.source is None:
+            raise ValueError("The keyring has no source to load keys from")
+        version = self.source.version()
+        self.replace(self.source.load(), version)
+
+    def replace(self, records: Dict[bytes, KeyRecord], source_version: Any = None):
+        """
+        Replaces all keys. Contexts of meters with unchanged keys are kept.
+        """
+        contexts = OrderedDict(
+            (system_title, context)
+            for system_title, context in self.contexts.items()
+            if records.get(system_title) == self.records.get(system_title)
+        )
+        # Swapped in one go so lookups never see partly loaded keys.
+        self.records, self.contexts = records, contexts
+        self.source_version = source_version
+        LOG.info(f"Loaded keys of {len(records)} meters")
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the keys if the source has changed. Returns True if it was reloaded.
+        """
+        if self.source is None or self.source.version() == self.source_version:
+            return False
+        self.reload()
+        return True
+
+    async def watch(self, interval: float = 10.0):
+        """
+        Reloads the keys when the source changes, checking every `interval` seconds.
+        The keys are loaded in a thread so the event loop is not blocked.
+        """
+        if self.source is None:
+            raise ValueError("The keyring has no source to load keys from")
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                version = await loop.run_in_executor(None, self.source.version)
+                if version != self.source_version:
+                    records = await loop.run_in_executor(None, self.source.load)
+                    self.replace(records, version)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                LOG.warning(f"Could not reload keys: {e!r}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,274 @@
+"""
+Decoding of notification bodies that have the same structure every time.
+"""
+
+import functools
+import logging
+import operator
+from collections import OrderedDict
+from typing import *
+
+import attr
+
+from dlms_cosem import dlms_data, utils
+from dlms_cosem.cosem import Obis
+
+LOG = logging.getLogger(__name__)
+
+OBIS_LENGTH = 6
+
+# Different bodies of the same length are rare, a few are kept for each length.
+MAX_SCHEMAS_PER_LENGTH = 4
+
+SIGNED_INTEGERS = (
+    dlms_data.IntegerData,
+    dlms_data.LongData,
+    dlms_data.DoubleLongData,
+    dlms_data.Long64Data,
+)
+UNSIGNED_INTEGERS = (
+    dlms_data.UnsignedIntegerData,
+    dlms_data.UnsignedLongData,
+    dlms_data.DoubleLongUnsignedData,
+    dlms_data.UnsignedLong64Data,
+    dlms_data.EnumData,
+)
+CONTAINERS = (dlms_data.DataArray, dlms_data.DataStructure)
+
+# Converts the bytes of an element to the value parse_as_dlms_data would give.
+Converter = Callable[[bytes], Any]
+
+
+def make_converter(data_class: Type, bit_length: int = 0) -> Converter:
+    if data_class in SIGNED_INTEGERS:
+        return functools.partial(int.from_bytes, byteorder="big", signed=True)
+    if data_class in UNSIGNED_INTEGERS:
+        return functools.partial(int.from_bytes, byteorder="big")
+    if data_class is dlms_data.OctetStringData:
+        return bytes
+    if data_class in CONTAINERS:
+        # Converted from the whole element, tag and length included.
+        return utils.parse_as_dlms_data
+    if data_class is dlms_data.BitStringData:
+        return lambda value: data_class.from_bytes(value).value[:bit_length]
+    return lambda value: data_class.from_bytes(value).to_python()
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class Element:
+    """A DLMS data element found while learning a body."""
+
+    data_class: Type
+    start: int
+    # Where the value starts, after the tag and length. Containers are converted
+    # from the whole element so it is the start for them.
+    value_start: int
+    end: int
+    bit_length: int = attr.ib(default=0)
+
+    @property
+    def is_obis(self) -> bool:
+        return (
+            self.data_class is dlms_data.OctetStringData
+            and self.end - self.value_start == OBIS_LENGTH
+        )
+
+
+@attr.s(auto_attribs=True)
+class SkeletonWalker:
+    """
+    Walks the DLMS data elements of a body and records the positions of the bytes
+    that decide its structure: tags, lengths and OBIS codes.
+    """
+
+    body: bytes
+    positions: List[int] = attr.ib(factory=list)
+    fields: List[Tuple[str, int, int, Converter]] = attr.ib(factory=list)
+
+    def walk(self):
+        if not self.body:
+            raise ValueError("Can not learn the structure of an empty body")
+        position = 0
+        elements = list()
+        while position < len(self.body):
+            element = self.element(position)
+            elements.append(element)
+            position = element.end
+        self.pair(elements)
+
+    def element(self, position: int) -> Element:
+        start = position
+        self.positions.append(position)
+        tag = self.byte(position)
+        try:
+            data_class = dlms_data.DlmsDataFactory.get_data_class(tag)
+        except KeyError:
+            raise ValueError(f"Unknown DLMS data tag {tag} at {position}")
+        position += 1
+
+        if data_class in CONTAINERS:
+            count, position = self.length(position)
+            children = list()
+            for _ in range(0, count):
+                child = self.element(position)
+                children.append(child)
+                position = child.end
+            self.pair(children)
+            return Element(data_class, start, start, position)
+
+        bit_length = 0
+        if data_class is dlms_data.BitStringData:
+            bit_length, position = self.length(position)
+            length = dlms_data.BitStringData.byte_length(bit_length)
+        elif data_class.LENGTH == dlms_data.VARIABLE_LENGTH:
+            length, position = self.length(position)
+        else:
+            length = data_class.LENGTH
+        end = position + length
+        if end > len(self.body):
+            raise ValueError(f"Body is too short for the element at {position}")
+        return Element(data_class, start, position, end, bit_length)
+
+    def length(self, position: int) -> Tuple[int, int]:
+        """Reads a variable length integer. Returns it and the position after it."""
+        self.positions.append(position)
+        first = self.byte(position)
+        if not first & 0b10000000:
+            return first, position + 1
+        byte_count = first & 0b01111111
+        for index in range(1, byte_count + 1):
+            self.positions.append(position + index)
+            self.byte(position + index)
+        value = int.from_bytes(
+            self.body[position + 1 : position + 1 + byte_count], "big"
+        )
+        return value, position + 1 + byte_count
+
+    def byte(self, position: int) -> int:
+        if position >= len(self.body):
+            raise ValueError(f"Body is too short for the element at {position}")
+        return self.body[position]
+
+    def pair(self, elements: List[Element]):
+        """
+        An OBIS code is paired with the element right after it, both when they are
+        the first two elements of a structure and when a structure has many OBIS
+        codes and values one after the other.
+        """
+        index = 0
+        while index < len(elements) - 1:
+            obis = elements[index]
+            if not obis.is_obis:
+                index += 1
+                continue
+            value = elements[index + 1]
+            key_bytes = self.body[obis.value_start : obis.end]
+            self.positions.extend(range(obis.value_start, obis.end))
+            self.fields.append(
+                (
+                    Obis.from_bytes(key_bytes).to_string(),
+                    value.value_start,
+                    value.end,
+                    make_converter(value.data_class, value.bit_length),
+                )
+            )
+            index += 2
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class BodySchema:
+    """
+    The compiled structure of a notification body.
+
+    A body matches the schema if it has the same length and the same bytes where
+    the schema has tags, lengths and OBIS codes. The elements of a matching body are
+    then at the same positions and the values are converted straight from the
+    bytes.
+    """
+
+    length: int
+    skeleton: Any
+    get_skeleton: Callable[[bytes], Any] = attr.ib(repr=False)
+    fields: Tuple[Tuple[str, int, int, Converter], ...] = attr.ib(repr=False)
+
+    @classmethod
+    def learn(cls, body: bytes) -> "BodySchema":
+        walker = SkeletonWalker(body=body)
+        walker.walk()
+        get_skeleton = operator.itemgetter(*walker.positions)
+        return cls(
+            length=len(body),
+            skeleton=get_skeleton(body),
+            get_skeleton=get_skeleton,
+            fields=tuple(walker.fields),
+        )
+
+    def matches(self, body: bytes) -> bool:
+        return len(body) == self.length and self.get_skeleton(body) == self.skeleton
+
+    def extract(self, body: bytes) -> List[Tuple[str, Any]]:
+        return [
+            (key, convert(body[start:end])) for key, start, end, convert in self.fields
+        ]
+
+
+@attr.s(auto_attribs=True)
+class SchemaStatistics:
+    # Bodies decoded with a known schema.
+    hits: int = attr.ib(default=0)
+    # Bodies that a schema had to be learnt for.
+    learnt: int = attr.ib(default=0)
+
+
+@attr.s(auto_attribs=True)
+class SchemaDecoder:
+    """
+    Decodes notification bodies to a list of (OBIS, value) pairs, with the OBIS codes
+    in string form like "1-0:1.7.0.255".
+
+    Meters of the same model push bodies with the same structure every time, only
+    the values change. The structure of a body is learnt the first time it is seen
+    and later bodies with the same structure are decoded without parsing them. A
+    body with another structure is learnt as new, so a changed structure never gives
+    values from the wrong positions.
+
+    An octet string of six bytes is taken as the OBIS code of the element after it,
+    other elements are not returned. Use it as the body decoder of a PushDecoder:
+
+        decoder = PushDecoder(keys=contexts.get, body_decoder=SchemaDecoder())
+    """
+
+    max_schemas: int = attr.ib(default=1000)
+    schemas: Dict[int, List[BodySchema]] = attr.ib(
+        init=False, factory=OrderedDict, repr=False
+    )
+    statistics: SchemaStatistics = attr.ib(init=False, factory=SchemaStatistics)
+
+    def __call__(self, body: bytes) -> List[Tuple[str, Any]]:
+        return self.decode(body)
+
+    def decode(self, body: bytes) -> List[Tuple[str, Any]]:
+        body = bytes(body)
+        schemas = self.schemas.get(len(body))
+        if schemas is not None:
+            self.schemas.move_to_end(len(body))
+            for schema in schemas:
+                if schema.matches(body):
+                    self.statistics.hits += 1
+                    return schema.extract(body)
+        return self.learn(body).extract(body)
+
+    def learn(self, body: bytes) -> BodySchema:
+        schema = BodySchema.learn(body)
+        LOG.debug(
+            f"Learnt the structure of a {len(body)} byte body with "
+            f"{len(schema.fields)} values"
+        )
+        self.statistics.learnt += 1
+        schemas = self.schemas.setdefault(len(body), list())
+        schemas.insert(0, schema)
+        del schemas[MAX_SCHEMAS_PER_LENGTH:]
+        self.schemas.move_to_end(len(body))
+        if len(self.schemas) > self.max_schemas:
+            self.schemas.popitem(last=False)
+        return schema
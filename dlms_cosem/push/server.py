@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from typing import *
+
+import attr
+
+from dlms_cosem.protocol.wrappers import DlmsUdpMessage, WrapperHeader
+from dlms_cosem.push.decoder import PushDecoder, PushDecodingError, PushNotification
+
+LOG = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+WRAPPER_HEADER_LENGTH = 8
+WRAPPER_VERSION = 1
+# Pushes are a few kB at most, with a margin for long profiles.
+MAX_APDU_LENGTH = 16384
+
+
+@attr.s(auto_attribs=True)
+class PushStatistics:
+    received: int = attr.ib(default=0)
+    delivered: int = attr.ib(default=0)
+    # Pushes that could not be decrypted or decoded.
+    failed: int = attr.ib(default=0)
+    # UDP pushes dropped because the queue was full.
+    dropped: int = attr.ib(default=0)
+
+
+@attr.s(auto_attribs=True)
+class UdpPushProtocol(asyncio.DatagramProtocol):
+    server: "PushServer"
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        self.server.udp_message_received(data, addr)
+
+    def error_received(self, exc: Exception):
+        LOG.warning(f"UDP push listener error: {exc!r}")
+
+
+@attr.s(auto_attribs=True)
+class PushServer:
+    """
+    Receives pushed DataNotifications from meters with the DLMS IP wrapper, over TCP
+    from many concurrent connections and over UDP.
+
+    Decoded pushes are put on `queue`, or passed to `handler` if it is set. With the
+    queue, TCP connections are not read while the queue is full so the meters are
+    slowed down by TCP flow control. UDP has no flow control so UDP pushes are dropped
+    when the queue is full. The handler is called in the event loop and should return
+    quickly, the connections are not read while it runs.
+
+    TCP connections announcing an APDU longer than `max_apdu_length` are closed, so a
+    peer can't make the server buffer more than that per connection.
+
+        server = PushServer(decoder=PushDecoder(keys=contexts.get))
+        await server.serve_tcp(port=4059)
+        await server.serve_udp(port=4059)
+        while True:
+            push = await server.queue.get()
+    """
+
+    decoder: PushDecoder = attr.ib(factory=PushDecoder)
+    handler: Optional[Callable[[PushNotification], None]] = attr.ib(default=None)
+    host: str = attr.ib(default="0.0.0.0")
+    max_queue_size: int = attr.ib(default=10000)
+    max_apdu_length: int = attr.ib(default=MAX_APDU_LENGTH)
+    statistics: PushStatistics = attr.ib(factory=PushStatistics)
+
+    # Created when serving so they belong to the running event loop.
+    queue: Optional[asyncio.Queue] = attr.ib(init=False, default=None)
+    servers: List[asyncio.AbstractServer] = attr.ib(init=False, factory=list)
+    udp_transports: List[asyncio.DatagramTransport] = attr.ib(init=False, factory=list)
+    connections: Set[asyncio.Future] = attr.ib(init=False, factory=set)
+
+    def setup_queue(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+    async def serve_tcp(self, port: int = 4059) -> int:
+        """
+        Listens for pushes over TCP. Returns the port listened on.
+        """
+        self.setup_queue()
+
+        def client_connected(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ):
+            connection = asyncio.ensure_future(self.handle_tcp(reader, writer))
+            self.connections.add(connection)
+            connection.add_done_callback(self.connections.discard)
+
+        server = await asyncio.start_server(client_connected, self.host, port)
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def serve_udp(self, port: int = 4059) -> int:
+        """
+        Listens for pushes over UDP. Returns the port listened on.
+        """
+        self.setup_queue()
+        transport, _ = await asyncio.get_event_loop().create_datagram_endpoint(
+            lambda: UdpPushProtocol(self), local_addr=(self.host, port)
+        )
+        self.udp_transports.append(transport)
+        return transport.get_extra_info("sockname")[1]
+
+    async def handle_tcp(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Reads wrapped APDUs from a TCP connection. Several APDUs in one read are
+        handled without reading again.
+        """
+        peer = writer.get_extra_info("peername")
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    return
+                buffer += data
+                position = 0
+                while len(buffer) - position >= WRAPPER_HEADER_LENGTH:
+                    header = WrapperHeader.from_bytes(
+                        bytes(buffer[position : position + WRAPPER_HEADER_LENGTH])
+                    )
+                    if header.version != WRAPPER_VERSION:
+                        # The stream can't be synchronised again.
+                        LOG.warning(
+                            f"Closing push connection from {peer}, received wrapper "
+                            f"version {header.version}"
+                        )
+                        return
+                    if header.length > self.max_apdu_length:
+                        self.statistics.received += 1
+                        self.statistics.failed += 1
+                        LOG.warning(
+                            f"Closing push connection from {peer}, announced APDU of "
+                            f"{header.length} bytes is longer than "
+                            f"{self.max_apdu_length}"
+                        )
+                        return
+                    end = position + WRAPPER_HEADER_LENGTH + header.length
+                    if end > len(buffer):
+                        break
+                    apdu = bytes(buffer[position + WRAPPER_HEADER_LENGTH : end])
+                    position = end
+                    push = self.decode(apdu, header, peer)
+                    if push is not None:
+                        await self.deliver(push)
+                del buffer[:position]
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def udp_message_received(self, data: bytes, peer: Tuple[str, int]):
+        try:
+            message = DlmsUdpMessage.from_bytes(data)
+        except ValueError as e:
+            self.statistics.received += 1
+            self.statistics.failed += 1
+            LOG.warning(f"Invalid UDP push from {peer}: {e!r}")
+            return
+        push = self.decode(message.data, message.wrapper_header, peer)
+        if push is None:
+            return
+        if self.handler is not None:
+            self.handler(push)
+        else:
+            try:
+                self.queue.put_nowait(push)
+            except asyncio.QueueFull:
+                self.statistics.dropped += 1
+                return
+        self.statistics.delivered += 1
+
+    def decode(
+        self, apdu: bytes, header: WrapperHeader, peer: Tuple[str, int]
+    ) -> Optional[PushNotification]:
+        self.statistics.received += 1
+        try:
+            return self.decoder.decode(apdu, header, peer)
+        except PushDecodingError as e:
+            self.statistics.failed += 1
+            LOG.warning(str(e))
+            return None
+
+    async def deliver(self, push: PushNotification):
+        if self.handler is not None:
+            self.handler(push)
+        else:
+            await self.queue.put(push)
+        self.statistics.delivered += 1
+
+    async def close(self):
+        """
+        Stops listening and closes all open connections.
+        """
+        for server in self.servers:
+            server.close()
+        for server in self.servers:
+            await server.wait_closed()
+        self.servers = []
+        for transport in self.udp_transports:
+            transport.close()
+        self.udp_transports = []
+        connections = list(self.connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
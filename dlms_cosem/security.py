@@ -1,6 +1,10 @@
+import functools
+from typing import *
+
 import attr
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.keywrap import aes_key_unwrap, aes_key_wrap
 
 from dlms_cosem.exceptions import CipheringError, DecryptionError
@@ -20,6 +24,9 @@ The initialization vector is essentially a nonce. In DLMS/COSEM it is
 """
 
 TAG_LENGTH = 12
+# Security contexts kept by the module level encrypt, decrypt and gmac functions.
+# They hold the keys until they are evicted or `clear_cached_contexts` is called.
+MAX_CACHED_CONTEXTS = 256
 
 
 def validate_security_suite_number(instance, attribute, value):
@@ -85,11 +92,229 @@ def validate_key(suite: int, key: bytes) -> None:
         )
 
 
+def make_initialization_vector(system_title: bytes, invocation_counter: int) -> bytes:
+    """
+    The initialization vector is 12 bytes long and consists of the system_title
+    (8 bytes) and invocation_counter (4 bytes)
+    """
+    if len(system_title) != 8:
+        raise ValueError(f"System Title must be of lenght 8, not {len(system_title)}")
+    return system_title + invocation_counter.to_bytes(4, "big")
+
+
 # TODO: Is there a reason to support only encrypted or only authenthicated data?
 #   only encrypted: additonal_data = b"". Dont add tag.
 #   only authenticated: additional_data = security_control + auth_key + plain_text
 
 
+@attr.s(auto_attribs=True)
+class SecurityContext:
+    """
+    Holds the ciphers for a key, authentication key and security suite so that they
+    can be reused between calls. The keys are validated once when the context is
+    created.
+
+    Encryption and GMAC uses an AESGCM instance that is set up once. AESGCM only
+    verifies full length tags so decryption of the 12 byte DLMS tags is done with a
+    GCM cipher using the cached AES algorithm.
+
+    :param int security_suite: Security suite the keys are used with.
+    :param bytes key: Encryption key, global or dedicated.
+    :param bytes auth_key: Authentication key.
+    """
+
+    security_suite: int = attr.ib(validator=[validate_security_suite_number])
+    key: bytes = attr.ib(repr=False)
+    auth_key: bytes = attr.ib(repr=False)
+    aesgcm: AESGCM = attr.ib(init=False, repr=False)
+    algorithm: algorithms.AES = attr.ib(init=False, repr=False)
+    # The associated data starts with the security control byte and the
+    # authentication key. Made once for the security controls of ciphered APDUs and
+    # of GMAC.
+    associated_data_prefixes: Dict[bytes, bytes] = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        # Making sure the keys are of correct length for specified security suite
+        validate_key(self.security_suite, self.key)
+        validate_key(self.security_suite, self.auth_key)
+        self.aesgcm = AESGCM(self.key)
+        self.algorithm = algorithms.AES(self.key)
+        self.associated_data_prefixes = dict()
+        for encrypted in (True, False):
+            control = SecurityControlField(
+                security_suite=self.security_suite,
+                authenticated=True,
+                encrypted=encrypted,
+            ).to_bytes()
+            self.associated_data_prefixes[control] = control + self.auth_key
+
+    def associated_data_prefix(self, security_control: SecurityControlField) -> bytes:
+        control = security_control.to_bytes()
+        prefix = self.associated_data_prefixes.get(control)
+        if prefix is None:
+            prefix = control + self.auth_key
+        return prefix
+
+    def validate_security_control(self, security_control: SecurityControlField):
+        if security_control.security_suite != self.security_suite:
+            raise ValueError(
+                f"Security control uses security suite "
+                f"{security_control.security_suite} but the security context is set "
+                f"up for security suite {self.security_suite}"
+            )
+
+    def encrypt(
+        self,
+        security_control: SecurityControlField,
+        system_title: bytes,
+        invocation_counter: int,
+        plain_text: bytes,
+    ) -> bytes:
+        """
+        Encrypts bytes according the to security context.
+        """
+        if not security_control.encrypted and not security_control.authenticated:
+            raise NotImplementedError("encrypt() only handles authenticated encryption")
+        self.validate_security_control(security_control)
+
+        iv = make_initialization_vector(system_title, invocation_counter)
+
+        # associated_data will be authenticated but not encrypted,
+        # it must also be passed in on decryption.
+        associated_data = self.associated_data_prefix(security_control)
+
+        # AESGCM returns the ciphertext with the 16 byte tag appended. DLMS uses a tag
+        # length of 12, truncating the GCM tag is allowed.
+        ciphered = self.aesgcm.encrypt(iv, plain_text, associated_data)
+        return ciphered[: len(plain_text) + TAG_LENGTH]
+
+    def encrypt_many(
+        self,
+        security_control: SecurityControlField,
+        system_title: bytes,
+        items: Iterable[Tuple[int, bytes]],
+    ) -> List[bytes]:
+        """
+        Encrypts several plain texts. `items` are tuples of invocation counter and
+        plain text.
+        """
+        return [
+            self.encrypt(security_control, system_title, invocation_counter, plain_text)
+            for invocation_counter, plain_text in items
+        ]
+
+    def decrypt(
+        self,
+        security_control: SecurityControlField,
+        system_title: bytes,
+        invocation_counter: int,
+        cipher_text: bytes,
+    ) -> bytes:
+        """
+        Decrypts bytes according to the security context.
+        """
+        if not security_control.encrypted and not security_control.authenticated:
+            raise NotImplementedError("encrypt() only handles authenticated encryption")
+        self.validate_security_control(security_control)
+
+        iv = make_initialization_vector(system_title, invocation_counter)
+
+        # extract the tag from the end of the cipher_text
+        tag = cipher_text[-TAG_LENGTH:]
+        ciphertext = cipher_text[:-TAG_LENGTH]
+        try:
+            # Construct a decryptor with the iv, and additionally the
+            # GCM tag used for authenticating the message.
+            decryptor = Cipher(
+                self.algorithm, modes.GCM(iv, tag, min_tag_length=TAG_LENGTH)
+            ).decryptor()
+
+            # We put associated_data back in or the tag will fail to verify
+            # when we finalize the decryptor.
+            decryptor.authenticate_additional_data(
+                self.associated_data_prefix(security_control)
+            )
+
+            # Decryption gets us the authenticated plaintext.
+            # If the tag does not match an InvalidTag exception will be raised.
+            return decryptor.update(ciphertext) + decryptor.finalize()
+        except InvalidTag:
+            raise DecryptionError(
+                "Unable to decrypt ciphertext. Authentication tag is not valid. "
+                "Ciphered text might have been tampered with or key, auth key, "
+                "security control or invocation counter is wrong"
+            )
+
+    def decrypt_many(
+        self,
+        security_control: SecurityControlField,
+        system_title: bytes,
+        items: Iterable[Tuple[int, bytes]],
+    ) -> List[bytes]:
+        """
+        Decrypts several ciphered texts. `items` are tuples of invocation counter and
+        ciphered text. A DecryptionError is raised on the first text that can't be
+        authenticated.
+        """
+        return [
+            self.decrypt(security_control, system_title, invocation_counter, text)
+            for invocation_counter, text in items
+        ]
+
+    def gmac(
+        self,
+        security_control: SecurityControlField,
+        system_title: bytes,
+        invocation_counter: int,
+        challenge: bytes,
+    ) -> bytes:
+        """
+        GMAC is quite simply GCM mode where all data is supplied as additional
+        authenticated data.
+        If the GCM input is restricted to data that is not to be encrypted, the
+        resulting specialization of GCM, called GMAC, is simply an authentication mode
+        on the input data.
+        """
+        if security_control.encrypted:
+            raise CipheringError(
+                "Security for GMAC is set to encrypted, but this is not a "
+                "valid choice since GMAC only authenticates  "
+            )
+        self.validate_security_control(security_control)
+
+        iv = make_initialization_vector(system_title, invocation_counter)
+
+        # associated_data will be authenticated but not encrypted,
+        # so we put all data in the associated data.
+        associated_data = self.associated_data_prefix(security_control) + challenge
+
+        # Encrypting an empty plain text only returns the tag. We want the tag as it
+        # is the authenticated data. Need to truncated it first
+        return self.aesgcm.encrypt(iv, b"", associated_data)[:TAG_LENGTH]
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_CONTEXTS)
+def cached_context(security_suite: int, key: bytes, auth_key: bytes) -> SecurityContext:
+    """
+    Returns a security context for the keys, reused between calls with the same keys.
+    The contexts of the last `MAX_CACHED_CONTEXTS` keys used are kept, together with
+    the keys, until `clear_cached_contexts` is called.
+
+    Connections and push decoders keep their own contexts. Only the module level
+    encrypt, decrypt and gmac functions use this cache.
+    """
+    return SecurityContext(security_suite, key, auth_key)
+
+
+def clear_cached_contexts():
+    """
+    Drops the security contexts, and the keys they hold, cached by the module level
+    encrypt, decrypt and gmac functions. Call it when keys are rotated or no longer
+    used.
+    """
+    cached_context.cache_clear()
+
+
 def encrypt(
     security_control: SecurityControlField,
     system_title: bytes,
@@ -100,43 +325,11 @@ def encrypt(
 ) -> bytes:
     """
     Encrypts bytes according the to security context.
+    The security context of the keys is cached, see `cached_context`.
     """
-
-    if not security_control.encrypted and not security_control.authenticated:
-        raise NotImplementedError("encrypt() only handles authenticated encryption")
-
-    if len(system_title) != 8:
-        raise ValueError(f"System Title must be of lenght 8, not {len(system_title)}")
-
-    # initialization vector is 12 bytes long and consists of the system_title (8 bytes)
-    # and invocation_counter (4 bytes)
-    iv = system_title + invocation_counter.to_bytes(4, "big")
-
-    # Making sure the keys are of correct length for specified security suite
-    validate_key(security_control.security_suite, key)
-    validate_key(security_control.security_suite, auth_key)
-
-    # Construct an AES-GCM Cipher object with the given key and iv. Allow for
-    # truncating the auth tag
-    encryptor = Cipher(
-        algorithms.AES(key),
-        modes.GCM(initialization_vector=iv, tag=None, min_tag_length=TAG_LENGTH),
-    ).encryptor()
-
-    # associated_data will be authenticated but not encrypted,
-    # it must also be passed in on decryption.
-    associated_data = security_control.to_bytes() + auth_key
-    encryptor.authenticate_additional_data(associated_data)
-
-    # Encrypt the plaintext and get the associated ciphertext.
-    # GCM does not require padding.
-    ciphertext = encryptor.update(plain_text) + encryptor.finalize()
-
-    # dlms uses a tag lenght of 12 not the default of 16. Since we have set the minimum
-    # tag length to 12 it is ok to truncated the tag down to 12 bytes.
-    tag = encryptor.tag[:TAG_LENGTH]
-
-    return ciphertext + tag
+    return cached_context(
+        security_control.security_suite, bytes(key), bytes(auth_key)
+    ).encrypt(security_control, system_title, invocation_counter, plain_text)
 
 
 def decrypt(
@@ -149,45 +342,11 @@ def decrypt(
 ):
     """
     Decrypts bytes according to the security context.
+    The security context of the keys is cached, see `cached_context`.
     """
-    if not security_control.encrypted and not security_control.authenticated:
-        raise NotImplementedError("encrypt() only handles authenticated encryption")
-
-    if len(system_title) != 8:
-        raise ValueError(f"System Title must be of lenght 8, not {len(system_title)}")
-
-    # initialization vector is 12 bytes long and consists of the system_title (8 bytes)
-    # and invocation_counter (4 bytes)
-    iv = system_title + invocation_counter.to_bytes(4, "big")
-
-    # Making sure the keys are of correct length for specified security suite
-    validate_key(security_control.security_suite, key)
-    validate_key(security_control.security_suite, auth_key)
-
-    # extract the tag from the end of the cipher_text
-    tag = cipher_text[-12:]
-    ciphertext = cipher_text[:-12]
-    try:
-        # Construct a Cipher object, with the key, iv, and additionally the
-        # GCM tag used for authenticating the message.
-        decryptor = Cipher(
-            algorithms.AES(key), modes.GCM(iv, tag, min_tag_length=12)
-        ).decryptor()
-
-        # We put associated_data back in or the tag will fail to verify
-        # when we finalize the decryptor.
-        associated_data = security_control.to_bytes() + auth_key
-        decryptor.authenticate_additional_data(associated_data)
-
-        # Decryption gets us the authenticated plaintext.
-        # If the tag does not match an InvalidTag exception will be raised.
-        return decryptor.update(ciphertext) + decryptor.finalize()
-    except InvalidTag:
-        raise DecryptionError(
-            "Unable to decrypt ciphertext. Authentication tag is not valid. Ciphered "
-            "text might have been tampered with or key, auth key, security control or "
-            "invocation counter is wrong"
-        )
+    return cached_context(
+        security_control.security_suite, bytes(key), bytes(auth_key)
+    ).decrypt(security_control, system_title, invocation_counter, cipher_text)
 
 
 def gmac(
@@ -199,49 +358,11 @@ def gmac(
     challenge: bytes,
 ):
     """
-    GMAC is quite simply GCM mode where all data is supplied as additional
-    authenticated data.
-    If the GCM input is restricted to data that is not to be encrypted, the resulting
-    specialization of GCM, called GMAC, is simply an authentication mode on the input
-    data.
+    Calculates the GMAC of the challenge. See SecurityContext.gmac
     """
-    if security_control.encrypted:
-        raise CipheringError(
-            "Security for GMAC is set to encrypted, but this is not a "
-            "valid choice since GMAC only authenticates  "
-        )
-
-    if len(system_title) != 8:
-        raise ValueError(f"System Title must be of lenght 8, not {len(system_title)}")
-
-    # initialization vector is 12 bytes long and consists of the system_title (8 bytes)
-    # and invocation_counter (4 bytes)
-    iv = system_title + invocation_counter.to_bytes(4, "big")
-
-    # Making sure the keys are of correct length for specified security suite
-    validate_key(security_control.security_suite, key)
-    validate_key(security_control.security_suite, auth_key)
-
-    # Construct an AES-GCM Cipher object with the given key and iv
-    encryptor = Cipher(
-        algorithms.AES(key),
-        modes.GCM(initialization_vector=iv, tag=None, min_tag_length=TAG_LENGTH),
-    ).encryptor()
-
-    # associated_data will be authenticated but not encrypted,
-    # so we put all data in the associated data.
-    associated_data = security_control.to_bytes() + auth_key + challenge
-    encryptor.authenticate_additional_data(associated_data)
-
-    # Making sure to add an empty byte string as input. Then it will only be the
-    # associated_data that will be authenticated.
-    ciphertext = encryptor.update(b"") + encryptor.finalize()
-
-    # We want the tag as it is the authenticated data. Need to truncated it first
-    tag = encryptor.tag[:TAG_LENGTH]
-
-    # ciphertext is really b"" here.
-    return ciphertext + tag
+    return cached_context(
+        security_control.security_suite, bytes(key), bytes(auth_key)
+    ).gmac(security_control, system_title, invocation_counter, challenge)
 
 
 def wrap_key(
@@ -0,0 +1,20 @@
+"""
+Simulated DLMS/COSEM meters for testing and load testing clients and collectors
+without real hardware.
+"""
+
+from dlms_cosem.simulator.benchmark import (
+    BenchmarkConfig,
+    BenchmarkReport,
+    ReadPlan,
+    run_benchmark,
+)
+from dlms_cosem.simulator.connection import DlmsServerConnection
+from dlms_cosem.simulator.hdlc import HdlcServerLink
+from dlms_cosem.simulator.meter import (
+    DataAccessError,
+    ObjectModel,
+    SimulatedMeter,
+    SyntheticProfile,
+)
+from dlms_cosem.simulator.server import LineShaping, MeterSimulator
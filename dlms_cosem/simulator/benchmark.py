@@ -0,0 +1,627 @@
+"""
+Measures how many meter reads per second clients built on `DlmsClient` and
+`AsyncDlmsClient` sustain against simulated meters on the loopback interface.
+
+The meters run in their own process so the CPU time measured is the CPU time of the
+clients. Each client reads its own meter, running sessions of a `ReadPlan` one after
+the other. Each session is timed per phase: connect, associate, get (per read) and
+release.
+
+    report = run_benchmark(BenchmarkConfig(clients=32, sessions=10, encrypted=True))
+    print(report.summary())
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import *
+
+import attr
+
+from dlms_cosem import cosem, dlms_data
+from dlms_cosem import enumerations as enums
+from dlms_cosem.clients.dlms_client import DlmsClient
+from dlms_cosem.clients.hdlc_bus import HdlcTcpBus
+from dlms_cosem.cosem.capture_object import CaptureObject
+from dlms_cosem.cosem.selective_access import RangeDescriptor
+from dlms_cosem.simulator.meter import SimulatedMeter, SyntheticProfile
+from dlms_cosem.simulator.server import LineShaping, MeterSimulator
+
+LOG = logging.getLogger(__name__)
+
+THREADS = "threads"
+PROCESSES = "processes"
+ASYNCIO = "asyncio"
+# asyncio clients sharing one TCP connection to the HDLC port, like meters behind one
+# serial line. The clients take turns on the line.
+ASYNCIO_SHARED_BUS = "asyncio-shared-bus"
+ASYNCIO_MODES = (ASYNCIO, ASYNCIO_SHARED_BUS)
+
+TCP = "tcp"
+HDLC = "hdlc"
+
+CONNECT = "connect"
+ASSOCIATE = "associate"
+GET = "get"
+RELEASE = "release"
+PHASES = (CONNECT, ASSOCIATE, GET, RELEASE)
+
+HOST = "127.0.0.1"
+# Meters on the HDLC port get a physical address each, from 16 up to 127.
+FIRST_PHYSICAL_ADDRESS = 16
+MAX_HDLC_METERS = 112
+
+ENCRYPTION_KEY = bytes.fromhex("000102030405060708090A0B0C0D0E0F")
+AUTHENTICATION_KEY = bytes.fromhex("D0D1D2D3D4D5D6D7D8D9DADBDCDDDEDF")
+CLIENT_SYSTEM_TITLE = b"BENCH001"
+
+PROFILE_START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+CLOCK = cosem.CosemAttribute(
+    interface=enums.CosemInterface.CLOCK,
+    instance=cosem.Obis(0, 0, 1, 0, 0),
+    attribute=2,
+)
+REGISTERS = [
+    cosem.CosemAttribute(
+        interface=enums.CosemInterface.REGISTER,
+        instance=cosem.Obis(1, 0, c, 8, 0),
+        attribute=2,
+    )
+    # Active and reactive energy, import and export.
+    for c in (1, 2, 3, 4)
+]
+LOAD_PROFILE = cosem.CosemAttribute(
+    interface=enums.CosemInterface.PROFILE_GENERIC,
+    instance=cosem.Obis(1, 0, 99, 1, 0),
+    attribute=2,
+)
+OBJECT_LIST = cosem.CosemAttribute(
+    interface=enums.CosemInterface.ASSOCIATION_LN,
+    instance=cosem.Obis(0, 0, 40, 0, 0),
+    attribute=2,
+)
+
+
+@attr.s(auto_attribs=True)
+class ReadPlan:
+    """
+    The attributes read in each session, in order.
+    """
+
+    name: str
+    reads: List[cosem.CosemAttributeWithSelection]
+
+
+def register_plan() -> ReadPlan:
+    return ReadPlan(
+        name="registers",
+        reads=[
+            cosem.CosemAttributeWithSelection(attribute=register, access_selection=None)
+            for register in REGISTERS
+        ],
+    )
+
+
+def profile_plan(hours: int = 24) -> ReadPlan:
+    """
+    Reads `hours` of the 15 minute load profile.
+    """
+    return ReadPlan(
+        name=f"profile-{hours}h",
+        reads=[
+            cosem.CosemAttributeWithSelection(
+                attribute=LOAD_PROFILE,
+                access_selection=RangeDescriptor(
+                    restricting_object=CaptureObject(
+                        cosem_attribute=CLOCK, data_index=0
+                    ),
+                    from_value=PROFILE_START,
+                    to_value=PROFILE_START + timedelta(hours=hours),
+                ),
+            )
+        ],
+    )
+
+
+def object_list_plan() -> ReadPlan:
+    return ReadPlan(
+        name="object-list",
+        reads=[
+            cosem.CosemAttributeWithSelection(
+                attribute=OBJECT_LIST, access_selection=None
+            )
+        ],
+    )
+
+
+def object_list(attributes: List[cosem.CosemAttribute]) -> dlms_data.DataArray:
+    """
+    The object list of the current association, with read access to attribute 1 and
+    2 of each object.
+    """
+    return dlms_data.DataArray(
+        [
+            dlms_data.DataStructure(
+                [
+                    dlms_data.UnsignedLongData(attribute.interface.value),
+                    dlms_data.UnsignedIntegerData(0),
+                    dlms_data.OctetStringData(attribute.instance.to_bytes()),
+                    dlms_data.DataStructure(
+                        [
+                            dlms_data.DataArray(
+                                [
+                                    dlms_data.DataStructure(
+                                        [
+                                            dlms_data.IntegerData(index),
+                                            dlms_data.EnumData(1),
+                                            dlms_data.NullData(),
+                                        ]
+                                    )
+                                    for index in (1, 2)
+                                ]
+                            ),
+                            dlms_data.DataArray([]),
+                        ]
+                    ),
+                ]
+            )
+            for attribute in attributes
+        ]
+    )
+
+
+def benchmark_meter(encrypted: bool, profile_days: int) -> SimulatedMeter:
+    """
+    A meter with the objects read by the standard read plans.
+    """
+    if encrypted:
+        meter = SimulatedMeter(
+            authentication=enums.AuthenticationMechanism.HLS_GMAC,
+            encryption_key=ENCRYPTION_KEY,
+            authentication_key=AUTHENTICATION_KEY,
+        )
+    else:
+        meter = SimulatedMeter()
+    for index, register in enumerate(REGISTERS):
+        meter.objects.add_value(
+            register, dlms_data.DoubleLongUnsignedData(1000 * (index + 1))
+        )
+    meter.objects.add_profile(
+        LOAD_PROFILE,
+        SyntheticProfile(start=PROFILE_START, entries=profile_days * 96, columns=4),
+    )
+    meter.objects.add_value(
+        OBJECT_LIST, object_list([CLOCK, *REGISTERS, LOAD_PROFILE, OBJECT_LIST])
+    )
+    return meter
+
+
+@attr.s(auto_attribs=True)
+class BenchmarkConfig:
+    """
+    :param clients: Number of concurrent clients, each reading its own meter.
+    :param sessions: Sessions run by each client, one after the other.
+    :param mode: Run the clients in threads, processes or as tasks in one asyncio
+        event loop. In asyncio mode each client has its own TCP connection, in
+        asyncio-shared-bus mode they share one. The asyncio modes need the HDLC
+        transport.
+    :param transport: Meters served with the IP wrapper (tcp), one port per meter,
+        or with HDLC on one port, like a serial-to-IP converter (hdlc).
+    :param encrypted: Associate with HLS-GMAC and cipher all APDUs.
+    :param profile_days: Days of 15 minute load profile in each meter.
+    """
+
+    clients: int = attr.ib(default=8)
+    sessions: int = attr.ib(default=10)
+    plan: ReadPlan = attr.ib(factory=register_plan)
+    mode: str = attr.ib(
+        default=THREADS,
+        validator=attr.validators.in_([THREADS, PROCESSES, *ASYNCIO_MODES]),
+    )
+    transport: str = attr.ib(default=TCP, validator=attr.validators.in_([TCP, HDLC]))
+    encrypted: bool = attr.ib(default=False)
+    max_pdu_size: int = attr.ib(default=1024)
+    profile_days: int = attr.ib(default=7)
+    latency: float = attr.ib(default=0.0)
+    bandwidth: Optional[int] = attr.ib(default=None)
+    timeout: int = attr.ib(default=10)
+
+    def __attrs_post_init__(self):
+        if self.mode in ASYNCIO_MODES and self.transport != HDLC:
+            raise ValueError(
+                f"The asyncio client only has HDLC transports, use transport={HDLC!r}"
+            )
+        if self.transport == HDLC and self.clients > MAX_HDLC_METERS:
+            raise ValueError(
+                f"At most {MAX_HDLC_METERS} meters can be addressed on one HDLC port, "
+                f"not {self.clients}"
+            )
+
+
+@attr.s(auto_attribs=True)
+class MeterTarget:
+    port: int
+    physical_address: Optional[int]
+
+
+@attr.s(auto_attribs=True)
+class ClientResult:
+    """
+    Measurements of the sessions of one or more clients.
+    """
+
+    durations: Dict[str, List[float]] = attr.ib(
+        factory=lambda: {phase: list() for phase in PHASES}
+    )
+    reads: int = attr.ib(default=0)
+    data_bytes: int = attr.ib(default=0)
+    sessions: int = attr.ib(default=0)
+    errors: int = attr.ib(default=0)
+    cpu_time: float = attr.ib(default=0.0)
+
+    def add(self, other: "ClientResult"):
+        for phase in PHASES:
+            self.durations[phase].extend(other.durations[phase])
+        self.reads += other.reads
+        self.data_bytes += other.data_bytes
+        self.sessions += other.sessions
+        self.errors += other.errors
+        self.cpu_time += other.cpu_time
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+@attr.s(auto_attribs=True)
+class PhaseStatistics:
+    """
+    Latencies of a phase in seconds.
+    """
+
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_durations(cls, durations: List[float]) -> "PhaseStatistics":
+        values = sorted(durations)
+        return cls(
+            count=len(values),
+            mean=sum(values) / len(values) if values else 0.0,
+            p50=percentile(values, 0.5),
+            p90=percentile(values, 0.9),
+            p99=percentile(values, 0.99),
+            max=values[-1] if values else 0.0,
+        )
+
+
+@attr.s(auto_attribs=True)
+class BenchmarkReport:
+    config: BenchmarkConfig
+    wall_time: float
+    cpu_time: float
+    reads: int
+    data_bytes: int
+    sessions: int
+    errors: int
+    phases: Dict[str, PhaseStatistics]
+
+    @property
+    def reads_per_second(self) -> float:
+        return self.reads / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.data_bytes / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def cpu_per_read(self) -> float:
+        return self.cpu_time / self.reads if self.reads else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The report as plain values, for storing results to compare releases.
+        """
+        return {
+            "plan": self.config.plan.name,
+            "clients": self.config.clients,
+            "mode": self.config.mode,
+            "transport": self.config.transport,
+            "encrypted": self.config.encrypted,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "reads": self.reads,
+            "data_bytes": self.data_bytes,
+            "sessions": self.sessions,
+            "errors": self.errors,
+            "reads_per_second": self.reads_per_second,
+            "bytes_per_second": self.bytes_per_second,
+            "cpu_per_read": self.cpu_per_read,
+            "phases": {
+                phase: attr.asdict(statistics)
+                for phase, statistics in self.phases.items()
+            },
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.config.plan.name}: {self.config.clients} clients "
+            f"({self.config.mode}, {self.config.transport}, "
+            f"{'encrypted' if self.config.encrypted else 'plain'})",
+            f"{self.reads} reads in {self.sessions} sessions, {self.errors} errors, "
+            f"{self.wall_time:.2f} s",
+            f"{self.reads_per_second:.1f} reads/s, {self.bytes_per_second:.0f} bytes/s, "
+            f"{self.cpu_per_read * 1000:.2f} ms CPU/read",
+            f"{'phase':<10}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}"
+            f"{'max':>10}  (ms)",
+        ]
+        for phase, s in self.phases.items():
+            lines.append(
+                f"{phase:<10}{s.count:>8}{s.mean * 1000:>10.2f}{s.p50 * 1000:>10.2f}"
+                f"{s.p90 * 1000:>10.2f}{s.p99 * 1000:>10.2f}{s.max * 1000:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+def client_arguments(config: BenchmarkConfig) -> Dict[str, Any]:
+    arguments: Dict[str, Any] = dict(max_pdu_size=config.max_pdu_size)
+    if config.encrypted:
+        arguments.update(
+            authentication_method=enums.AuthenticationMechanism.HLS_GMAC,
+            encryption_key=ENCRYPTION_KEY,
+            authentication_key=AUTHENTICATION_KEY,
+            client_system_title=CLIENT_SYSTEM_TITLE,
+        )
+    return arguments
+
+
+def make_client(config: BenchmarkConfig, target: MeterTarget) -> DlmsClient:
+    if config.transport == TCP:
+        return DlmsClient.with_tcp_transport(
+            host=HOST,
+            port=target.port,
+            client_logical_address=16,
+            server_logical_address=1,
+            timeout=config.timeout,
+            **client_arguments(config),
+        )
+    return DlmsClient.with_hdlc_tcp_transport(
+        host=HOST,
+        port=target.port,
+        client_logical_address=16,
+        server_logical_address=1,
+        server_physical_address=target.physical_address,
+        timeout=config.timeout,
+        **client_arguments(config),
+    )
+
+
+def run_client(config: BenchmarkConfig, target: MeterTarget) -> ClientResult:
+    """
+    Runs the sessions of one client with `DlmsClient`.
+    """
+    result = ClientResult()
+    cpu_started = time.process_time()
+    for _ in range(config.sessions):
+        client = make_client(config, target)
+        try:
+            started = time.perf_counter()
+            client.connect()
+            connected = time.perf_counter()
+            client.associate()
+            associated = time.perf_counter()
+            result.durations[CONNECT].append(connected - started)
+            result.durations[ASSOCIATE].append(associated - connected)
+            for read in config.plan.reads:
+                started = time.perf_counter()
+                data = client.get(read.attribute, read.access_selection)
+                result.durations[GET].append(time.perf_counter() - started)
+                result.reads += 1
+                result.data_bytes += len(data)
+            started = time.perf_counter()
+            client.release_association()
+            client.disconnect()
+            result.durations[RELEASE].append(time.perf_counter() - started)
+            result.sessions += 1
+        except Exception as e:
+            LOG.warning(f"Session to {target} failed: {e!r}")
+            result.errors += 1
+            try:
+                client.io_interface.disconnect()
+            except Exception as e:
+                LOG.debug(f"Could not disconnect from {target}: {e!r}")
+    result.cpu_time = time.process_time() - cpu_started
+    return result
+
+
+async def run_async_client(
+    config: BenchmarkConfig, bus: HdlcTcpBus, target: MeterTarget
+) -> ClientResult:
+    """
+    Runs the sessions of one client with `AsyncDlmsClient` on a link of the bus. Each
+    session connects and disconnects the HDLC link.
+    """
+    result = ClientResult()
+    for _ in range(config.sessions):
+        client = bus.client(
+            server_physical_address=target.physical_address,
+            **client_arguments(config),
+        )
+        try:
+            started = time.perf_counter()
+            await client.connect()
+            connected = time.perf_counter()
+            await client.associate()
+            associated = time.perf_counter()
+            result.durations[CONNECT].append(connected - started)
+            result.durations[ASSOCIATE].append(associated - connected)
+            for read in config.plan.reads:
+                started = time.perf_counter()
+                data = await client.get(read.attribute, read.access_selection)
+                result.durations[GET].append(time.perf_counter() - started)
+                result.reads += 1
+                result.data_bytes += len(data)
+            started = time.perf_counter()
+            await client.release_association()
+            await client.disconnect()
+            # The bus keeps the link when the client disconnects.
+            await client.io_interface.disconnect_link()
+            result.durations[RELEASE].append(time.perf_counter() - started)
+            result.sessions += 1
+        except Exception as e:
+            LOG.warning(f"Session to {target} failed: {e!r}")
+            result.errors += 1
+            try:
+                await client.io_interface.disconnect_link()
+            except Exception as e:
+                LOG.debug(f"Could not disconnect from {target}: {e!r}")
+    return result
+
+
+def run_async_clients(
+    config: BenchmarkConfig, targets: List[MeterTarget]
+) -> List[ClientResult]:
+    async def run_all():
+        if config.mode == ASYNCIO_SHARED_BUS:
+            shared_bus = HdlcTcpBus(
+                host=HOST, port=targets[0].port, timeout=config.timeout
+            )
+            buses = [shared_bus] * len(targets)
+        else:
+            buses = [
+                HdlcTcpBus(host=HOST, port=target.port, timeout=config.timeout)
+                for target in targets
+            ]
+        try:
+            return await asyncio.gather(
+                *[
+                    run_async_client(config, bus, target)
+                    for bus, target in zip(buses, targets)
+                ]
+            )
+        finally:
+            # Closing a closed bus does nothing.
+            for bus in buses:
+                await bus.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run_all())
+    finally:
+        loop.close()
+
+
+def serve_meters(config: BenchmarkConfig, connection):
+    """
+    Runs the simulated meters until the process is terminated. The targets of the
+    clients are sent back on the connection.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    simulator = MeterSimulator(
+        host=HOST,
+        shaping=LineShaping(latency=config.latency, bandwidth=config.bandwidth),
+    )
+    if config.transport == TCP:
+        targets = [
+            MeterTarget(
+                port=loop.run_until_complete(
+                    simulator.serve_tcp(
+                        benchmark_meter(config.encrypted, config.profile_days)
+                    )
+                ),
+                physical_address=None,
+            )
+            for _ in range(config.clients)
+        ]
+    else:
+        physical_addresses = range(
+            FIRST_PHYSICAL_ADDRESS, FIRST_PHYSICAL_ADDRESS + config.clients
+        )
+        port = loop.run_until_complete(
+            simulator.serve_hdlc(
+                {
+                    physical_address: benchmark_meter(
+                        config.encrypted, config.profile_days
+                    )
+                    for physical_address in physical_addresses
+                }
+            )
+        )
+        targets = [
+            MeterTarget(port=port, physical_address=physical_address)
+            for physical_address in physical_addresses
+        ]
+    connection.send(targets)
+    loop.run_forever()
+
+
+def run_benchmark(config: BenchmarkConfig) -> BenchmarkReport:
+    """
+    Starts the meters in a separate process, runs the clients and reports the
+    results.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    meters = multiprocessing.Process(
+        target=serve_meters, args=(config, sender), daemon=True
+    )
+    meters.start()
+    try:
+        if not receiver.poll(config.timeout):
+            raise TimeoutError("The simulated meters did not start")
+        targets = receiver.recv()
+
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        if config.mode in ASYNCIO_MODES:
+            results = run_async_clients(config, targets)
+        elif config.mode == THREADS:
+            with ThreadPoolExecutor(max_workers=config.clients) as executor:
+                results = list(
+                    executor.map(lambda target: run_client(config, target), targets)
+                )
+        else:
+            with ProcessPoolExecutor(max_workers=config.clients) as executor:
+                results = list(
+                    executor.map(run_client, [config] * len(targets), targets)
+                )
+        wall_time = time.perf_counter() - started
+        cpu_time = time.process_time() - cpu_started
+    finally:
+        meters.terminate()
+        meters.join()
+
+    total = ClientResult()
+    for result in results:
+        total.add(result)
+    if config.mode == PROCESSES:
+        # The clients used the CPU of the worker processes.
+        cpu_time = total.cpu_time
+
+    return BenchmarkReport(
+        config=config,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        reads=total.reads,
+        data_bytes=total.data_bytes,
+        sessions=total.sessions,
+        errors=total.errors,
+        phases={
+            phase: PhaseStatistics.from_durations(total.durations[phase])
+            for phase in PHASES
+        },
+    )
@@ -0,0 +1,491 @@
+import logging
+import os
+from typing import *
+
+import attr
+
+from dlms_cosem import cosem, dlms_data
+from dlms_cosem import enumerations as enums
+from dlms_cosem import exceptions, security, utils
+from dlms_cosem.connection import GENERAL_GLOBAL_CIPHER_OVERHEAD, XDlmsApduFactory
+from dlms_cosem.protocol import acse, xdlms
+from dlms_cosem.protocol.xdlms.conformance import Conformance
+from dlms_cosem.protocol.xdlms.invoke_id_and_priority import InvokeIdAndPriority
+from dlms_cosem.simulator.meter import AccessSelection, DataAccessError, SimulatedMeter
+
+LOG = logging.getLogger(__name__)
+
+# Tag, response type, invoke id, last block, block number (4 bytes), data choice and
+# the length of the raw data (up to 3 bytes).
+GET_BLOCK_OVERHEAD = 12
+# Tag, response type, invoke id and data choice.
+GET_NORMAL_OVERHEAD = 4
+
+CURRENT_ASSOCIATION = cosem.Obis(0, 0, 40, 0, 0)
+REPLY_TO_HLS_AUTHENTICATION = 1
+
+# Raised by the APDU parsers on malformed requests.
+PARSING_ERRORS = (KeyError, ValueError, IndexError, NotImplementedError)
+
+
+def negotiate_conformance(proposed: Conformance, supported: Conformance) -> Conformance:
+    return Conformance(
+        **{
+            name: getattr(proposed, name) and getattr(supported, name)
+            for name in Conformance.conformance_bit_position
+        }
+    )
+
+
+@attr.s(auto_attribs=True)
+class EncodedData(dlms_data.BaseDlmsData):
+    """Data that is already A-XDR encoded"""
+
+    def to_bytes(self) -> bytes:
+        return self.value
+
+
+@attr.s(auto_attribs=True)
+class DlmsServerConnection:
+    """
+    The server (meter) side of a DLMS connection.
+
+    Handles one application association at a time: the AARQ is answered with an AARE
+    and, with HLS-GMAC, the association is only usable after the client has replied
+    to the meter challenge. GET (normal, with block transfer and with list), SET and
+    ACTION requests are served from the object model of the meter.
+
+    Requests protected with general-glo-ciphering or general-ded-ciphering are
+    answered with the same protection.
+    """
+
+    meter: SimulatedMeter
+
+    associated: bool = attr.ib(init=False, default=False)
+    hls_pending: bool = attr.ib(init=False, default=False)
+    conformance: Conformance = attr.ib(init=False, factory=Conformance)
+    # Largest APDU the client accepts.
+    client_max_pdu_size: int = attr.ib(init=False, default=65535)
+    client_system_title: Optional[bytes] = attr.ib(init=False, default=None)
+    client_to_meter_challenge: Optional[bytes] = attr.ib(init=False, default=None)
+    meter_to_client_challenge: Optional[bytes] = attr.ib(init=False, default=None)
+    dedicated_key: Optional[bytes] = attr.ib(init=False, default=None)
+
+    # Ongoing GET with block transfer.
+    block_data: Optional[Iterator[bytes]] = attr.ib(init=False, default=None)
+    block_buffer: bytearray = attr.ib(init=False, factory=bytearray)
+    block_number: int = attr.ib(init=False, default=0)
+
+    security_contexts: Dict[bytes, security.SecurityContext] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+
+    def handle(self, apdu_bytes: bytes) -> bytes:
+        """
+        Returns the response to a request APDU.
+        """
+        try:
+            request = XDlmsApduFactory.apdu_from_bytes(apdu_bytes)
+        except PARSING_ERRORS as e:
+            LOG.warning(f"Could not parse request {apdu_bytes!r}: {e}")
+            return self.exception_response(
+                enums.StateException.SERVICE_UNKNOWN,
+                enums.ServiceException.SERVICE_NOT_SUPPORTED,
+            )
+        LOG.debug("Received: %s", request)
+
+        if isinstance(request, acse.ApplicationAssociationRequest):
+            return self.associate(request).to_bytes()
+        if isinstance(request, acse.ReleaseRequest):
+            self.release()
+            return acse.ReleaseResponse(
+                reason=enums.ReleaseResponseReason.NORMAL
+            ).to_bytes()
+        if isinstance(request, xdlms.GeneralGlobalCipher):
+            return self.handle_protected(request)
+        return self.handle_xdlms(request)
+
+    @staticmethod
+    def exception_response(
+        state_error: enums.StateException, service_error: enums.ServiceException
+    ) -> bytes:
+        return xdlms.ExceptionResponse(state_error, service_error).to_bytes()
+
+    def release(self):
+        self.associated = False
+        self.hls_pending = False
+        self.dedicated_key = None
+        self.block_data = None
+        self.block_buffer = bytearray()
+
+    def get_security_context(self, key: bytes) -> security.SecurityContext:
+        context = self.security_contexts.get(key)
+        if context is None:
+            context = security.SecurityContext(
+                security_suite=self.meter.security_suite,
+                key=key,
+                auth_key=self.meter.authentication_key,
+            )
+            self.security_contexts[key] = context
+        return context
+
+    def associate(
+        self, aarq: acse.ApplicationAssociationRequest
+    ) -> acse.ApplicationAssociationResponse:
+        self.release()
+        initiate_request = aarq.user_information.content
+        ciphered = isinstance(initiate_request, xdlms.GlobalCipherInitiateRequest)
+        self.client_system_title = aarq.system_title
+        if ciphered:
+            security_control = initiate_request.security_control
+            if not self.meter.encryption_key or not self.client_system_title:
+                return self.reject(
+                    enums.AcseServiceUserDiagnostics.APPLICATION_CONTEXT_NAME_NOT_SUPPORTED
+                )
+            try:
+                plain_text = self.get_security_context(
+                    self.meter.encryption_key
+                ).decrypt(
+                    security_control,
+                    system_title=self.client_system_title,
+                    invocation_counter=initiate_request.invocation_counter,
+                    cipher_text=initiate_request.ciphered_text,
+                )
+            except exceptions.DecryptionError:
+                return self.reject(enums.AcseServiceUserDiagnostics.NO_REASON_GIVEN)
+            initiate_request = xdlms.InitiateRequest.from_bytes(plain_text)
+
+        authentication = self.meter.authentication or enums.AuthenticationMechanism.NONE
+        if (aarq.authentication or enums.AuthenticationMechanism.NONE) != (
+            authentication
+        ):
+            return self.reject(
+                enums.AcseServiceUserDiagnostics.AUTHENTICATION_MECHANISM_NAME_REQUIRED
+            )
+        if authentication == enums.AuthenticationMechanism.LLS:
+            if aarq.authentication_value != self.meter.password:
+                return self.reject(
+                    enums.AcseServiceUserDiagnostics.AUTHENTICATION_FAILED
+                )
+        elif authentication == enums.AuthenticationMechanism.HLS_GMAC:
+            self.client_to_meter_challenge = aarq.authentication_value
+            self.meter_to_client_challenge = os.urandom(self.meter.challenge_length)
+            self.hls_pending = True
+        elif authentication != enums.AuthenticationMechanism.NONE:
+            return self.reject(
+                enums.AcseServiceUserDiagnostics.AUTHENTICATION_MECHANISM_NAME_NOT_RECOGNIZED
+            )
+
+        self.conformance = negotiate_conformance(
+            initiate_request.proposed_conformance, self.meter.conformance
+        )
+        self.client_max_pdu_size = initiate_request.client_max_receive_pdu_size
+        self.dedicated_key = initiate_request.dedicated_key
+        self.associated = not self.hls_pending
+
+        initiate_response = xdlms.InitiateResponse(
+            negotiated_conformance=self.conformance,
+            server_max_receive_pdu_size=self.meter.max_pdu_size,
+        )
+        if ciphered:
+            invocation_counter = self.meter.next_invocation_counter()
+            user_information_content = xdlms.GlobalCipherInitiateResponse(
+                security_control=security_control,
+                invocation_counter=invocation_counter,
+                ciphered_text=self.get_security_context(
+                    self.meter.encryption_key
+                ).encrypt(
+                    security_control,
+                    system_title=self.meter.system_title,
+                    invocation_counter=invocation_counter,
+                    plain_text=initiate_response.to_bytes(),
+                ),
+            )
+        else:
+            user_information_content = initiate_response
+
+        return acse.ApplicationAssociationResponse(
+            result=enums.AssociationResult.ACCEPTED,
+            result_source_diagnostics=(
+                enums.AcseServiceUserDiagnostics.AUTHENTICATION_REQUIRED
+                if self.hls_pending
+                else enums.AcseServiceUserDiagnostics.NULL
+            ),
+            ciphered=ciphered,
+            authentication=self.meter.authentication,
+            system_title=self.meter.system_title,
+            authentication_value=self.meter_to_client_challenge,
+            user_information=acse.UserInformation(content=user_information_content),
+        )
+
+    def reject(
+        self, diagnostics: enums.AcseServiceUserDiagnostics
+    ) -> acse.ApplicationAssociationResponse:
+        LOG.info(f"Rejecting association: {diagnostics!r}")
+        self.release()
+        return acse.ApplicationAssociationResponse(
+            result=enums.AssociationResult.REJECTED_PERMANENT,
+            result_source_diagnostics=diagnostics,
+        )
+
+    def handle_protected(self, request: xdlms.GeneralGlobalCipher) -> bytes:
+        """
+        Deciphers the request and protects the response the same way.
+        """
+        # GeneralDedicatedCipher is a subclass of GeneralGlobalCipher.
+        dedicated = isinstance(request, xdlms.GeneralDedicatedCipher)
+        key = self.dedicated_key if dedicated else self.meter.encryption_key
+        if not key or not self.meter.authentication_key:
+            return self.exception_response(
+                enums.StateException.SERVICE_NOT_ALLOWED,
+                enums.ServiceException.DECIPHERING_ERROR,
+            )
+        context = self.get_security_context(key)
+        try:
+            plain_text = context.decrypt(
+                request.security_control,
+                system_title=request.system_title,
+                invocation_counter=request.invocation_counter,
+                cipher_text=request.ciphered_text,
+            )
+        except exceptions.DecryptionError:
+            return self.exception_response(
+                enums.StateException.SERVICE_NOT_ALLOWED,
+                enums.ServiceException.DECIPHERING_ERROR,
+            )
+
+        try:
+            plain_request = XDlmsApduFactory.apdu_from_bytes(plain_text)
+        except PARSING_ERRORS as e:
+            LOG.warning(f"Could not parse deciphered request {plain_text!r}: {e}")
+            return self.exception_response(
+                enums.StateException.SERVICE_UNKNOWN,
+                enums.ServiceException.SERVICE_NOT_SUPPORTED,
+            )
+
+        response = self.handle_xdlms(
+            plain_request,
+            max_apdu_size=self.client_max_pdu_size - GENERAL_GLOBAL_CIPHER_OVERHEAD,
+        )
+        invocation_counter = self.meter.next_invocation_counter()
+        response_class = (
+            xdlms.GeneralDedicatedCipher if dedicated else xdlms.GeneralGlobalCipher
+        )
+        return response_class(
+            system_title=self.meter.system_title,
+            security_control=request.security_control,
+            invocation_counter=invocation_counter,
+            ciphered_text=context.encrypt(
+                request.security_control,
+                system_title=self.meter.system_title,
+                invocation_counter=invocation_counter,
+                plain_text=response,
+            ),
+        ).to_bytes()
+
+    def handle_xdlms(self, request, max_apdu_size: Optional[int] = None) -> bytes:
+        if max_apdu_size is None:
+            max_apdu_size = self.client_max_pdu_size
+
+        if self.hls_pending and isinstance(request, xdlms.ActionRequestNormal):
+            method = request.cosem_method
+            if (
+                method.interface == enums.CosemInterface.ASSOCIATION_LN
+                and method.instance == CURRENT_ASSOCIATION
+                and method.method == REPLY_TO_HLS_AUTHENTICATION
+            ):
+                return self.reply_to_hls_authentication(request).to_bytes()
+
+        if not self.associated:
+            return self.exception_response(
+                enums.StateException.SERVICE_NOT_ALLOWED,
+                enums.ServiceException.OPERATION_NOT_POSSIBLE,
+            )
+
+        if isinstance(request, xdlms.GetRequestNormal):
+            return self.get(request, max_apdu_size)
+        if isinstance(request, xdlms.GetRequestNext):
+            return self.get_next(request, max_apdu_size)
+        if isinstance(request, xdlms.GetRequestWithList):
+            return self.get_with_list(request)
+        if isinstance(request, xdlms.SetRequestNormal):
+            return self.set(request)
+        if isinstance(request, xdlms.ActionRequestNormal):
+            return self.action(request)
+        LOG.warning(f"Service not supported by the simulator: {request}")
+        return self.exception_response(
+            enums.StateException.SERVICE_UNKNOWN,
+            enums.ServiceException.SERVICE_NOT_SUPPORTED,
+        )
+
+    def reply_to_hls_authentication(self, request: xdlms.ActionRequestNormal):
+        """
+        Verifies the reply of the client to the meter challenge and answers with the
+        reply of the meter to the client challenge.
+
+        HLS_GMAC: SC + IC + GMAC(SC + AK + Challenge)
+        """
+        self.hls_pending = False
+        reply = utils.parse_as_dlms_data(request.data)
+        security_control = security.SecurityControlField.from_bytes(reply[:1])
+        context = self.get_security_context(self.meter.encryption_key)
+        expected = context.gmac(
+            security_control=security_control,
+            system_title=self.client_system_title,
+            invocation_counter=int.from_bytes(reply[1:5], "big"),
+            challenge=self.meter_to_client_challenge,
+        )
+        if reply[5:] != expected:
+            LOG.info("Client failed HLS authentication")
+            return xdlms.ActionResponseNormal(
+                status=enums.ActionResultStatus.READ_WRITE_DENIED,
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            )
+
+        self.associated = True
+        invocation_counter = self.meter.next_invocation_counter()
+        gmac = context.gmac(
+            security_control=security_control,
+            system_title=self.meter.system_title,
+            invocation_counter=invocation_counter,
+            challenge=self.client_to_meter_challenge,
+        )
+        return xdlms.ActionResponseNormalWithData(
+            status=enums.ActionResultStatus.SUCCESS,
+            data=dlms_data.OctetStringData(
+                security_control.to_bytes()
+                + invocation_counter.to_bytes(4, "big")
+                + gmac
+            ).to_bytes(),
+            invoke_id_and_priority=request.invoke_id_and_priority,
+        )
+
+    def get(self, request: xdlms.GetRequestNormal, max_apdu_size: int) -> bytes:
+        self.block_data = None
+        self.block_buffer = bytearray()
+        try:
+            data = self.meter.objects.read(
+                request.cosem_attribute, request.access_selection
+            )
+        except DataAccessError as e:
+            return xdlms.GetResponseNormalWithError(
+                error=e.result, invoke_id_and_priority=request.invoke_id_and_priority
+            ).to_bytes()
+
+        # Only encode as much of the value as is needed to know if it fits in one
+        # response.
+        max_data_size = max_apdu_size - GET_NORMAL_OVERHEAD
+        buffer = bytearray()
+        for chunk in data:
+            buffer += chunk
+            if len(buffer) > max_data_size:
+                break
+        else:
+            return xdlms.GetResponseNormal(
+                data=bytes(buffer),
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+
+        if not self.conformance.block_transfer_with_get_or_read:
+            return xdlms.GetResponseNormalWithError(
+                error=enums.DataAccessResult.OTHER_REASON,
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        self.block_data = data
+        self.block_buffer = buffer
+        self.block_number = 0
+        return self.next_block(request.invoke_id_and_priority, max_apdu_size)
+
+    def get_next(self, request: xdlms.GetRequestNext, max_apdu_size: int) -> bytes:
+        if self.block_data is None and not self.block_buffer:
+            return xdlms.GetResponseLastBlockWithError(
+                error=enums.DataAccessResult.NO_LONG_GET_IN_PROGRESS,
+                block_number=request.block_number,
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        if request.block_number != self.block_number:
+            self.block_data = None
+            self.block_buffer = bytearray()
+            return xdlms.GetResponseLastBlockWithError(
+                error=enums.DataAccessResult.DATA_BLOCK_NUMBER_INVALID,
+                block_number=request.block_number,
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        return self.next_block(request.invoke_id_and_priority, max_apdu_size)
+
+    def next_block(
+        self, invoke_id_and_priority: InvokeIdAndPriority, max_apdu_size: int
+    ) -> bytes:
+        """
+        Encodes more of the value until there is more than a block to send, so it is
+        known if the block is the last one.
+        """
+        block_size = max_apdu_size - GET_BLOCK_OVERHEAD
+        while self.block_data is not None and len(self.block_buffer) <= block_size:
+            try:
+                self.block_buffer += next(self.block_data)
+            except StopIteration:
+                self.block_data = None
+
+        block = bytes(self.block_buffer[:block_size])
+        del self.block_buffer[:block_size]
+        self.block_number += 1
+        if self.block_data is None and not self.block_buffer:
+            return xdlms.GetResponseLastBlock(
+                data=block,
+                block_number=self.block_number,
+                invoke_id_and_priority=invoke_id_and_priority,
+            ).to_bytes()
+        return xdlms.GetResponseWithBlock(
+            data=block,
+            block_number=self.block_number,
+            invoke_id_and_priority=invoke_id_and_priority,
+        ).to_bytes()
+
+    def read_all(
+        self, cosem_attribute: cosem.CosemAttribute, access_selection: AccessSelection
+    ) -> Union[EncodedData, enums.DataAccessResult]:
+        try:
+            return EncodedData(
+                b"".join(self.meter.objects.read(cosem_attribute, access_selection))
+            )
+        except DataAccessError as e:
+            return e.result
+
+    def get_with_list(self, request: xdlms.GetRequestWithList) -> bytes:
+        return xdlms.GetResponseWithList(
+            response_data=[
+                self.read_all(item.attribute, item.access_selection)
+                for item in request.cosem_attributes_with_selection
+            ],
+            invoke_id_and_priority=request.invoke_id_and_priority,
+        ).to_bytes()
+
+    def set(self, request: xdlms.SetRequestNormal) -> bytes:
+        try:
+            self.meter.objects.write(request.cosem_attribute, request.data)
+            result = enums.DataAccessResult.SUCCESS
+        except DataAccessError as e:
+            result = e.result
+        return xdlms.SetResponseNormal(
+            result=result, invoke_id_and_priority=request.invoke_id_and_priority
+        ).to_bytes()
+
+    def action(self, request: xdlms.ActionRequestNormal) -> bytes:
+        try:
+            data = self.meter.objects.invoke(request.cosem_method, request.data)
+        except DataAccessError as e:
+            return xdlms.ActionResponseNormal(
+                status=enums.ActionResultStatus(e.result.value),
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        if data is None:
+            return xdlms.ActionResponseNormal(
+                status=enums.ActionResultStatus.SUCCESS,
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        return xdlms.ActionResponseNormalWithData(
+            status=enums.ActionResultStatus.SUCCESS,
+            data=data,
+            invoke_id_and_priority=request.invoke_id_and_priority,
+        ).to_bytes()
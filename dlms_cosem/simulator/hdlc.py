@@ -0,0 +1,192 @@
+import logging
+from typing import *
+
+import attr
+
+from dlms_cosem.clients.hdlc_transport import LLC_COMMAND_HEADER, LLC_RESPONSE_HEADER
+from dlms_cosem.hdlc import fields, frames
+from dlms_cosem.hdlc.address import HdlcAddress
+from dlms_cosem.hdlc.builder import HdlcFrameBuilder
+from dlms_cosem.hdlc.exceptions import HdlcParsingError
+from dlms_cosem.simulator.connection import DlmsServerConnection
+from dlms_cosem.simulator.meter import SimulatedMeter
+
+LOG = logging.getLogger(__name__)
+
+SNRM = 0x93
+DISC = 0x53
+
+
+@attr.s(auto_attribs=True)
+class HdlcServerLink:
+    """
+    The server side of a HDLC link to a simulated meter.
+
+    Information frames from the client are put together into requests that are
+    answered by a `DlmsServerConnection`. Responses longer than the negotiated
+    information field are segmented and sent `window_size` frames at a time. The
+    client polls for the next window with a RR. Frames received out of sequence are
+    rejected with a REJ.
+    """
+
+    server_address: HdlcAddress
+    meter: SimulatedMeter
+    # Largest information field and window size the meter accepts in the SNRM.
+    max_info_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    frame_builder: HdlcFrameBuilder = attr.ib(factory=HdlcFrameBuilder)
+
+    client_address: Optional[HdlcAddress] = attr.ib(init=False, default=None)
+    dlms_connection: Optional[DlmsServerConnection] = attr.ib(init=False, default=None)
+    transmit_info_length: int = attr.ib(init=False, default=128)
+    transmit_window_size: int = attr.ib(init=False, default=1)
+    # Send and receive sequence numbers.
+    vs: int = attr.ib(init=False, default=0)
+    vr: int = attr.ib(init=False, default=0)
+    request: bytearray = attr.ib(init=False, factory=bytearray)
+    frame_lost: bool = attr.ib(init=False, default=False)
+    response_segments: List[memoryview] = attr.ib(init=False, factory=list)
+    response_position: int = attr.ib(init=False, default=0)
+
+    def receive_frame(self, frame_bytes: bytes) -> List[bytes]:
+        """
+        Handles a frame addressed to the meter and returns the frames to send back.
+        """
+        position = frames.control_field_position(frame_bytes)
+        control = frame_bytes[position]
+        _, (
+            client_logical,
+            client_physical,
+            _,
+        ) = HdlcAddress.find_address_in_frame_bytes(frame_bytes)
+        self.client_address = HdlcAddress(client_logical, client_physical, "client")
+        # The information field is after the control field and the HCS.
+        information = frame_bytes[position + 3 : -3]
+
+        if control == SNRM:
+            return self.connect(information)
+        if control == DISC:
+            self.dlms_connection = None
+            return [self.build(frames.UnNumberedAcknowledgmentFrame)]
+        if self.dlms_connection is None:
+            LOG.warning(f"Dropping frame on disconnected link: {frame_bytes!r}")
+            return []
+        if not control & 0b1:
+            segmented = bool(frame_bytes[1] & 0b00001000)
+            return self.receive_information(information, control, segmented)
+        if control & 0b1111 == 0b0001:  # RR
+            if self.response_position >= len(self.response_segments):
+                # Nothing more to send, acknowledge what was received.
+                return [
+                    self.build(
+                        frames.ReceiveReadyFrame, receive_sequence_number=self.vr
+                    )
+                ]
+            return self.send_window(self.response_position)
+        if control & 0b1111 == 0b1001:  # REJ
+            rejected = (self.vs - (control >> 5)) % 8
+            return self.send_window(self.response_position - rejected)
+        LOG.warning(f"Frame type not supported by the simulator: {frame_bytes!r}")
+        return []
+
+    def build(self, frame_class, **kwargs) -> bytes:
+        return self.frame_builder.build(
+            frame_class(self.client_address, self.server_address, **kwargs)
+        )
+
+    def connect(self, information: bytes) -> List[bytes]:
+        proposed = None
+        if information:
+            try:
+                proposed = fields.HdlcParameterList.from_bytes(information)
+            except HdlcParsingError as e:
+                LOG.warning(f"Dropping SNRM with malformed parameters: {e}")
+                return []
+
+        self.dlms_connection = DlmsServerConnection(meter=self.meter)
+        self.vs = 0
+        self.vr = 0
+        self.request = bytearray()
+        self.frame_lost = False
+        self.response_segments = []
+        self.response_position = 0
+        if proposed is None:
+            # No parameters, the default values are used.
+            self.transmit_info_length = fields.HdlcParameterList.DEFAULT_MAX_INFO_LENGTH
+            self.transmit_window_size = fields.HdlcParameterList.DEFAULT_WINDOW_SIZE
+            return [self.build(frames.UnNumberedAcknowledgmentFrame)]
+
+        self.transmit_info_length = min(
+            self.max_info_length, proposed.max_info_length_receive
+        )
+        self.transmit_window_size = min(self.window_size, proposed.window_size_receive)
+        accepted = fields.HdlcParameterList(
+            max_info_length_transmit=self.transmit_info_length,
+            max_info_length_receive=min(
+                self.max_info_length, proposed.max_info_length_transmit
+            ),
+            window_size_transmit=self.transmit_window_size,
+            window_size_receive=min(self.window_size, proposed.window_size_transmit),
+        )
+        return [
+            self.build(
+                frames.UnNumberedAcknowledgmentFrame, payload=accepted.to_bytes()
+            )
+        ]
+
+    def receive_information(
+        self, information: bytes, control: int, segmented: bool
+    ) -> List[bytes]:
+        send_sequence_number = (control >> 1) & 0b111
+        final = bool(control & 0b00010000)
+        if send_sequence_number == self.vr and not self.frame_lost:
+            self.request += information
+            self.vr = (self.vr + 1) % 8
+        else:
+            self.frame_lost = True
+        if not final:
+            return []
+        if self.frame_lost:
+            self.frame_lost = False
+            return [self.build(frames.RejectFrame, receive_sequence_number=self.vr)]
+        if segmented:
+            # Poll the client for the rest of the request.
+            return [
+                self.build(frames.ReceiveReadyFrame, receive_sequence_number=self.vr)
+            ]
+
+        request = bytes(self.request)
+        self.request = bytearray()
+        if not request.startswith(LLC_COMMAND_HEADER):
+            LOG.warning(f"Dropping request without LLC header: {request!r}")
+            return []
+        response = memoryview(
+            LLC_RESPONSE_HEADER
+            + self.dlms_connection.handle(request[len(LLC_COMMAND_HEADER) :])
+        )
+        self.response_segments = [
+            response[index : index + self.transmit_info_length]
+            for index in range(0, len(response), self.transmit_info_length)
+        ]
+        self.response_position = 0
+        return self.send_window(0)
+
+    def send_window(self, position: int) -> List[bytes]:
+        # Frames from a rejected position are sent again with their old numbers.
+        self.vs = (self.vs - (self.response_position - position)) % 8
+        window = self.response_segments[position : position + self.transmit_window_size]
+        out = list()
+        for index, segment in enumerate(window, start=position):
+            out.append(
+                self.build(
+                    frames.InformationFrame,
+                    payload=segment,
+                    send_sequence_number=self.vs,
+                    receive_sequence_number=self.vr,
+                    segmented=index < len(self.response_segments) - 1,
+                    final=index == position + len(window) - 1,
+                )
+            )
+            self.vs = (self.vs + 1) % 8
+        self.response_position = position + len(window)
+        return out
@@ -0,0 +1,230 @@
+import os
+from datetime import datetime, timedelta
+from typing import *
+
+import attr
+
+from dlms_cosem import cosem, dlms_data
+from dlms_cosem import enumerations as enums
+from dlms_cosem import time
+from dlms_cosem.cosem.selective_access import EntryDescriptor, RangeDescriptor
+from dlms_cosem.protocol.xdlms.conformance import Conformance
+
+AccessSelection = Optional[Union[RangeDescriptor, EntryDescriptor]]
+
+
+class DataAccessError(Exception):
+    """An attribute or method of the simulated meter could not be accessed"""
+
+    def __init__(self, result: enums.DataAccessResult):
+        super().__init__(result.name)
+        self.result = result
+
+
+def default_meter_system_title() -> bytes:
+    return b"SIM" + os.urandom(5)
+
+
+def default_meter_conformance() -> Conformance:
+    return Conformance(
+        general_protection=True,
+        general_block_transfer=False,
+        block_transfer_with_get_or_read=True,
+        block_transfer_with_set_or_write=False,
+        block_transfer_with_action=False,
+        multiple_references=True,
+        get=True,
+        set=True,
+        selective_access=True,
+        action=True,
+    )
+
+
+@attr.s(auto_attribs=True)
+class SyntheticProfile:
+    """
+    A Profile Generic buffer with `entries` rows captured every `capture_period`
+    minutes from `start`.
+
+    Rows are generated and encoded while they are sent, so a buffer of any size only
+    costs the time to send it. Each row is the capture time as an octet string
+    followed by `columns` double long unsigned values that increase with each entry,
+    like register readings.
+    """
+
+    start: datetime
+    entries: int
+    capture_period: int = attr.ib(default=15)
+    columns: int = attr.ib(default=1)
+
+    ROWS_PER_CHUNK: ClassVar[int] = 64
+
+    @property
+    def period(self) -> timedelta:
+        return timedelta(minutes=self.capture_period)
+
+    def capture_time(self, index: int) -> datetime:
+        return self.start + index * self.period
+
+    def align(self, value: datetime) -> datetime:
+        """
+        Makes a datetime from a range descriptor comparable to the start of the
+        buffer. A meter without time zone in the request uses its own time zone.
+        """
+        if self.start.tzinfo is None:
+            return value.replace(tzinfo=None)
+        if value.tzinfo is None:
+            return value.replace(tzinfo=self.start.tzinfo)
+        return value
+
+    def entry_range(self, access_selection: AccessSelection = None) -> range:
+        """
+        Returns the indexes of the entries selected by the access selection.
+        """
+        if access_selection is None:
+            return range(self.entries)
+        if isinstance(access_selection, EntryDescriptor):
+            # Entries are numbered from 1 and to_entry 0 means the last entry.
+            to_entry = access_selection.to_entry or self.entries
+            return range(access_selection.from_entry - 1, min(to_entry, self.entries))
+
+        from_offset = self.align(access_selection.from_value) - self.start
+        to_offset = self.align(access_selection.to_value) - self.start
+        first = max(0, -(-from_offset // self.period))
+        last = min(self.entries - 1, to_offset // self.period)
+        return range(first, last + 1)
+
+    def encode_entry(self, index: int) -> bytes:
+        values = [
+            dlms_data.OctetStringData(time.datetime_to_bytes(self.capture_time(index)))
+        ]
+        values.extend(
+            dlms_data.DoubleLongUnsignedData(((index + 1) * column) % 0x100000000)
+            for column in range(1, self.columns + 1)
+        )
+        return dlms_data.DataStructure(values).to_bytes()
+
+    def encode(self, access_selection: AccessSelection = None) -> Iterator[bytes]:
+        """
+        Yields the encoded buffer, an array of the selected entries, in chunks of
+        `ROWS_PER_CHUNK` entries.
+        """
+        entries = self.entry_range(access_selection)
+        yield bytes([dlms_data.DataArray.TAG]) + dlms_data.encode_variable_integer(
+            len(entries)
+        )
+        for start in range(0, len(entries), self.ROWS_PER_CHUNK):
+            yield b"".join(
+                self.encode_entry(index)
+                for index in entries[start : start + self.ROWS_PER_CHUNK]
+            )
+
+
+@attr.s(auto_attribs=True)
+class ObjectModel:
+    """
+    The COSEM objects of a simulated meter.
+
+    Attribute values are kept A-XDR encoded so reading them is a lookup. Attributes
+    and methods are keyed on their encoded descriptors.
+    """
+
+    values: Dict[bytes, bytes] = attr.ib(factory=dict)
+    writable: Set[bytes] = attr.ib(factory=set)
+    profiles: Dict[bytes, SyntheticProfile] = attr.ib(factory=dict)
+    methods: Dict[bytes, Callable[[Optional[bytes]], Optional[bytes]]] = attr.ib(
+        factory=dict
+    )
+
+    def add_value(
+        self,
+        cosem_attribute: cosem.CosemAttribute,
+        value: dlms_data.AbstractDlmsData,
+        writable: bool = False,
+    ):
+        key = cosem_attribute.to_bytes()
+        self.values[key] = value.to_bytes()
+        if writable:
+            self.writable.add(key)
+
+    def add_profile(
+        self, cosem_attribute: cosem.CosemAttribute, profile: SyntheticProfile
+    ):
+        self.profiles[cosem_attribute.to_bytes()] = profile
+
+    def add_method(
+        self,
+        cosem_method: cosem.CosemMethod,
+        handler: Callable[[Optional[bytes]], Optional[bytes]],
+    ):
+        """
+        The handler is called with the encoded method parameters and returns the
+        encoded return parameters, or None if there are none.
+        """
+        self.methods[cosem_method.to_bytes()] = handler
+
+    def read(
+        self,
+        cosem_attribute: cosem.CosemAttribute,
+        access_selection: AccessSelection = None,
+    ) -> Iterator[bytes]:
+        """
+        Returns the encoded value of the attribute in chunks.
+        """
+        key = cosem_attribute.to_bytes()
+        profile = self.profiles.get(key)
+        if profile is not None:
+            return profile.encode(access_selection)
+        value = self.values.get(key)
+        if value is None:
+            raise DataAccessError(enums.DataAccessResult.OBJECT_UNDEFINED)
+        if access_selection is not None:
+            raise DataAccessError(enums.DataAccessResult.SCOPE_OF_ACCESS_VIOLATED)
+        return iter([value])
+
+    def write(self, cosem_attribute: cosem.CosemAttribute, data: bytes):
+        key = cosem_attribute.to_bytes()
+        if key not in self.values:
+            raise DataAccessError(enums.DataAccessResult.OBJECT_UNDEFINED)
+        if key not in self.writable:
+            raise DataAccessError(enums.DataAccessResult.READ_WRITE_DENIED)
+        self.values[key] = bytes(data)
+
+    def invoke(
+        self, cosem_method: cosem.CosemMethod, data: Optional[bytes]
+    ) -> Optional[bytes]:
+        handler = self.methods.get(cosem_method.to_bytes())
+        if handler is None:
+            raise DataAccessError(enums.DataAccessResult.OBJECT_UNDEFINED)
+        return handler(data)
+
+
+@attr.s(auto_attribs=True)
+class SimulatedMeter:
+    """
+    Configuration and state of a simulated meter that is shared by all associations
+    to it.
+
+    Set `authentication` to LLS with a `password` or to HLS_GMAC with an encryption
+    and authentication key to require authentication. With keys set, ciphered
+    association requests and APDUs protected with general-glo-ciphering or
+    general-ded-ciphering are accepted.
+    """
+
+    objects: ObjectModel = attr.ib(factory=ObjectModel)
+    system_title: bytes = attr.ib(factory=default_meter_system_title)
+    authentication: Optional[enums.AuthenticationMechanism] = attr.ib(default=None)
+    password: Optional[bytes] = attr.ib(default=None)
+    encryption_key: Optional[bytes] = attr.ib(default=None)
+    authentication_key: Optional[bytes] = attr.ib(default=None)
+    security_suite: int = attr.ib(default=0)
+    conformance: Conformance = attr.ib(factory=default_meter_conformance)
+    # Largest APDU the meter accepts. Sent to the client in the InitiateResponse.
+    max_pdu_size: int = attr.ib(default=1024)
+    challenge_length: int = attr.ib(default=16)
+    # Last invocation counter used by the meter when protecting APDUs.
+    invocation_counter: int = attr.ib(default=0)
+
+    def next_invocation_counter(self) -> int:
+        self.invocation_counter += 1
+        return self.invocation_counter
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from typing import *
+
+import attr
+
+from dlms_cosem.hdlc import frames
+from dlms_cosem.hdlc.address import HdlcAddress
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+from dlms_cosem.protocol.wrappers import WrapperHeader, WrapperProtocolDataUnit
+from dlms_cosem.simulator.connection import DlmsServerConnection
+from dlms_cosem.simulator.hdlc import HdlcServerLink
+from dlms_cosem.simulator.meter import SimulatedMeter
+
+LOG = logging.getLogger(__name__)
+
+READ_SIZE = 4096
+WRAPPER_HEADER_LENGTH = 8
+
+
+@attr.s(auto_attribs=True)
+class LineShaping:
+    """
+    Makes simulated meters answer like meters on a slow line.
+
+    :param latency: Seconds to wait before a response is sent. Covers the processing
+        time of the meter and the round trip of the network.
+    :param bandwidth: Bytes per second the response is sent with. None is unlimited.
+    :param chunk_size: Bytes written at a time when the bandwidth is limited.
+    """
+
+    latency: float = attr.ib(default=0.0)
+    bandwidth: Optional[int] = attr.ib(default=None)
+    chunk_size: int = attr.ib(default=64)
+
+    async def send(self, writer: asyncio.StreamWriter, data: bytes):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not self.bandwidth:
+            writer.write(data)
+            await writer.drain()
+            return
+        view = memoryview(data)
+        for index in range(0, len(view), self.chunk_size):
+            chunk = view[index : index + self.chunk_size]
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(len(chunk) / self.bandwidth)
+
+
+@attr.s(auto_attribs=True)
+class MeterSimulator:
+    """
+    Serves simulated meters over TCP from one asyncio event loop.
+
+    `serve_tcp` listens for DLMS over the IP wrapper, like a meter with its own IP
+    address. `serve_hdlc` listens for HDLC frames, like a serial-to-IP converter
+    with meters on its serial side addressed by their physical address. Thousands of
+    meters can share one HDLC port.
+
+    Each TCP connection gets its own associations, while the object model and the
+    invocation counter of a meter are shared by all connections to it.
+
+        simulator = MeterSimulator()
+        port = await simulator.serve_tcp(meter)
+        ...
+        await simulator.close()
+    """
+
+    host: str = attr.ib(default="127.0.0.1")
+    shaping: LineShaping = attr.ib(factory=LineShaping)
+    servers: List[asyncio.AbstractServer] = attr.ib(factory=list)
+    # Tasks handling the open connections.
+    connections: Set[asyncio.Future] = attr.ib(factory=set)
+
+    async def serve_tcp(
+        self,
+        meter: SimulatedMeter,
+        port: int = 0,
+        shaping: Optional[LineShaping] = None,
+    ) -> int:
+        """
+        Serves the meter with the DLMS IP wrapper. Returns the port listened on.
+        """
+        shaping = shaping or self.shaping
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            connection = DlmsServerConnection(meter=meter)
+            try:
+                while True:
+                    header = WrapperHeader.from_bytes(
+                        await reader.readexactly(WRAPPER_HEADER_LENGTH)
+                    )
+                    request = await reader.readexactly(header.length)
+                    response = connection.handle(request)
+                    await shaping.send(
+                        writer,
+                        WrapperProtocolDataUnit(
+                            response,
+                            WrapperHeader(
+                                source_wport=header.destination_wport,
+                                destination_wport=header.source_wport,
+                                length=len(response),
+                            ),
+                        ).to_bytes(),
+                    )
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        return await self.start_server(handle, port)
+
+    async def serve_hdlc(
+        self,
+        meters: Dict[Optional[int], SimulatedMeter],
+        port: int = 0,
+        server_logical_address: int = 1,
+        max_info_length: int = 128,
+        window_size: int = 1,
+        shaping: Optional[LineShaping] = None,
+    ) -> int:
+        """
+        Serves the meters with HDLC. The meters are keyed on their physical address.
+        Returns the port listened on.
+        """
+        shaping = shaping or self.shaping
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            links = {
+                physical_address: HdlcServerLink(
+                    server_address=HdlcAddress(
+                        server_logical_address, physical_address, "server"
+                    ),
+                    meter=meter,
+                    max_info_length=max_info_length,
+                    window_size=window_size,
+                )
+                for physical_address, meter in meters.items()
+            }
+            scanner = HdlcFrameScanner()
+            try:
+                while True:
+                    data = await reader.read(READ_SIZE)
+                    if not data:
+                        return
+                    scanner.receive_data(data)
+                    response = list()
+                    while True:
+                        frame_bytes = scanner.next_frame_bytes()
+                        if frame_bytes is None:
+                            break
+                        response.extend(self.route_frame(links, frame_bytes))
+                    if response:
+                        await shaping.send(writer, b"".join(response))
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        return await self.start_server(handle, port)
+
+    @staticmethod
+    def route_frame(
+        links: Dict[Optional[int], HdlcServerLink], frame_bytes: bytes
+    ) -> List[bytes]:
+        if not frames.FCS.verify(frame_bytes, 1, -1):
+            LOG.warning(f"Dropping frame with incorrect FCS: {frame_bytes!r}")
+            return []
+        (logical, physical, _), _ = HdlcAddress.find_address_in_frame_bytes(frame_bytes)
+        link = links.get(physical)
+        if link is None or logical != link.server_address.logical_address:
+            return []
+        return link.receive_frame(frame_bytes)
+
+    async def start_server(self, handle, port: int) -> int:
+        def client_connected(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ):
+            connection = asyncio.ensure_future(handle(reader, writer))
+            self.connections.add(connection)
+            connection.add_done_callback(self.connections.discard)
+
+        server = await asyncio.start_server(client_connected, self.host, port)
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stops listening and closes all open connections.
+        """
+        for server in self.servers:
+            server.close()
+        for server in self.servers:
+            await server.wait_closed()
+        self.servers = []
+        connections = list(self.connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
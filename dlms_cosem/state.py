@@ -63,10 +63,13 @@ READY = make_sentinel("READY")
 
 AWAITING_RELEASE_RESPONSE = make_sentinel("AWAITING_RELEASE_RESPONSE")
 AWAITING_ACTION_RESPONSE = make_sentinel("AWAITING_ACTION_RESPONSE")
+SHOULD_SEND_ACTION_PBLOCK = make_sentinel("SHOULD_SEND_ACTION_PBLOCK")
+SHOULD_ACK_ACTION_PBLOCK = make_sentinel("SHOULD_ACK_ACTION_PBLOCK")
 AWAITING_GET_RESPONSE = make_sentinel("AWAITING_GET_RESPONSE")
 AWAITING_GET_BLOCK_RESPONSE = make_sentinel("AWAITING_GET_BLOCK_RESPONSE")
 SHOULD_ACK_LAST_GET_BLOCK = make_sentinel("SHOULD_ACK_LAST_GET_BLOCK")
 AWAITING_SET_RESPONSE = make_sentinel("AWAITING_SET_RESPONSE")
+AWAITING_ACCESS_RESPONSE = make_sentinel("AWAITING_ACCESS_RESPONSE")
 
 SHOULD_SEND_HLS_SEVER_CHALLENGE_RESULT = make_sentinel(
     "SHOULD_SEND_HLS_SEVER_CHALLENGE_RESULT"
@@ -94,6 +97,10 @@ DLMS_STATE_TRANSITIONS = {
         HlsStart: SHOULD_SEND_HLS_SEVER_CHALLENGE_RESULT,
         RejectAssociation: NO_ASSOCIATION,
         xdlms.ActionRequestNormal: AWAITING_ACTION_RESPONSE,
+        xdlms.ActionRequestWithList: AWAITING_ACTION_RESPONSE,
+        xdlms.ActionRequestWithFirstPblock: AWAITING_ACTION_RESPONSE,
+        xdlms.ActionRequestWithListAndFirstPblock: AWAITING_ACTION_RESPONSE,
+        xdlms.AccessRequest: AWAITING_ACCESS_RESPONSE,
         xdlms.DataNotification: READY,
     },
     SHOULD_SEND_HLS_SEVER_CHALLENGE_RESULT: {
@@ -120,11 +127,26 @@ DLMS_STATE_TRANSITIONS = {
         xdlms.GetResponseLastBlock: READY,
     },
     AWAITING_SET_RESPONSE: {xdlms.SetResponseNormal: READY},
+    AWAITING_ACCESS_RESPONSE: {
+        xdlms.AccessResponse: READY,
+        xdlms.ExceptionResponse: READY,
+        # Meters that do not support ACCESS can answer with a service error.
+        xdlms.ConfirmedServiceError: READY,
+    },
     AWAITING_ACTION_RESPONSE: {
         xdlms.ActionResponseNormal: READY,
         xdlms.ActionResponseNormalWithData: READY,
         xdlms.ActionResponseNormalWithError: READY,
+        xdlms.ActionResponseWithList: READY,
+        xdlms.ActionResponseWithPblock: SHOULD_ACK_ACTION_PBLOCK,
+        xdlms.ActionResponseLastPblock: READY,
+        xdlms.ActionResponseNextPblock: SHOULD_SEND_ACTION_PBLOCK,
+        xdlms.ExceptionResponse: READY,
+    },
+    SHOULD_SEND_ACTION_PBLOCK: {
+        xdlms.ActionRequestWithPblock: AWAITING_ACTION_RESPONSE
     },
+    SHOULD_ACK_ACTION_PBLOCK: {xdlms.ActionRequestNextPblock: AWAITING_ACTION_RESPONSE},
     SHOULD_ACK_LAST_GET_BLOCK: {xdlms.GetRequestNext: AWAITING_GET_BLOCK_RESPONSE},
     AWAITING_RELEASE_RESPONSE: {
         acse.ReleaseResponse: NO_ASSOCIATION,
@@ -158,4 +180,4 @@ class DlmsConnectionState:
             )
         old_state = self.current_state
         self.current_state = new_state
-        LOG.debug(f"DLMS state transitioned from {old_state} to {new_state}")
+        LOG.debug("DLMS state transitioned from %s to %s", old_state, new_state)
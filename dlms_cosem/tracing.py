@@ -0,0 +1,278 @@
+"""
+Timing of the layers a request passes through, and tracing of the bytes they send and
+receive.
+
+The client, the connection and the transports record how long each phase of a request
+takes and how many bytes it handles, to a `Tracer` set on them. When no tracer is set
+nothing is timed.
+
+The DLMS and HDLC connections log the bytes they send and receive to the
+`dlms_cosem.wire` logger when the wire trace is enabled with `enable_wire_trace()`.
+When it is disabled the bytes are not rendered.
+"""
+
+import abc
+import bisect
+import logging
+from collections import Counter, defaultdict
+from typing import *
+
+import attr
+
+WIRE_LOG = logging.getLogger("dlms_cosem.wire")
+
+SENT = "sent"
+RECEIVED = "received"
+
+# An APDU is encoded to bytes.
+ENCODE = "encode"
+# An APDU is ciphered, includes encoding the plain APDU.
+PROTECT = "protect"
+# The request is written to the meter.
+TRANSPORT_SEND = "transport_send"
+# Waiting for and reading the response. Mostly the time the meter takes to answer.
+TRANSPORT_RECEIVE = "transport_receive"
+# The whole request and response through the transport.
+TRANSPORT = "transport"
+# A ciphered APDU is deciphered, includes decoding the plain APDU.
+UNPROTECT = "unprotect"
+# An APDU is decoded from bytes.
+DECODE = "decode"
+
+PHASES = (
+    ENCODE,
+    PROTECT,
+    TRANSPORT_SEND,
+    TRANSPORT_RECEIVE,
+    TRANSPORT,
+    UNPROTECT,
+    DECODE,
+)
+
+# Upper bounds in seconds of the histogram buckets, from 50 microseconds to about
+# 100 seconds.
+BUCKETS = tuple(0.00005 * 2 ** index for index in range(0, 22))
+
+
+class Tracer(abc.ABC):
+    """
+    Receives the timings of a client. Timings are recorded from the thread using the
+    client, so one tracer should be used per client.
+    """
+
+    @abc.abstractmethod
+    def record(self, phase: str, seconds: float, size: int = 0) -> None:
+        """
+        Records that a phase took `seconds` and handled `size` bytes.
+        """
+        raise NotImplementedError()
+
+    def state_changed(self, previous_state: Any, new_state: Any) -> None:
+        """
+        Called when the DLMS connection changes state.
+        """
+
+
+@attr.s(auto_attribs=True)
+class Histogram:
+    """
+    Counts of durations in exponential buckets, with the total time and bytes.
+    """
+
+    counts: List[int] = attr.ib(factory=lambda: [0] * (len(BUCKETS) + 1))
+    count: int = attr.ib(default=0)
+    total: float = attr.ib(default=0.0)
+    maximum: float = attr.ib(default=0.0)
+    size: int = attr.ib(default=0)
+
+    def add(self, seconds: float, size: int = 0):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.size += size
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the upper bound of the bucket the percentile is in. The maximum is
+        returned for the last bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(BUCKETS):
+                    return min(BUCKETS[index], self.maximum)
+                break
+        return self.maximum
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.maximum,
+            "bytes": self.size,
+        }
+
+
+@attr.s(auto_attribs=True)
+class MeterTracer(Tracer):
+    """
+    Records the timings of the client of one meter in a LatencyAggregator.
+    """
+
+    histograms: Dict[str, Histogram]
+    transitions: Counter
+
+    def record(self, phase: str, seconds: float, size: int = 0) -> None:
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = Histogram()
+        histogram.add(seconds, size)
+
+    def state_changed(self, previous_state: Any, new_state: Any) -> None:
+        self.transitions[(str(previous_state), str(new_state))] += 1
+
+
+@attr.s(auto_attribs=True)
+class LatencyAggregator:
+    """
+    Collects latency histograms per meter and phase from many clients.
+
+        aggregator = LatencyAggregator()
+        client = DlmsClient.with_tcp_transport(..., tracer=aggregator.tracer("meter-1"))
+        ...
+        print(aggregator.report())
+    """
+
+    histograms: Dict[str, Dict[str, Histogram]] = attr.ib(
+        factory=lambda: defaultdict(dict)
+    )
+    transitions: Dict[str, Counter] = attr.ib(factory=lambda: defaultdict(Counter))
+
+    def tracer(self, meter: str) -> MeterTracer:
+        """
+        Returns a tracer recording the timings of the client of a meter.
+        """
+        return MeterTracer(
+            histograms=self.histograms[meter], transitions=self.transitions[meter]
+        )
+
+    def phase(self, phase: str) -> Histogram:
+        """
+        Returns a histogram of a phase over all meters.
+        """
+        combined = Histogram()
+        for histograms in self.histograms.values():
+            histogram = histograms.get(phase)
+            if histogram is None:
+                continue
+            combined.counts = [a + b for a, b in zip(combined.counts, histogram.counts)]
+            combined.count += histogram.count
+            combined.total += histogram.total
+            combined.size += histogram.size
+            combined.maximum = max(combined.maximum, histogram.maximum)
+        return combined
+
+    def to_dict(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {
+            meter: {
+                phase: histogram.to_dict() for phase, histogram in histograms.items()
+            }
+            for meter, histograms in self.histograms.items()
+        }
+
+    def report(self) -> str:
+        """
+        A table of the latencies in milliseconds per meter and phase.
+        """
+        lines = [
+            f"{'meter':<20} {'phase':<18} {'count':>7} {'mean':>9} {'p50':>9} "
+            f"{'p90':>9} {'p99':>9} {'max':>9}"
+        ]
+        for meter, histograms in sorted(self.histograms.items()):
+            for phase in sorted(histograms, key=phase_order):
+                histogram = histograms[phase]
+                lines.append(
+                    f"{meter:<20} {phase:<18} {histogram.count:>7} "
+                    f"{histogram.mean * 1000:>9.3f} "
+                    f"{histogram.percentile(50) * 1000:>9.3f} "
+                    f"{histogram.percentile(90) * 1000:>9.3f} "
+                    f"{histogram.percentile(99) * 1000:>9.3f} "
+                    f"{histogram.maximum * 1000:>9.3f}"
+                )
+        return "\n".join(lines)
+
+
+def phase_order(phase: str) -> Tuple[int, str]:
+    return (PHASES.index(phase) if phase in PHASES else len(PHASES), phase)
+
+
+class HexBytes:
+    """
+    Renders bytes as hex when a log record is formatted, not when it is made.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return bytes(self.data).hex()
+
+
+@attr.s(auto_attribs=True)
+class WireTrace:
+    """
+    Logs the bytes on the wire of each layer to the `dlms_cosem.wire` logger at DEBUG
+    level. The records have the `layer`, `direction` and `size` attributes for
+    structured handlers.
+
+    The layers check `enabled` before calling `record()`, so the disabled trace costs
+    one attribute lookup per APDU or frame. Bytes are logged as they are on the wire,
+    ciphered APDUs are not deciphered.
+    """
+
+    enabled: bool = attr.ib(default=False)
+    # Level of the wire logger before the trace was enabled, restored when disabled.
+    previous_level: int = attr.ib(default=logging.NOTSET)
+
+    def record(self, layer: str, direction: str, data: bytes):
+        size = len(data)
+        WIRE_LOG.debug(
+            "%s %s %d bytes: %s",
+            layer,
+            direction,
+            size,
+            HexBytes(data),
+            extra={"layer": layer, "direction": direction, "size": size},
+        )
+
+
+WIRE_TRACE = WireTrace()
+
+
+def enable_wire_trace(enabled: bool = True):
+    """
+    Switches the wire trace on or off. The `dlms_cosem.wire` logger is set to DEBUG
+    level while it is on, the records are handled by the handlers of the application.
+    The level the logger had before is restored when it is switched off.
+    """
+    if enabled and not WIRE_TRACE.enabled:
+        WIRE_TRACE.previous_level = WIRE_LOG.level
+        WIRE_LOG.setLevel(logging.DEBUG)
+    elif not enabled and WIRE_TRACE.enabled:
+        WIRE_LOG.setLevel(WIRE_TRACE.previous_level)
+    WIRE_TRACE.enabled = enabled
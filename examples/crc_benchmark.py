@@ -0,0 +1,54 @@
+"""
+Measures the time to calculate the HDLC CRC over frames of different lengths with
+`update_crc`, which runs longer data two bytes at a time, and one byte at a time for
+comparison.
+
+    python examples/crc_benchmark.py
+    python examples/crc_benchmark.py --lengths 579 --runs 20000
+"""
+
+import argparse
+import os
+import timeit
+
+from dlms_cosem import crc
+
+
+def update_crc_per_byte(value: int, data: bytes) -> int:
+    table = crc.CRC_TABLE
+    for byte in data:
+        value = (value >> 8) ^ table[(value ^ byte) & 0xFF]
+    return value
+
+
+def measure(function, data: bytes, runs: int) -> float:
+    """Returns the best time of one run in microseconds."""
+    times = timeit.repeat(
+        lambda: function(crc.INITIAL_VALUE, data), number=runs, repeat=5
+    )
+    return min(times) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--lengths", type=int, nargs="+", default=[8, 32, 128, 579, 2048]
+    )
+    parser.add_argument("--runs", type=int, default=5000)
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        data = os.urandom(length)
+        assert crc.update_crc(crc.INITIAL_VALUE, data) == update_crc_per_byte(
+            crc.INITIAL_VALUE, data
+        )
+        per_byte = measure(update_crc_per_byte, data, args.runs)
+        per_word = measure(crc.update_crc, data, args.runs)
+        print(
+            f"{length} bytes: {per_byte:.2f} us one byte at a time, {per_word:.2f} us "
+            f"with update_crc, {per_byte / per_word:.1f} times faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures reads per second against simulated meters on the loopback interface.
+
+    python examples/fleet_benchmark.py --clients 64 --mode threads --encrypted
+    python examples/fleet_benchmark.py --clients 100 --mode asyncio --transport hdlc
+
+Use --json to save the results and compare releases or configurations.
+"""
+
+import argparse
+import json
+
+from dlms_cosem.simulator.benchmark import (
+    BenchmarkConfig,
+    object_list_plan,
+    profile_plan,
+    register_plan,
+    run_benchmark,
+)
+
+PLANS = {
+    "registers": register_plan,
+    "profile": profile_plan,
+    "object-list": object_list_plan,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--plan", choices=PLANS, default="registers")
+    parser.add_argument(
+        "--mode",
+        choices=["threads", "processes", "asyncio", "asyncio-shared-bus"],
+        default="threads",
+    )
+    parser.add_argument("--transport", choices=["tcp", "hdlc"], default="tcp")
+    parser.add_argument("--encrypted", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=None)
+    parser.add_argument("--json", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        BenchmarkConfig(
+            clients=args.clients,
+            sessions=args.sessions,
+            plan=PLANS[args.plan](),
+            mode=args.mode,
+            transport=args.transport,
+            encrypted=args.encrypted,
+            latency=args.latency,
+            bandwidth=args.bandwidth,
+        )
+    )
+    print(report.summary())
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report.to_dict(), file, indent=2)
+
+
+# The guard is needed to run the clients in processes.
+if __name__ == "__main__":
+    main()
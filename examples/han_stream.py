@@ -0,0 +1,49 @@
+"""
+Prints the readings a meter pushes on its HAN port, read from a serial port.
+
+    python examples/han_stream.py /dev/ttyUSB0 --baud-rate 2400
+
+Pass --key and --auth-key, hex encoded, for meters that cipher the pushes.
+"""
+
+import argparse
+
+import serial
+
+from dlms_cosem.push import HanStreamDecoder, KeyRecord, Keyring, SchemaDecoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("port")
+    parser.add_argument("--baud-rate", type=int, default=2400)
+    parser.add_argument("--parity", choices=["N", "E"], default="N")
+    parser.add_argument("--system-title", help="system title of the meter, in hex")
+    parser.add_argument("--key", help="encryption key, in hex")
+    parser.add_argument("--auth-key", help="authentication key, in hex")
+    args = parser.parse_args()
+    if args.key and not (args.system_title and args.auth_key):
+        parser.error("--key needs --system-title and --auth-key")
+
+    keyring = Keyring()
+    if args.key:
+        keyring.add(
+            bytes.fromhex(args.system_title),
+            KeyRecord(
+                encryption_key=bytes.fromhex(args.key),
+                authentication_key=bytes.fromhex(args.auth_key),
+            ),
+        )
+    decoder = HanStreamDecoder(
+        decoder=keyring.push_decoder(body_decoder=SchemaDecoder())
+    )
+
+    stream = serial.Serial(args.port, baudrate=args.baud_rate, parity=args.parity)
+    for push in decoder.read_stream(stream):
+        print(f"Push at {push.notification.date_time}")
+        for obis, value in push.data:
+            print(f"  {obis} = {value!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measures the CPU time per read of a client and a simulated meter in the same process,
+with no network, so the cost of the protocol layers and their logging is what is
+measured.
+
+    python examples/logging_benchmark.py --reads 5000
+    python examples/logging_benchmark.py --level DEBUG
+    python examples/logging_benchmark.py --wire-trace
+
+Logging is set up with a handler that drops the records, so only the cost of making
+and formatting them is measured.
+"""
+
+import argparse
+import logging
+import time
+
+import attr
+
+from dlms_cosem import tracing
+from dlms_cosem.clients.dlms_client import DlmsClient
+from dlms_cosem.simulator.benchmark import (
+    REGISTERS,
+    BenchmarkConfig,
+    benchmark_meter,
+    client_arguments,
+)
+from dlms_cosem.simulator.connection import DlmsServerConnection
+
+
+class FormattingNullHandler(logging.Handler):
+    """Formats the records like a real handler would, then drops them."""
+
+    def emit(self, record):
+        self.format(record)
+
+
+@attr.s(auto_attribs=True)
+class InProcessTransport:
+    connection: DlmsServerConnection
+    client_logical_address: int = attr.ib(default=16)
+    server_logical_address: int = attr.ib(default=1)
+    timeout: int = attr.ib(default=1)
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def send(self, bytes_to_send: bytes) -> bytes:
+        return self.connection.handle(bytes_to_send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--level", default="WARNING")
+    parser.add_argument("--wire-trace", action="store_true")
+    parser.add_argument("--plain", action="store_true", help="do not use encryption")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.level, handlers=[FormattingNullHandler()])
+    tracing.enable_wire_trace(args.wire_trace)
+
+    config = BenchmarkConfig(encrypted=not args.plain)
+    meter = benchmark_meter(encrypted=config.encrypted, profile_days=1)
+    client = DlmsClient(
+        client_logical_address=16,
+        server_logical_address=1,
+        io_interface=InProcessTransport(DlmsServerConnection(meter=meter)),
+        **client_arguments(config),
+    )
+    with client.session():
+        started = time.process_time()
+        for index in range(args.reads):
+            client.get(REGISTERS[index % len(REGISTERS)])
+        cpu_time = time.process_time() - started
+
+    print(
+        f"level={args.level} wire_trace={args.wire_trace} "
+        f"encrypted={config.encrypted}: {cpu_time / args.reads * 1e6:.1f} us CPU "
+        f"per read"
+    )
+
+
+if __name__ == "__main__":
+    main()
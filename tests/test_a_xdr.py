@@ -1,6 +1,7 @@
 import pprint
 from functools import partial
 
+from dlms_cosem import dlms_data
 from dlms_cosem import enumerations as enums
 from dlms_cosem.a_xdr import (
     Attribute,
@@ -172,3 +173,16 @@ def test_decode_long():
     apdu = XDlmsApduFactory.apdu_from_bytes(data)
     assert isinstance(apdu, GetResponseWithBlock)
     assert apdu.block_number == 1
+
+
+def test_bit_string_round_trip():
+    bits = dlms_data.BitStringData("1110000001")
+    data = bits.to_bytes()
+    assert data == b"\x04\x0a\xe0\x40"
+    assert parse_as_dlms_data(data) == "1110000001"
+
+
+def test_long_octet_string_uses_variable_length():
+    data = dlms_data.OctetStringData(b"\x01" * 200).to_bytes()
+    assert data[:3] == b"\x09\x81\xc8"
+    assert parse_as_dlms_data(data) == b"\x01" * 200
@@ -0,0 +1,168 @@
+from typing import *
+
+import attr
+import pytest
+
+from dlms_cosem import cosem, dlms_data, enumerations, tracing, utils
+from dlms_cosem.clients.async_dlms_client import AsyncDlmsClient
+from dlms_cosem.clients.dlms_client import DataResultError
+from dlms_cosem.connection import DlmsConnection, XDlmsApduFactory
+from dlms_cosem.invocation_counters import MemoryInvocationCounterStore, counter_key
+from dlms_cosem.protocol import xdlms
+from dlms_cosem.protocol.xdlms.conformance import Conformance
+from dlms_cosem.simulator import DlmsServerConnection, SimulatedMeter
+from dlms_cosem.state import READY
+from dlms_cosem.tracing import LatencyAggregator
+from tests.test_clients.test_async_hdlc_transport import run
+from tests.test_clients.test_dlms_client import AccessMeter
+from tests.test_simulator.test_connection import (
+    AUTHENTICATION_KEY,
+    CLIENT_SYSTEM_TITLE,
+    ENCRYPTION_KEY,
+    REGISTER,
+    hls_meter,
+)
+
+CLOCK = cosem.CosemAttribute(
+    interface=enumerations.CosemInterface.CLOCK,
+    instance=cosem.Obis(0, 0, 1, 0, 0),
+    attribute=2,
+)
+
+
+@attr.s(auto_attribs=True)
+class AsyncMeter:
+    """
+    Answers GET requests with `value` or an error if there is no value and ACCESS
+    requests as `AccessMeter`.
+    """
+
+    value: Optional[bytes] = attr.ib(default=None)
+    access_meter: AccessMeter = attr.ib(factory=AccessMeter)
+    requests: list = attr.ib(factory=list)
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def send(self, data: bytes) -> bytes:
+        request = XDlmsApduFactory.apdu_from_bytes(data)
+        self.requests.append(request)
+        if isinstance(request, xdlms.AccessRequest):
+            return self.access_meter.send(data)
+        if self.value is None:
+            return xdlms.GetResponseNormalWithError(
+                invoke_id_and_priority=request.invoke_id_and_priority,
+                error=enumerations.DataAccessResult.OBJECT_UNDEFINED,
+            ).to_bytes()
+        return xdlms.GetResponseNormal(
+            invoke_id_and_priority=request.invoke_id_and_priority, data=self.value
+        ).to_bytes()
+
+
+@attr.s(auto_attribs=True)
+class AsyncInProcessTransport:
+    """Passes requests straight to a server connection"""
+
+    connection: DlmsServerConnection
+    client_logical_address: int = attr.ib(default=16)
+    server_logical_address: int = attr.ib(default=1)
+    timeout: int = attr.ib(default=1)
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def send(self, data: bytes) -> bytes:
+        return self.connection.handle(data)
+
+
+def hls_client(meter: SimulatedMeter, **kwargs) -> AsyncDlmsClient:
+    return AsyncDlmsClient(
+        client_logical_address=16,
+        server_logical_address=1,
+        io_interface=AsyncInProcessTransport(DlmsServerConnection(meter=meter)),
+        authentication_method=enumerations.AuthenticationMechanism.HLS_GMAC,
+        encryption_key=ENCRYPTION_KEY,
+        authentication_key=AUTHENTICATION_KEY,
+        client_system_title=CLIENT_SYSTEM_TITLE,
+        **kwargs,
+    )
+
+
+async def read_register(client: AsyncDlmsClient) -> bytes:
+    async with client.session():
+        return await client.get(REGISTER)
+
+
+def make_client(meter: AsyncMeter) -> AsyncDlmsClient:
+    return AsyncDlmsClient(
+        client_logical_address=16,
+        server_logical_address=1,
+        io_interface=meter,
+        dlms_connection=DlmsConnection.with_pre_established_association(
+            conformance=Conformance(get=True, access=True)
+        ),
+    )
+
+
+def test_get():
+    value = dlms_data.OctetStringData(bytes(12)).to_bytes()
+    client = make_client(AsyncMeter(value=value))
+
+    assert run(client.get(CLOCK)) == value
+    assert client.dlms_connection.state.current_state == READY
+
+
+def test_get_error():
+    client = make_client(AsyncMeter())
+
+    with pytest.raises(DataResultError):
+        run(client.get(CLOCK))
+
+
+def test_access():
+    meter = AsyncMeter()
+    client = make_client(meter)
+
+    responses = run(client.access([xdlms.AccessRequestGet(cosem_attribute=CLOCK)]))
+
+    assert responses[0].result == enumerations.DataAccessResult.SUCCESS
+    assert responses[0].data == meter.access_meter.clock
+    assert client.long_invoke_id == 1
+
+
+def test_hls_session():
+    client = hls_client(hls_meter())
+
+    assert utils.parse_as_dlms_data(run(read_register(client))) == 1234
+
+
+def test_client_records_phases():
+    aggregator = LatencyAggregator()
+    client = hls_client(hls_meter(), tracer=aggregator.tracer("meter-1"))
+
+    run(read_register(client))
+
+    phases = aggregator.histograms["meter-1"]
+    # AARQ, HLS reply, GET and RLRQ.
+    assert phases[tracing.TRANSPORT].count == 4
+    assert phases[tracing.UNPROTECT].count == 4
+    assert client.dlms_connection.tracer is client.tracer
+
+
+def test_client_continues_from_stored_counters():
+    meter = hls_meter()
+    store = MemoryInvocationCounterStore(batch_size=100)
+    client = hls_client(meter, invocation_counter_store=store)
+    run(read_register(client))
+    used = client.client_invocation_counter
+
+    assert store.meter_invocation_counter(counter_key(16, ENCRYPTION_KEY)) > 0
+    client = hls_client(meter, invocation_counter_store=store)
+    run(read_register(client))
+    assert client.client_invocation_counter > used
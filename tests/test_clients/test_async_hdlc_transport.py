@@ -0,0 +1,124 @@
+import asyncio
+import os
+import pty
+
+import attr
+import pytest
+
+from dlms_cosem.clients.async_hdlc_transport import AsyncSerialHdlcTransport
+from dlms_cosem.clients.hdlc_transport import LLC_COMMAND_HEADER
+from dlms_cosem.exceptions import CommunicationError
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+from tests.test_clients.test_hdlc_transport import REQUEST, SimulatedHdlcMeter
+
+
+@attr.s(auto_attribs=True)
+class PtyMeter:
+    """
+    Connects a SimulatedHdlcMeter to the master side of a pseudo-terminal. The
+    transport opens the slave side as its serial port.
+    """
+
+    meter: SimulatedHdlcMeter
+    master: int
+    slave: int
+    scanner: HdlcFrameScanner = attr.ib(factory=HdlcFrameScanner)
+    responding: bool = attr.ib(default=True)
+
+    @classmethod
+    def open(cls, meter: SimulatedHdlcMeter) -> "PtyMeter":
+        master, slave = pty.openpty()
+        os.set_blocking(master, False)
+        pty_meter = cls(meter, master, slave)
+        asyncio.get_event_loop().add_reader(master, pty_meter.data_received)
+        return pty_meter
+
+    @property
+    def port(self) -> str:
+        return os.ttyname(self.slave)
+
+    def data_received(self):
+        self.scanner.receive_data(os.read(self.master, 4096))
+        while True:
+            frame_bytes = self.scanner.next_frame_bytes()
+            if frame_bytes is None:
+                break
+            if self.responding:
+                self.meter.write(frame_bytes)
+        if self.meter.out_buffer:
+            os.write(self.master, self.meter.out_buffer)
+            self.meter.out_buffer = bytearray()
+
+    def close(self):
+        asyncio.get_event_loop().remove_reader(self.master)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def make_transport(port: str, window_size: int = 1) -> AsyncSerialHdlcTransport:
+    return AsyncSerialHdlcTransport(
+        client_logical_address=16,
+        server_logical_address=1,
+        serial_port=port,
+        window_size=window_size,
+        timeout=1,
+    )
+
+
+def test_send_over_pty():
+    async def exchange():
+        pty_meter = PtyMeter.open(SimulatedHdlcMeter(window_size=3))
+        try:
+            async with make_transport(pty_meter.port, window_size=3) as transport:
+                response = await transport.send(REQUEST)
+        finally:
+            pty_meter.close()
+        return pty_meter.meter, response
+
+    meter, response = run(exchange())
+    assert response == REQUEST[::-1]
+    assert meter.requests == [LLC_COMMAND_HEADER + REQUEST]
+    # SNRM, 7 information frames, 2 RR and DISC
+    assert len(meter.received_controls) == 11
+
+
+def test_many_ports_in_one_loop():
+    async def exchange(request: bytes):
+        pty_meter = PtyMeter.open(SimulatedHdlcMeter())
+        try:
+            async with make_transport(pty_meter.port) as transport:
+                return await transport.send(request)
+        finally:
+            pty_meter.close()
+
+    async def exchange_all():
+        return await asyncio.gather(
+            *[exchange(REQUEST[index:]) for index in range(0, 400, 50)]
+        )
+
+    responses = run(exchange_all())
+    assert responses == [REQUEST[index:][::-1] for index in range(0, 400, 50)]
+
+
+def test_no_response_times_out():
+    async def exchange():
+        pty_meter = PtyMeter.open(SimulatedHdlcMeter())
+        pty_meter.responding = False
+        transport = make_transport(pty_meter.port)
+        transport.timeout = 0.1
+        try:
+            await transport.connect()
+        finally:
+            transport.close()
+            pty_meter.close()
+
+    with pytest.raises(CommunicationError):
+        run(exchange())
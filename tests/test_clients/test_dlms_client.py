@@ -1,9 +1,14 @@
+from typing import *
+
 import pytest
 
-from dlms_cosem import enumerations
+from dlms_cosem import cosem, dlms_data, enumerations
 from dlms_cosem.clients.blocking_tcp_transport import BlockingTcpTransport
-from dlms_cosem.clients.dlms_client import DlmsClient
-from dlms_cosem.exceptions import DlmsClientException
+from dlms_cosem.clients.dlms_client import ActionError, DlmsClient
+from dlms_cosem.connection import DlmsConnection, XDlmsApduFactory
+from dlms_cosem.exceptions import DlmsClientException, LocalDlmsProtocolError
+from dlms_cosem.protocol import xdlms
+from dlms_cosem.protocol.xdlms.conformance import Conformance
 from dlms_cosem.state import READY
 
 
@@ -114,3 +119,257 @@ class TestDlmsClientContextSwitch:
                 authentication_key=self.authentication_key,
                 authentication_method=self.auth,
             )
+
+
+class BlockTransferActionMeter:
+    """
+    Receives action parameters in blocks and returns the parameters as return data,
+    split into blocks of 10 bytes. The blocks carry one Action-Response-With-Optional-
+    Data for an ACTION-Normal and a SEQUENCE OF them for an ACTION.WITH_LIST.
+    """
+
+    def __init__(self, skip_block: Optional[int] = None):
+        # The number of a response block that is never sent, to test block ordering.
+        self.skip_block = skip_block
+        self.received = bytearray()
+        self.response_blocks = list()
+        self.requests = list()
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def respond_with_blocks(self, invoke_id_and_priority):
+        first_request = self.requests[0]
+        if isinstance(first_request, xdlms.ActionRequestWithListAndFirstPblock):
+            results = [
+                xdlms.ActionResponseWithOptionalData(
+                    status=enumerations.ActionResultStatus.SUCCESS
+                )
+                for _ in first_request.cosem_methods
+            ]
+            # The list of results starts after the tag, response type, invoke id and
+            # priority.
+            raw = xdlms.ActionResponseWithList(responses=results).to_bytes()[3:]
+        else:
+            raw = xdlms.ActionResponseWithOptionalData(
+                status=enumerations.ActionResultStatus.SUCCESS,
+                data=bytes(self.received),
+            ).to_bytes()
+        self.response_blocks = [raw[i : i + 10] for i in range(0, len(raw), 10)]
+        return self.next_response_block(0, invoke_id_and_priority)
+
+    def next_response_block(self, acknowledged_block, invoke_id_and_priority):
+        block_number = acknowledged_block + 1
+        if block_number == self.skip_block:
+            block_number += 1
+        if block_number == len(self.response_blocks):
+            response_class = xdlms.ActionResponseLastPblock
+        else:
+            response_class = xdlms.ActionResponseWithPblock
+        return response_class(
+            data=self.response_blocks[block_number - 1],
+            block_number=block_number,
+            invoke_id_and_priority=invoke_id_and_priority,
+        ).to_bytes()
+
+    def send(self, data: bytes) -> bytes:
+        request = XDlmsApduFactory.apdu_from_bytes(data)
+        self.requests.append(request)
+        if isinstance(request, xdlms.ActionRequestNextPblock):
+            return self.next_response_block(
+                request.block_number, request.invoke_id_and_priority
+            )
+        self.received.extend(request.pblock.raw_data)
+        if request.pblock.last_block:
+            return self.respond_with_blocks(request.invoke_id_and_priority)
+        return xdlms.ActionResponseNextPblock(
+            block_number=request.pblock.block_number,
+            invoke_id_and_priority=request.invoke_id_and_priority,
+        ).to_bytes()
+
+
+class TestDlmsClientActionBlockTransfer:
+    method = cosem.CosemMethod(
+        interface=enumerations.CosemInterface.IMAGE_TRANSFER,
+        instance=cosem.Obis(0, 0, 44, 0, 0),
+        method=2,
+    )
+
+    @staticmethod
+    def get_client(meter, block_transfer_with_action: bool = True) -> DlmsClient:
+        return DlmsClient(
+            client_logical_address=16,
+            server_logical_address=1,
+            io_interface=meter,
+            dlms_connection=DlmsConnection.with_pre_established_association(
+                conformance=Conformance(
+                    action=True, block_transfer_with_action=block_transfer_with_action
+                ),
+                max_pdu_size=64,
+            ),
+        )
+
+    def test_large_action_is_sent_in_blocks(self):
+        meter = BlockTransferActionMeter()
+        client = self.get_client(meter)
+        data = dlms_data.OctetStringData(bytes(range(0, 150))).to_bytes()
+
+        result = client.action(self.method, data)
+
+        assert bytes(meter.received) == data
+        assert result == data
+        assert isinstance(meter.requests[0], xdlms.ActionRequestWithFirstPblock)
+        assert all(len(request.to_bytes()) <= 64 for request in meter.requests)
+        assert client.dlms_connection.state.current_state == READY
+
+    def test_large_action_many_is_sent_in_blocks(self):
+        meter = BlockTransferActionMeter()
+        client = self.get_client(meter)
+        data = [dlms_data.OctetStringData(bytes(60)).to_bytes(), None]
+
+        results = client.action_many([self.method, self.method], data)
+
+        assert len(results) == 2
+        assert isinstance(meter.requests[0], xdlms.ActionRequestWithListAndFirstPblock)
+        assert xdlms.ActionRequestWithList.decode_parameters(meter.received) == data
+
+    def test_response_blocks_out_of_order_raises(self):
+        client = self.get_client(BlockTransferActionMeter(skip_block=2))
+        data = dlms_data.OctetStringData(bytes(range(0, 150))).to_bytes()
+
+        with pytest.raises(ActionError):
+            client.action(self.method, data)
+
+    def test_action_block_transfer_is_proposed_when_asked_for(self):
+        meter = BlockTransferActionMeter()
+        default = DlmsClient(
+            client_logical_address=16, server_logical_address=1, io_interface=meter
+        )
+        client = DlmsClient(
+            client_logical_address=16,
+            server_logical_address=1,
+            io_interface=meter,
+            action_block_transfer=True,
+        )
+
+        assert not default.dlms_connection.conformance.block_transfer_with_action
+        assert client.dlms_connection.conformance.block_transfer_with_action
+
+    def test_too_large_action_without_block_transfer_raises(self):
+        client = self.get_client(
+            BlockTransferActionMeter(), block_transfer_with_action=False
+        )
+        data = dlms_data.OctetStringData(bytes(150)).to_bytes()
+        with pytest.raises(LocalDlmsProtocolError):
+            client.action(self.method, data)
+
+
+class AccessMeter:
+    def __init__(self):
+        self.clock = dlms_data.OctetStringData(bytes(12)).to_bytes()
+        self.requests = list()
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def send(self, data: bytes) -> bytes:
+        request = XDlmsApduFactory.apdu_from_bytes(data)
+        self.requests.append(request)
+        responses = list()
+        for item in request.requests:
+            if isinstance(item, xdlms.AccessRequestGet):
+                if item.cosem_attribute.interface == enumerations.CosemInterface.CLOCK:
+                    value = self.clock
+                else:
+                    value = dlms_data.UnsignedIntegerData(1).to_bytes()
+                responses.append(
+                    xdlms.AccessResponseGet(
+                        result=enumerations.DataAccessResult.SUCCESS, data=value
+                    )
+                )
+            elif isinstance(item, xdlms.AccessRequestSet):
+                self.clock = item.data
+                responses.append(
+                    xdlms.AccessResponseSet(
+                        result=enumerations.DataAccessResult.SUCCESS
+                    )
+                )
+        return xdlms.AccessResponse(
+            long_invoke_id_and_priority=request.long_invoke_id_and_priority,
+            responses=responses,
+        ).to_bytes()
+
+
+class UnsupportedAccessMeter(AccessMeter):
+    def send(self, data: bytes) -> bytes:
+        return xdlms.ConfirmedServiceError(
+            error=enumerations.ServiceError.SERVICE_UNSUPPORTED
+        ).to_bytes()
+
+
+class TestDlmsClientAccess:
+    clock = cosem.CosemAttribute(
+        interface=enumerations.CosemInterface.CLOCK,
+        instance=cosem.Obis(0, 0, 1, 0, 0),
+        attribute=2,
+    )
+    status = cosem.CosemAttribute(
+        interface=enumerations.CosemInterface.DATA,
+        instance=cosem.Obis(0, 0, 96, 5, 0),
+        attribute=2,
+    )
+
+    def test_access(self):
+        meter = AccessMeter()
+        client = DlmsClient(
+            client_logical_address=16,
+            server_logical_address=1,
+            io_interface=meter,
+            dlms_connection=DlmsConnection.with_pre_established_association(
+                conformance=Conformance(access=True)
+            ),
+        )
+        new_time = dlms_data.OctetStringData(b"\x07\xe5" + bytes(10)).to_bytes()
+
+        responses = client.access(
+            [
+                xdlms.AccessRequestGet(cosem_attribute=self.clock),
+                xdlms.AccessRequestSet(cosem_attribute=self.clock, data=new_time),
+                xdlms.AccessRequestGet(cosem_attribute=self.status),
+            ]
+        )
+
+        assert [response.result for response in responses] == [
+            enumerations.DataAccessResult.SUCCESS
+        ] * 3
+        assert responses[0].data == dlms_data.OctetStringData(bytes(12)).to_bytes()
+        assert responses[2].data == b"\x11\x01"
+        assert meter.clock == new_time
+        assert len(meter.requests) == 1
+        assert client.dlms_connection.state.current_state == READY
+
+        client.access([xdlms.AccessRequestGet(cosem_attribute=self.clock)])
+        invoke_ids = [
+            r.long_invoke_id_and_priority.long_invoke_id for r in meter.requests
+        ]
+        assert invoke_ids == [1, 2]
+
+    def test_access_not_supported_by_meter_raises(self):
+        client = DlmsClient(
+            client_logical_address=16,
+            server_logical_address=1,
+            io_interface=UnsupportedAccessMeter(),
+            dlms_connection=DlmsConnection.with_pre_established_association(
+                conformance=Conformance(access=True)
+            ),
+        )
+
+        with pytest.raises(DlmsClientException):
+            client.access([xdlms.AccessRequestGet(cosem_attribute=self.clock)])
+        assert client.dlms_connection.state.current_state == READY
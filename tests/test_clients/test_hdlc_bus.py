@@ -0,0 +1,150 @@
+import asyncio
+import os
+import pty
+from typing import *
+
+import attr
+
+from dlms_cosem.clients.hdlc_bus import HdlcBus
+from dlms_cosem.clients.hdlc_transport import LLC_COMMAND_HEADER
+from dlms_cosem.hdlc import address, frames
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+from tests.test_clients.test_async_hdlc_transport import run
+from tests.test_clients.test_hdlc_transport import REQUEST, SimulatedHdlcMeter
+
+PHYSICAL_ADDRESSES = [17, 18, 19]
+
+
+@attr.s(auto_attribs=True)
+class PtyBus:
+    """
+    Meters sharing the master side of a pseudo-terminal. Frames are passed to the
+    meter with the physical address in the destination address.
+    """
+
+    meters: Dict[int, SimulatedHdlcMeter]
+    master: int
+    slave: int
+    scanner: HdlcFrameScanner = attr.ib(factory=HdlcFrameScanner)
+    # Physical address of the meter of each received request, in order.
+    requests: List[int] = attr.ib(factory=list)
+
+    @classmethod
+    def open(cls, physical_addresses: List[int]) -> "PtyBus":
+        meters = {
+            physical_address: SimulatedHdlcMeter(
+                server_address=address.HdlcAddress(1, physical_address, "server")
+            )
+            for physical_address in physical_addresses
+        }
+        master, slave = pty.openpty()
+        os.set_blocking(master, False)
+        bus = cls(meters, master, slave)
+        asyncio.get_event_loop().add_reader(master, bus.data_received)
+        return bus
+
+    @property
+    def port(self) -> str:
+        return os.ttyname(self.slave)
+
+    def data_received(self):
+        self.scanner.receive_data(os.read(self.master, 4096))
+        while True:
+            frame_bytes = self.scanner.next_frame_bytes()
+            if frame_bytes is None:
+                break
+            destination, _ = address.HdlcAddress.find_address_in_frame_bytes(
+                frame_bytes
+            )
+            meter = self.meters[destination[1]]
+            requests = len(meter.requests)
+            meter.write(frame_bytes)
+            if len(meter.requests) > requests:
+                self.requests.append(destination[1])
+            if meter.out_buffer:
+                os.write(self.master, meter.out_buffer)
+                meter.out_buffer = bytearray()
+
+    def close(self):
+        asyncio.get_event_loop().remove_reader(self.master)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def test_meters_take_turns_on_the_line():
+    async def read_meter(bus: HdlcBus, physical_address: int) -> List[bytes]:
+        transport = bus.transport(server_physical_address=physical_address)
+        responses = list()
+        for index in range(3):
+            responses.append(await transport.send(REQUEST[index:]))
+            # Handling the response gives the other meters a turn.
+            await asyncio.sleep(0)
+        return responses
+
+    async def read_all():
+        pty_bus = PtyBus.open(PHYSICAL_ADDRESSES)
+        bus = HdlcBus(serial_port=pty_bus.port, timeout=1)
+        try:
+            await asyncio.gather(
+                *[
+                    bus.transport(server_physical_address=address).connect()
+                    for address in PHYSICAL_ADDRESSES
+                ]
+            )
+            responses = await asyncio.gather(
+                *[read_meter(bus, address) for address in PHYSICAL_ADDRESSES]
+            )
+            await bus.close()
+        finally:
+            pty_bus.close()
+        return pty_bus, responses
+
+    pty_bus, responses = run(read_all())
+
+    expected = [REQUEST[index:][::-1] for index in range(3)]
+    assert responses == [expected] * len(PHYSICAL_ADDRESSES)
+    assert pty_bus.requests == PHYSICAL_ADDRESSES * 3
+    for meter in pty_bus.meters.values():
+        assert meter.requests == [LLC_COMMAND_HEADER + REQUEST[i:] for i in range(3)]
+
+
+def test_link_is_kept_between_sessions():
+    async def sessions():
+        pty_bus = PtyBus.open([17])
+        bus = HdlcBus(serial_port=pty_bus.port, timeout=1)
+        try:
+            for _ in range(2):
+                transport = bus.transport(server_physical_address=17)
+                async with transport:
+                    await transport.send(REQUEST[:10])
+            await bus.close()
+        finally:
+            pty_bus.close()
+        return pty_bus.meters[17]
+
+    meter = run(sessions())
+    # SNRM, 2 information frames and DISC when the bus is closed.
+    assert meter.received_controls[0] == 0x93
+    assert meter.received_controls[-1] == 0x53
+    assert len(meter.received_controls) == 4
+
+
+def test_frames_are_routed_by_address():
+    async def route():
+        bus = HdlcBus(serial_port="simulated")
+        links = [
+            bus.transport(server_physical_address=17 + index) for index in range(2)
+        ]
+        for link in links:
+            link._received = asyncio.Queue()
+        for physical_address in [18, 19]:
+            bus.route_frame(
+                frames.UnNumberedAcknowledgmentFrame(
+                    address.HdlcAddress(16, None, "client"),
+                    address.HdlcAddress(1, physical_address, "server"),
+                ).to_bytes()
+            )
+        return [link._received.qsize() for link in links]
+
+    # The frame from the unknown meter 19 is dropped.
+    assert run(route()) == [0, 1]
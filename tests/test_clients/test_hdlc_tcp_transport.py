@@ -0,0 +1,153 @@
+import asyncio
+import socket
+import threading
+from typing import *
+
+import attr
+import pytest
+
+from dlms_cosem.clients.hdlc_bus import HdlcTcpBus
+from dlms_cosem.clients.hdlc_tcp_transport import HdlcTcpTransport
+from dlms_cosem.clients.hdlc_transport import LLC_COMMAND_HEADER
+from dlms_cosem.exceptions import CommunicationError
+from dlms_cosem.hdlc import address
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+from tests.test_clients.test_async_hdlc_transport import run
+from tests.test_clients.test_hdlc_transport import REQUEST, SimulatedHdlcMeter
+
+
+def listening_socket() -> socket.socket:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    return server
+
+
+@attr.s(auto_attribs=True)
+class Converter:
+    """
+    A serial-to-IP converter with meters on its serial side. Frames are passed to the
+    meter with the physical address in the destination address.
+    """
+
+    physical_addresses: List[Optional[int]]
+    meters: Dict[Optional[int], SimulatedHdlcMeter] = attr.ib(
+        default=attr.Factory(
+            lambda self: {
+                physical_address: SimulatedHdlcMeter(
+                    server_address=address.HdlcAddress(1, physical_address, "server")
+                )
+                for physical_address in self.physical_addresses
+            },
+            takes_self=True,
+        )
+    )
+    scanner: HdlcFrameScanner = attr.ib(factory=HdlcFrameScanner)
+
+    def receive(self, data: bytes) -> bytes:
+        self.scanner.receive_data(data)
+        out = bytearray()
+        while True:
+            frame_bytes = self.scanner.next_frame_bytes()
+            if frame_bytes is None:
+                return bytes(out)
+            destination, _ = address.HdlcAddress.find_address_in_frame_bytes(
+                frame_bytes
+            )
+            meter = self.meters[destination[1]]
+            meter.write(frame_bytes)
+            out += meter.out_buffer
+            meter.out_buffer = bytearray()
+
+    def serve_one_connection(self) -> Tuple[str, int]:
+        """
+        Accepts one connection in a thread and returns the address to connect to.
+        """
+        server = listening_socket()
+
+        def serve():
+            connection, _ = server.accept()
+            server.close()
+            with connection:
+                while True:
+                    data = connection.recv(4096)
+                    if not data:
+                        return
+                    connection.sendall(self.receive(data))
+
+        threading.Thread(target=serve, daemon=True).start()
+        return server.getsockname()
+
+
+def test_hdlc_over_tcp():
+    converter = Converter([None])
+    host, port = converter.serve_one_connection()
+    transport = HdlcTcpTransport(
+        client_logical_address=16,
+        server_logical_address=1,
+        host=host,
+        port=port,
+        timeout=1,
+    )
+
+    with transport:
+        assert transport.send(REQUEST) == REQUEST[::-1]
+
+    meter = converter.meters[None]
+    assert meter.requests == [LLC_COMMAND_HEADER + REQUEST]
+    assert meter.received_controls[-1] == 0x53
+    assert transport.tcp_socket is None
+
+
+def test_connection_refused():
+    server = listening_socket()
+    host, port = server.getsockname()
+    server.close()
+    transport = HdlcTcpTransport(
+        client_logical_address=16, server_logical_address=1, host=host, port=port
+    )
+
+    with pytest.raises(CommunicationError):
+        transport.connect()
+
+
+def test_meters_share_one_tcp_connection():
+    converter = Converter([17, 18])
+
+    async def read_meter(bus: HdlcTcpBus, physical_address: int) -> bytes:
+        transport = bus.transport(server_physical_address=physical_address)
+        await transport.connect()
+        return await transport.send(REQUEST[physical_address:])
+
+    async def read_all():
+        connections = list()
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                writer.write(converter.receive(data))
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()
+        bus = HdlcTcpBus(host=host, port=port, timeout=1)
+        try:
+            responses = await asyncio.gather(
+                *[read_meter(bus, address) for address in [17, 18]]
+            )
+            await bus.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+        return responses, len(connections)
+
+    responses, connections = run(read_all())
+
+    assert responses == [REQUEST[17:][::-1], REQUEST[18:][::-1]]
+    assert connections == 1
+    for physical_address, meter in converter.meters.items():
+        assert meter.requests == [LLC_COMMAND_HEADER + REQUEST[physical_address:]]
+        assert meter.received_controls[-1] == 0x53
@@ -0,0 +1,371 @@
+from typing import *
+
+import attr
+import pytest
+import serial
+
+from dlms_cosem import iec62056_21
+from dlms_cosem.clients.hdlc_transport import (
+    LLC_COMMAND_HEADER,
+    LLC_RESPONSE_HEADER,
+    SerialHdlcTransport,
+)
+from dlms_cosem.hdlc import address, fields, frames
+from dlms_cosem.hdlc.connection import HdlcConnection
+
+CLIENT_ADDRESS = address.HdlcAddress(logical_address=16, address_type="client")
+SERVER_ADDRESS = address.HdlcAddress(logical_address=1, address_type="server")
+
+
+@attr.s(auto_attribs=True)
+class SimulatedHdlcMeter:
+    """
+    Acts as the serial port of a SerialHdlcTransport and answers with the HDLC frames a
+    meter would send. The response to a request is the request reversed.
+
+    Frames can be "lost" to test the recovery with REJ frames.
+    Setting `read_size` limits the bytes returned per read to simulate data trickling
+    in over a slow line.
+    """
+
+    server_address: address.HdlcAddress = attr.ib(default=SERVER_ADDRESS)
+    window_size: int = attr.ib(default=1)
+    max_data_size: int = attr.ib(default=128)
+    max_receive_size: int = attr.ib(default=128)
+    # Index of frames received from the client that are lost the first time.
+    drop_received: Set[int] = attr.ib(factory=set)
+    # Index of frames sent by the meter that are lost the first time.
+    drop_sent: Set[int] = attr.ib(factory=set)
+    read_size: Optional[int] = attr.ib(default=None)
+
+    in_buffer: bytearray = attr.ib(factory=bytearray)
+    out_buffer: bytearray = attr.ib(factory=bytearray)
+    received_frames: int = attr.ib(default=0)
+    sent_frames: int = attr.ib(default=0)
+    received_controls: List[int] = attr.ib(factory=list)
+    requests: List[bytes] = attr.ib(factory=list)
+    vs: int = attr.ib(default=0)
+    vr: int = attr.ib(default=0)
+    missed_frame: bool = attr.ib(default=False)
+    response_segments: List[bytes] = attr.ib(factory=list)
+    response_position: int = attr.ib(default=0)
+    reads: int = attr.ib(default=0)
+
+    def write(self, data: bytes):
+        self.received_frames += 1
+        if self.received_frames - 1 in self.drop_received:
+            return
+        position = frames.control_field_position(data)
+        control = data[position]
+        # Information field after the control field and HCS.
+        information = data[position + 3 : -3]
+        self.received_controls.append(control)
+        final = bool(control & 0b00010000)
+        if control == 0x93:  # SNRM
+            self.receive_snrm(information)
+        elif control == 0x53:  # DISC
+            self.write_out(
+                frames.UnNumberedAcknowledgmentFrame(
+                    CLIENT_ADDRESS, self.server_address
+                )
+            )
+        elif control & 0b1 == 0:
+            self.receive_information(data, information, control, final)
+        elif control & 0b1111 == 0b0001:  # RR
+            self.send_window(self.response_position)
+        elif control & 0b1111 == 0b1001:  # REJ
+            rejected = (self.vs - (control >> 5)) % 8
+            self.send_window(self.response_position - rejected)
+
+    def receive_snrm(self, information: bytes):
+        if not information:
+            # No parameters, use default values.
+            self.window_size = 1
+            self.max_data_size = 128
+            self.write_out(
+                frames.UnNumberedAcknowledgmentFrame(
+                    CLIENT_ADDRESS, self.server_address
+                )
+            )
+            return
+        proposed = fields.HdlcParameterList.from_bytes(information)
+        self.window_size = min(self.window_size, proposed.window_size_receive)
+        self.max_data_size = min(self.max_data_size, proposed.max_info_length_receive)
+        accepted = fields.HdlcParameterList(
+            max_info_length_transmit=self.max_data_size,
+            max_info_length_receive=min(
+                self.max_receive_size, proposed.max_info_length_transmit
+            ),
+            window_size_transmit=self.window_size,
+            window_size_receive=min(self.window_size, proposed.window_size_transmit),
+        )
+        self.write_out(
+            frames.UnNumberedAcknowledgmentFrame(
+                CLIENT_ADDRESS, self.server_address, payload=accepted.to_bytes()
+            )
+        )
+
+    def receive_information(
+        self, data: bytes, information: bytes, control: int, final: bool
+    ):
+        ssn = (control >> 1) & 0b111
+        if ssn == self.vr and not self.missed_frame:
+            self.in_buffer += information
+            self.vr = (self.vr + 1) % 8
+        else:
+            self.missed_frame = True
+        if not final:
+            return
+        if self.missed_frame:
+            self.missed_frame = False
+            self.write_out(
+                frames.RejectFrame(
+                    CLIENT_ADDRESS, self.server_address, receive_sequence_number=self.vr
+                )
+            )
+            return
+        segmented = bool(data[1] & 0b00001000)
+        if segmented:
+            self.write_out(
+                frames.ReceiveReadyFrame(
+                    CLIENT_ADDRESS, self.server_address, receive_sequence_number=self.vr
+                )
+            )
+            return
+        request = bytes(self.in_buffer)
+        self.requests.append(request)
+        self.in_buffer = bytearray()
+        response = LLC_RESPONSE_HEADER + request[len(LLC_COMMAND_HEADER) :][::-1]
+        self.response_segments = [
+            response[index : index + self.max_data_size]
+            for index in range(0, len(response), self.max_data_size)
+        ]
+        self.response_position = 0
+        self.send_window(0)
+
+    def send_window(self, position: int):
+        self.vs = (self.vs - (self.response_position - position)) % 8
+        window = self.response_segments[position : position + self.window_size]
+        for index, segment in enumerate(window, start=position):
+            frame = frames.InformationFrame(
+                CLIENT_ADDRESS,
+                self.server_address,
+                payload=segment,
+                send_sequence_number=self.vs,
+                receive_sequence_number=self.vr,
+                segmented=index < len(self.response_segments) - 1,
+                final=index == position + len(window) - 1,
+            )
+            self.vs = (self.vs + 1) % 8
+            self.write_out(frame)
+        self.response_position = position + len(window)
+
+    def write_out(self, frame):
+        self.sent_frames += 1
+        if self.sent_frames - 1 in self.drop_sent:
+            return
+        self.out_buffer += frame.to_bytes()
+
+    @property
+    def in_waiting(self) -> int:
+        if self.read_size is None:
+            return len(self.out_buffer)
+        return min(self.read_size, len(self.out_buffer))
+
+    def read(self, size: int = 1) -> bytes:
+        self.reads += 1
+        if self.read_size is not None:
+            size = min(size, self.read_size)
+        out = bytes(self.out_buffer[:size])
+        del self.out_buffer[:size]
+        return out
+
+
+def make_transport(
+    meter: SimulatedHdlcMeter,
+    window_size: int = 1,
+    max_info_length: int = 128,
+    receive_window_size: Optional[int] = None,
+):
+    transport = SerialHdlcTransport(
+        client_logical_address=16,
+        server_logical_address=1,
+        serial_port="simulated",
+        serial=meter,
+        hdlc_connection=HdlcConnection(
+            CLIENT_ADDRESS,
+            SERVER_ADDRESS,
+            max_data_size=max_info_length,
+            max_data_size_receive=max_info_length,
+            window_size_transmit=window_size,
+            window_size_receive=receive_window_size or meter.window_size,
+        ),
+    )
+    transport.connect()
+    return transport
+
+
+REQUEST = bytes(range(256)) * 3
+
+
+def test_send_without_windowing():
+    meter = SimulatedHdlcMeter()
+    transport = make_transport(meter)
+
+    assert transport.send(REQUEST) == REQUEST[::-1]
+    assert meter.requests == [LLC_COMMAND_HEADER + REQUEST]
+    # All information frames are final when window size is 1.
+    information_controls = [c for c in meter.received_controls if c & 0b1 == 0]
+    assert all(c & 0b00010000 for c in information_controls)
+
+
+def test_send_with_window():
+    meter = SimulatedHdlcMeter(window_size=3)
+    transport = make_transport(meter, window_size=3)
+
+    assert transport.send(REQUEST) == REQUEST[::-1]
+    assert transport.send(REQUEST[:10]) == REQUEST[:10][::-1]
+    # 7 information frames in 3 windows. 1 SNRM and 2 RR to request the
+    # next response windows.
+    assert len(meter.received_controls) == 1 + 7 + 2 + 1
+    assert transport.hdlc_connection.unacknowledged_frames == []
+
+
+def test_server_rejects_missing_frame():
+    meter = SimulatedHdlcMeter(window_size=3, drop_received={2})
+    transport = make_transport(meter, window_size=3)
+
+    assert transport.send(REQUEST) == REQUEST[::-1]
+    assert meter.requests == [LLC_COMMAND_HEADER + REQUEST]
+
+
+def test_client_rejects_missing_frame():
+    # UA, 2 RR and the first response frame is sent before the lost frame.
+    meter = SimulatedHdlcMeter(window_size=3, drop_sent={4})
+    transport = make_transport(meter, window_size=3)
+
+    assert transport.send(REQUEST) == REQUEST[::-1]
+    reject_controls = [c for c in meter.received_controls if c & 0b1111 == 0b1001]
+    assert len(reject_controls) == 1
+    assert not transport.hdlc_connection.reject_pending
+
+
+def test_hdlc_parameters_are_negotiated():
+    meter = SimulatedHdlcMeter(window_size=2, max_data_size=256, max_receive_size=512)
+    transport = make_transport(
+        meter, window_size=3, max_info_length=1024, receive_window_size=3
+    )
+
+    connection = transport.hdlc_connection
+    assert connection.max_data_size == 512
+    assert connection.max_data_size_receive == 256
+    assert connection.window_size_transmit == 2
+    assert connection.window_size_receive == 2
+
+    request = REQUEST * 3
+    assert transport.send(request) == request[::-1]
+    # 3 frames of 512 bytes and a last one.
+    information_controls = [c for c in meter.received_controls if c & 0b1 == 0]
+    assert len(information_controls) == 5
+
+
+def test_response_window_is_read_in_one_go():
+    meter = SimulatedHdlcMeter(window_size=3)
+    transport = make_transport(meter, window_size=3)
+    meter.reads = 0
+
+    assert transport.send(REQUEST) == REQUEST[::-1]
+    # 7 frames in each direction. One read for each of the 2 RR acknowledging the
+    # request windows and one for each of the 3 response windows.
+    assert meter.reads == 5
+
+
+def test_frames_split_over_several_reads():
+    meter = SimulatedHdlcMeter(window_size=2, read_size=5)
+    transport = make_transport(meter, window_size=2)
+
+    assert transport.send(REQUEST) == REQUEST[::-1]
+    assert meter.requests == [LLC_COMMAND_HEADER + REQUEST]
+
+
+@attr.s(auto_attribs=True)
+class ModeEMeter(SimulatedHdlcMeter):
+    """
+    Starts in IEC 62056-21 and switches to HDLC at the baud rate selected in the
+    acknowledgement of its identification.
+    """
+
+    identification: bytes = attr.ib(default=b"/ABC6\\2METER\r\n")
+    baudrate: int = attr.ib(default=9600)
+    bytesize: int = attr.ib(default=serial.EIGHTBITS)
+    parity: str = attr.ib(default=serial.PARITY_NONE)
+    selected_baud_rate: Optional[int] = attr.ib(default=None)
+    # Baud rate, data bits and parity of the port for each write from the client.
+    line_settings: List[Tuple[int, int, str]] = attr.ib(factory=list)
+
+    def write(self, data: bytes):
+        self.line_settings.append((self.baudrate, self.bytesize, self.parity))
+        if data.startswith(b"/?"):
+            self.out_buffer += self.identification
+        elif data.startswith(iec62056_21.ACK):
+            self.selected_baud_rate = iec62056_21.BAUD_RATES[chr(data[2])]
+        else:
+            super().write(data)
+
+    def read_until(self, expected: bytes) -> bytes:
+        end = self.out_buffer.find(expected)
+        return self.read(len(self.out_buffer) if end < 0 else end + len(expected))
+
+    def reset_input_buffer(self):
+        self.out_buffer = bytearray()
+
+    def flush(self):
+        pass
+
+
+def make_mode_e_transport(meter: ModeEMeter, **kwargs) -> SerialHdlcTransport:
+    return SerialHdlcTransport(
+        client_logical_address=16,
+        server_logical_address=1,
+        serial_port="simulated",
+        serial=meter,
+        iec_mode_e=True,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def no_baud_rate_switch_delay(monkeypatch):
+    monkeypatch.setattr(iec62056_21, "BAUD_RATE_SWITCH_DELAY", 0)
+
+
+def test_mode_e_handshake_before_snrm(no_baud_rate_switch_delay):
+    meter = ModeEMeter()
+    transport = make_mode_e_transport(meter)
+    transport.connect()
+
+    assert transport.send(REQUEST[:10]) == REQUEST[:10][::-1]
+    assert meter.selected_baud_rate == 19200
+    handshake = (300, serial.SEVENBITS, serial.PARITY_EVEN)
+    hdlc = (19200, serial.EIGHTBITS, serial.PARITY_NONE)
+    # Request and acknowledgement, then SNRM and the request.
+    assert meter.line_settings == [handshake, handshake, hdlc, hdlc]
+    assert meter.received_controls[0] == 0x93
+
+
+def test_mode_e_baud_rate_is_limited_by_client(no_baud_rate_switch_delay):
+    meter = ModeEMeter()
+    transport = make_mode_e_transport(meter, iec_max_baud_rate=9600)
+    transport.connect()
+
+    assert meter.selected_baud_rate == 9600
+    assert meter.baudrate == 9600
+
+
+def test_mode_e_not_supported(no_baud_rate_switch_delay):
+    meter = ModeEMeter(identification=b"/ABC5METER\r\n")
+    transport = make_mode_e_transport(meter)
+
+    with pytest.raises(iec62056_21.Iec62056_21Error):
+        transport.connect()
+    assert meter.received_controls == []
@@ -0,0 +1,282 @@
+from typing import *
+
+import attr
+import pytest
+
+from dlms_cosem import dlms_data, enumerations
+from dlms_cosem.clients.dlms_client import DlmsClient
+from dlms_cosem.clients.image_transfer import (
+    ImageTransfer,
+    ImageTransferError,
+    ImageTransferStatus,
+    missing_blocks,
+    number_of_blocks,
+)
+from dlms_cosem.connection import DlmsConnection, XDlmsApduFactory
+from dlms_cosem.protocol import xdlms
+from dlms_cosem.protocol.xdlms.conformance import Conformance
+
+
+@attr.s(auto_attribs=True)
+class SimulatedImageTransferMeter:
+    """
+    Acts as the io_interface of a DlmsClient and answers GET and ACTION requests on
+    an Image Transfer object.
+    """
+
+    block_size: int = attr.ib(default=16)
+    status: ImageTransferStatus = attr.ib(default=ImageTransferStatus.NOT_INITIATED)
+    image_identifier: bytes = attr.ib(default=b"")
+    image_size: int = attr.ib(default=0)
+    received_blocks: Dict[int, bytes] = attr.ib(factory=dict)
+    # block numbers that will be "lost" the first time they are sent.
+    drop_blocks: Set[int] = attr.ib(factory=set)
+    received_block_numbers: List[int] = attr.ib(factory=list)
+    methods_called: List[int] = attr.ib(factory=list)
+    # reads of image_transfer_status before an asynchronous verification is done.
+    verification_polls: int = attr.ib(default=0)
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    @property
+    def blocks_status(self) -> str:
+        total = number_of_blocks(self.image_size, self.block_size)
+        return "".join(
+            "1" if block in self.received_blocks else "0" for block in range(total)
+        )
+
+    @property
+    def image(self) -> bytes:
+        return b"".join(
+            self.received_blocks[block] for block in sorted(self.received_blocks)
+        )
+
+    def read(self, attribute: int) -> dlms_data.BaseDlmsData:
+        if attribute == 2:
+            return dlms_data.DoubleLongUnsignedData(self.block_size)
+        if attribute == 3:
+            return dlms_data.BitStringData(self.blocks_status)
+        if attribute == 6:
+            if self.status == ImageTransferStatus.VERIFICATION_INITIATED:
+                self.verification_polls -= 1
+                if self.verification_polls < 0:
+                    self.status = ImageTransferStatus.VERIFICATION_SUCCESSFUL
+            return dlms_data.EnumData(self.status)
+        raise ValueError(f"Attribute {attribute} not simulated")
+
+    def call(self, method: int, data: bytes) -> enumerations.ActionResultStatus:
+        self.methods_called.append(method)
+        parsed = dlms_data.DlmsDataParser().parse(data, limit=1)[0]
+        if method == 1:
+            image_identifier = parsed.value[0].value
+            image_size = parsed.value[1].value
+            # A transfer of the same image is resumed.
+            if (image_identifier, image_size) != (
+                self.image_identifier,
+                self.image_size,
+            ):
+                self.received_blocks = dict()
+            self.image_identifier = image_identifier
+            self.image_size = image_size
+            self.status = ImageTransferStatus.INITIATED
+        elif method == 2:
+            block_number = parsed.value[0].value
+            self.received_block_numbers.append(block_number)
+            if block_number in self.drop_blocks:
+                self.drop_blocks.remove(block_number)
+                return enumerations.ActionResultStatus.SUCCESS
+            self.received_blocks[block_number] = parsed.value[1].value
+        elif method == 3:
+            if self.verification_polls:
+                self.status = ImageTransferStatus.VERIFICATION_INITIATED
+                return enumerations.ActionResultStatus.TEMPORARY_FAILURE
+            self.status = ImageTransferStatus.VERIFICATION_SUCCESSFUL
+        elif method == 4:
+            self.status = ImageTransferStatus.ACTIVATION_SUCCESSFUL
+        return enumerations.ActionResultStatus.SUCCESS
+
+    def send(self, data: bytes) -> bytes:
+        request = XDlmsApduFactory.apdu_from_bytes(data)
+        if isinstance(request, xdlms.GetRequestNormal):
+            return xdlms.GetResponseNormal(
+                data=self.read(request.cosem_attribute.attribute).to_bytes(),
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        if isinstance(request, xdlms.ActionRequestNormal):
+            return xdlms.ActionResponseNormal(
+                status=self.call(request.cosem_method.method, request.data),
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        if isinstance(request, xdlms.ActionRequestWithList):
+            for method, data in zip(request.cosem_methods, request.data):
+                self.call(method.method, data)
+            return xdlms.ActionResponseWithList(
+                responses=[
+                    xdlms.ActionResponseWithOptionalData(
+                        status=enumerations.ActionResultStatus.SUCCESS
+                    )
+                    for _ in request.cosem_methods
+                ],
+                invoke_id_and_priority=request.invoke_id_and_priority,
+            ).to_bytes()
+        raise ValueError(f"Request {request} not simulated")
+
+
+def make_image_transfer(meter: SimulatedImageTransferMeter, **kwargs) -> ImageTransfer:
+    client = DlmsClient(
+        client_logical_address=16,
+        server_logical_address=1,
+        io_interface=meter,
+        dlms_connection=DlmsConnection.with_pre_established_association(
+            conformance=Conformance(get=True, action=True)
+        ),
+    )
+    return ImageTransfer(dlms_client=client, **kwargs)
+
+
+IMAGE = bytes(range(0, 256)) * 4 + b"tail"
+
+
+def test_number_of_blocks():
+    assert number_of_blocks(32, 16) == 2
+    assert number_of_blocks(33, 16) == 3
+    assert number_of_blocks(1, 16) == 1
+
+
+def test_missing_blocks():
+    assert missing_blocks("1011", 4) == [1]
+    # bits not reported are treated as not transferred.
+    assert missing_blocks("11", 4) == [2, 3]
+
+
+def test_upload():
+    meter = SimulatedImageTransferMeter()
+    result = make_image_transfer(meter).upload(IMAGE, image_identifier=b"fw-1")
+
+    assert meter.image == IMAGE
+    assert meter.status == ImageTransferStatus.VERIFICATION_SUCCESSFUL
+    assert meter.methods_called[0] == 1
+    assert result.total_blocks == 65
+    assert result.blocks_sent == 65
+    assert result.bytes_sent == len(IMAGE)
+
+
+def test_upload_resends_missing_blocks():
+    meter = SimulatedImageTransferMeter(drop_blocks={3, 10})
+    result = make_image_transfer(meter).upload(
+        IMAGE, image_identifier=b"fw-1", verify=False
+    )
+
+    assert meter.image == IMAGE
+    assert meter.received_block_numbers[-2:] == [3, 10]
+    assert result.blocks_sent == 67
+    assert meter.methods_called.count(3) == 0
+
+
+def test_upload_with_several_blocks_per_request():
+    meter = SimulatedImageTransferMeter(drop_blocks={7})
+    meter_requests = list()
+    send = meter.send
+    meter.send = lambda data: meter_requests.append(data) or send(data)
+
+    result = make_image_transfer(meter, blocks_per_request=10).upload(
+        IMAGE, image_identifier=b"fw-1", verify=False
+    )
+
+    assert meter.image == IMAGE
+    assert result.blocks_sent == 66
+    # 7 requests for 65 blocks and one request to resend the dropped block.
+    action_requests = [data for data in meter_requests if data[0] == 195]
+    assert len(action_requests) == 1 + 7 + 1
+
+
+def test_upload_resumes_initiated_transfer():
+    meter = SimulatedImageTransferMeter(
+        status=ImageTransferStatus.INITIATED,
+        image_identifier=b"fw-1",
+        image_size=len(IMAGE),
+    )
+    meter.received_blocks = {
+        block: IMAGE[block * 16 : block * 16 + 16] for block in range(0, 60)
+    }
+    result = make_image_transfer(meter).upload(
+        IMAGE, image_identifier=b"fw-1", activate=True
+    )
+
+    assert meter.image == IMAGE
+    assert meter.methods_called[0] == 1
+    assert meter.received_block_numbers == [60, 61, 62, 63, 64]
+    assert result.blocks_sent == 5
+    assert meter.status == ImageTransferStatus.ACTIVATION_SUCCESSFUL
+
+
+def test_upload_does_not_resume_transfer_of_other_image():
+    meter = SimulatedImageTransferMeter(
+        status=ImageTransferStatus.INITIATED,
+        image_identifier=b"fw-0",
+        image_size=len(IMAGE),
+    )
+    meter.received_blocks = {block: bytes(16) for block in range(0, 60)}
+
+    result = make_image_transfer(meter).upload(
+        IMAGE, image_identifier=b"fw-1", verify=False, activate=True
+    )
+
+    assert meter.image == IMAGE
+    assert result.blocks_sent == 65
+
+
+def test_verify_polls_asynchronous_verification():
+    meter = SimulatedImageTransferMeter(verification_polls=2)
+
+    make_image_transfer(meter, verify_poll_interval=0).upload(
+        IMAGE, image_identifier=b"fw-1"
+    )
+
+    assert meter.status == ImageTransferStatus.VERIFICATION_SUCCESSFUL
+    assert meter.verification_polls < 0
+
+
+def test_upload_without_resume_initiates():
+    meter = SimulatedImageTransferMeter(
+        status=ImageTransferStatus.INITIATED, image_size=len(IMAGE)
+    )
+    result = make_image_transfer(meter).upload(
+        IMAGE, image_identifier=b"fw-1", resume=False
+    )
+    assert meter.methods_called[0] == 1
+    assert result.blocks_sent == 65
+
+
+def test_upload_raises_when_blocks_keeps_missing():
+    meter = SimulatedImageTransferMeter()
+    image_transfer = make_image_transfer(meter, max_retries=0)
+    meter.drop_blocks = {0}
+
+    with pytest.raises(ImageTransferError):
+        image_transfer.upload(IMAGE, image_identifier=b"fw-1")
+
+
+def test_upload_file(tmp_path):
+    image_file = tmp_path / "firmware.bin"
+    image_file.write_bytes(IMAGE)
+    meter = SimulatedImageTransferMeter()
+
+    result = make_image_transfer(meter).upload_file(
+        image_file, image_identifier=b"fw-1"
+    )
+    assert meter.image == IMAGE
+    assert result.bytes_sent == len(IMAGE)
+
+
+def test_upload_empty_file_raises(tmp_path):
+    image_file = tmp_path / "firmware.bin"
+    image_file.write_bytes(b"")
+    meter = SimulatedImageTransferMeter()
+
+    with pytest.raises(ImageTransferError):
+        make_image_transfer(meter).upload_file(image_file, image_identifier=b"fw-1")
@@ -1,6 +1,6 @@
 import pytest
 
-from dlms_cosem import dlms_data, enumerations, exceptions, security, state
+from dlms_cosem import cosem, dlms_data, enumerations, exceptions, security, state
 from dlms_cosem.connection import (
     DlmsConnection,
     XDlmsApduFactory,
@@ -24,6 +24,15 @@ def test_conformance_protection_is_set_when_passing_encryption_key():
     assert c.state.current_state == state.NO_ASSOCIATION
 
 
+def test_action_block_transfer_is_only_proposed_when_asked_for():
+    c = DlmsConnection(client_system_title=b"12345678")
+    assert not c.conformance.block_transfer_with_action
+
+    c = DlmsConnection(client_system_title=b"12345678", use_action_block_transfer=True)
+    aarq = c.get_aarq()
+    assert aarq.user_information.content.proposed_conformance.block_transfer_with_action
+
+
 def test_negotiated_conformance_is_updated():
     c = DlmsConnection(client_system_title=b"12345678")
     c.send(c.get_aarq())
@@ -254,6 +263,97 @@ def test_rejection_resets_connection_state(
     assert connection_with_hls.state.current_state == state.NO_ASSOCIATION
 
 
+def test_dedicated_key_is_generated_in_aarq(connection_with_hls: DlmsConnection):
+    connection_with_hls.use_dedicated_ciphering = True
+    connection_with_hls.dedicated_invocation_counter = 5
+
+    aarq = connection_with_hls.get_aarq()
+    first_key = connection_with_hls.global_dedicated_key
+    assert len(first_key) == 16
+    assert aarq.user_information.content.dedicated_key == first_key
+    assert connection_with_hls.dedicated_invocation_counter == 0
+
+    connection_with_hls.get_aarq()
+    assert connection_with_hls.global_dedicated_key != first_key
+
+
+def test_no_dedicated_key_in_aarq_without_dedicated_ciphering(
+    connection_with_hls: DlmsConnection,
+):
+    aarq = connection_with_hls.get_aarq()
+    assert connection_with_hls.global_dedicated_key is None
+    assert aarq.user_information.content.dedicated_key is None
+
+
+def test_xdlms_apdus_are_protected_with_dedicated_key(
+    connection_with_hls: DlmsConnection,
+):
+    connection_with_hls.use_dedicated_ciphering = True
+    connection_with_hls.get_aarq()
+    connection_with_hls.state.current_state = state.READY
+    connection_with_hls.client_invocation_counter = 10
+    get = xdlms.GetRequestNormal(
+        cosem_attribute=cosem.CosemAttribute(
+            interface=enumerations.CosemInterface.DATA,
+            instance=cosem.Obis(0, 0, 0x2B, 1, 0),
+            attribute=2,
+        )
+    )
+
+    data = connection_with_hls.send(get)
+    apdu = XDlmsApduFactory.apdu_from_bytes(data)
+    assert isinstance(apdu, xdlms.GeneralDedicatedCipher)
+    assert apdu.invocation_counter == 0
+    assert connection_with_hls.dedicated_invocation_counter == 1
+    # The global invocation counter is not used.
+    assert connection_with_hls.client_invocation_counter == 10
+
+    plain = security.decrypt(
+        security_control=apdu.security_control,
+        system_title=apdu.system_title,
+        invocation_counter=apdu.invocation_counter,
+        key=connection_with_hls.global_dedicated_key,
+        auth_key=connection_with_hls.global_authentication_key,
+        cipher_text=apdu.ciphered_text,
+    )
+    assert plain == get.to_bytes()
+
+
+def test_dedicated_ciphered_response_is_unprotected(
+    connection_with_hls: DlmsConnection,
+):
+    connection_with_hls.use_dedicated_ciphering = True
+    connection_with_hls.get_aarq()
+    connection_with_hls.state.current_state = state.AWAITING_GET_RESPONSE
+    connection_with_hls.meter_system_title = b"12345678"
+    response = xdlms.GetResponseNormal(data=b"\x12\x00\x01")
+
+    def ciphered_response(invocation_counter: int) -> bytes:
+        return xdlms.GeneralDedicatedCipher(
+            security_control=connection_with_hls.security_control,
+            system_title=connection_with_hls.meter_system_title,
+            invocation_counter=invocation_counter,
+            ciphered_text=security.encrypt(
+                security_control=connection_with_hls.security_control,
+                system_title=connection_with_hls.meter_system_title,
+                auth_key=connection_with_hls.global_authentication_key,
+                key=connection_with_hls.global_dedicated_key,
+                invocation_counter=invocation_counter,
+                plain_text=response.to_bytes(),
+            ),
+        ).to_bytes()
+
+    connection_with_hls.receive_data(ciphered_response(3))
+    assert connection_with_hls.next_event() == response
+    assert connection_with_hls.meter_dedicated_invocation_counter == 3
+    assert connection_with_hls.state.current_state == state.READY
+
+    connection_with_hls.state.current_state = state.AWAITING_GET_RESPONSE
+    connection_with_hls.receive_data(ciphered_response(3))
+    with pytest.raises(LocalDlmsProtocolError):
+        connection_with_hls.next_event()
+
+
 # what happens if the gmac provided by the meter is wrong
 # -> we get an error
 
@@ -319,3 +419,13 @@ class TestMakeClientToServerChallenge:
     def test_too_long_length_raises_value_error(self):
         with pytest.raises(ValueError):
             make_client_to_server_challenge(65)
+
+
+def test_security_contexts_are_reused(connection_with_hls: DlmsConnection):
+    connection_with_hls.encrypt(b"\x01")
+    connection_with_hls.encrypt(b"\x02")
+    assert len(connection_with_hls.security_contexts) == 1
+
+    connection_with_hls.global_encryption_key = b"A" * 16
+    connection_with_hls.encrypt(b"\x03")
+    assert len(connection_with_hls.security_contexts) == 2
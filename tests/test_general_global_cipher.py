@@ -1,5 +1,10 @@
 from dlms_cosem.connection import XDlmsApduFactory
-from dlms_cosem.protocol.xdlms import DataNotification, GeneralGlobalCipher
+from dlms_cosem.protocol.xdlms import (
+    DataNotification,
+    GeneralDedicatedCipher,
+    GeneralGlobalCipher,
+)
+from dlms_cosem.security import SecurityControlField
 
 
 def test_gen_glo_cipher_load():
@@ -51,3 +56,32 @@ def test_data_notification_apdu():
     assert isinstance(apdu, DataNotification)
 
     print(apdu)
+
+
+def test_gen_ded_cipher_parses_from_factory():
+    apdu = GeneralDedicatedCipher(
+        system_title=b"12345678",
+        security_control=SecurityControlField(
+            security_suite=0, authenticated=True, encrypted=True
+        ),
+        invocation_counter=1,
+        ciphered_text=b"\x01\x02\x03",
+    )
+    data = apdu.to_bytes()
+    assert data[0] == 220
+
+    parsed = XDlmsApduFactory.apdu_from_bytes(data)
+    assert isinstance(parsed, GeneralDedicatedCipher)
+    assert parsed == apdu
+
+
+def test_gen_glo_cipher_to_bytes_long_ciphered_text():
+    apdu = GeneralGlobalCipher(
+        system_title=b"12345678",
+        security_control=SecurityControlField(
+            security_suite=0, authenticated=True, encrypted=True
+        ),
+        invocation_counter=1,
+        ciphered_text=bytes(300),
+    )
+    assert XDlmsApduFactory.apdu_from_bytes(apdu.to_bytes()) == apdu
@@ -0,0 +1,49 @@
+import pytest
+
+from dlms_cosem.hdlc import address, fields, frames
+from dlms_cosem.hdlc.builder import HdlcFrameBuilder
+
+CLIENT = address.HdlcAddress(16, None, "client")
+SERVER = address.HdlcAddress(1, None, "server")
+SERVER_WITH_PHYSICAL = address.HdlcAddress(1, 17, "server")
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        frames.SetNormalResponseModeFrame(SERVER, CLIENT),
+        frames.SetNormalResponseModeFrame(
+            SERVER_WITH_PHYSICAL,
+            CLIENT,
+            parameters=fields.HdlcParameterList(window_size_receive=7),
+        ),
+        frames.DisconnectFrame(SERVER, CLIENT),
+        frames.ReceiveReadyFrame(SERVER, CLIENT, receive_sequence_number=5),
+        frames.RejectFrame(SERVER, CLIENT, receive_sequence_number=3),
+        frames.UnNumberedAcknowledgmentFrame(CLIENT, SERVER),
+        frames.UnnumberedInformationFrame(CLIENT, SERVER, payload=b"\x0f\x00"),
+        frames.InformationFrame(
+            SERVER_WITH_PHYSICAL,
+            CLIENT,
+            payload=memoryview(bytes(range(200))),
+            send_sequence_number=2,
+            receive_sequence_number=4,
+            segmented=True,
+            final=False,
+        ),
+    ],
+)
+def test_build_is_same_as_to_bytes(frame):
+    assert HdlcFrameBuilder().build(frame) == frame.to_bytes()
+
+
+def test_addresses_are_encoded_once():
+    builder = HdlcFrameBuilder()
+    for ssn in range(3):
+        frame = frames.InformationFrame(
+            SERVER, CLIENT, payload=b"\x01", send_sequence_number=ssn
+        )
+        assert builder.build(frame) == frame.to_bytes()
+    builder.build(frames.ReceiveReadyFrame(SERVER, CLIENT))
+
+    assert list(builder.address_templates.values()) == [b"\x03\x21"]
@@ -1,6 +1,9 @@
 import pytest
 
-from dlms_cosem.hdlc import address, fields, frames
+from dlms_cosem import crc
+from dlms_cosem.hdlc import address, exceptions, fields, frames, state
+from dlms_cosem.hdlc.connection import HdlcConnection
+from dlms_cosem.hdlc.exceptions import LocalProtocolError
 
 
 def test_hdlc_frame_format_field_from_bytes():
@@ -73,6 +76,33 @@ class TestCrc:
         result = _crc.calculate_for(bytes.fromhex(data))
         assert result == bytes.fromhex(correct_crc)
 
+    def test_crc_lsb_first(self):
+        result = frames.HCS.calculate_for(bytes.fromhex("033f"), lsb_first=True)
+        assert result == bytes.fromhex("ec5b")
+
+    def test_running_crc_over_chunks(self):
+        data = bytes.fromhex("a00802232193")
+        running = frames.FCS.running()
+        running.update(data[:2]).update(memoryview(data)[2:])
+        assert running.digest() == frames.FCS.calculate_for(data)
+
+    @pytest.mark.parametrize("length", [15, 16, 17, 579])
+    def test_crc_of_long_data(self, length):
+        data = bytes(range(256)) * 3
+        value = crc.INITIAL_VALUE
+        for byte in data[1 : length + 1]:
+            value = (value >> 8) ^ crc.CRC_TABLE[(value ^ byte) & 0xFF]
+
+        assert crc.update_crc(crc.INITIAL_VALUE, data[1 : length + 1]) == value
+        assert crc.update_crc(crc.INITIAL_VALUE, memoryview(data)[1 : length + 1]) == (
+            value
+        )
+
+    def test_verify(self):
+        frame = bytes.fromhex("7ea00802232193bd647e")
+        assert frames.FCS.verify(frame, 1, -1)
+        assert not frames.FCS.verify(frame[:-2] + b"\x00\x7e", 1, -1)
+
 
 class TestHdlcFrameValidation:
     def test_frame_is_enclosed_by_hdlc_flag(self):
@@ -223,3 +253,172 @@ class TestUnnumberedInformationControlField:
         data = b"\x13"
         cf = fields.UnnumberedInformationControlField.from_bytes(data)
         assert cf.to_bytes() == data
+
+
+class TestRejectFrame:
+    def test_round_trip(self):
+        frame = frames.RejectFrame(
+            destination_address=address.HdlcAddress(16, None, "client"),
+            source_address=address.HdlcAddress(1, None, "server"),
+            receive_sequence_number=5,
+        )
+        assert frames.RejectFrame.from_bytes(frame.to_bytes()) == frame
+
+    def test_is_not_parsed_as_receive_ready(self):
+        with pytest.raises(ValueError):
+            fields.ReceiveReadyControlField.from_bytes(b"\xb9")
+        assert (
+            fields.RejectControlField.from_bytes(b"\xb9").receive_sequence_number == 5
+        )
+
+
+class TestHdlcConnectionWindowing:
+    @pytest.fixture
+    def connection(self) -> HdlcConnection:
+        connection = HdlcConnection(
+            client_address=address.HdlcAddress(16, None, "client"),
+            server_address=address.HdlcAddress(1, None, "server"),
+            window_size_transmit=3,
+        )
+        connection.state.current_state = state.IDLE
+        return connection
+
+    def send_information(self, connection: HdlcConnection, final: bool):
+        connection.send(
+            frames.InformationFrame(
+                destination_address=connection.server_address,
+                source_address=connection.client_address,
+                payload=b"\x01",
+                send_sequence_number=connection.server_ssn,
+                receive_sequence_number=connection.server_rsn,
+                segmented=True,
+                final=final,
+            )
+        )
+
+    def test_window_of_frames_is_acknowledged(self, connection):
+        self.send_information(connection, final=False)
+        self.send_information(connection, final=False)
+        assert connection.state.current_state == state.IDLE
+        self.send_information(connection, final=True)
+        assert connection.state.current_state == state.AWAITING_RESPONSE
+
+        connection.acknowledge(3)
+        assert connection.unacknowledged_frames == []
+
+    def test_window_cannot_overflow(self, connection):
+        for _ in range(3):
+            self.send_information(connection, final=False)
+        with pytest.raises(LocalProtocolError):
+            self.send_information(connection, final=True)
+
+    def test_rewind_to_unacknowledged(self, connection):
+        for final in (False, False, True):
+            self.send_information(connection, final=final)
+        connection.acknowledge(1)
+        resend = connection.rewind_to_unacknowledged()
+        assert [frame.send_sequence_number for frame in resend] == [1, 2]
+        assert connection.server_ssn == 1
+
+    def test_acknowledge_outside_window_raises(self, connection):
+        self.send_information(connection, final=True)
+        with pytest.raises(LocalProtocolError):
+            connection.acknowledge(4)
+
+    def test_snrm_resets_sequence_numbers(self, connection):
+        for final in (False, True):
+            self.send_information(connection, final=final)
+        connection.state.current_state = state.NOT_CONNECTED
+
+        connection.send(
+            frames.SetNormalResponseModeFrame(
+                destination_address=connection.server_address,
+                source_address=connection.client_address,
+            )
+        )
+
+        assert connection.server_ssn == 0
+        assert connection.client_rsn == 0
+        assert connection.unacknowledged_frames == []
+
+
+class TestHdlcParameterList:
+    def test_default_parameters(self):
+        data = bytes.fromhex("818012050180060180070400000001080400000001")
+        parameters = fields.HdlcParameterList.from_bytes(data)
+        assert parameters == fields.HdlcParameterList()
+        assert parameters.to_bytes() == data
+
+    def test_two_byte_info_length(self):
+        parameters = fields.HdlcParameterList(
+            max_info_length_transmit=2030,
+            max_info_length_receive=512,
+            window_size_transmit=7,
+            window_size_receive=3,
+        )
+        data = parameters.to_bytes()
+        assert data[3:7] == bytes.fromhex("050207ee")
+        assert fields.HdlcParameterList.from_bytes(data) == parameters
+
+    def test_missing_parameters_use_default(self):
+        data = bytes.fromhex("818006070400000005")
+        parameters = fields.HdlcParameterList.from_bytes(data)
+        assert parameters.window_size_transmit == 5
+        assert parameters.max_info_length_receive == 128
+
+    def test_not_a_parameter_list_raises(self):
+        with pytest.raises(exceptions.HdlcParsingError):
+            fields.HdlcParameterList.from_bytes(bytes.fromhex("e6e700"))
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            # Truncated identifier and length.
+            "81800105",
+            # Truncated value.
+            "8180020501",
+            # Empty value.
+            "8180020500",
+            # Window size 0.
+            "818003070100",
+        ],
+    )
+    def test_malformed_parameters_raise(self, data: str):
+        with pytest.raises(exceptions.HdlcParsingError):
+            fields.HdlcParameterList.from_bytes(bytes.fromhex(data))
+
+    def test_too_large_parameters_are_lowered_to_maximum(self):
+        data = bytes.fromhex("81800a05020800070400000009")
+        parameters = fields.HdlcParameterList.from_bytes(data)
+        assert parameters.max_info_length_transmit == 2030
+        assert parameters.window_size_transmit == 7
+
+
+class TestSnrmParameters:
+    def test_snrm_without_parameters(self):
+        snrm = frames.SetNormalResponseModeFrame(
+            destination_address=address.HdlcAddress(1, None, "server"),
+            source_address=address.HdlcAddress(16, None, "client"),
+        )
+        assert snrm.to_bytes() == bytes.fromhex("7ea0070321930f017e")
+
+    def test_snrm_with_parameters_has_hcs(self):
+        snrm = frames.SetNormalResponseModeFrame(
+            destination_address=address.HdlcAddress(1, None, "server"),
+            source_address=address.HdlcAddress(16, None, "client"),
+            parameters=fields.HdlcParameterList(window_size_receive=7),
+        )
+        data = snrm.to_bytes()
+        assert len(data) == 2 + 9 + 21
+        assert frames.FCS.verify(data, 1, 8)
+        assert frames.FCS.verify(data, 1, -1)
+
+    def test_ua_parameters(self):
+        parameters = fields.HdlcParameterList(max_info_length_receive=256)
+        ua = frames.UnNumberedAcknowledgmentFrame(
+            destination_address=address.HdlcAddress(16, None, "client"),
+            source_address=address.HdlcAddress(1, None, "server"),
+            payload=parameters.to_bytes(),
+        )
+        parsed = frames.UnNumberedAcknowledgmentFrame.from_bytes(ua.to_bytes())
+        assert parsed.parameters == parameters
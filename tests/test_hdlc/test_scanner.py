@@ -0,0 +1,79 @@
+from dlms_cosem.hdlc import address, frames
+from dlms_cosem.hdlc.scanner import HdlcFrameScanner
+from dlms_cosem.hdlc.state import NEED_DATA
+
+CLIENT = address.HdlcAddress(16, None, "client")
+SERVER = address.HdlcAddress(1, None, "server")
+
+
+def information_frame(payload: bytes, ssn: int = 0) -> frames.InformationFrame:
+    return frames.InformationFrame(
+        CLIENT,
+        SERVER,
+        payload=payload,
+        send_sequence_number=ssn,
+        receive_sequence_number=0,
+    )
+
+
+def test_frame_with_flag_in_payload():
+    frame = information_frame(b"\xe6\xe7\x00\x7e\x7e\x01")
+    scanner = HdlcFrameScanner()
+    scanner.receive_data(frame.to_bytes())
+    assert scanner.next_frame() == frame
+    assert scanner.next_frame() is NEED_DATA
+
+
+def test_frame_in_several_chunks():
+    data = information_frame(b"\x01\x02\x03").to_bytes()
+    scanner = HdlcFrameScanner()
+    scanner.receive_data(data[:5])
+    assert scanner.next_frame() is NEED_DATA
+    scanner.receive_data(data[5:])
+    assert isinstance(scanner.next_frame(), frames.InformationFrame)
+
+
+def test_frames_sharing_flags():
+    first = information_frame(b"\x01", ssn=0).to_bytes()
+    second = information_frame(b"\x02", ssn=1).to_bytes()
+    scanner = HdlcFrameScanner()
+    scanner.receive_data(first + second[1:])
+    assert scanner.next_frame().payload == b"\x01"
+    assert scanner.next_frame().payload == b"\x02"
+    assert scanner.discarded_bytes == 0
+
+
+def test_dispatch_on_control_field():
+    rr = frames.ReceiveReadyFrame(CLIENT, SERVER, receive_sequence_number=3)
+    rej = frames.RejectFrame(CLIENT, SERVER, receive_sequence_number=2)
+    ua = frames.UnNumberedAcknowledgmentFrame(CLIENT, SERVER)
+    ui = frames.UnnumberedInformationFrame(CLIENT, SERVER, payload=b"\x0f\x00")
+    scanner = HdlcFrameScanner()
+    scanner.receive_data(b"".join(f.to_bytes() for f in [rr, rej, ua, ui]))
+    parsed = [scanner.next_frame() for _ in range(4)]
+    assert [type(frame) for frame in parsed] == [type(f) for f in [rr, rej, ua, ui]]
+    assert [frame.to_bytes() for frame in parsed] == [
+        f.to_bytes() for f in [rr, rej, ua, ui]
+    ]
+
+
+def test_resynchronises_after_garbage_and_bad_frames():
+    good = information_frame(b"\x01\x02").to_bytes()
+    bad_fcs = bytearray(good)
+    bad_fcs[-2] ^= 0xFF
+    scanner = HdlcFrameScanner()
+    scanner.receive_data(b"\x00\x11" + bytes(bad_fcs) + good)
+    assert scanner.next_frame().payload == b"\x01\x02"
+    assert scanner.discarded_frames == 1
+    assert scanner.discarded_bytes == 2
+
+
+def test_unsupported_frame_is_dropped():
+    rr = frames.ReceiveReadyFrame(CLIENT, SERVER, receive_sequence_number=3)
+    rnr = bytearray(rr.to_bytes())
+    # Receive not ready has the same layout as RR.
+    rnr[5] = 0b01110101
+    scanner = HdlcFrameScanner()
+    scanner.receive_data(bytes(rnr) + rr.to_bytes())
+    assert scanner.next_frame() == rr
+    assert scanner.discarded_frames == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from dlms_cosem import iec62056_21
+from dlms_cosem.iec62056_21 import (
+    AckOptionSelectMessage,
+    IdentificationMessage,
+    RequestMessage,
+)
+
+
+def test_request_message():
+    assert RequestMessage().to_bytes() == b"/?!\r\n"
+    assert RequestMessage(device_address="12345678").to_bytes() == b"/?12345678!\r\n"
+
+
+def test_parse_identification():
+    data = b"/ISK5\\2MT382-1000\r\n"
+    identification = IdentificationMessage.from_bytes(data)
+
+    assert identification.manufacturer == "ISK"
+    assert identification.baud_rate == 9600
+    assert identification.capabilities == ["2"]
+    assert identification.identification == "MT382-1000"
+    assert identification.supports_mode_e
+    assert identification.to_bytes() == data
+
+
+def test_parse_identification_without_mode_e():
+    identification = IdentificationMessage.from_bytes(b"/LGZ4ZMD3104407\r\n")
+
+    assert identification.baud_rate == 4800
+    assert identification.capabilities == []
+    assert not identification.supports_mode_e
+
+
+def test_faulty_identification():
+    with pytest.raises(iec62056_21.Iec62056_21Error):
+        IdentificationMessage.from_bytes(b"/IS5\r\n")
+
+
+def test_ack_option_select_message():
+    assert AckOptionSelectMessage(baud_rate_character="5").to_bytes() == (
+        b"\x06252\r\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "baud_rate_character,max_baud_rate,expected",
+    [
+        ("6", 19200, 19200),
+        ("6", 9600, 9600),
+        ("4", 19200, 4800),
+        ("6", 5000, 4800),
+        ("6", 110, 300),
+    ],
+)
+def test_select_baud_rate(baud_rate_character, max_baud_rate, expected):
+    identification = IdentificationMessage(
+        manufacturer="ABC",
+        baud_rate_character=baud_rate_character,
+        identification="METER",
+        capabilities=["2"],
+    )
+    assert iec62056_21.select_baud_rate(identification, max_baud_rate) == expected
@@ -0,0 +1,136 @@
+import multiprocessing
+
+import pytest
+
+from dlms_cosem.invocation_counters import (
+    MAX_INVOCATION_COUNTER,
+    CounterReservation,
+    InvocationCounterExhaustedError,
+    MemoryInvocationCounterStore,
+    SqliteInvocationCounterStore,
+    counter_key,
+)
+from tests.test_simulator.test_connection import (
+    ENCRYPTION_KEY,
+    REGISTER,
+    hls_client,
+    hls_meter,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryInvocationCounterStore(batch_size=10)
+    return SqliteInvocationCounterStore(str(tmp_path / "counters.db"), batch_size=10)
+
+
+def reserve_many(path: str, times: int, queue: multiprocessing.Queue):
+    store = SqliteInvocationCounterStore(path)
+    queue.put([store.reserve("meter", 5) for _ in range(times)])
+
+
+class TestInvocationCounterStore:
+    def test_reserved_ranges_do_not_overlap(self, store):
+        assert store.reserve("meter", 10) == 0
+        assert store.reserve("meter", 10) == 10
+        assert store.reserve("meter", 5, at_least=100) == 100
+        assert store.reserve("meter", 5) == 105
+        assert store.reserve("other", 5) == 0
+
+    def test_release_hands_unused_counters_to_next_reservation(self, store):
+        store.reserve("meter", 10)
+
+        assert store.release("meter", 3, 10)
+        assert store.reserve("meter", 10) == 3
+
+    def test_release_after_later_reservation_is_ignored(self, store):
+        store.reserve("meter", 10)
+        store.reserve("meter", 10)
+
+        assert not store.release("meter", 3, 10)
+        assert store.reserve("meter", 10) == 20
+
+    def test_meter_invocation_counter_only_increases(self, store):
+        assert store.meter_invocation_counter("meter") == 0
+        store.update_meter_invocation_counter("meter", 50)
+        store.update_meter_invocation_counter("meter", 40)
+
+        assert store.meter_invocation_counter("meter") == 50
+
+    def test_counters_are_exhausted(self, store):
+        store.reserve("meter", 1, at_least=MAX_INVOCATION_COUNTER)
+
+        with pytest.raises(InvocationCounterExhaustedError):
+            store.reserve("meter", 1)
+
+    def test_sqlite_counters_survive_reopening(self, tmp_path):
+        path = str(tmp_path / "counters.db")
+        SqliteInvocationCounterStore(path).reserve("meter", 1000)
+
+        assert SqliteInvocationCounterStore(path).reserve("meter", 1000) == 1000
+
+    def test_processes_get_separate_ranges(self, tmp_path):
+        path = str(tmp_path / "counters.db")
+        SqliteInvocationCounterStore(path)
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=reserve_many, args=(path, 20, queue))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        starts = [start for _ in processes for start in queue.get(timeout=30)]
+        for process in processes:
+            process.join()
+
+        assert sorted(starts) == list(range(0, 400, 5))
+
+
+class TestCounterReservation:
+    def test_reserves_next_range_before_running_out(self):
+        store = MemoryInvocationCounterStore(batch_size=10)
+        reservation = CounterReservation(store=store, key="meter")
+
+        assert reservation.next_invocation_counter(0) == 0
+        assert reservation.next_invocation_counter(5) == 5
+        assert reservation.next_invocation_counter(7) == 7
+        assert reservation.end == 20
+
+    def test_skips_to_range_reserved_after_another_client(self):
+        store = MemoryInvocationCounterStore(batch_size=10)
+        reservation = CounterReservation(store=store, key="meter")
+        reservation.next_invocation_counter(0)
+        store.reserve("meter", 10)
+
+        assert reservation.next_invocation_counter(7) == 20
+
+
+class TestDlmsClient:
+    def test_client_continues_from_stored_counters(self, tmp_path):
+        path = str(tmp_path / "counters.db")
+        meter = hls_meter()
+        store = SqliteInvocationCounterStore(path, batch_size=100)
+
+        with hls_client(meter, invocation_counter_store=store).session() as client:
+            client.get(REGISTER)
+            used = client.client_invocation_counter
+
+        key = counter_key(16, ENCRYPTION_KEY)
+        store = SqliteInvocationCounterStore(path, batch_size=100)
+        assert store.meter_invocation_counter(key) > 0
+        with hls_client(meter, invocation_counter_store=store).session() as client:
+            client.get(REGISTER)
+            assert client.client_invocation_counter > used
+            assert client.dlms_connection.meter_invocation_counter > 0
+
+    def test_crashed_client_does_not_reuse_counters(self):
+        store = MemoryInvocationCounterStore(batch_size=100)
+        crashed = hls_client(hls_meter(), invocation_counter_store=store)
+        crashed.connect()
+        crashed.associate()
+
+        with hls_client(
+            hls_meter(), invocation_counter_store=store
+        ).session() as client:
+            assert client.client_invocation_counter >= 100
@@ -0,0 +1,219 @@
+import urllib.request
+
+import pytest
+
+from dlms_cosem import enumerations as enums
+from dlms_cosem import metrics
+from dlms_cosem.clients.dlms_client import DlmsClient
+from dlms_cosem.exceptions import DecryptionError, DlmsClientException
+from dlms_cosem.hdlc import address, frames, state
+from dlms_cosem.hdlc.connection import HdlcConnection
+from dlms_cosem.metrics import MetricsRegistry
+from dlms_cosem.simulator import MeterSimulator
+from tests.test_simulator.test_connection import (
+    BUFFER,
+    REGISTER,
+    hls_client,
+    hls_meter,
+    make_client,
+    make_meter,
+)
+from tests.test_simulator.test_server import running_simulator
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.enable_metrics()
+    yield
+    metrics.enable_metrics(False)
+
+
+def test_render_counters():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ["meter"])
+    errors = registry.counter("errors_total", "Errors.\nAll of them.")
+    requests.inc('meter "1"')
+    requests.inc('meter "1"', amount=2)
+    requests.inc("meter\\2")
+
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{meter="meter \\"1\\""} 3\n'
+        'requests_total{meter="meter\\\\2"} 1\n'
+        "# HELP errors_total Errors.\\nAll of them.\n"
+        "# TYPE errors_total counter\n"
+        "errors_total 0\n"
+    )
+    assert errors.value() == 0
+
+
+def test_counter_is_made_once():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ["meter"])
+    assert registry.counter("requests_total", "Requests.", ["meter"]) is counter
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Requests.")
+
+
+def test_counter_validates_labels_and_amount():
+    counter = MetricsRegistry().counter("requests_total", "Requests.", ["meter"])
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc("1", amount=-1)
+    with pytest.raises(ValueError):
+        MetricsRegistry().counter("requests-total", "Requests.")
+
+
+def test_write_replaces_file(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.").inc(amount=5)
+    path = tmp_path / "dlms.prom"
+    path.write_text("old")
+
+    registry.write(str(path))
+
+    assert path.read_text().endswith("requests_total 5\n")
+    assert [p.name for p in tmp_path.iterdir()] == ["dlms.prom"]
+
+
+def test_serve_over_http():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.").inc()
+    server = registry.serve(port=0)
+    try:
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5
+        ) as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert b"requests_total 1\n" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_disabled_registry_is_not_updated():
+    sent = metrics.APDUS_SENT.value("GetRequestNormal")
+    frames_sent = metrics.HDLC_FRAMES_SENT.value("SetNormalResponseModeFrame")
+
+    with hls_client(hls_meter()).session() as client:
+        client.get(REGISTER)
+
+    assert not metrics.REGISTRY.enabled
+    assert metrics.APDUS_SENT.value("GetRequestNormal") == sent
+    assert metrics.HDLC_FRAMES_SENT.value("SetNormalResponseModeFrame") == frames_sent
+
+
+@pytest.mark.usefixtures("enabled_metrics")
+def test_connection_counts_apdus_and_blocks():
+    sent = metrics.APDUS_SENT.value("GetRequestNormal")
+    received = metrics.APDUS_RECEIVED.value("GetResponseNormal")
+    blocks = metrics.BLOCKS.value("received")
+
+    with hls_client(hls_meter(), max_pdu_size=256).session() as client:
+        client.get(REGISTER)
+        client.get(BUFFER)
+
+    assert metrics.APDUS_SENT.value("GetRequestNormal") == sent + 2
+    assert metrics.APDUS_RECEIVED.value("GetResponseNormal") == received + 1
+    assert metrics.BLOCKS.value("received") > blocks + 1
+
+
+@pytest.mark.usefixtures("enabled_metrics")
+def test_connection_counts_decryption_failures():
+    failures = metrics.DECRYPTION_FAILURES.value()
+    client = hls_client(hls_meter())
+    client.associate()
+    send = client.io_interface.send
+    # Breaks the authentication tag of the responses.
+    client.io_interface.send = lambda data: send(data)[:-1] + b"\x00"
+
+    with pytest.raises(DecryptionError):
+        client.get(REGISTER)
+    assert metrics.DECRYPTION_FAILURES.value() == failures + 1
+
+
+@pytest.mark.usefixtures("enabled_metrics")
+def test_connection_counts_association_rejects():
+    rejects = metrics.ASSOCIATION_REJECTS.value("rejected_permanent")
+    meter = make_meter(
+        authentication=enums.AuthenticationMechanism.LLS, password=b"12345678"
+    )
+    client = make_client(
+        meter,
+        authentication_method=enums.AuthenticationMechanism.LLS,
+        password=b"wrong",
+    )
+
+    with pytest.raises(DlmsClientException):
+        client.associate()
+    assert metrics.ASSOCIATION_REJECTS.value("rejected_permanent") == rejects + 1
+
+
+@pytest.mark.usefixtures("enabled_metrics")
+def test_hdlc_counts_frames_and_bytes():
+    snrm = metrics.HDLC_FRAMES_SENT.value("SetNormalResponseModeFrame")
+    information = metrics.HDLC_FRAMES_RECEIVED.value("InformationFrame")
+    bytes_received = metrics.BYTES_RECEIVED.value("hdlc")
+    simulator = MeterSimulator()
+    with running_simulator(simulator, simulator.serve_hdlc({17: make_meter()})) as port:
+        client = DlmsClient.with_hdlc_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            server_physical_address=17,
+            timeout=1,
+        )
+        with client.session():
+            client.get(REGISTER)
+
+    assert metrics.HDLC_FRAMES_SENT.value("SetNormalResponseModeFrame") == snrm + 1
+    assert metrics.HDLC_FRAMES_RECEIVED.value("InformationFrame") == information + 3
+    assert metrics.BYTES_RECEIVED.value("hdlc") > bytes_received
+
+
+@pytest.mark.usefixtures("enabled_metrics")
+def test_tcp_counts_bytes():
+    bytes_sent = metrics.BYTES_SENT.value("tcp")
+    simulator = MeterSimulator()
+    with running_simulator(simulator, simulator.serve_tcp(make_meter())) as port:
+        client = DlmsClient.with_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            timeout=1,
+        )
+        with client.session():
+            client.get(REGISTER)
+
+    assert metrics.BYTES_SENT.value("tcp") > bytes_sent
+
+
+@pytest.mark.usefixtures("enabled_metrics")
+def test_hdlc_counts_retransmissions():
+    retransmissions = metrics.HDLC_RETRANSMISSIONS.value()
+    connection = HdlcConnection(
+        client_address=address.HdlcAddress(16, None, "client"),
+        server_address=address.HdlcAddress(1, None, "server"),
+        window_size_transmit=3,
+    )
+    connection.state.current_state = state.IDLE
+    for final in (False, False, True):
+        connection.send(
+            frames.InformationFrame(
+                destination_address=connection.server_address,
+                source_address=connection.client_address,
+                payload=b"\x01",
+                send_sequence_number=connection.server_ssn,
+                receive_sequence_number=connection.server_rsn,
+                segmented=True,
+                final=final,
+            )
+        )
+    connection.acknowledge(1)
+
+    connection.rewind_to_unacknowledged()
+    assert metrics.HDLC_RETRANSMISSIONS.value() == retransmissions + 2
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import pytest
+
+from dlms_cosem import dlms_data, security
+from dlms_cosem.protocol import xdlms
+from dlms_cosem.protocol.xdlms.data_notification import LongInvokeIdAndPriority
+from dlms_cosem.push import PushDecoder, PushDecodingError, UnknownSystemTitleError
+
+ENCRYPTION_KEY = bytes.fromhex("000102030405060708090A0B0C0D0E0F")
+AUTHENTICATION_KEY = bytes.fromhex("D0D1D2D3D4D5D6D7D8D9DADBDCDDDEDF")
+SYSTEM_TITLE = b"MMM\x00\x00\x00\x00\x01"
+SECURITY_CONTROL = security.SecurityControlField(
+    security_suite=0, authenticated=True, encrypted=True
+)
+
+BODY = dlms_data.DataStructure(
+    [
+        dlms_data.OctetStringData(b"\x01\x00\x01\x08\x00\xff"),
+        dlms_data.DoubleLongUnsignedData(1234),
+    ]
+).to_bytes()
+
+
+def make_context(key: bytes = ENCRYPTION_KEY) -> security.SecurityContext:
+    return security.SecurityContext(
+        security_suite=0, key=key, auth_key=AUTHENTICATION_KEY
+    )
+
+
+def make_notification(body: bytes = BODY) -> xdlms.DataNotification:
+    return xdlms.DataNotification(
+        long_invoke_id_and_priority=LongInvokeIdAndPriority(long_invoke_id=1),
+        date_time=datetime(2021, 1, 1),
+        body=body,
+    )
+
+
+def cipher(
+    apdu: bytes,
+    invocation_counter: int = 1,
+    system_title: bytes = SYSTEM_TITLE,
+    context: security.SecurityContext = None,
+) -> bytes:
+    context = context or make_context()
+    return xdlms.GeneralGlobalCipher(
+        system_title=system_title,
+        security_control=SECURITY_CONTROL,
+        invocation_counter=invocation_counter,
+        ciphered_text=context.encrypt(
+            SECURITY_CONTROL, system_title, invocation_counter, apdu
+        ),
+    ).to_bytes()
+
+
+def test_decode_plain_notification():
+    push = PushDecoder().decode(make_notification().to_bytes())
+
+    assert push.notification.body == BODY
+    assert push.data == [b"\x01\x00\x01\x08\x00\xff", 1234]
+    assert push.system_title is None
+
+
+def test_decode_ciphered_notification():
+    decoder = PushDecoder(keys={SYSTEM_TITLE: make_context()}.get)
+
+    push = decoder.decode(cipher(make_notification().to_bytes(), invocation_counter=7))
+
+    assert push.data == [b"\x01\x00\x01\x08\x00\xff", 1234]
+    assert push.system_title == SYSTEM_TITLE
+    assert push.invocation_counter == 7
+
+
+def test_body_is_not_decoded_without_body_decoder():
+    push = PushDecoder(body_decoder=None).decode(make_notification().to_bytes())
+    assert push.data is None
+
+
+def test_unknown_system_title():
+    decoder = PushDecoder(keys={}.get)
+    with pytest.raises(UnknownSystemTitleError):
+        decoder.decode(cipher(make_notification().to_bytes()))
+
+
+def test_wrong_key():
+    decoder = PushDecoder(keys={SYSTEM_TITLE: make_context(bytes(16))}.get)
+    with pytest.raises(PushDecodingError):
+        decoder.decode(cipher(make_notification().to_bytes()))
+
+
+def test_not_a_notification():
+    with pytest.raises(PushDecodingError):
+        PushDecoder().decode(b"\x01\x02\x03")
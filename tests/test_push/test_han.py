@@ -0,0 +1,121 @@
+import io
+import re
+from pathlib import Path
+
+from dlms_cosem.hdlc import frames
+from dlms_cosem.hdlc.address import HdlcAddress
+from dlms_cosem.push import HanStreamDecoder, PushDecoder
+from tests.test_push.test_decoder import (
+    SYSTEM_TITLE,
+    cipher,
+    make_context,
+    make_notification,
+)
+from tests.test_push.test_schema import registers
+
+EXAMPLE = Path(__file__).parents[2] / "examples" / "parse_norwegian_han.py"
+HAN_FRAME = bytes.fromhex(
+    "".join(re.findall(r'"([0-9a-f]+)"', EXAMPLE.read_text().split("ui = ")[0]))
+)
+
+CLIENT = HdlcAddress(logical_address=16, physical_address=None, address_type="client")
+METER = HdlcAddress(logical_address=1, physical_address=17, address_type="server")
+
+
+def ui_frames(apdu: bytes, segment_length: int = 40) -> bytes:
+    information = b"\xe6\xe7\x00" + apdu
+    segments = [
+        information[index : index + segment_length]
+        for index in range(0, len(information), segment_length)
+    ]
+    return b"".join(
+        frames.UnnumberedInformationFrame(
+            CLIENT, METER, segment, segmented=index < len(segments) - 1
+        ).to_bytes()
+        for index, segment in enumerate(segments)
+    )
+
+
+def test_decodes_frames_between_garbage_in_small_chunks():
+    stream = b"\x00\x13garbage" + HAN_FRAME + b"\x7e\x7e\xa0" + HAN_FRAME
+    decoder = HanStreamDecoder()
+
+    pushes = list()
+    for index in range(0, len(stream), 7):
+        pushes.extend(decoder.feed(stream[index : index + 7]))
+
+    assert len(pushes) == 2
+    assert pushes[0].data[1] == ("1-0:1.7.0.255", 1122)
+    assert pushes[1].data == pushes[0].data
+    assert decoder.statistics.notifications == 2
+
+
+def test_reassembles_segmented_ciphered_notifications():
+    apdu = cipher(make_notification(registers(7, 8)).to_bytes(), invocation_counter=3)
+    decoder = HanStreamDecoder(
+        decoder=PushDecoder(keys={SYSTEM_TITLE: make_context()}.get)
+    )
+
+    pushes = decoder.feed(ui_frames(apdu) + ui_frames(apdu))
+
+    assert len(pushes) == 2
+    assert pushes[0].system_title == SYSTEM_TITLE
+    assert pushes[0].invocation_counter == 3
+    assert pushes[0].data == [
+        b"\x01\x00\x01\x07\x00\xff",
+        7,
+        b"\x01\x00\x20\x07\x00\xff",
+        8,
+    ]
+
+
+def test_notification_with_corrupted_segment_is_dropped():
+    stream = bytearray(ui_frames(make_notification(registers(1, 2)).to_bytes(), 20))
+    stream[30] ^= 0xFF
+    decoder = HanStreamDecoder()
+
+    pushes = decoder.feed(bytes(stream) + HAN_FRAME)
+
+    assert len(pushes) == 1
+    assert pushes[0].data[1] == ("1-0:1.7.0.255", 1122)
+    assert decoder.statistics.invalid_frames >= 1
+    assert decoder.statistics.failed == 1
+
+
+def test_notification_with_lost_first_segment_is_dropped():
+    stream = bytearray(ui_frames(make_notification(registers(1, 2)).to_bytes(), 20))
+    stream[5] ^= 0xFF
+    decoder = HanStreamDecoder()
+    decoded = list()
+    decode = decoder.decoder.decode
+    decoder.decoder.decode = lambda apdu: decoded.append(apdu) or decode(apdu)
+
+    pushes = decoder.feed(bytes(stream) + HAN_FRAME)
+
+    # The remaining segments are not decoded as an APDU.
+    assert len(decoded) == 1
+    assert len(pushes) == 1
+    assert pushes[0].data[1] == ("1-0:1.7.0.255", 1122)
+    assert decoder.statistics.invalid_frames == 1
+    assert decoder.statistics.failed == 1
+
+
+def test_overlong_notification_is_dropped():
+    decoder = HanStreamDecoder(max_apdu_length=1000)
+
+    pushes = decoder.feed(
+        ui_frames(make_notification(b"\x09\x82\x07\xd0" + bytes(2000)).to_bytes())
+        + HAN_FRAME
+    )
+
+    assert len(pushes) == 1
+    assert len(decoder.apdu) == 0
+    assert decoder.statistics.failed == 1
+
+
+def test_read_stream_until_no_data():
+    decoder = HanStreamDecoder()
+
+    pushes = list(decoder.read_stream(io.BytesIO(HAN_FRAME * 3), read_size=100))
+
+    assert len(pushes) == 3
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from dlms_cosem.push import (
+    CsvKeySource,
+    KeyRecord,
+    Keyring,
+    PushDecodingError,
+    ReplayError,
+    SqliteKeySource,
+)
+from tests.test_clients.test_async_hdlc_transport import run
+from tests.test_push.test_decoder import (
+    AUTHENTICATION_KEY,
+    ENCRYPTION_KEY,
+    SYSTEM_TITLE,
+    cipher,
+    make_notification,
+)
+
+OTHER_SYSTEM_TITLE = b"MMM\x00\x00\x00\x00\x02"
+RECORD = KeyRecord(encryption_key=ENCRYPTION_KEY, authentication_key=AUTHENTICATION_KEY)
+
+
+def write_csv(path, *lines: str):
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def csv_line(system_title: bytes, key: bytes = ENCRYPTION_KEY) -> str:
+    return f"{system_title.hex()},{key.hex()},{AUTHENTICATION_KEY.hex()}"
+
+
+def test_context_is_made_once_and_reused():
+    keyring = Keyring()
+    keyring.add(SYSTEM_TITLE, RECORD)
+
+    context = keyring.context(SYSTEM_TITLE)
+
+    assert context.key == ENCRYPTION_KEY
+    assert keyring.context(SYSTEM_TITLE) is context
+    assert keyring.context(OTHER_SYSTEM_TITLE) is None
+
+
+def test_least_recently_used_contexts_are_dropped():
+    keyring = Keyring(max_contexts=1)
+    keyring.add(SYSTEM_TITLE, RECORD)
+    keyring.add(OTHER_SYSTEM_TITLE, RECORD)
+
+    keyring.context(SYSTEM_TITLE)
+    keyring.context(OTHER_SYSTEM_TITLE)
+
+    assert list(keyring.contexts) == [OTHER_SYSTEM_TITLE]
+
+
+def test_replayed_invocation_counter_is_rejected():
+    keyring = Keyring()
+    keyring.check_invocation_counter(SYSTEM_TITLE, 5)
+    keyring.check_invocation_counter(SYSTEM_TITLE, 6)
+    with pytest.raises(ReplayError):
+        keyring.check_invocation_counter(SYSTEM_TITLE, 6)
+    keyring.check_invocation_counter(OTHER_SYSTEM_TITLE, 1)
+
+
+def test_push_decoder_rejects_replayed_push():
+    keyring = Keyring()
+    keyring.add(SYSTEM_TITLE, RECORD)
+    decoder = keyring.push_decoder()
+    push = cipher(make_notification().to_bytes(), invocation_counter=3)
+
+    assert decoder.decode(push).invocation_counter == 3
+    with pytest.raises(ReplayError):
+        decoder.decode(push)
+
+
+def test_push_with_wrong_key_does_not_move_invocation_counter():
+    keyring = Keyring()
+    keyring.add(SYSTEM_TITLE, KeyRecord(bytes(16), AUTHENTICATION_KEY))
+    decoder = keyring.push_decoder()
+
+    with pytest.raises(PushDecodingError):
+        decoder.decode(cipher(make_notification().to_bytes(), invocation_counter=9))
+    assert SYSTEM_TITLE not in keyring.invocation_counters
+
+
+def test_load_from_csv(tmp_path):
+    path = str(tmp_path / "keys.csv")
+    write_csv(path, "# system title,key,auth key", "", csv_line(SYSTEM_TITLE))
+    keyring = Keyring(source=CsvKeySource(path))
+
+    keyring.reload()
+
+    assert len(keyring) == 1
+    assert keyring.records[SYSTEM_TITLE] == RECORD
+
+
+def test_invalid_csv(tmp_path):
+    path = str(tmp_path / "keys.csv")
+    write_csv(path, "not,hex")
+    with pytest.raises(ValueError):
+        CsvKeySource(path).load()
+
+
+def test_reload_if_changed_keeps_unchanged_contexts_and_counters(tmp_path):
+    path = str(tmp_path / "keys.csv")
+    write_csv(path, csv_line(SYSTEM_TITLE), csv_line(OTHER_SYSTEM_TITLE))
+    keyring = Keyring(source=CsvKeySource(path))
+    keyring.reload()
+    context = keyring.context(SYSTEM_TITLE)
+    keyring.context(OTHER_SYSTEM_TITLE)
+    keyring.check_invocation_counter(SYSTEM_TITLE, 10)
+
+    assert not keyring.reload_if_changed()
+
+    write_csv(path, csv_line(SYSTEM_TITLE), csv_line(OTHER_SYSTEM_TITLE, bytes(16)))
+    # Make sure the modification time differs on file systems with coarse times.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert keyring.reload_if_changed()
+    assert keyring.context(SYSTEM_TITLE) is context
+    assert keyring.context(OTHER_SYSTEM_TITLE).key == bytes(16)
+    assert keyring.invocation_counters[SYSTEM_TITLE] == 10
+
+
+def test_load_from_sqlite(tmp_path):
+    path = str(tmp_path / "keys.db")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE meter_keys (system_title, encryption_key, authentication_key, "
+        "security_suite)"
+    )
+    connection.execute(
+        "INSERT INTO meter_keys VALUES (?, ?, ?, ?)",
+        (SYSTEM_TITLE, ENCRYPTION_KEY, AUTHENTICATION_KEY, 0),
+    )
+    connection.execute(
+        "INSERT INTO meter_keys VALUES (?, ?, ?, NULL)",
+        (OTHER_SYSTEM_TITLE.hex(), ENCRYPTION_KEY.hex(), AUTHENTICATION_KEY.hex()),
+    )
+    connection.commit()
+    connection.close()
+    keyring = Keyring(source=SqliteKeySource(path))
+
+    keyring.reload()
+
+    assert keyring.records == {SYSTEM_TITLE: RECORD, OTHER_SYSTEM_TITLE: RECORD}
+
+
+def test_watch_reloads_changed_keys(tmp_path):
+    path = str(tmp_path / "keys.csv")
+    write_csv(path, csv_line(SYSTEM_TITLE))
+    keyring = Keyring(source=CsvKeySource(path))
+
+    async def watch():
+        watcher = asyncio.ensure_future(keyring.watch(interval=0.01))
+        for _ in range(100):
+            if len(keyring) == 1:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+
+    run(watch())
+
+    assert len(keyring) == 1
@@ -0,0 +1,120 @@
+import pytest
+
+from dlms_cosem import dlms_data
+from dlms_cosem.cosem import Obis
+from dlms_cosem.push import PushDecoder, PushDecodingError, SchemaDecoder
+from dlms_cosem.utils import parse_as_dlms_data
+from tests.test_push.test_decoder import make_notification
+
+# Body of a three phase meter pushing on the Norwegian HAN port, shortened.
+HAN_BODY = bytes.fromhex(
+    "0105"
+    "020209060000010000ff090c07e30c1001073b28ff8000ff"
+    "020309060100010700ff060000046202020f00161b"
+    "0203090601001f0700ff10000002020fff1621"
+    "020309060100200700ff12090302020fff1623"
+    "020309060100010800ff060099598602020f00161e"
+)
+
+
+def registers(*values) -> bytes:
+    return dlms_data.DataStructure(
+        [
+            dlms_data.OctetStringData(b"\x01\x00\x01\x07\x00\xff"),
+            dlms_data.DoubleLongUnsignedData(values[0]),
+            dlms_data.OctetStringData(b"\x01\x00\x20\x07\x00\xff"),
+            dlms_data.LongData(values[1]),
+        ]
+    ).to_bytes()
+
+
+def test_decodes_like_the_full_parser():
+    expected = [
+        (Obis.from_bytes(row[0]).to_string(), row[1])
+        for row in parse_as_dlms_data(HAN_BODY)
+    ]
+
+    assert SchemaDecoder().decode(HAN_BODY) == expected
+    assert expected[1] == ("1-0:1.7.0.255", 1122)
+    assert expected[2] == ("1-0:31.7.0.255", 0)
+
+
+def test_schema_is_reused_for_new_values():
+    decoder = SchemaDecoder()
+
+    assert decoder.decode(registers(1, 2)) == [
+        ("1-0:1.7.0.255", 1),
+        ("1-0:32.7.0.255", 2),
+    ]
+    assert decoder.decode(registers(1000, -230)) == [
+        ("1-0:1.7.0.255", 1000),
+        ("1-0:32.7.0.255", -230),
+    ]
+    assert decoder.statistics.learnt == 1
+    assert decoder.statistics.hits == 1
+
+
+def test_changed_obis_code_is_learnt_again():
+    decoder = SchemaDecoder()
+    decoder.decode(registers(1, 2))
+    changed = registers(1, 2).replace(b"\x01\x00\x20\x07", b"\x01\x00\x34\x07")
+
+    assert decoder.decode(changed) == [("1-0:1.7.0.255", 1), ("1-0:52.7.0.255", 2)]
+    assert decoder.statistics.learnt == 2
+
+
+def test_changed_types_of_same_length_are_learnt_again():
+    decoder = SchemaDecoder()
+    decoder.decode(registers(1, 2))
+    # A signed double long instead of the double long unsigned.
+    changed = bytearray(registers(1, 2))
+    changed[10] = dlms_data.DoubleLongData.TAG
+    changed[11:15] = (-5).to_bytes(4, "big", signed=True)
+
+    assert decoder.decode(bytes(changed))[0] == ("1-0:1.7.0.255", -5)
+    assert decoder.statistics.learnt == 2
+
+
+def test_flat_obis_value_pairs_and_nested_values():
+    body = dlms_data.DataStructure(
+        [
+            dlms_data.OctetStringData(b"\x01\x00\x00\x02\x00\xff"),
+            dlms_data.DataStructure(
+                [dlms_data.IntegerData(-1), dlms_data.EnumData(27)]
+            ),
+            dlms_data.BitStringData("101"),
+            dlms_data.OctetStringData(b"\x00\x00\x60\x07\x00\xff"),
+            dlms_data.BitStringData("101"),
+        ]
+    ).to_bytes()
+
+    assert SchemaDecoder().decode(body) == [
+        ("1-0:0.2.0.255", [-1, 27]),
+        ("0-0:96.7.0.255", "101"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "body", [b"", bytes.fromhex("0202090601"), bytes.fromhex("ee00")]
+)
+def test_invalid_body_raises_value_error(body: bytes):
+    with pytest.raises(ValueError):
+        SchemaDecoder().decode(body)
+
+
+def test_only_recent_lengths_are_kept():
+    decoder = SchemaDecoder(max_schemas=2)
+    for count in range(1, 4):
+        decoder.decode(dlms_data.DataArray([dlms_data.NullData()] * count).to_bytes())
+
+    assert len(decoder.schemas) == 2
+
+
+def test_as_body_decoder_of_push_decoder():
+    decoder = PushDecoder(body_decoder=SchemaDecoder())
+
+    push = decoder.decode(make_notification(registers(5, 6)).to_bytes())
+
+    assert push.data == [("1-0:1.7.0.255", 5), ("1-0:32.7.0.255", 6)]
+    with pytest.raises(PushDecodingError):
+        decoder.decode(make_notification(b"\x02\x02\x09").to_bytes())
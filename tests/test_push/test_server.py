@@ -0,0 +1,167 @@
+import asyncio
+import socket
+from typing import *
+
+from dlms_cosem.protocol.wrappers import WrapperHeader, WrapperProtocolDataUnit
+from dlms_cosem.push import PushDecoder, PushNotification, PushServer
+from tests.test_clients.test_async_hdlc_transport import run
+from tests.test_push.test_decoder import (
+    SYSTEM_TITLE,
+    cipher,
+    make_context,
+    make_notification,
+)
+
+
+def wrap(apdu: bytes) -> bytes:
+    return WrapperProtocolDataUnit(
+        apdu, WrapperHeader(source_wport=1, destination_wport=1, length=len(apdu))
+    ).to_bytes()
+
+
+def make_server(**kwargs) -> PushServer:
+    return PushServer(
+        decoder=PushDecoder(keys={SYSTEM_TITLE: make_context()}.get),
+        host="127.0.0.1",
+        **kwargs,
+    )
+
+
+def test_tcp_pushes_from_many_connections():
+    pushes = [
+        wrap(cipher(make_notification().to_bytes(), invocation_counter=counter))
+        for counter in range(1, 11)
+    ]
+
+    async def push_and_receive():
+        server = make_server()
+        port = await server.serve_tcp(port=0)
+        writers = list()
+        for index in range(5):
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            # Two pushes split over several writes.
+            data = b"".join(pushes[index * 2 : index * 2 + 2])
+            writer.write(data[:5])
+            await writer.drain()
+            writer.write(data[5:])
+            writers.append(writer)
+        received = [await server.queue.get() for _ in range(10)]
+        for writer in writers:
+            writer.close()
+        await server.close()
+        return server, received
+
+    server, received = run(push_and_receive())
+
+    assert sorted(push.invocation_counter for push in received) == list(range(1, 11))
+    assert server.statistics.received == 10
+    assert server.statistics.delivered == 10
+    assert received[0].peer[0] == "127.0.0.1"
+
+
+def test_tcp_backpressure_when_queue_is_full():
+    pushes = b"".join(wrap(make_notification().to_bytes()) for _ in range(5))
+
+    async def push_to_full_queue():
+        server = make_server(max_queue_size=2)
+        port = await server.serve_tcp(port=0)
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(pushes)
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        queued = server.queue.qsize()
+        # The rest are delivered when the queue is read.
+        received = [await server.queue.get() for _ in range(5)]
+        writer.close()
+        await server.close()
+        return queued, received
+
+    queued, received = run(push_to_full_queue())
+
+    assert queued == 2
+    assert len(received) == 5
+
+
+def test_udp_pushes_with_handler():
+    handled: List[PushNotification] = list()
+
+    async def push_and_receive():
+        server = make_server(handler=handled.append)
+        port = await server.serve_udp(port=0)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            for counter in range(1, 4):
+                client.sendto(
+                    wrap(cipher(make_notification().to_bytes(), counter)),
+                    ("127.0.0.1", port),
+                )
+            client.sendto(b"garbage", ("127.0.0.1", port))
+            for _ in range(100):
+                if server.statistics.received == 4:
+                    break
+                await asyncio.sleep(0.01)
+        await server.close()
+        return server
+
+    server = run(push_and_receive())
+
+    assert [push.invocation_counter for push in handled] == [1, 2, 3]
+    assert server.statistics.failed == 1
+
+
+def test_udp_pushes_are_dropped_when_queue_is_full():
+    async def push_to_full_queue():
+        server = make_server(max_queue_size=1)
+        port = await server.serve_udp(port=0)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            for _ in range(3):
+                client.sendto(wrap(make_notification().to_bytes()), ("127.0.0.1", port))
+            for _ in range(100):
+                if server.statistics.received == 3:
+                    break
+                await asyncio.sleep(0.01)
+        await server.close()
+        return server
+
+    server = run(push_to_full_queue())
+
+    assert server.statistics.delivered == 1
+    assert server.statistics.dropped == 2
+
+
+def test_undecodable_push_is_counted():
+    async def push_garbage():
+        server = make_server()
+        port = await server.serve_tcp(port=0)
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            wrap(cipher(make_notification().to_bytes(), system_title=b"UNKNOWN1"))
+            + wrap(make_notification().to_bytes())
+        )
+        push = await server.queue.get()
+        writer.close()
+        await server.close()
+        return server, push
+
+    server, push = run(push_garbage())
+
+    assert push.system_title is None
+    assert server.statistics.failed == 1
+
+
+def test_tcp_connection_with_too_long_apdu_is_closed():
+    async def push_too_long():
+        server = make_server(max_apdu_length=100)
+        port = await server.serve_tcp(port=0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        header = WrapperHeader(source_wport=1, destination_wport=1, length=60000)
+        writer.write(header.to_bytes() + bytes(100))
+        closed = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        await server.close()
+        return server, closed
+
+    server, closed = run(push_too_long())
+
+    assert closed == b""
+    assert server.statistics.failed == 1
+    assert server.queue.empty()
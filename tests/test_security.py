@@ -1,7 +1,17 @@
+import pytest
 from cryptography.hazmat.primitives.ciphers import algorithms, modes
 from cryptography.hazmat.primitives.ciphers.base import Cipher
 
-from dlms_cosem.security import SecurityControlField, decrypt, encrypt, gmac
+from dlms_cosem.exceptions import DecryptionError
+from dlms_cosem.security import (
+    SecurityContext,
+    SecurityControlField,
+    cached_context,
+    clear_cached_contexts,
+    decrypt,
+    encrypt,
+    gmac,
+)
 
 
 def test_encrypt():
@@ -159,3 +169,123 @@ def test_gmac2():
     result = ciphertext + tag
 
     assert result == bytes.fromhex("1A52FE7DD3E72748973C1E28")
+
+
+class TestSecurityContext:
+    security_control = SecurityControlField(
+        security_suite=0, authenticated=True, encrypted=True
+    )
+    encryption_key = bytes.fromhex("000102030405060708090A0B0C0D0E0F")
+    authentication_key = bytes.fromhex("D0D1D2D3D4D5D6D7D8D9DADBDCDDDEDF")
+    system_title = bytes.fromhex("4D4D4D0000BC614E")
+
+    @property
+    def context(self) -> SecurityContext:
+        return SecurityContext(
+            security_suite=0, key=self.encryption_key, auth_key=self.authentication_key
+        )
+
+    def test_encrypt_matches_function(self):
+        plain_data = bytes.fromhex("C0010000080000010000FF0200")
+        assert self.context.encrypt(
+            self.security_control, self.system_title, 0x01234567, plain_data
+        ) == bytes.fromhex("411312FF935A47566827C467BC7D825C3BE4A77C3FCC056B6B")
+
+    def test_encrypt_many_and_decrypt_many(self):
+        context = self.context
+        texts = [b"first", b"second", b""]
+        ciphered = context.encrypt_many(
+            self.security_control, self.system_title, enumerate(texts, start=1)
+        )
+        assert ciphered[1] == encrypt(
+            security_control=self.security_control,
+            system_title=self.system_title,
+            invocation_counter=2,
+            key=self.encryption_key,
+            auth_key=self.authentication_key,
+            plain_text=b"second",
+        )
+        assert (
+            context.decrypt_many(
+                self.security_control, self.system_title, enumerate(ciphered, start=1)
+            )
+            == texts
+        )
+
+    def test_decrypt_with_wrong_invocation_counter_raises(self):
+        context = self.context
+        ciphered = context.encrypt(self.security_control, self.system_title, 1, b"a")
+        with pytest.raises(DecryptionError):
+            context.decrypt(self.security_control, self.system_title, 2, ciphered)
+
+    def test_gmac_matches_function(self):
+        security_control = SecurityControlField(
+            security_suite=0, authenticated=True, encrypted=False
+        )
+        assert self.context.gmac(
+            security_control, self.system_title, 1, b"challenge"
+        ) == gmac(
+            security_control=security_control,
+            system_title=self.system_title,
+            invocation_counter=1,
+            key=self.encryption_key,
+            auth_key=self.authentication_key,
+            challenge=b"challenge",
+        )
+
+    def test_invalid_key_length_raises_on_creation(self):
+        with pytest.raises(ValueError):
+            SecurityContext(security_suite=2, key=self.encryption_key, auth_key=b"")
+
+    def test_other_security_suite_raises(self):
+        with pytest.raises(ValueError):
+            self.context.encrypt(
+                SecurityControlField(
+                    security_suite=1, authenticated=True, encrypted=True
+                ),
+                self.system_title,
+                1,
+                b"a",
+            )
+
+
+def test_module_functions_reuse_security_context():
+    key = b"SUCHINSECUREKIND"
+    auth_key = bytearray(b"SUCHINSECUREAUTH")
+    security_control = SecurityControlField(
+        security_suite=0, authenticated=True, encrypted=True
+    )
+
+    context = cached_context(0, key, bytes(auth_key))
+    cipher_text = encrypt(security_control, b"12345678", 1, key, b"text", auth_key)
+
+    assert cached_context(0, key, bytes(auth_key)) is context
+    assert cipher_text == context.encrypt(security_control, b"12345678", 1, b"text")
+    assert decrypt(security_control, b"12345678", 1, key, cipher_text, auth_key) == (
+        b"text"
+    )
+
+
+def test_clear_cached_contexts():
+    context = cached_context(0, b"SUCHINSECUREKIND", b"SUCHINSECUREAUTH")
+
+    clear_cached_contexts()
+
+    assert cached_context.cache_info().currsize == 0
+    assert cached_context(0, b"SUCHINSECUREKIND", b"SUCHINSECUREAUTH") is not context
+
+
+def test_associated_data_prefix():
+    context = SecurityContext(0, b"SUCHINSECUREKIND", b"SUCHINSECUREAUTH")
+    encrypted = SecurityControlField(
+        security_suite=0, authenticated=True, encrypted=True
+    )
+    broadcast = SecurityControlField(
+        security_suite=0, authenticated=True, encrypted=True, broadcast_key=True
+    )
+
+    assert context.associated_data_prefix(encrypted) == b"\x30SUCHINSECUREAUTH"
+    assert context.associated_data_prefix(encrypted) is context.associated_data_prefix(
+        encrypted
+    )
+    assert context.associated_data_prefix(broadcast) == b"\x70SUCHINSECUREAUTH"
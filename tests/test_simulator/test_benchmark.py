@@ -0,0 +1,84 @@
+import pytest
+
+from dlms_cosem import utils
+from dlms_cosem.parsers import AssociationObjectListParser
+from dlms_cosem.simulator.benchmark import (
+    ASYNCIO,
+    ASYNCIO_SHARED_BUS,
+    HDLC,
+    PHASES,
+    PROCESSES,
+    BenchmarkConfig,
+    PhaseStatistics,
+    benchmark_meter,
+    object_list_plan,
+    percentile,
+    profile_plan,
+    run_benchmark,
+)
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile(values, 1.0) == 100.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_phase_statistics():
+    statistics = PhaseStatistics.from_durations([0.3, 0.1, 0.2])
+    assert statistics.count == 3
+    assert statistics.mean == pytest.approx(0.2)
+    assert statistics.p50 == 0.2
+    assert statistics.max == 0.3
+
+
+def test_asyncio_needs_hdlc():
+    with pytest.raises(ValueError):
+        BenchmarkConfig(mode=ASYNCIO)
+
+
+def test_object_list_of_benchmark_meter_can_be_parsed():
+    meter = benchmark_meter(encrypted=False, profile_days=1)
+    data = b"".join(meter.objects.read(object_list_plan().reads[0].attribute))
+    objects = AssociationObjectListParser.parse_entries(utils.parse_as_dlms_data(data))
+    assert len(objects) == 7
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        BenchmarkConfig(clients=3, sessions=2),
+        BenchmarkConfig(
+            clients=3,
+            sessions=2,
+            plan=profile_plan(hours=12),
+            transport=HDLC,
+            encrypted=True,
+        ),
+        BenchmarkConfig(
+            clients=3,
+            sessions=2,
+            plan=object_list_plan(),
+            mode=ASYNCIO,
+            transport=HDLC,
+            encrypted=True,
+        ),
+        BenchmarkConfig(clients=3, sessions=2, mode=ASYNCIO_SHARED_BUS, transport=HDLC),
+        BenchmarkConfig(clients=2, sessions=1, mode=PROCESSES),
+    ],
+)
+def test_run_benchmark(config: BenchmarkConfig):
+    report = run_benchmark(config)
+
+    sessions = config.clients * config.sessions
+    assert report.errors == 0
+    assert report.sessions == sessions
+    assert report.reads == sessions * len(config.plan.reads)
+    assert report.phases["get"].count == report.reads
+    assert report.phases["associate"].count == sessions
+    assert report.reads_per_second > 0
+    assert report.bytes_per_second > 0
+    assert set(report.to_dict()["phases"]) == set(PHASES)
+    assert config.plan.name in report.summary()
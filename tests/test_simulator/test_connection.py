@@ -0,0 +1,253 @@
+from datetime import timedelta
+from typing import *
+
+import attr
+import pytest
+
+from dlms_cosem import cosem, dlms_data
+from dlms_cosem import enumerations as enums
+from dlms_cosem import security, utils
+from dlms_cosem.clients.dlms_client import (
+    ActionError,
+    DataResultError,
+    DlmsClient,
+    HLSError,
+)
+from dlms_cosem.exceptions import DlmsClientException
+from dlms_cosem.protocol import xdlms
+from dlms_cosem.simulator import DlmsServerConnection, SimulatedMeter, SyntheticProfile
+from tests.test_simulator.test_meter import (
+    BUFFER,
+    CLOCK,
+    REGISTER,
+    START,
+    range_descriptor,
+)
+
+ENCRYPTION_KEY = bytes.fromhex("000102030405060708090A0B0C0D0E0F")
+AUTHENTICATION_KEY = bytes.fromhex("D0D1D2D3D4D5D6D7D8D9DADBDCDDDEDF")
+CLIENT_SYSTEM_TITLE = b"CLIENT01"
+
+RESET = cosem.CosemMethod(
+    interface=enums.CosemInterface.REGISTER,
+    instance=cosem.Obis(1, 0, 1, 8, 0),
+    method=1,
+)
+
+
+def make_meter(**kwargs) -> SimulatedMeter:
+    meter = SimulatedMeter(**kwargs)
+    meter.objects.add_value(
+        REGISTER, dlms_data.DoubleLongUnsignedData(1234), writable=True
+    )
+    meter.objects.add_profile(BUFFER, SyntheticProfile(start=START, entries=1000))
+
+    def reset(data: Optional[bytes]) -> None:
+        meter.objects.values[REGISTER.to_bytes()] = b"\x06\x00\x00\x00\x00"
+
+    meter.objects.add_method(RESET, reset)
+    return meter
+
+
+@attr.s(auto_attribs=True)
+class InProcessTransport:
+    """Passes requests straight to a server connection"""
+
+    connection: DlmsServerConnection
+    client_logical_address: int = attr.ib(default=16)
+    server_logical_address: int = attr.ib(default=1)
+    timeout: int = attr.ib(default=1)
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def send(self, bytes_to_send: bytes) -> bytes:
+        return self.connection.handle(bytes_to_send)
+
+
+def make_client(meter: SimulatedMeter, **kwargs) -> DlmsClient:
+    return DlmsClient(
+        client_logical_address=16,
+        server_logical_address=1,
+        io_interface=InProcessTransport(DlmsServerConnection(meter=meter)),
+        **kwargs,
+    )
+
+
+def hls_client(meter: SimulatedMeter, **kwargs) -> DlmsClient:
+    return make_client(
+        meter,
+        authentication_method=enums.AuthenticationMechanism.HLS_GMAC,
+        encryption_key=ENCRYPTION_KEY,
+        authentication_key=AUTHENTICATION_KEY,
+        client_system_title=CLIENT_SYSTEM_TITLE,
+        **kwargs,
+    )
+
+
+def hls_meter() -> SimulatedMeter:
+    return make_meter(
+        authentication=enums.AuthenticationMechanism.HLS_GMAC,
+        encryption_key=ENCRYPTION_KEY,
+        authentication_key=AUTHENTICATION_KEY,
+    )
+
+
+class TestDlmsServerConnection:
+    def test_get(self):
+        with make_client(make_meter()).session() as client:
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 1234
+
+    def test_get_undefined_object(self):
+        with make_client(make_meter()).session() as client:
+            with pytest.raises(DataResultError):
+                client.get(CLOCK)
+
+    def test_get_profile_with_block_transfer(self):
+        meter = make_meter()
+        with make_client(meter, max_pdu_size=256).session() as client:
+            rows = utils.parse_as_dlms_data(client.get(BUFFER))
+        assert len(rows) == 1000
+        assert rows[-1][1] == 1000
+
+    def test_get_range_of_profile(self):
+        with make_client(make_meter()).session() as client:
+            rows = utils.parse_as_dlms_data(
+                client.get(
+                    BUFFER,
+                    range_descriptor(START, START + timedelta(hours=1)),
+                )
+            )
+        assert [row[1] for row in rows] == [1, 2, 3, 4, 5]
+
+    def test_get_with_list(self):
+        with make_client(make_meter()).session() as client:
+            response = client.get_many(
+                [
+                    cosem.CosemAttributeWithSelection(
+                        attribute=REGISTER, access_selection=None
+                    ),
+                    cosem.CosemAttributeWithSelection(
+                        attribute=CLOCK, access_selection=None
+                    ),
+                ]
+            )
+        assert isinstance(response, xdlms.GetResponseWithList)
+        assert response.response_data[1] == enums.DataAccessResult.OBJECT_UNDEFINED
+
+    def test_set(self):
+        with make_client(make_meter()).session() as client:
+            response = client.set(REGISTER, b"\x06\x00\x00\x00\x05")
+            assert response.result == enums.DataAccessResult.SUCCESS
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 5
+
+    def test_action(self):
+        with make_client(make_meter()).session() as client:
+            assert client.action(RESET, dlms_data.IntegerData(0).to_bytes()) is None
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 0
+
+    def test_action_on_undefined_method(self):
+        method = cosem.CosemMethod(
+            interface=enums.CosemInterface.CLOCK,
+            instance=cosem.Obis(0, 0, 1, 0, 0),
+            method=1,
+        )
+        with make_client(make_meter()).session() as client:
+            with pytest.raises(ActionError):
+                client.action(method, dlms_data.IntegerData(0).to_bytes())
+
+    def test_lls(self):
+        meter = make_meter(
+            authentication=enums.AuthenticationMechanism.LLS, password=b"12345678"
+        )
+        with make_client(
+            meter,
+            authentication_method=enums.AuthenticationMechanism.LLS,
+            password=b"12345678",
+        ).session() as client:
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 1234
+
+    def test_lls_with_wrong_password_is_rejected(self):
+        meter = make_meter(
+            authentication=enums.AuthenticationMechanism.LLS, password=b"12345678"
+        )
+        client = make_client(
+            meter,
+            authentication_method=enums.AuthenticationMechanism.LLS,
+            password=b"wrong",
+        )
+        with pytest.raises(DlmsClientException):
+            client.associate()
+
+    def test_missing_authentication_is_rejected(self):
+        client = make_client(hls_meter())
+        with pytest.raises(DlmsClientException):
+            client.associate()
+
+    def test_hls_gmac(self):
+        meter = hls_meter()
+        with hls_client(meter, max_pdu_size=256).session() as client:
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 1234
+            rows = utils.parse_as_dlms_data(client.get(BUFFER))
+        assert len(rows) == 1000
+        assert meter.invocation_counter > 2
+
+    def test_hls_gmac_with_dedicated_ciphering(self):
+        with hls_client(hls_meter(), dedicated_ciphering=True).session() as client:
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 1234
+
+    def test_hls_gmac_with_wrong_key_is_rejected(self):
+        client = hls_client(hls_meter())
+        client.dlms_connection.global_encryption_key = bytes(16)
+        with pytest.raises(DlmsClientException):
+            client.associate()
+
+    def test_hls_gmac_with_wrong_authentication_key_fails(self):
+        client = hls_client(hls_meter())
+        client.dlms_connection.global_authentication_key = bytes(16)
+        with pytest.raises((HLSError, DlmsClientException)):
+            client.associate()
+
+    def test_request_before_association(self):
+        connection = DlmsServerConnection(meter=make_meter())
+        response = xdlms.ExceptionResponse.from_bytes(
+            connection.handle(
+                xdlms.GetRequestNormal(cosem_attribute=REGISTER).to_bytes()
+            )
+        )
+        assert response.state_error == enums.StateException.SERVICE_NOT_ALLOWED
+
+    def test_malformed_ciphered_request(self):
+        client = hls_client(hls_meter())
+        client.associate()
+        security_control = security.SecurityControlField(
+            security_suite=0, authenticated=True, encrypted=True
+        )
+        request = xdlms.GeneralGlobalCipher(
+            system_title=CLIENT_SYSTEM_TITLE,
+            security_control=security_control,
+            invocation_counter=1000,
+            ciphered_text=security.encrypt(
+                security_control,
+                system_title=CLIENT_SYSTEM_TITLE,
+                invocation_counter=1000,
+                key=ENCRYPTION_KEY,
+                plain_text=b"\xc0\xff",
+                auth_key=AUTHENTICATION_KEY,
+            ),
+        )
+
+        response = xdlms.ExceptionResponse.from_bytes(
+            client.io_interface.connection.handle(request.to_bytes())
+        )
+        assert response.state_error == enums.StateException.SERVICE_UNKNOWN
+
+    def test_meters_share_object_model_between_connections(self):
+        meter = make_meter()
+        with make_client(meter).session() as client:
+            client.set(REGISTER, b"\x06\x00\x00\x00\x07")
+        with make_client(meter).session() as client:
+            assert utils.parse_as_dlms_data(client.get(REGISTER)) == 7
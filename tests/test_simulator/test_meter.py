@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dlms_cosem import cosem, dlms_data
+from dlms_cosem import enumerations as enums
+from dlms_cosem import time, utils
+from dlms_cosem.cosem.capture_object import CaptureObject
+from dlms_cosem.cosem.selective_access import EntryDescriptor, RangeDescriptor
+from dlms_cosem.simulator import DataAccessError, ObjectModel, SyntheticProfile
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+CLOCK = cosem.CosemAttribute(
+    interface=enums.CosemInterface.CLOCK,
+    instance=cosem.Obis(0, 0, 1, 0, 0),
+    attribute=2,
+)
+REGISTER = cosem.CosemAttribute(
+    interface=enums.CosemInterface.REGISTER,
+    instance=cosem.Obis(1, 0, 1, 8, 0),
+    attribute=2,
+)
+BUFFER = cosem.CosemAttribute(
+    interface=enums.CosemInterface.PROFILE_GENERIC,
+    instance=cosem.Obis(1, 0, 99, 1, 0),
+    attribute=2,
+)
+
+
+def range_descriptor(from_value: datetime, to_value: datetime) -> RangeDescriptor:
+    return RangeDescriptor(
+        restricting_object=CaptureObject(cosem_attribute=CLOCK, data_index=0),
+        from_value=from_value,
+        to_value=to_value,
+    )
+
+
+class TestSyntheticProfile:
+    def test_all_entries_without_selection(self):
+        profile = SyntheticProfile(start=START, entries=10)
+        assert profile.entry_range() == range(10)
+
+    def test_range_descriptor_on_capture_times(self):
+        profile = SyntheticProfile(start=START, entries=100)
+        selection = range_descriptor(
+            START + timedelta(minutes=30), START + timedelta(minutes=60)
+        )
+        assert profile.entry_range(selection) == range(2, 5)
+
+    def test_range_descriptor_between_capture_times(self):
+        profile = SyntheticProfile(start=START, entries=100)
+        selection = range_descriptor(
+            START + timedelta(minutes=20), START + timedelta(minutes=50)
+        )
+        assert profile.entry_range(selection) == range(2, 4)
+
+    def test_range_descriptor_outside_buffer(self):
+        profile = SyntheticProfile(start=START, entries=4)
+        before = range_descriptor(START - timedelta(days=2), START - timedelta(days=1))
+        after = range_descriptor(START + timedelta(days=1), START + timedelta(days=2))
+        assert len(profile.entry_range(before)) == 0
+        assert len(profile.entry_range(after)) == 0
+
+    def test_range_descriptor_without_time_zone_uses_buffer_time_zone(self):
+        profile = SyntheticProfile(start=START, entries=100)
+        selection = range_descriptor(
+            datetime(2020, 1, 1, 0, 15), datetime(2020, 1, 1, 0, 15)
+        )
+        assert profile.entry_range(selection) == range(1, 2)
+
+    def test_entry_descriptor(self):
+        profile = SyntheticProfile(start=START, entries=10)
+        assert profile.entry_range(EntryDescriptor(from_entry=3, to_entry=5)) == range(
+            2, 5
+        )
+        assert profile.entry_range(EntryDescriptor(from_entry=8)) == range(7, 10)
+
+    def test_encoded_buffer(self):
+        profile = SyntheticProfile(start=START, entries=100, columns=2)
+        profile.ROWS_PER_CHUNK = 8
+        chunks = list(profile.encode())
+        # The array header and then 13 chunks of rows.
+        assert len(chunks) == 14
+
+        rows = utils.parse_as_dlms_data(b"".join(chunks))
+        assert len(rows) == 100
+        capture_time, _ = time.datetime_from_bytes(rows[10][0])
+        assert capture_time.replace(tzinfo=timezone.utc) == START + timedelta(
+            minutes=150
+        )
+        assert rows[10][1:] == [11, 22]
+
+    def test_empty_selection_is_an_empty_array(self):
+        profile = SyntheticProfile(start=START, entries=10)
+        selection = range_descriptor(
+            START - timedelta(days=2), START - timedelta(days=1)
+        )
+        assert b"".join(profile.encode(selection)) == b"\x01\x00"
+
+
+class TestObjectModel:
+    def test_read_value(self):
+        objects = ObjectModel()
+        objects.add_value(REGISTER, dlms_data.DoubleLongUnsignedData(1234))
+        assert b"".join(objects.read(REGISTER)) == b"\x06\x00\x00\x04\xd2"
+
+    def test_read_undefined_object(self):
+        with pytest.raises(DataAccessError) as e:
+            ObjectModel().read(REGISTER)
+        assert e.value.result == enums.DataAccessResult.OBJECT_UNDEFINED
+
+    def test_selective_access_on_value_is_rejected(self):
+        objects = ObjectModel()
+        objects.add_value(REGISTER, dlms_data.DoubleLongUnsignedData(1234))
+        with pytest.raises(DataAccessError) as e:
+            objects.read(REGISTER, EntryDescriptor(from_entry=1))
+        assert e.value.result == enums.DataAccessResult.SCOPE_OF_ACCESS_VIOLATED
+
+    def test_read_profile(self):
+        objects = ObjectModel()
+        objects.add_profile(BUFFER, SyntheticProfile(start=START, entries=5))
+        assert len(utils.parse_as_dlms_data(b"".join(objects.read(BUFFER)))) == 5
+
+    def test_write(self):
+        objects = ObjectModel()
+        objects.add_value(REGISTER, dlms_data.DoubleLongUnsignedData(1), writable=True)
+        objects.write(REGISTER, b"\x06\x00\x00\x00\x02")
+        assert b"".join(objects.read(REGISTER)) == b"\x06\x00\x00\x00\x02"
+
+    def test_write_read_only_value(self):
+        objects = ObjectModel()
+        objects.add_value(REGISTER, dlms_data.DoubleLongUnsignedData(1))
+        with pytest.raises(DataAccessError) as e:
+            objects.write(REGISTER, b"\x06\x00\x00\x00\x02")
+        assert e.value.result == enums.DataAccessResult.READ_WRITE_DENIED
+
+    def test_invoke(self):
+        objects = ObjectModel()
+        method = cosem.CosemMethod(
+            interface=enums.CosemInterface.REGISTER,
+            instance=cosem.Obis(1, 0, 1, 8, 0),
+            method=1,
+        )
+        objects.add_method(method, lambda data: data)
+        assert objects.invoke(method, b"\x0f\x00") == b"\x0f\x00"
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from dlms_cosem import utils
+from dlms_cosem.clients.dlms_client import DlmsClient
+from dlms_cosem.clients.hdlc_bus import HdlcTcpBus
+from dlms_cosem.hdlc import frames
+from dlms_cosem.hdlc.address import HdlcAddress
+from dlms_cosem.simulator import LineShaping, MeterSimulator
+from dlms_cosem.simulator.hdlc import HdlcServerLink
+from tests.test_clients.test_async_hdlc_transport import run
+from tests.test_simulator.test_connection import (
+    AUTHENTICATION_KEY,
+    CLIENT_SYSTEM_TITLE,
+    ENCRYPTION_KEY,
+    hls_meter,
+    make_meter,
+)
+from tests.test_simulator.test_meter import BUFFER, REGISTER, START, range_descriptor
+
+
+@contextmanager
+def running_simulator(simulator: MeterSimulator, serve):
+    """
+    Runs the simulator in an event loop in another thread, so blocking clients can
+    be used against it. Yields the port returned by `serve`.
+    """
+    loop = asyncio.new_event_loop()
+    port = loop.run_until_complete(serve)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield port
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(simulator.close())
+        loop.close()
+
+
+def test_tcp_wrapper_with_hls_gmac():
+    simulator = MeterSimulator()
+    with running_simulator(simulator, simulator.serve_tcp(hls_meter())) as port:
+        client = DlmsClient.with_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            authentication_method=hls_meter().authentication,
+            encryption_key=ENCRYPTION_KEY,
+            authentication_key=AUTHENTICATION_KEY,
+            client_system_title=CLIENT_SYSTEM_TITLE,
+            max_pdu_size=512,
+            timeout=1,
+        )
+        with client.session():
+            rows = utils.parse_as_dlms_data(
+                client.get(BUFFER, range_descriptor(START, START + timedelta(days=1)))
+            )
+
+    assert len(rows) == 97
+
+
+def test_hdlc_with_meters_on_physical_addresses():
+    meters = {17: make_meter(), 18: make_meter()}
+    meters[18].objects.values[REGISTER.to_bytes()] = b"\x06\x00\x00\x00\x12"
+    simulator = MeterSimulator()
+    with running_simulator(
+        simulator, simulator.serve_hdlc(meters, max_info_length=64, window_size=3)
+    ) as port:
+        values = dict()
+        for physical_address in meters:
+            client = DlmsClient.with_hdlc_tcp_transport(
+                host="127.0.0.1",
+                port=port,
+                client_logical_address=16,
+                server_logical_address=1,
+                server_physical_address=physical_address,
+                max_pdu_size=512,
+                timeout=1,
+                hdlc_window_size=7,
+            )
+            with client.session():
+                values[physical_address] = utils.parse_as_dlms_data(
+                    client.get(REGISTER)
+                )
+                rows = utils.parse_as_dlms_data(client.get(BUFFER))
+                assert len(rows) == 1000
+
+    assert values == {17: 1234, 18: 18}
+
+
+def test_snrm_with_malformed_parameters_is_dropped():
+    link = HdlcServerLink(HdlcAddress(1, 17, "server"), make_meter())
+
+    assert link.connect(bytes.fromhex("81800105")) == []
+    assert link.dlms_connection is None
+
+
+def test_rr_after_last_window_is_answered_with_rr():
+    server_address = HdlcAddress(1, 17, "server")
+    client_address = HdlcAddress(16, None, "client")
+    link = HdlcServerLink(server_address, make_meter())
+    link.receive_frame(
+        frames.SetNormalResponseModeFrame(server_address, client_address).to_bytes()
+    )
+
+    response = link.receive_frame(
+        frames.ReceiveReadyFrame(server_address, client_address, 0).to_bytes()
+    )
+
+    assert len(response) == 1
+    assert isinstance(frames.frame_from_bytes(response[0]), frames.ReceiveReadyFrame)
+
+
+def test_many_meters_in_one_event_loop():
+    meters = {physical_address: make_meter() for physical_address in range(16, 116)}
+
+    async def read_meter(bus: HdlcTcpBus, physical_address: int) -> int:
+        async with bus.client(server_physical_address=physical_address).session() as c:
+            return utils.parse_as_dlms_data(await c.get(REGISTER))
+
+    async def read_all():
+        simulator = MeterSimulator()
+        port = await simulator.serve_hdlc(meters)
+        bus = HdlcTcpBus(host="127.0.0.1", port=port, timeout=5)
+        try:
+            return await asyncio.gather(
+                *[read_meter(bus, physical_address) for physical_address in meters]
+            )
+        finally:
+            await bus.close()
+            await simulator.close()
+
+    assert run(read_all()) == [1234] * len(meters)
+
+
+def test_line_shaping():
+    simulator = MeterSimulator(shaping=LineShaping(latency=0.05, bandwidth=20000))
+    with running_simulator(simulator, simulator.serve_tcp(make_meter())) as port:
+        client = DlmsClient.with_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            timeout=1,
+        )
+        with client.session():
+            started = time.monotonic()
+            client.get(BUFFER)
+            elapsed = time.monotonic() - started
+
+    # The buffer is about 26 kB and is sent at 20 kB/s after the latency.
+    assert elapsed > 1.0
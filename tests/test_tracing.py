@@ -0,0 +1,227 @@
+import logging
+
+from dlms_cosem import tracing
+from dlms_cosem.clients.dlms_client import DlmsClient
+from dlms_cosem.simulator import LineShaping, MeterSimulator
+from dlms_cosem.tracing import Histogram, LatencyAggregator
+from tests.test_simulator.test_connection import (
+    REGISTER,
+    hls_client,
+    hls_meter,
+    make_meter,
+)
+from tests.test_simulator.test_server import running_simulator
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.add(0.001, size=10)
+    for _ in range(10):
+        histogram.add(0.5)
+
+    assert histogram.count == 100
+    assert histogram.size == 900
+    assert histogram.percentile(50) == 0.0016
+    assert histogram.percentile(99) == 0.5
+    assert histogram.maximum == 0.5
+    assert round(histogram.mean, 4) == 0.0509
+
+
+def test_client_records_phases_and_state_changes():
+    aggregator = LatencyAggregator()
+    client = hls_client(hls_meter(), tracer=aggregator.tracer("meter-1"))
+
+    with client.session():
+        client.get(REGISTER)
+
+    phases = aggregator.histograms["meter-1"]
+    assert set(phases) == {
+        tracing.ENCODE,
+        tracing.PROTECT,
+        tracing.TRANSPORT,
+        tracing.DECODE,
+        tracing.UNPROTECT,
+    }
+    # AARQ, HLS reply, GET and RLRQ.
+    assert phases[tracing.TRANSPORT].count == 4
+    assert phases[tracing.ENCODE].size > 0
+    assert aggregator.transitions["meter-1"][("READY", "AWAITING_GET_RESPONSE")] == 1
+    assert "meter-1" in aggregator.report()
+
+
+def test_tcp_transport_records_send_and_receive():
+    aggregator = LatencyAggregator()
+    simulator = MeterSimulator(shaping=LineShaping(latency=0.02))
+    with running_simulator(simulator, simulator.serve_tcp(make_meter())) as port:
+        client = DlmsClient.with_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            timeout=1,
+            tracer=aggregator.tracer("tcp"),
+        )
+        with client.session():
+            client.get(REGISTER)
+
+    receive = aggregator.histograms["tcp"][tracing.TRANSPORT_RECEIVE]
+    assert receive.count == 3
+    assert receive.percentile(50) >= 0.02
+    assert aggregator.phase(tracing.TRANSPORT_SEND).count == 3
+
+
+def test_hdlc_transport_records_send_and_receive():
+    aggregator = LatencyAggregator()
+    simulator = MeterSimulator()
+    with running_simulator(simulator, simulator.serve_hdlc({17: make_meter()})) as port:
+        client = DlmsClient.with_hdlc_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            server_physical_address=17,
+            timeout=1,
+            tracer=aggregator.tracer("hdlc"),
+        )
+        with client.session():
+            client.get(REGISTER)
+
+    histograms = aggregator.to_dict()["hdlc"]
+    assert histograms[tracing.TRANSPORT_SEND]["count"] == 3
+    assert histograms[tracing.TRANSPORT_RECEIVE]["bytes"] > 0
+
+
+def test_tracer_set_later_reaches_connection_and_transport():
+    aggregator = LatencyAggregator()
+    simulator = MeterSimulator()
+    with running_simulator(simulator, simulator.serve_tcp(make_meter())) as port:
+        client = DlmsClient.with_tcp_transport(
+            host="127.0.0.1",
+            port=port,
+            client_logical_address=16,
+            server_logical_address=1,
+            timeout=1,
+        )
+        client.tracer = aggregator.tracer("tcp")
+        with client.session():
+            client.get(REGISTER)
+
+    assert client.dlms_connection.tracer is client.tracer
+    assert client.io_interface.tracer is client.tracer
+    assert aggregator.histograms["tcp"][tracing.TRANSPORT_RECEIVE].count == 3
+    assert aggregator.histograms["tcp"][tracing.DECODE].count == 3
+
+
+def test_tracer_reaches_given_connection():
+    aggregator = LatencyAggregator()
+    connection = hls_client(hls_meter()).dlms_connection
+    client = hls_client(
+        hls_meter(), dlms_connection=connection, tracer=aggregator.tracer("meter-1")
+    )
+
+    with client.session():
+        client.get(REGISTER)
+
+    assert connection.tracer is client.tracer
+    # AARE, HLS reply, GET and RLRE.
+    assert aggregator.histograms["meter-1"][tracing.UNPROTECT].count == 4
+
+
+def test_no_tracer_by_default():
+    client = hls_client(hls_meter())
+
+    with client.session():
+        client.get(REGISTER)
+
+    assert client.tracer is None
+    assert client.dlms_connection.tracer is None
+
+
+def test_wire_trace_is_off_by_default(caplog):
+    caplog.set_level(logging.DEBUG)
+    client = hls_client(hls_meter())
+
+    with client.session():
+        client.get(REGISTER)
+
+    assert not [r for r in caplog.records if r.name == tracing.WIRE_LOG.name]
+
+
+def test_disabling_wire_trace_restores_level():
+    tracing.WIRE_LOG.setLevel(logging.WARNING)
+    try:
+        tracing.enable_wire_trace()
+        tracing.enable_wire_trace()
+        assert tracing.WIRE_LOG.level == logging.DEBUG
+
+        tracing.enable_wire_trace(False)
+        assert tracing.WIRE_LOG.level == logging.WARNING
+    finally:
+        tracing.enable_wire_trace(False)
+        tracing.WIRE_LOG.setLevel(logging.NOTSET)
+
+
+def test_wire_trace_logs_ciphered_bytes(caplog):
+    caplog.set_level(logging.DEBUG, logger=tracing.WIRE_LOG.name)
+    client = hls_client(hls_meter())
+    tracing.enable_wire_trace()
+    try:
+        with client.session():
+            client.get(REGISTER)
+    finally:
+        tracing.enable_wire_trace(False)
+
+    records = [r for r in caplog.records if r.name == tracing.WIRE_LOG.name]
+    # AARQ, HLS reply, GET and RLRQ and their responses.
+    assert [(r.layer, r.direction) for r in records[:2]] == [
+        ("dlms", tracing.SENT),
+        ("dlms", tracing.RECEIVED),
+    ]
+    assert len(records) == 8
+    data = bytes.fromhex(records[4].getMessage().split()[-1])
+    assert len(data) == records[4].size
+    # The GET request protected with general-glo-ciphering.
+    assert data[0] == 0xDB
+    # caplog set the level before the trace was enabled.
+    assert tracing.WIRE_LOG.level == logging.DEBUG
+    assert not tracing.WIRE_TRACE.enabled
+
+
+def test_deciphered_apdus_are_not_logged(caplog):
+    caplog.set_level(logging.INFO, logger="dlms_cosem.connection")
+    client = hls_client(hls_meter())
+
+    with client.session():
+        client.get(REGISTER)
+
+    assert not [r for r in caplog.records if r.levelno >= logging.WARNING]
+
+
+def test_hdlc_connection_traces_frames(caplog):
+    caplog.set_level(logging.DEBUG, logger=tracing.WIRE_LOG.name)
+    simulator = MeterSimulator()
+    tracing.enable_wire_trace()
+    try:
+        with running_simulator(
+            simulator, simulator.serve_hdlc({17: make_meter()})
+        ) as port:
+            client = DlmsClient.with_hdlc_tcp_transport(
+                host="127.0.0.1",
+                port=port,
+                client_logical_address=16,
+                server_logical_address=1,
+                server_physical_address=17,
+                timeout=1,
+            )
+            with client.session():
+                client.get(REGISTER)
+    finally:
+        tracing.enable_wire_trace(False)
+
+    layers = {r.layer for r in caplog.records if r.name == tracing.WIRE_LOG.name}
+    assert layers == {"dlms", "hdlc"}
+    hdlc = [r for r in caplog.records if getattr(r, "layer", None) == "hdlc"]
+    # The SNRM is the first frame sent.
+    assert hdlc[0].direction == tracing.SENT
+    assert hdlc[0].getMessage().endswith("7e")
@@ -0,0 +1,154 @@
+import datetime
+
+import pytest
+from dateutil import tz
+
+from dlms_cosem import cosem, dlms_data, enumerations
+from dlms_cosem.connection import XDlmsApduFactory
+from dlms_cosem.cosem.selective_access import CaptureObject, RangeDescriptor
+from dlms_cosem.protocol import xdlms
+
+CLOCK_TIME = cosem.CosemAttribute(
+    interface=enumerations.CosemInterface.CLOCK,
+    instance=cosem.Obis(0, 0, 1, 0, 0),
+    attribute=2,
+)
+DISCONNECT_CONTROL = cosem.CosemMethod(
+    interface=enumerations.CosemInterface.DISCONNECT_CONTROL,
+    instance=cosem.Obis(0, 0, 96, 3, 10),
+    method=1,
+)
+INVOKE_ID = xdlms.LongInvokeIdAndPriority(
+    long_invoke_id=1, prioritized=True, confirmed=True
+)
+
+
+class TestAccessRequest:
+    def test_transform_bytes(self):
+        data = b"\xd9\xc0\x00\x00\x01\x00\x01\x01\x00\x08\x00\x00\x01\x00\x00\xff\x02\x01\x00"
+        request = xdlms.AccessRequest(
+            long_invoke_id_and_priority=INVOKE_ID,
+            requests=[xdlms.AccessRequestGet(cosem_attribute=CLOCK_TIME)],
+        )
+        assert request.to_bytes() == data
+        assert xdlms.AccessRequest.from_bytes(data) == request
+
+    def test_mixed_operations(self):
+        request = xdlms.AccessRequest(
+            long_invoke_id_and_priority=INVOKE_ID,
+            requests=[
+                xdlms.AccessRequestGet(cosem_attribute=CLOCK_TIME),
+                xdlms.AccessRequestSet(
+                    cosem_attribute=CLOCK_TIME,
+                    data=dlms_data.OctetStringData(bytes(12)).to_bytes(),
+                ),
+                xdlms.AccessRequestAction(
+                    cosem_method=DISCONNECT_CONTROL,
+                    data=dlms_data.IntegerData(0).to_bytes(),
+                ),
+                xdlms.AccessRequestAction(cosem_method=DISCONNECT_CONTROL),
+            ],
+        )
+        assert xdlms.AccessRequest.from_bytes(request.to_bytes()) == request
+
+    def test_with_date_time(self):
+        request = xdlms.AccessRequest(
+            long_invoke_id_and_priority=INVOKE_ID,
+            requests=[xdlms.AccessRequestGet(cosem_attribute=CLOCK_TIME)],
+            date_time=datetime.datetime(
+                2021, 5, 3, 12, 0, tzinfo=tz.tzoffset(None, 3600)
+            ),
+        )
+        assert request.to_bytes()[5] == 12
+        assert xdlms.AccessRequest.from_bytes(request.to_bytes()) == request
+
+    def test_get_with_selection(self):
+        request = xdlms.AccessRequest(
+            long_invoke_id_and_priority=INVOKE_ID,
+            requests=[
+                xdlms.AccessRequestGet(
+                    cosem_attribute=cosem.CosemAttribute(
+                        interface=enumerations.CosemInterface.PROFILE_GENERIC,
+                        instance=cosem.Obis(1, 0, 99, 1, 0),
+                        attribute=2,
+                    ),
+                    access_selection=RangeDescriptor(
+                        restricting_object=CaptureObject(cosem_attribute=CLOCK_TIME),
+                        from_value=datetime.datetime(
+                            2021, 5, 1, tzinfo=tz.tzoffset(None, 3600)
+                        ),
+                        to_value=datetime.datetime(
+                            2021, 5, 2, tzinfo=tz.tzoffset(None, 3600)
+                        ),
+                    ),
+                ),
+                xdlms.AccessRequestGet(cosem_attribute=CLOCK_TIME),
+            ],
+        )
+        parsed = xdlms.AccessRequest.from_bytes(request.to_bytes())
+        assert parsed.requests[0].request_type == (
+            enumerations.AccessRequestType.GET_WITH_SELECTION
+        )
+        assert parsed.to_bytes() == request.to_bytes()
+
+    def test_wrong_tag_raises_value_error(self):
+        data = b"\xda\xc0\x00\x00\x01\x00\x01\x01\x00\x08\x00\x00\x01\x00\x00\xff\x02\x01\x00"
+        with pytest.raises(ValueError):
+            xdlms.AccessRequest.from_bytes(data)
+
+    def test_factory(self):
+        data = b"\xd9\xc0\x00\x00\x01\x00\x01\x01\x00\x08\x00\x00\x01\x00\x00\xff\x02\x01\x00"
+        assert isinstance(XDlmsApduFactory.apdu_from_bytes(data), xdlms.AccessRequest)
+
+
+class TestAccessResponse:
+    def test_transform_bytes(self):
+        data = (
+            b"\xda\xc0\x00\x00\x01\x00\x00\x03\x11\x05\x00\x00\x03"
+            b"\x01\x00\x02\x00\x03\x00"
+        )
+        response = xdlms.AccessResponse(
+            long_invoke_id_and_priority=INVOKE_ID,
+            responses=[
+                xdlms.AccessResponseGet(
+                    result=enumerations.DataAccessResult.SUCCESS, data=b"\x11\x05"
+                ),
+                xdlms.AccessResponseSet(result=enumerations.DataAccessResult.SUCCESS),
+                xdlms.AccessResponseAction(
+                    result=enumerations.ActionResultStatus.SUCCESS
+                ),
+            ],
+        )
+        assert response.to_bytes() == data
+        assert xdlms.AccessResponse.from_bytes(data) == response
+
+    def test_self_descriptive(self):
+        response = xdlms.AccessResponse(
+            long_invoke_id_and_priority=INVOKE_ID,
+            responses=[
+                xdlms.AccessResponseGet(
+                    result=enumerations.DataAccessResult.SUCCESS, data=b"\x11\x05"
+                ),
+                xdlms.AccessResponseAction(
+                    result=enumerations.ActionResultStatus.SUCCESS, data=b"\x0f\x01"
+                ),
+            ],
+            request_specifications=[
+                xdlms.AccessRequestGet(cosem_attribute=CLOCK_TIME),
+                xdlms.AccessRequestAction(cosem_method=DISCONNECT_CONTROL),
+            ],
+        )
+        assert xdlms.AccessResponse.from_bytes(response.to_bytes()) == response
+
+    def test_factory(self):
+        data = b"\xda\xc0\x00\x00\x01\x00\x00\x01\x00\x01\x02\x00"
+        response = XDlmsApduFactory.apdu_from_bytes(data)
+        assert isinstance(response, xdlms.AccessResponse)
+        assert response.responses == [
+            xdlms.AccessResponseSet(result=enumerations.DataAccessResult.SUCCESS)
+        ]
+
+    def test_data_and_response_mismatch_raises_value_error(self):
+        data = b"\xda\xc0\x00\x00\x01\x00\x00\x01\x00\x02\x02\x00\x02\x00"
+        with pytest.raises(ValueError):
+            xdlms.AccessResponse.from_bytes(data)
@@ -69,10 +69,23 @@ class TestActionRequestFactory:
         with pytest.raises(ValueError):
             xdlms.ActionRequestFactory.from_bytes(data)
 
-    def test_any_other_type_than_normal_raises_notimplementederror(self):
-        data = b"\xc3\x02\xc0\x00\x0f\x00\x00(\x00\x00\xff\x01\x00"
-        with pytest.raises(NotImplementedError):
-            xdlms.ActionRequestFactory.from_bytes(data)
+    def test_next_pblock(self):
+        data = b"\xc3\x02\xc0\x00\x00\x00\x01"
+        assert isinstance(
+            xdlms.ActionRequestFactory.from_bytes(data), xdlms.ActionRequestNextPblock
+        )
+
+    def test_with_list(self):
+        data = b"\xc3\x03\xc0\x01\x00\x0f\x00\x00(\x00\x00\xff\x01\x01\x00"
+        assert isinstance(
+            xdlms.ActionRequestFactory.from_bytes(data), xdlms.ActionRequestWithList
+        )
+
+    def test_with_pblock(self):
+        data = b"\xc3\x06\xc0\x01\x00\x00\x00\x02\x01\x00"
+        assert isinstance(
+            xdlms.ActionRequestFactory.from_bytes(data), xdlms.ActionRequestWithPblock
+        )
 
 
 class TestActionResponseNormal:
@@ -194,7 +207,173 @@ class TestActionResponseFactory:
         with pytest.raises(ValueError):
             xdlms.ActionResponseFactory.from_bytes(data)
 
-    def test_type_other_than_normal_raises_not_implemented_error(self):
-        data = b"\xc7\x02\xc0\x00\x01\x01\xfa"
-        with pytest.raises(NotImplementedError):
-            xdlms.ActionResponseFactory.from_bytes(data)
+    def test_with_pblock(self):
+        data = b"\xc7\x02\xc0\x00\x00\x00\x00\x01\x02\x01\x00"
+        assert isinstance(
+            xdlms.ActionResponseFactory.from_bytes(data),
+            xdlms.ActionResponseWithPblock,
+        )
+
+    def test_last_pblock(self):
+        data = b"\xc7\x02\xc0\x01\x00\x00\x00\x02\x02\x01\x00"
+        assert isinstance(
+            xdlms.ActionResponseFactory.from_bytes(data),
+            xdlms.ActionResponseLastPblock,
+        )
+
+    def test_with_list(self):
+        data = b"\xc7\x03\xc0\x02\x00\x00\x00\x01\x01\xfa"
+        assert isinstance(
+            xdlms.ActionResponseFactory.from_bytes(data), xdlms.ActionResponseWithList
+        )
+
+    def test_next_pblock(self):
+        data = b"\xc7\x04\xc0\x00\x00\x00\x01"
+        assert isinstance(
+            xdlms.ActionResponseFactory.from_bytes(data),
+            xdlms.ActionResponseNextPblock,
+        )
+
+
+class TestActionRequestWithList:
+    def test_transform_bytes(self):
+        data = (
+            b"\xc3\x03\xc1\x02"
+            b"\x00\x46\x00\x00`\x03\n\xff\x01"
+            b"\x00\x46\x00\x00`\x03\n\xff\x02"
+            b"\x02\x0f\x00\x00"
+        )
+        action = xdlms.ActionRequestWithList(
+            cosem_methods=[
+                cosem.CosemMethod(
+                    interface=enumerations.CosemInterface.DISCONNECT_CONTROL,
+                    instance=cosem.Obis(0, 0, 96, 3, 10),
+                    method=1,
+                ),
+                cosem.CosemMethod(
+                    interface=enumerations.CosemInterface.DISCONNECT_CONTROL,
+                    instance=cosem.Obis(0, 0, 96, 3, 10),
+                    method=2,
+                ),
+            ],
+            data=[b"\x0f\x00", None],
+            invoke_id_and_priority=xdlms.InvokeIdAndPriority(
+                invoke_id=1, confirmed=True, high_priority=True
+            ),
+        )
+        assert action.to_bytes() == data
+        assert xdlms.ActionRequestWithList.from_bytes(data) == action
+
+    def test_data_must_match_methods(self):
+        with pytest.raises(ValueError):
+            xdlms.ActionRequestWithList(
+                cosem_methods=[
+                    cosem.CosemMethod(
+                        interface=enumerations.CosemInterface.DISCONNECT_CONTROL,
+                        instance=cosem.Obis(0, 0, 96, 3, 10),
+                        method=1,
+                    )
+                ],
+                data=[],
+            )
+
+
+class TestActionRequestPblocks:
+    method = cosem.CosemMethod(
+        interface=enumerations.CosemInterface.IMAGE_TRANSFER,
+        instance=cosem.Obis(0, 0, 44, 0, 0),
+        method=2,
+    )
+
+    def test_first_pblock_transform_bytes(self):
+        data = (
+            b"\xc3\x04\xc0\x00\x12\x00\x00,\x00\x00\xff\x02"
+            b"\x00\x00\x00\x00\x01\x03\x02\x02\x06"
+        )
+        action = xdlms.ActionRequestWithFirstPblock(
+            cosem_method=self.method,
+            pblock=xdlms.DataBlockSA(
+                last_block=False, block_number=1, raw_data=b"\x02\x02\x06"
+            ),
+        )
+        assert action.to_bytes() == data
+        assert xdlms.ActionRequestWithFirstPblock.from_bytes(data) == action
+
+    def test_pblock_transform_bytes(self):
+        data = b"\xc3\x06\xc0\x01\x00\x00\x00\x02\x02\x00\x01"
+        action = xdlms.ActionRequestWithPblock(
+            pblock=xdlms.DataBlockSA(
+                last_block=True, block_number=2, raw_data=b"\x00\x01"
+            ),
+        )
+        assert action.to_bytes() == data
+        assert xdlms.ActionRequestWithPblock.from_bytes(data) == action
+
+    def test_list_and_first_pblock_transform_bytes(self):
+        action = xdlms.ActionRequestWithListAndFirstPblock(
+            cosem_methods=[self.method, self.method],
+            pblock=xdlms.DataBlockSA(
+                last_block=False, block_number=1, raw_data=b"\x02\x02\x06"
+            ),
+        )
+        assert (
+            xdlms.ActionRequestWithListAndFirstPblock.from_bytes(action.to_bytes())
+            == action
+        )
+
+    def test_next_pblock_transform_bytes(self):
+        data = b"\xc3\x02\xc0\x00\x00\x00\x05"
+        action = xdlms.ActionRequestNextPblock(block_number=5)
+        assert action.to_bytes() == data
+        assert xdlms.ActionRequestNextPblock.from_bytes(data) == action
+
+    def test_wrong_octet_string_length_raises_value_error(self):
+        data = b"\xc3\x06\xc0\x01\x00\x00\x00\x02\x05\x00\x01"
+        with pytest.raises(ValueError):
+            xdlms.ActionRequestWithPblock.from_bytes(data)
+
+
+class TestActionResponseWithList:
+    def test_transform_bytes(self):
+        data = b"\xc7\x03\xc0\x03\x00\x00\x00\x01\x00\x11\x05\x03\x01\x01\x03"
+        response = xdlms.ActionResponseWithList(
+            responses=[
+                xdlms.ActionResponseWithOptionalData(
+                    status=enumerations.ActionResultStatus.SUCCESS
+                ),
+                xdlms.ActionResponseWithOptionalData(
+                    status=enumerations.ActionResultStatus.SUCCESS, data=b"\x11\x05"
+                ),
+                xdlms.ActionResponseWithOptionalData(
+                    status=enumerations.ActionResultStatus.READ_WRITE_DENIED,
+                    error=enumerations.DataAccessResult.READ_WRITE_DENIED,
+                ),
+            ]
+        )
+        assert response.to_bytes() == data
+        assert xdlms.ActionResponseWithList.from_bytes(data) == response
+
+
+class TestActionResponsePblocks:
+    def test_with_pblock_transform_bytes(self):
+        data = b"\xc7\x02\xc0\x00\x00\x00\x00\x01\x02\x01\x00"
+        response = xdlms.ActionResponseWithPblock(data=b"\x01\x00", block_number=1)
+        assert response.to_bytes() == data
+        assert xdlms.ActionResponseWithPblock.from_bytes(data) == response
+
+    def test_last_pblock_transform_bytes(self):
+        data = b"\xc7\x02\xc0\x01\x00\x00\x00\x02\x01\x00"
+        response = xdlms.ActionResponseLastPblock(data=b"\x00", block_number=2)
+        assert response.to_bytes() == data
+        assert xdlms.ActionResponseLastPblock.from_bytes(data) == response
+
+    def test_last_block_in_with_pblock_raises_value_error(self):
+        data = b"\xc7\x02\xc0\x01\x00\x00\x00\x02\x01\x00"
+        with pytest.raises(ValueError):
+            xdlms.ActionResponseWithPblock.from_bytes(data)
+
+    def test_next_pblock_transform_bytes(self):
+        data = b"\xc7\x04\xc0\x00\x00\x00\x03"
+        response = xdlms.ActionResponseNextPblock(block_number=3)
+        assert response.to_bytes() == data
+        assert xdlms.ActionResponseNextPblock.from_bytes(data) == response